@@ -7,15 +7,23 @@
 # pyre-unsafe
 
 import functools
+import sys
 from typing import Callable
 
-from botocore.exceptions import ClientError
-from fbpcp.error.mapper.aws import map_aws_error
-from fbpcp.error.mapper.gcp import map_gcp_error
-from fbpcp.error.mapper.k8s import map_k8s_error
 from fbpcp.error.pcp import PcpError
-from google.cloud.exceptions import GoogleCloudError
-from kubernetes.client.exceptions import OpenApiException
+
+# Cloud SDK error types by the module defining them. They are looked up in sys.modules
+# instead of being imported: an error of a type can only be raised once its module has
+# been imported, so the SDKs are only loaded by the gateways actually used.
+AWS_ERROR = ("botocore.exceptions", "ClientError")
+GCP_ERROR = ("google.cloud.exceptions", "GoogleCloudError")
+K8S_ERROR = ("kubernetes.client.exceptions", "OpenApiException")
+
+
+def _is_error(err: Exception, error_type: tuple) -> bool:
+    module_name, class_name = error_type
+    module = sys.modules.get(module_name)
+    return module is not None and isinstance(err, getattr(module, class_name))
 
 
 def error_handler(f: Callable) -> Callable:
@@ -25,15 +33,21 @@ def error_handler(f: Callable) -> Callable:
             return f(*args, **kwargs)
         except PcpError as err:
             raise err from None
-        # AWS Error
-        except ClientError as err:
-            raise map_aws_error(err) from None
-        # GCP Error
-        except GoogleCloudError as err:
-            raise map_gcp_error(err) from None
-        except OpenApiException as err:
-            raise map_k8s_error(err) from None
         except Exception as err:
+            # AWS Error
+            if _is_error(err, AWS_ERROR):
+                from fbpcp.error.mapper.aws import map_aws_error
+
+                raise map_aws_error(err) from None
+            # GCP Error
+            if _is_error(err, GCP_ERROR):
+                from fbpcp.error.mapper.gcp import map_gcp_error
+
+                raise map_gcp_error(err) from None
+            if _is_error(err, K8S_ERROR):
+                from fbpcp.error.mapper.k8s import map_k8s_error
+
+                raise map_k8s_error(err) from None
             raise PcpError(err) from None
 
     return wrapper
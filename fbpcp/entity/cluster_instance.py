@@ -11,6 +11,7 @@ from enum import Enum
 from typing import Dict
 
 from dataclasses_json import dataclass_json
+from fbpcp.decorator.slots import add_slots
 
 
 class ClusterStatus(Enum):
@@ -20,6 +21,7 @@ class ClusterStatus(Enum):
 
 
 @dataclass_json
+@add_slots
 @dataclass
 class Cluster:
     cluster_arn: str
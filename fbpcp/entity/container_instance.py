@@ -11,7 +11,8 @@ from enum import Enum
 from typing import Optional
 
 from dataclasses_json import dataclass_json
-from fbpcp.entity.container_metadata import ContainerStoppedMetadata
+from fbpcp.decorator.slots import add_slots
+from fbpcp.entity.container_metadata import ContainerStoppedMetadata, ContainerTimeline
 from fbpcp.entity.container_permission import ContainerPermissionConfig
 
 
@@ -23,6 +24,7 @@ class ContainerInstanceStatus(Enum):
 
 
 @dataclass_json
+@add_slots
 @dataclass
 class ContainerInstance:
     instance_id: str
@@ -33,3 +35,4 @@ class ContainerInstance:
     exit_code: Optional[int] = None
     permission: Optional[ContainerPermissionConfig] = None
     stopped_metadata: Optional[ContainerStoppedMetadata] = None
+    timeline: Optional[ContainerTimeline] = None
@@ -7,13 +7,50 @@
 # pyre-strict
 
 from dataclasses import dataclass
+from typing import Dict, Optional
 
 from dataclasses_json import dataclass_json
+from fbpcp.decorator.slots import add_slots
 
 
 @dataclass_json
+@add_slots
 @dataclass
 class ContainerStoppedMetadata:
     stopped_at: str
     stop_code: str
     stopped_reason: str
+
+
+# (phase, start field, end field) of the container lifecycle phases
+CONTAINER_TIMELINE_PHASES = (
+    ("provisioning", "created_at", "pull_started_at"),
+    ("image_pull", "pull_started_at", "pull_stopped_at"),
+    ("container_start", "pull_stopped_at", "started_at"),
+    ("launch", "created_at", "started_at"),
+    ("run", "started_at", "stopping_at"),
+    ("stopping", "stopping_at", "stopped_at"),
+)
+
+
+@dataclass_json
+@add_slots
+@dataclass
+class ContainerTimeline:
+    """Lifecycle timestamps of a container, in seconds since the epoch"""
+
+    created_at: Optional[float] = None
+    pull_started_at: Optional[float] = None
+    pull_stopped_at: Optional[float] = None
+    started_at: Optional[float] = None
+    stopping_at: Optional[float] = None
+    stopped_at: Optional[float] = None
+
+    def get_phase_durations(self) -> Dict[str, int]:
+        """Returns the duration in milliseconds of every phase whose start and end are known"""
+        durations = {}
+        for phase, start_field, end_field in CONTAINER_TIMELINE_PHASES:
+            start, end = getattr(self, start_field), getattr(self, end_field)
+            if start is not None and end is not None:
+                durations[phase] = int((end - start) * 1e3)
+        return durations
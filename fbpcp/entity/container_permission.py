@@ -9,9 +9,11 @@
 from dataclasses import dataclass
 
 from dataclasses_json import dataclass_json
+from fbpcp.decorator.slots import add_slots
 
 
 @dataclass_json
+@add_slots
 @dataclass
 class ContainerPermissionConfig:
     role_id: str
@@ -8,7 +8,7 @@
 
 from dataclasses import dataclass
 from enum import Enum
-from typing import Dict
+from typing import Dict, Union
 
 from fbpcp.entity.cloud_provider import CloudProvider
 from fbpcp.error.pcp import InvalidParameterError
@@ -36,10 +36,19 @@ class ContainerTypeConfig:
 
     @classmethod
     def get_config(
-        cls, cloud_provider: CloudProvider, container_type: ContainerType
+        cls,
+        cloud_provider: CloudProvider,
+        container_type: Union[ContainerType, "ContainerTypeConfig"],
     ) -> "ContainerTypeConfig":
+        if isinstance(container_type, ContainerTypeConfig):
+            # a custom size
+            return container_type
         if cloud_provider != CloudProvider.AWS:
             raise InvalidParameterError(
                 f"Cloud provider {cloud_provider} is not supported."
             )
         return cls(**CONTAINER_TYPES[cloud_provider][container_type])
+
+
+# A predefined container type, or a custom number of vCPU and memory
+ContainerSize = Union[ContainerType, ContainerTypeConfig]
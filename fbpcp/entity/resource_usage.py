@@ -0,0 +1,41 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import hashlib
+import json
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class ResourceUsage:
+    """Resources used by one package run, as recorded by the OneDocker runner"""
+
+    package_name: str
+    version: str
+    # see get_run_fingerprint
+    fingerprint: str
+    peak_memory: int  # Peak RSS in bytes
+    cpu_time: float  # User and system cpu seconds
+    wall_time: float  # Seconds
+    cpu: int  # Number of vCPU available to the run
+    exit_code: int
+    recorded_at: float = field(default_factory=time.time)
+
+
+def get_run_fingerprint(
+    package_name: str, version: str, exe_args: Optional[str] = None
+) -> str:
+    """Identify the runs of a package version with the same arguments"""
+    return hashlib.sha256(
+        json.dumps([package_name, version, exe_args or ""]).encode()
+    ).hexdigest()[:32]
@@ -0,0 +1,27 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from dataclasses import dataclass, field
+from typing import Optional
+from uuid import uuid4
+
+from dataclasses_json import dataclass_json
+
+
+@dataclass_json
+@dataclass
+class WorkItem:
+    """A package run handed to a serving OneDocker runner through a work queue"""
+
+    package_name: str
+    version: str
+    exe_args: Optional[str] = None
+    timeout: Optional[int] = None
+    item_id: str = field(default_factory=lambda: str(uuid4()))
+    # set by the runner once the item has run
+    exit_code: Optional[int] = None
@@ -11,6 +11,7 @@ from fbpcp.error.pcp import (
     InvalidParameterError,
     LimitExceededError,
     PcpError,
+    PreconditionFailedError,
     ThrottlingError,
 )
 
@@ -30,4 +31,8 @@ def map_aws_error(error: ClientError) -> PcpError:
     if code == "LimitExceededException":
         return LimitExceededError(message)
 
+    # conditional writes lost to a concurrent writer
+    if code in ("PreconditionFailed", "ConditionalRequestConflict"):
+        return PreconditionFailedError(message)
+
     return PcpError(message)
@@ -21,3 +21,7 @@ class ThrottlingError(PcpError):
 
 class LimitExceededError(PcpError):
     pass
+
+
+class PreconditionFailedError(PcpError):
+    pass
@@ -5,22 +5,27 @@
 # LICENSE file in the root directory of this source tree.
 
 # pyre-strict
-from concurrent.futures import ThreadPoolExecutor
-from typing import Any, Dict, Final, Iterator, List, Optional, Tuple
+import queue
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from typing import Any, Dict, Final, Iterator, List, Optional, Set, Tuple
 
 import boto3
 from botocore.client import BaseClient
+from botocore.exceptions import ClientError
 from fbpcp.decorator.error_handler import error_handler
 from fbpcp.decorator.metrics import duration_time, error_counter, request_counter
 from fbpcp.entity.cluster_instance import Cluster
 from fbpcp.entity.container_definition import ContainerDefinition
 from fbpcp.entity.container_instance import ContainerInstance
-from fbpcp.error.pcp import PcpError
+from fbpcp.error.mapper.aws import map_aws_error
+from fbpcp.error.pcp import InvalidParameterError, PcpError
 from fbpcp.gateway.aws import AWSGateway
 from fbpcp.mapper.aws import (
     map_ecstask_to_containerinstance,
     map_ecstaskdefinition_to_containerdefinition,
-    map_esccluster_to_clusterinstance,
+    map_ecstasks_to_containerinstances,
+    map_escclusters_to_clusterinstances,
     map_gb_to_mb,
     map_vcpu_to_unit,
 )
@@ -31,6 +36,12 @@ METRICS_RUN_TASK_COUNT = "aws.ecs.run_task.count"
 METRICS_RUN_TASK_ERROR_COUNT = "aws.ecs.run_task.error.count"
 METRICS_RUN_TASK_DURATION = "aws.ecs.run_task.duration"
 
+# The maximum number of tasks a single RunTask call can launch
+MAX_RUN_TASK_COUNT = 10
+# The maximum number of tasks a single ListTasks page or DescribeTasks call can hold
+MAX_DESCRIBE_TASKS_COUNT = 100
+DEFAULT_MAX_DESCRIBE_WORKERS = 4
+
 
 class ECSGateway(AWSGateway, MetricsGetter):
     def __init__(
@@ -46,6 +57,8 @@ class ECSGateway(AWSGateway, MetricsGetter):
 
         self.client: BaseClient = self.create_ecs_client()
         self.metrics: Final[Optional[MetricsEmitter]] = metrics
+        # clients reused by the parallel describe calls, one per concurrent worker
+        self._client_pool: "queue.SimpleQueue[BaseClient]" = queue.SimpleQueue()
 
     def has_metrics(self) -> bool:
         return self.metrics is not None
@@ -101,19 +114,77 @@ class ECSGateway(AWSGateway, MetricsGetter):
 
         return map_ecstask_to_containerinstance(response["tasks"][0])
 
+    @error_counter(METRICS_RUN_TASK_ERROR_COUNT)
+    @request_counter(METRICS_RUN_TASK_COUNT)
+    @duration_time(METRICS_RUN_TASK_DURATION)
+    @error_handler
+    def run_tasks(
+        self,
+        task_definition: str,
+        container: str,
+        cmd: str,
+        cluster: str,
+        subnets: List[str],
+        count: int,
+        env_vars: Optional[Dict[str, str]] = None,
+        cpu: Optional[int] = None,
+        memory: Optional[int] = None,
+        task_role_arn: Optional[str] = None,
+    ) -> List[ContainerInstance]:
+        """Launch count identical tasks with a single RunTask call.
+
+        ECS may place only some of the tasks, e.g. when the cluster is short on capacity.
+        The placed tasks are returned and the failures logged, so the caller can launch the
+        remaining ones again.
+
+        Raises:
+            InvalidParameterError: count is not between 1 and MAX_RUN_TASK_COUNT.
+            PcpError: no task could be placed.
+        """
+        if not 1 <= count <= MAX_RUN_TASK_COUNT:
+            raise InvalidParameterError(
+                f"count should be between 1 and {MAX_RUN_TASK_COUNT}, got {count}"
+            )
+        overrides = self._get_overrides(
+            container, cmd, env_vars, cpu, memory, task_role_arn
+        )
+        response = self.client.run_task(
+            taskDefinition=task_definition,
+            cluster=cluster,
+            networkConfiguration={
+                "awsvpcConfiguration": {
+                    "subnets": subnets,
+                    "assignPublicIp": "ENABLED",
+                }
+            },
+            overrides=overrides,
+            count=count,
+        )
+
+        for failure in response["failures"]:
+            self.logger.error(f"ECSGateway failed to create a task. Failure: {failure}")
+        if not response["tasks"]:
+            raise PcpError(f"ECS failure: reason: {response['failures'][0]['reason']}")
+
+        return map_ecstasks_to_containerinstances(response["tasks"])
+
     @error_handler
     def describe_tasks(
         self, cluster: str, tasks: List[str]
     ) -> List[Optional[ContainerInstance]]:
-        response = self.client.describe_tasks(
+        return self._describe_tasks_core(self.client, cluster, tasks)
+
+    def _describe_tasks_core(
+        self, client: BaseClient, cluster: str, tasks: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        response = client.describe_tasks(
             cluster=cluster, tasks=tasks
         )  # not necessarily in order of `tasks`
 
-        arn_to_instance: Dict[str, Optional[ContainerInstance]] = {}
-        for resp_task_dict in response["tasks"]:
-            arn_to_instance[resp_task_dict["taskArn"]] = (
-                map_ecstask_to_containerinstance(resp_task_dict)
-            )
+        arn_to_instance: Dict[str, Optional[ContainerInstance]] = {
+            instance.instance_id: instance
+            for instance in map_ecstasks_to_containerinstances(response["tasks"])
+        }
 
         for failure in response["failures"]:
             self.logger.warning(
@@ -131,10 +202,13 @@ class ECSGateway(AWSGateway, MetricsGetter):
         self,
         cluster: str,
         nextToken: Optional[str] = None,
+        desired_status: Optional[str] = None,
     ) -> Tuple[List[str], str]:
         kwargs = {"cluster": cluster}
         if nextToken:
             kwargs["nextToken"] = nextToken
+        if desired_status:
+            kwargs["desiredStatus"] = desired_status
 
         response = self.client.list_tasks(**kwargs)
         return response.get("taskArns", None), response.get("nextToken", None)
@@ -153,6 +227,83 @@ class ECSGateway(AWSGateway, MetricsGetter):
             if list_tasks[0]:
                 yield from list_tasks[0]
 
+    def iter_cluster_instances(
+        self,
+        cluster: str,
+        desired_status: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_DESCRIBE_WORKERS,
+    ) -> Iterator[ContainerInstance]:
+        """Yield the container instances of a cluster while it is still being listed.
+
+        Each ListTasks page (up to 100 ARNs) is described in a DescribeTasks call running
+        in the background while the next pages are listed. At most max_workers pages are
+        held in memory at a time, so the whole cluster inventory is never materialized.
+        Instances are yielded as their batch completes, not in listing order.
+
+        Args:
+            cluster: the cluster to list.
+            desired_status: optional ListTasks filter: RUNNING (default on ECS side), PENDING or STOPPED.
+            max_workers: the maximum number of DescribeTasks calls in flight.
+        """
+        # error_handler cannot wrap a generator, which raises while it is iterated
+        try:
+            yield from self._iter_cluster_instances(
+                cluster, desired_status, max_workers
+            )
+        except PcpError:
+            raise
+        except ClientError as err:
+            raise map_aws_error(err) from None
+        except Exception as err:
+            raise PcpError(err) from None
+
+    def _iter_cluster_instances(
+        self,
+        cluster: str,
+        desired_status: Optional[str],
+        max_workers: int,
+    ) -> Iterator[ContainerInstance]:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        in_flight: Set["Future[List[Optional[ContainerInstance]]]"] = set()
+        try:
+            next_token = None
+            while True:
+                arns, next_token = self.list_tasks(cluster, next_token, desired_status)
+                for start in range(0, len(arns or []), MAX_DESCRIBE_TASKS_COUNT):
+                    if len(in_flight) >= max_workers:
+                        done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                        yield from self._completed_instances(done)
+                    in_flight.add(
+                        executor.submit(
+                            self._describe_tasks_pooled,
+                            cluster,
+                            arns[start : start + MAX_DESCRIBE_TASKS_COUNT],
+                        )
+                    )
+                if not next_token:
+                    break
+            while in_flight:
+                done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                yield from self._completed_instances(done)
+        finally:
+            # shutdown(cancel_futures=True) needs Python 3.9
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=True)
+
+    def _describe_tasks_pooled(
+        self, cluster: str, tasks: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        with self._pooled_client() as client:
+            return self._describe_tasks_core(client, cluster, tasks)
+
+    def _completed_instances(
+        self, done: Set["Future[List[Optional[ContainerInstance]]]"]
+    ) -> Iterator[ContainerInstance]:
+        for future in done:
+            # tasks stopped long ago may be gone by the time they are described
+            yield from (instance for instance in future.result() if instance)
+
     @error_handler
     def stop_task(self, cluster: str, task_id: str) -> None:
         self.client.stop_task(
@@ -169,10 +320,7 @@ class ECSGateway(AWSGateway, MetricsGetter):
         if not clusters:
             clusters = self.list_clusters()
         response = self.client.describe_clusters(clusters=clusters, include=["TAGS"])
-        cluster_instances = [
-            map_esccluster_to_clusterinstance(cluster)
-            for cluster in response["clusters"]
-        ]
+        cluster_instances = map_escclusters_to_clusterinstances(response["clusters"])
         if tags:
             return list(
                 filter(
@@ -252,16 +400,9 @@ class ECSGateway(AWSGateway, MetricsGetter):
             task_definitions = self.list_task_definitions()
         container_definitions = []
         with ThreadPoolExecutor(max_workers=max_workers) as executor:
-            input_arguments = [
-                (
-                    self.create_ecs_client(),
-                    definition,
-                )
-                for definition in task_definitions
-            ]
             results = executor.map(
-                lambda args: self._describe_task_definition_core(*args),
-                input_arguments,
+                self._describe_task_definition_pooled,
+                task_definitions,
             )
             for container_definition in results:
                 if tags is None or tags.items() <= container_definition.tags.items():
@@ -269,6 +410,24 @@ class ECSGateway(AWSGateway, MetricsGetter):
 
         return container_definitions
 
+    def _describe_task_definition_pooled(
+        self, task_defination: str
+    ) -> ContainerDefinition:
+        with self._pooled_client() as client:
+            return self._describe_task_definition_core(client, task_defination)
+
+    @contextmanager
+    def _pooled_client(self) -> Iterator[BaseClient]:
+        """Borrow a client from the pool, creating one if all of them are in use"""
+        try:
+            client = self._client_pool.get_nowait()
+        except queue.Empty:
+            client = self.create_ecs_client()
+        try:
+            yield client
+        finally:
+            self._client_pool.put(client)
+
     def _get_overrides(
         self,
         container: str,
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from fbpcp.decorator.error_handler import error_handler
+from fbpcp.error.mapper.k8s import map_k8s_error
+from fbpcp.error.pcp import PcpError
+from kubernetes import client, config as k8s_config, watch
+from kubernetes.client.exceptions import ApiException, OpenApiException
+from kubernetes.config.config_exception import ConfigException
+
+
+class K8sGateway:
+    def __init__(
+        self,
+        namespace: str,
+        config_file: Optional[str] = None,
+        context: Optional[str] = None,
+        client_config: Optional[client.Configuration] = None,
+    ) -> None:
+        """
+        Args:
+            namespace: the namespace of the jobs and pods.
+            config_file: kubeconfig file. Ignored when running inside a cluster.
+            context: kubeconfig context. Defaults to the current context.
+            client_config: an explicit client configuration, used instead of the in-cluster or kubeconfig one.
+        """
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.namespace = namespace
+        if client_config is None:
+            try:
+                k8s_config.load_incluster_config()
+            except ConfigException:
+                k8s_config.load_kube_config(config_file=config_file, context=context)
+        api_client = client.ApiClient(client_config)
+        self.batch_api = client.BatchV1Api(api_client)
+        self.core_api = client.CoreV1Api(api_client)
+
+    @error_handler
+    def create_job(self, body: Dict[str, Any]) -> None:
+        self.batch_api.create_namespaced_job(namespace=self.namespace, body=body)
+
+    @error_handler
+    def read_job(self, name: str) -> Optional[client.V1Job]:
+        try:
+            return self.batch_api.read_namespaced_job(
+                name=name, namespace=self.namespace
+            )
+        except ApiException as err:
+            if err.status == 404:
+                return None
+            raise err
+
+    @error_handler
+    def delete_job(self, name: str) -> None:
+        self.batch_api.delete_namespaced_job(
+            name=name, namespace=self.namespace, propagation_policy="Background"
+        )
+
+    @error_handler
+    def list_pods(self, label_selector: str) -> Tuple[List[client.V1Pod], str]:
+        """Returns the matching pods and the resource version to watch them from"""
+        pod_list = self.core_api.list_namespaced_pod(
+            namespace=self.namespace, label_selector=label_selector
+        )
+        return pod_list.items, pod_list.metadata.resource_version
+
+    @error_handler
+    def delete_pods(self, label_selector: str) -> None:
+        self.core_api.delete_collection_namespaced_pod(
+            namespace=self.namespace, label_selector=label_selector
+        )
+
+    def watch_pods(
+        self,
+        label_selector: str,
+        resource_version: str,
+        timeout_seconds: int,
+    ) -> Iterator[Tuple[str, Any]]:
+        """Yield (event type, pod) pairs of the matching pods after resource_version.
+
+        The stream ends after timeout_seconds. It raises an InvalidParameterError or a
+        PcpError when the watch fails, e.g. when resource_version is too old and the pods
+        have to be listed again.
+        """
+        # error_handler cannot wrap the iteration of a generator
+        try:
+            for event in watch.Watch().stream(
+                self.core_api.list_namespaced_pod,
+                namespace=self.namespace,
+                label_selector=label_selector,
+                resource_version=resource_version,
+                timeout_seconds=timeout_seconds,
+            ):
+                yield event["type"], event["object"]
+        except OpenApiException as err:
+            raise map_k8s_error(err) from None
+        except Exception as err:
+            raise PcpError(err) from None
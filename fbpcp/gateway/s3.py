@@ -8,7 +8,7 @@
 
 import json
 import os
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, IO, List, Optional, Tuple
 
 import boto3
 from botocore import UNSIGNED
@@ -75,11 +75,48 @@ class S3Gateway(AWSGateway):
     def put_object(self, bucket: str, key: str, data: str) -> None:
         self.client.put_object(Bucket=bucket, Key=key, Body=data.encode())
 
+    @error_handler
+    def put_object_conditional(
+        self, bucket: str, key: str, data: str, etag: Optional[str]
+    ) -> str:
+        """Write an object only if its current ETag is etag, or if it does not exist when
+        etag is None, and return the new ETag. Raises PreconditionFailedError otherwise.
+        """
+        condition = {"IfMatch": etag} if etag else {"IfNoneMatch": "*"}
+        res = self.client.put_object(
+            Bucket=bucket, Key=key, Body=data.encode(), **condition
+        )
+        return res["ETag"]
+
+    @error_handler
+    def get_object_with_etag(self, bucket: str, key: str) -> Optional[Tuple[str, str]]:
+        """Read an object and its ETag, None if the object does not exist"""
+        try:
+            res = self.client.get_object(Bucket=bucket, Key=key)
+        except ClientError as err:
+            if err.response["Error"]["Code"] == "NoSuchKey":
+                return None
+            raise
+        return res["Body"].read().decode(), res["ETag"]
+
     @error_handler
     def get_object(self, bucket: str, key: str) -> str:
         res = self.client.get_object(Bucket=bucket, Key=key)
         return res["Body"].read().decode()
 
+    @error_handler
+    def get_object_range(self, bucket: str, key: str, start: int, end: int) -> bytes:
+        """Read the bytes start to end (inclusive) of an object"""
+        res = self.client.get_object(
+            Bucket=bucket, Key=key, Range=f"bytes={start}-{end}"
+        )
+        return res["Body"].read()
+
+    @error_handler
+    def get_object_stream(self, bucket: str, key: str) -> IO[bytes]:
+        """Open an object for streaming reads of its body"""
+        return self.client.get_object(Bucket=bucket, Key=key)["Body"]
+
     @error_handler
     def get_object_size(self, bucket: str, key: str) -> int:
         return self.client.head_object(Bucket=bucket, Key=key)["ContentLength"]
@@ -100,6 +137,13 @@ class S3Gateway(AWSGateway):
 
         return key_list
 
+    @error_handler
+    def list_objects_info(self, bucket: str, key: str) -> List[Dict[str, Any]]:
+        """List the Key, Size, LastModified and ETag of all the objects under a prefix"""
+        paginator = self.client.get_paginator("list_objects_v2")
+        pages = paginator.paginate(Bucket=bucket, Prefix=key)
+        return [content for page in pages for content in page.get("Contents", [])]
+
     @error_handler
     def list_folders(self, bucket: str, key: str) -> List[str]:
         """List the folders for a given S3 path (key)
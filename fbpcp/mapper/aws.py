@@ -7,13 +7,15 @@
 # pyre-strict
 
 import logging
+from datetime import datetime
 from decimal import Decimal
-from typing import Any, Dict, List
+from typing import Any, Dict, List, Optional, Union
 
 from fbpcp.entity.cloud_cost import CloudCost, CloudCostItem
 from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
 from fbpcp.entity.container_definition import ContainerDefinition
 from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_metadata import ContainerTimeline
 from fbpcp.entity.container_permission import ContainerPermissionConfig
 from fbpcp.entity.firewall_ruleset import FirewallRule, FirewallRuleset
 from fbpcp.entity.policy_statement import PolicyStatement
@@ -37,6 +39,16 @@ from fbpcp.util.aws import (
 CPU_VIRTUAL_TO_UNIT = 1024
 MEMORY_GB_TO_MB = 1024
 
+# ECS task timestamps -> ContainerTimeline fields
+ECS_TASK_TIMELINE_FIELDS = {
+    "createdAt": "created_at",
+    "pullStartedAt": "pull_started_at",
+    "pullStoppedAt": "pull_stopped_at",
+    "startedAt": "started_at",
+    "stoppingAt": "stopping_at",
+    "stoppedAt": "stopped_at",
+}
+
 
 def map_vcpu_to_unit(vcpu: int) -> int:
     return vcpu * CPU_VIRTUAL_TO_UNIT
@@ -54,30 +66,37 @@ def map_mb_to_gb(mb: str) -> int:
     return int(mb) // MEMORY_GB_TO_MB
 
 
+def map_ecstasks_to_containerinstances(
+    tasks: List[Dict[str, Any]]
+) -> List[ContainerInstance]:
+    """Map the tasks of a DescribeTasks or RunTask response"""
+    return [map_ecstask_to_containerinstance(task) for task in tasks]
+
+
 def map_ecstask_to_containerinstance(task: Dict[str, Any]) -> ContainerInstance:
     container = task["containers"][0]
-    logging.debug(f"The ECS task response from AWS: {task}")
+    # formatted only when debug logging is enabled
+    logging.debug("The ECS task response from AWS: %s", task)
+    network_interfaces = container["networkInterfaces"]
     ip_v4 = (
-        container["networkInterfaces"][0].get("privateIpv4Address")
-        if len(container["networkInterfaces"]) > 0
-        else None
+        network_interfaces[0].get("privateIpv4Address") if network_interfaces else None
     )
 
-    status = container["lastStatus"]
-    if status == "RUNNING":
+    exit_code = container.get("exitCode")
+    last_status = container["lastStatus"]
+    if last_status == "RUNNING":
         status = ContainerInstanceStatus.STARTED
-    elif status == "STOPPED":
-        if container.get("exitCode") == 0:
+    elif last_status == "STOPPED":
+        if exit_code == 0:
             status = ContainerInstanceStatus.COMPLETED
         else:
             status = ContainerInstanceStatus.FAILED
     else:
         status = ContainerInstanceStatus.UNKNOWN
-    vcpu = map_unit_to_vcpu(task["cpu"]) if "cpu" in task else None
-    memory_in_gb = map_mb_to_gb(task["memory"]) if "memory" in task else None
+    cpu = task.get("cpu")
+    memory = task.get("memory")
 
     container_permission = None
-
     overrides = task.get("overrides")
     if overrides:
         task_role_arn = overrides.get("taskRoleArn")
@@ -88,13 +107,32 @@ def map_ecstask_to_containerinstance(task: Dict[str, Any]) -> ContainerInstance:
         instance_id=task["taskArn"],
         ip_address=ip_v4,
         status=status,
-        cpu=vcpu,
-        memory=memory_in_gb,
-        exit_code=container.get("exitCode"),
+        cpu=map_unit_to_vcpu(cpu) if cpu is not None else None,
+        memory=map_mb_to_gb(memory) if memory is not None else None,
+        exit_code=exit_code,
         permission=container_permission,
+        timeline=map_ecstask_to_containertimeline(task),
     )
 
 
+def map_ecstask_to_containertimeline(
+    task: Dict[str, Any]
+) -> Optional[ContainerTimeline]:
+    timestamps = None
+    for key, field in ECS_TASK_TIMELINE_FIELDS.items():
+        timestamp = task.get(key)
+        if timestamp is not None:
+            if timestamps is None:
+                timestamps = {}
+            timestamps[field] = _map_timestamp_to_epoch(timestamp)
+    return ContainerTimeline(**timestamps) if timestamps else None
+
+
+def _map_timestamp_to_epoch(timestamp: Union[datetime, float]) -> float:
+    # boto3 parses timestamps into datetimes, raw API responses hold epoch seconds
+    return timestamp.timestamp() if isinstance(timestamp, datetime) else timestamp
+
+
 def map_esccluster_to_clusterinstance(cluster: Dict[str, Any]) -> Cluster:
     status = cluster["status"]
     if status == "ACTIVE":
@@ -115,6 +153,13 @@ def map_esccluster_to_clusterinstance(cluster: Dict[str, Any]) -> Cluster:
     )
 
 
+def map_escclusters_to_clusterinstances(
+    clusters: List[Dict[str, Any]]
+) -> List[Cluster]:
+    """Map the clusters of a DescribeClusters response"""
+    return [map_esccluster_to_clusterinstance(cluster) for cluster in clusters]
+
+
 def map_ec2vpc_to_vpcinstance(vpc: Dict[str, Any]) -> Vpc:
     state = vpc["State"]
     if state == "pending":
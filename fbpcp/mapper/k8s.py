@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from datetime import datetime
+from typing import Any, Optional
+
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_metadata import ContainerTimeline
+
+
+def map_k8spod_to_containerinstance(
+    pod: Any, instance_id: str, deleted: bool = False
+) -> ContainerInstance:
+    """Map a V1Pod to a ContainerInstance like an ECS task: pending pods have no IP,
+    running pods are STARTED, and finished or deleted pods are COMPLETED or FAILED"""
+    phase = pod.status.phase if pod.status else None
+    container_status = (
+        pod.status.container_statuses[0]
+        if pod.status and pod.status.container_statuses
+        else None
+    )
+    running = container_status.state.running if container_status else None
+    terminated = container_status.state.terminated if container_status else None
+    exit_code = terminated.exit_code if terminated else None
+
+    if phase == "Succeeded":
+        status = ContainerInstanceStatus.COMPLETED
+    elif phase == "Failed" or deleted:
+        status = ContainerInstanceStatus.FAILED
+    elif phase == "Running":
+        status = ContainerInstanceStatus.STARTED
+    else:
+        status = ContainerInstanceStatus.UNKNOWN
+
+    started_at = running.started_at if running else None
+    started_at = started_at or (terminated.started_at if terminated else None)
+    return ContainerInstance(
+        instance_id=instance_id,
+        ip_address=pod.status.pod_ip if pod.status else None,
+        status=status,
+        exit_code=0 if phase == "Succeeded" and exit_code is None else exit_code,
+        timeline=ContainerTimeline(
+            created_at=_map_time_to_epoch(pod.metadata.creation_timestamp),
+            started_at=_map_time_to_epoch(started_at),
+            stopping_at=_map_time_to_epoch(pod.metadata.deletion_timestamp),
+            stopped_at=(
+                _map_time_to_epoch(terminated.finished_at) if terminated else None
+            ),
+        ),
+    )
+
+
+def _map_time_to_epoch(timestamp: Optional[datetime]) -> Optional[float]:
+    return timestamp.timestamp() if timestamp else None
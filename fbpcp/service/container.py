@@ -7,13 +7,15 @@
 # pyre-strict
 
 import abc
+import asyncio
+import functools
 from typing import Dict, List, Optional, Union
 
 from fbpcp.entity.cluster_instance import Cluster
 
 from fbpcp.entity.container_instance import ContainerInstance
 from fbpcp.entity.container_permission import ContainerPermissionConfig
-from fbpcp.entity.container_type import ContainerType
+from fbpcp.entity.container_type import ContainerSize
 from fbpcp.error.pcp import PcpError
 
 
@@ -36,7 +38,7 @@ class ContainerService(abc.ABC):
         container_definition: str,
         cmd: str,
         env_vars: Optional[Dict[str, str]] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[ContainerSize] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> ContainerInstance:
         pass
@@ -47,11 +49,36 @@ class ContainerService(abc.ABC):
         container_definition: str,
         cmds: List[str],
         env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[ContainerSize] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> List[ContainerInstance]:
         pass
 
+    async def create_instances_async(
+        self,
+        container_definition: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Async version of create_instances.
+
+        The default implementation runs create_instances in the event loop's executor.
+        Implementations should override it with a natively concurrent version.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None,
+            functools.partial(
+                self.create_instances,
+                container_definition=container_definition,
+                cmds=cmds,
+                env_vars=env_vars,
+                container_type=container_type,
+                permission=permission,
+            ),
+        )
+
     @abc.abstractmethod
     def get_instance(self, instance_id: str) -> Optional[ContainerInstance]:
         """Get a specific container instance.
@@ -80,9 +107,21 @@ class ContainerService(abc.ABC):
             A list of Optional, in the same order as the input ids. For example, if
             users pass 3 instance_ids and the second instance could not be found,
             then returned list should also have 3 elements, with the 2nd elements being None.
+            This order must be kept even if implementations look up instances concurrently.
         """
         pass
 
+    async def get_instances_async(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        """Async version of get_instances, with the same ordered result.
+
+        The default implementation runs get_instances in the event loop's executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.get_instances, instance_ids
+        )
+
     @abc.abstractmethod
     def cancel_instance(self, instance_id: str) -> None:
         """Cancel a running container instance.
@@ -106,10 +145,22 @@ class ContainerService(abc.ABC):
         Returns:
             A list of Optionals, in the same order as the input instance ids. A `None` indicates
             a successful cancellation, whereas a `PceError` indicates a failed cancellation and
-            describes the error reason.
+            describes the error reason. This order must be kept even if implementations cancel
+            instances concurrently.
         """
         pass
 
+    async def cancel_instances_async(
+        self, instance_ids: List[str]
+    ) -> List[Optional[PcpError]]:
+        """Async version of cancel_instances, with the same ordered result.
+
+        The default implementation runs cancel_instances in the event loop's executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            None, self.cancel_instances, instance_ids
+        )
+
     @abc.abstractmethod
     def get_current_instances_count(self) -> int:
         """Get total pending and running instances count for cluster
@@ -6,23 +6,34 @@
 
 # pyre-strict
 
+import asyncio
+import functools
 import itertools
 import logging
-from typing import Any, Dict, List, Optional, Union
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Tuple, TypeVar, Union
 
 from fbpcp.entity.cloud_provider import CloudProvider
 
 from fbpcp.entity.cluster_instance import Cluster
 from fbpcp.entity.container_instance import ContainerInstance
 from fbpcp.entity.container_permission import ContainerPermissionConfig
-from fbpcp.entity.container_type import ContainerType, ContainerTypeConfig
+from fbpcp.entity.container_type import ContainerSize, ContainerTypeConfig
 from fbpcp.error.pcp import PcpError
-from fbpcp.gateway.ecs import ECSGateway
+from fbpcp.gateway.ecs import ECSGateway, MAX_RUN_TASK_COUNT
 from fbpcp.metrics.emitter import MetricsEmitter
 from fbpcp.service.container import ContainerService
 from fbpcp.util.aws import split_container_definition
+from fbpcp.util.container_instance_cache import ContainerInstanceCache
+from fbpcp.util.rate_limiter import RateLimiter
 
 AWS_API_INPUT_SIZE_LIMIT = 100  # AWS API Call Capacity Limit
+DEFAULT_MAX_WORKERS = 8
+DEFAULT_MAX_REQUESTS_PER_SECOND = 20.0  # ECS sustained rate for most task APIs
+
+T = TypeVar("T")
+R = TypeVar("R")
 
 
 class AWSContainerService(ContainerService):
@@ -36,7 +47,18 @@ class AWSContainerService(ContainerService):
         config: Optional[Dict[str, Any]] = None,
         metrics: Optional[MetricsEmitter] = None,
         session_token: Optional[str] = None,
+        max_workers: int = DEFAULT_MAX_WORKERS,
+        max_requests_per_second: Optional[float] = DEFAULT_MAX_REQUESTS_PER_SECOND,
+        cache: Optional[ContainerInstanceCache] = None,
     ) -> None:
+        """
+        Args:
+            max_workers: the maximum number of ECS calls issued concurrently by batch operations.
+            max_requests_per_second: the rate limit shared by all concurrent ECS calls of batch
+            operations. None disables rate limiting.
+            cache: an optional cache of container instances keyed by task ARN. It may be shared
+            by several services.
+        """
         self.logger: logging.Logger = logging.getLogger(__name__)
         self.region = region
         self.cluster = cluster
@@ -44,6 +66,11 @@ class AWSContainerService(ContainerService):
         self.ecs_gateway = ECSGateway(
             region, access_key_id, access_key_data, config, metrics, session_token
         )
+        self.max_workers = max_workers
+        self.rate_limiter: Optional[RateLimiter] = (
+            RateLimiter(max_requests_per_second) if max_requests_per_second else None
+        )
+        self.cache = cache
 
     def get_region(
         self,
@@ -60,43 +87,19 @@ class AWSContainerService(ContainerService):
         container_definition: str,
         cmd: str,
         env_vars: Optional[Dict[str, str]] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[ContainerSize] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> ContainerInstance:
-        task_definition, container = split_container_definition(container_definition)
-
-        if not self.subnets:
-            raise PcpError(
-                "No subnets specified. It's required to create container instances."
-            )
-        cpu = None
-        memory = None
-        if container_type is not None:
-            container_config = ContainerTypeConfig.get_config(
-                CloudProvider.AWS, container_type
-            )
-            cpu, memory = container_config.cpu, container_config.memory
-
-        task_role_arn = permission.role_id if permission else None
-
-        return self.ecs_gateway.run_task(
-            task_definition=task_definition,
-            container=container,
-            cmd=cmd,
-            cluster=self.cluster,
-            subnets=self.subnets,
-            env_vars=env_vars,
-            cpu=cpu,
-            memory=memory,
-            task_role_arn=task_role_arn,
-        )
+        return self._create_batch(
+            container_definition, cmd, 1, env_vars, container_type, permission
+        )[0]
 
     def create_instances(
         self,
         container_definition: str,
         cmds: List[str],
         env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[ContainerSize] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> List[ContainerInstance]:
         """
@@ -108,30 +111,188 @@ class AWSContainerService(ContainerService):
             instances. When it is a list of dicts, it is expected that the length of the list
             is the same as the length of the cmds list, such that each item corresponds
             to one instance.
-            container_type: The type of container to create.
+            container_type: The type of container to create, or a custom ContainerTypeConfig.
+
+        Instances sharing the same cmd and env_vars are launched together, up to
+        MAX_RUN_TASK_COUNT per RunTask call.
+
+        Returns:
+            The created instances, in the same order as cmds.
         """
         if type(env_vars) is list and len(env_vars) != len(cmds):
             raise ValueError(
                 f"Length of env_vars list {len(env_vars)} is different from length of cmds {len(cmds)}."
             )
 
-        instances = [
-            self.create_instance(
-                container_definition=container_definition,
-                cmd=cmds[i],
-                env_vars=env_vars[i] if type(env_vars) is list else env_vars,
-                container_type=container_type,
-                permission=permission,
+        batches = self._group_identical_launches(cmds, env_vars)
+        instances: List[Optional[ContainerInstance]] = [None] * len(cmds)
+        for positions, cmd, batch_env_vars in batches:
+            batch_instances = self._create_batch(
+                container_definition,
+                cmd,
+                len(positions),
+                batch_env_vars,
+                container_type,
+                permission,
             )
-            for i in range(len(cmds))
-        ]
+            for i, instance in zip(positions, batch_instances):
+                instances[i] = instance
+
+        self.logger.info(
+            f"AWSContainerService created {len(cmds)} containers successfully in {len(batches)} batches"
+        )
+        return [instance for instance in instances if instance is not None]
+
+    async def create_instances_async(
+        self,
+        container_definition: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Create instances concurrently, with at most max_workers RunTask calls in flight.
+
+        Args:
+            Same as create_instances.
+
+        Returns:
+            The created instances, in the same order as cmds.
+        """
+        if type(env_vars) is list and len(env_vars) != len(cmds):
+            raise ValueError(
+                f"Length of env_vars list {len(env_vars)} is different from length of cmds {len(cmds)}."
+            )
+
+        batches = self._group_identical_launches(cmds, env_vars)
+        semaphore = asyncio.Semaphore(self.max_workers)
+        batch_instances = await asyncio.gather(
+            *[
+                self._run_in_executor(
+                    semaphore,
+                    functools.partial(
+                        self._rate_limited,
+                        self._create_batch,
+                        container_definition,
+                        cmd,
+                        len(positions),
+                        batch_env_vars,
+                        container_type,
+                        permission,
+                    ),
+                )
+                for positions, cmd, batch_env_vars in batches
+            ]
+        )
+        instances: List[Optional[ContainerInstance]] = [None] * len(cmds)
+        for (positions, _, _), created in zip(batches, batch_instances):
+            for i, instance in zip(positions, created):
+                instances[i] = instance
 
         self.logger.info(
-            f"AWSContainerService created {len(instances)} containers successfully"
+            f"AWSContainerService created {len(cmds)} containers successfully in {len(batches)} batches"
         )
+        return [instance for instance in instances if instance is not None]
+
+    def _group_identical_launches(
+        self,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+    ) -> List[Tuple[List[int], str, Optional[Dict[str, str]]]]:
+        """Group the positions of identical (cmd, env_vars) launches into batches of at most
+        MAX_RUN_TASK_COUNT, keeping the order of first appearance"""
+        groups: Dict[Tuple[str, Optional[Tuple[Tuple[str, str], ...]]], List[int]] = {}
+        for i, cmd in enumerate(cmds):
+            instance_env_vars = env_vars[i] if type(env_vars) is list else env_vars
+            key = (
+                cmd,
+                (
+                    tuple(sorted(instance_env_vars.items()))
+                    if instance_env_vars is not None
+                    else None
+                ),
+            )
+            groups.setdefault(key, []).append(i)
+
+        batches = []
+        for positions in groups.values():
+            for start in range(0, len(positions), MAX_RUN_TASK_COUNT):
+                batch = positions[start : start + MAX_RUN_TASK_COUNT]
+                batches.append(
+                    (
+                        batch,
+                        cmds[batch[0]],
+                        env_vars[batch[0]] if type(env_vars) is list else env_vars,
+                    )
+                )
+        return batches
+
+    def _create_batch(
+        self,
+        container_definition: str,
+        cmd: str,
+        count: int,
+        env_vars: Optional[Dict[str, str]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Launch count identical instances, relaunching the ones ECS could not place"""
+        task_definition, container = split_container_definition(container_definition)
+
+        if not self.subnets:
+            raise PcpError(
+                "No subnets specified. It's required to create container instances."
+            )
+        cpu = None
+        memory = None
+        if container_type is not None:
+            container_config = ContainerTypeConfig.get_config(
+                CloudProvider.AWS, container_type
+            )
+            cpu, memory = container_config.cpu, container_config.memory
+
+        task_role_arn = permission.role_id if permission else None
+
+        if count == 1:
+            return [
+                self.ecs_gateway.run_task(
+                    task_definition=task_definition,
+                    container=container,
+                    cmd=cmd,
+                    cluster=self.cluster,
+                    subnets=self.subnets,
+                    env_vars=env_vars,
+                    cpu=cpu,
+                    memory=memory,
+                    task_role_arn=task_role_arn,
+                )
+            ]
+
+        instances: List[ContainerInstance] = []
+        while len(instances) < count:
+            # each call places at least one task or raises
+            instances.extend(
+                self.ecs_gateway.run_tasks(
+                    task_definition=task_definition,
+                    container=container,
+                    cmd=cmd,
+                    cluster=self.cluster,
+                    subnets=self.subnets,
+                    count=count - len(instances),
+                    env_vars=env_vars,
+                    cpu=cpu,
+                    memory=memory,
+                    task_role_arn=task_role_arn,
+                )
+            )
         return instances
 
     def get_instance(self, instance_id: str) -> Optional[ContainerInstance]:
+        if self.cache:
+            return self.cache.get_many(
+                [instance_id],
+                lambda ids: [self.ecs_gateway.describe_task(self.cluster, ids[0])],
+            )[0]
         return self.ecs_gateway.describe_task(self.cluster, instance_id)
 
     def get_instances(
@@ -147,28 +308,167 @@ class AWSContainerService(ContainerService):
             users pass 3 instance_ids and the second instance could not be found,
             then returned list should also have 3 elements, with the 2nd elements being None.
         """
+        if self.cache:
+            return self.cache.get_many(instance_ids, self._describe_instances)
+        return self._describe_instances(instance_ids)
+
+    async def get_instances_async(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        semaphore = asyncio.Semaphore(self.max_workers)
+        if self.cache:
+            return await self._run_in_executor(
+                semaphore, functools.partial(self.get_instances, instance_ids)
+            )
+
         id_batches = [
             instance_ids[i : i + AWS_API_INPUT_SIZE_LIMIT]
             for i in range(0, len(instance_ids), AWS_API_INPUT_SIZE_LIMIT)
         ]
-        container_batches = [
-            self.ecs_gateway.describe_tasks(self.cluster, ids) for ids in id_batches
+        container_batches = await asyncio.gather(
+            *[
+                self._run_in_executor(
+                    semaphore,
+                    functools.partial(
+                        self._rate_limited,
+                        self.ecs_gateway.describe_tasks,
+                        self.cluster,
+                        ids,
+                    ),
+                )
+                for ids in id_batches
+            ]
+        )
+        return list(itertools.chain.from_iterable(container_batches))
+
+    def _describe_instances(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        id_batches = [
+            instance_ids[i : i + AWS_API_INPUT_SIZE_LIMIT]
+            for i in range(0, len(instance_ids), AWS_API_INPUT_SIZE_LIMIT)
         ]
+        container_batches = self._map_concurrently(
+            lambda ids: self._rate_limited(
+                self.ecs_gateway.describe_tasks, self.cluster, ids
+            ),
+            id_batches,
+        )
         return list(itertools.chain.from_iterable(container_batches))
 
     def cancel_instance(self, instance_id: str) -> None:
+        if self.cache:
+            self.cache.invalidate(instance_id)
         return self.ecs_gateway.stop_task(cluster=self.cluster, task_id=instance_id)
 
-    def cancel_instances(self, instance_ids: List[str]) -> List[Optional[PcpError]]:
+    def cancel_instances(
+        self, instance_ids: List[str], timeout: Optional[float] = None
+    ) -> List[Optional[PcpError]]:
+        """Cancel one or more running container instances concurrently.
+
+        Args:
+            instance_ids: the instance ids of the container instances to cancel.
+            timeout: optional deadline in seconds for the whole batch. Cancellations that
+            have not completed by then are abandoned and reported as a PcpError.
+
+        Returns:
+            A list of Optionals, in the same order as the input instance ids. A `None` indicates
+            a successful cancellation, whereas a `PcpError` indicates a failed cancellation and
+            describes the error reason.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        futures = [
+            executor.submit(self._cancel_instance_before, instance_id, deadline)
+            for instance_id in instance_ids
+        ]
+        done, not_done = wait(futures, timeout=timeout)
+        for future in not_done:
+            future.cancel()
+        executor.shutdown(wait=not not_done)
+
         res = []
-        for instance_id in instance_ids:
-            try:
-                res.append(self.cancel_instance(instance_id))
-            except PcpError as err:
-                res.append(err)
+        for instance_id, future in zip(instance_ids, futures):
+            if future in done:
+                res.append(future.result())
+            else:
+                res.append(
+                    PcpError(
+                        f"Cancelling instance {instance_id} did not complete within {timeout} seconds"
+                    )
+                )
+        return res
 
+    async def cancel_instances_async(
+        self, instance_ids: List[str], timeout: Optional[float] = None
+    ) -> List[Optional[PcpError]]:
+        """Async version of cancel_instances, with the same ordered result and deadline option"""
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        semaphore = asyncio.Semaphore(self.max_workers)
+        tasks = [
+            asyncio.ensure_future(
+                self._run_in_executor(
+                    semaphore,
+                    functools.partial(
+                        self._cancel_instance_before, instance_id, deadline
+                    ),
+                )
+            )
+            for instance_id in instance_ids
+        ]
+        if not tasks:
+            return []
+        _, pending = await asyncio.wait(tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+
+        res = []
+        for instance_id, task in zip(instance_ids, tasks):
+            if task in pending:
+                res.append(
+                    PcpError(
+                        f"Cancelling instance {instance_id} did not complete within {timeout} seconds"
+                    )
+                )
+            else:
+                res.append(task.result())
         return res
 
+    def _cancel_instance_before(
+        self, instance_id: str, deadline: Optional[float]
+    ) -> Optional[PcpError]:
+        try:
+            if self.rate_limiter:
+                self.rate_limiter.acquire()
+            if deadline is not None and time.monotonic() > deadline:
+                return PcpError(
+                    f"Deadline passed before cancelling instance {instance_id}"
+                )
+            self.cancel_instance(instance_id)
+        except PcpError as err:
+            return err
+        return None
+
+    def _rate_limited(self, f: Callable[..., R], *args: Any) -> R:
+        if self.rate_limiter:
+            self.rate_limiter.acquire()
+        return f(*args)
+
+    async def _run_in_executor(
+        self, semaphore: asyncio.Semaphore, f: Callable[[], R]
+    ) -> R:
+        async with semaphore:
+            return await asyncio.get_running_loop().run_in_executor(None, f)
+
+    def _map_concurrently(self, f: Callable[[T], R], items: List[T]) -> List[R]:
+        """Apply f to every item with a bounded thread pool, keeping the input order"""
+        if len(items) <= 1:
+            return [f(item) for item in items]
+        with ThreadPoolExecutor(
+            max_workers=min(self.max_workers, len(items))
+        ) as executor:
+            return list(executor.map(f, items))
+
     def get_current_instances_count(self) -> int:
         cluster = self.ecs_gateway.describe_cluster(self.cluster)
         return cluster.running_tasks + cluster.pending_tasks
@@ -0,0 +1,445 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+import shlex
+import threading
+import time
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Set, Tuple, Union
+from uuid import uuid4
+
+from fbpcp.entity.cloud_provider import CloudProvider
+from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.entity.container_type import ContainerSize, ContainerTypeConfig
+from fbpcp.error.pcp import PcpError
+from fbpcp.gateway.k8s import K8sGateway
+from fbpcp.mapper.k8s import map_k8spod_to_containerinstance
+from fbpcp.service.container import ContainerService
+from kubernetes import client
+
+DEFAULT_K8S_NAMESPACE = "default"
+DEFAULT_K8S_CLUSTER = "kubernetes"
+DEFAULT_WATCH_TIMEOUT = 60
+DEFAULT_RELIST_DELAY = 1.0
+JOB_NAME_PREFIX = "fbpcp-"
+CONTAINER_NAME = "main"
+MANAGED_BY_LABEL = "app.kubernetes.io/managed-by"
+MANAGED_BY_VALUE = "fbpcp"
+CLUSTER_LABEL = "fbpcp.facebook.com/cluster"
+JOB_NAME_LABEL = "job-name"
+COMPLETION_INDEX_KEY = "batch.kubernetes.io/job-completion-index"
+# objects are capped at about 1.5 MB by etcd, so larger batches are split across Jobs
+MAX_JOB_SCRIPT_SIZE = 512 * 1024
+
+
+class K8sContainerService(ContainerService):
+    """A ContainerService running instances as pods of Kubernetes indexed Jobs.
+
+    create_instances launches a whole batch as a single Job with one completion index
+    per cmd, so the cluster creates the pods instead of this service. Instance ids are
+    "<job name>/<completion index>". Pod statuses are kept up to date by a background
+    watch of the pods created by this service rather than by polling.
+
+    Instances report the same statuses as ECS tasks: UNKNOWN without IP while pending,
+    STARTED with the pod IP while running, then COMPLETED or FAILED with the exit code.
+    A failed index is not retried. Requires Kubernetes 1.28 or later.
+    """
+
+    def __init__(
+        self,
+        namespace: str = DEFAULT_K8S_NAMESPACE,
+        cluster: str = DEFAULT_K8S_CLUSTER,
+        config_file: Optional[str] = None,
+        context: Optional[str] = None,
+        client_config: Optional[client.Configuration] = None,
+        watch_timeout: int = DEFAULT_WATCH_TIMEOUT,
+    ) -> None:
+        """
+        Args:
+            namespace: the namespace the jobs are created in.
+            cluster: name reported as the cluster of the instances. It labels the pods, so services with different names do not see each other's instances.
+            config_file: kubeconfig file. Ignored when running inside a cluster.
+            context: kubeconfig context. Defaults to the current context.
+            client_config: an explicit client configuration, used instead of the in-cluster or kubeconfig one.
+            watch_timeout: seconds after which the pod watch is restarted.
+        """
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.namespace = namespace
+        self.cluster = cluster
+        self.watch_timeout = watch_timeout
+        self.k8s_gateway = K8sGateway(namespace, config_file, context, client_config)
+        self.label_selector: str = (
+            f"{MANAGED_BY_LABEL}={MANAGED_BY_VALUE},{CLUSTER_LABEL}={cluster}"
+        )
+        # instance id -> latest known state of its pod
+        self._instances: Dict[str, ContainerInstance] = {}
+        self._cancelled: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+
+    def get_region(
+        self,
+    ) -> str:
+        return self.namespace
+
+    def get_cluster(
+        self,
+    ) -> str:
+        return self.cluster
+
+    def create_instance(
+        self,
+        container_definition: str,
+        cmd: str,
+        env_vars: Optional[Dict[str, str]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> ContainerInstance:
+        return self.create_instances(
+            container_definition, [cmd], env_vars, container_type, permission
+        )[0]
+
+    def create_instances(
+        self,
+        container_definition: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Launch an indexed Job running cmds[i] in the pod of completion index i.
+
+        Batches whose script would exceed MAX_JOB_SCRIPT_SIZE bytes are split across
+        several Jobs. If a Job cannot be created, the Jobs created before it are deleted.
+
+        Args:
+            container_definition: the image of the containers.
+            permission: role_id is used as the service account of the pods.
+
+        Returns:
+            The pending instances, in the same order as cmds.
+        """
+        if type(env_vars) is list and len(env_vars) != len(cmds):
+            raise ValueError(
+                f"Length of env_vars list {len(env_vars)} is different from length of cmds {len(cmds)}."
+            )
+        if not cmds:
+            return []
+        self._ensure_watcher()
+
+        instances: List[ContainerInstance] = []
+        job_names: List[str] = []
+        try:
+            for start, end in _split_by_script_size(cmds, env_vars):
+                job_name = f"{JOB_NAME_PREFIX}{uuid4().hex[:16]}"
+                self.k8s_gateway.create_job(
+                    self._build_job(
+                        job_name,
+                        container_definition,
+                        cmds[start:end],
+                        env_vars[start:end] if isinstance(env_vars, list) else env_vars,
+                        container_type,
+                        permission,
+                    )
+                )
+                job_names.append(job_name)
+                self.logger.info(
+                    f"K8sContainerService created job {job_name} with {end - start} instances of {container_definition}"
+                )
+                instances.extend(
+                    ContainerInstance(
+                        instance_id=f"{job_name}/{index}",
+                        status=ContainerInstanceStatus.UNKNOWN,
+                        permission=permission,
+                    )
+                    for index in range(end - start)
+                )
+        except Exception:
+            for job_name in job_names:
+                try:
+                    self.k8s_gateway.delete_job(job_name)
+                except PcpError as err:
+                    self.logger.error(f"Failed to delete job {job_name}: {err}")
+            raise
+        return instances
+
+    def get_instance(self, instance_id: str) -> Optional[ContainerInstance]:
+        return self.get_instances([instance_id])[0]
+
+    def get_instances(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        """Get instances from the watched pod states.
+
+        Instances the watch has not seen yet, e.g. right after the service started, are
+        read from the API server.
+        """
+        self._ensure_watcher()
+        with self._lock:
+            instances = {
+                instance_id: self._instances[instance_id]
+                for instance_id in instance_ids
+                if instance_id in self._instances
+            }
+        missing_jobs = {
+            instance_id.rpartition("/")[0]
+            for instance_id in instance_ids
+            if instance_id not in instances and instance_id.rpartition("/")[0]
+        }
+        for job_name in missing_jobs:
+            instances.update(self._read_job_instances(job_name))
+        return [instances.get(instance_id) for instance_id in instance_ids]
+
+    def cancel_instance(self, instance_id: str) -> None:
+        error = self.cancel_instances([instance_id])[0]
+        if error:
+            raise error
+
+    def cancel_instances(self, instance_ids: List[str]) -> List[Optional[PcpError]]:
+        """Cancel instances with one call per job.
+
+        A job whose instances are all cancelled is deleted with its pods. Otherwise only the
+        pods of the cancelled indexes are deleted, and their indexes are marked failed.
+        """
+        indexes_by_job: Dict[str, Set[int]] = defaultdict(set)
+        errors: Dict[str, Optional[PcpError]] = {}
+        for instance_id in instance_ids:
+            try:
+                job_name, index = _split_instance_id(instance_id)
+            except PcpError as err:
+                errors[instance_id] = err
+                continue
+            indexes_by_job[job_name].add(index)
+
+        for job_name, indexes in indexes_by_job.items():
+            error = None
+            try:
+                job = self.k8s_gateway.read_job(job_name)
+                if job is None:
+                    raise PcpError(f"Job {job_name} not found.")
+                if indexes >= set(range(job.spec.completions or 0)):
+                    self.k8s_gateway.delete_job(job_name)
+                else:
+                    selected = ",".join(str(index) for index in sorted(indexes))
+                    self.k8s_gateway.delete_pods(
+                        f"{JOB_NAME_LABEL}={job_name},{COMPLETION_INDEX_KEY} in ({selected})"
+                    )
+                with self._lock:
+                    for index in indexes:
+                        instance_id = f"{job_name}/{index}"
+                        self._cancelled.add(instance_id)
+                        instance = self._instances.get(instance_id)
+                        if instance and instance.status in (
+                            ContainerInstanceStatus.UNKNOWN,
+                            ContainerInstanceStatus.STARTED,
+                        ):
+                            instance.status = ContainerInstanceStatus.FAILED
+            except PcpError as err:
+                error = err
+            for index in indexes:
+                errors[f"{job_name}/{index}"] = error
+        return [errors[instance_id] for instance_id in instance_ids]
+
+    def get_current_instances_count(self) -> int:
+        pods, _ = self.k8s_gateway.list_pods(self.label_selector)
+        return sum(
+            pod.status.phase in ("Pending", "Running")
+            for pod in pods
+            if pod.metadata.deletion_timestamp is None
+        )
+
+    def get_cluster_instance(self) -> Cluster:
+        pods, _ = self.k8s_gateway.list_pods(self.label_selector)
+        phases = [
+            pod.status.phase for pod in pods if pod.metadata.deletion_timestamp is None
+        ]
+        return Cluster(
+            cluster_arn=f"{self.namespace}/{self.cluster}",
+            cluster_name=self.cluster,
+            pending_tasks=phases.count("Pending"),
+            running_tasks=phases.count("Running"),
+            status=ClusterStatus.ACTIVE,
+        )
+
+    def close(self) -> None:
+        """Stop watching the pods. The watch ends within watch_timeout seconds."""
+        self._stop_event.set()
+
+    def _build_job(
+        self,
+        job_name: str,
+        image: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+        container_type: Optional[ContainerSize],
+        permission: Optional[ContainerPermissionConfig],
+    ) -> Dict[str, Any]:
+        # a plain body rather than V1Job, whose fields vary with the client version
+        labels = {MANAGED_BY_LABEL: MANAGED_BY_VALUE, CLUSTER_LABEL: self.cluster}
+        container: Dict[str, Any] = {
+            "name": CONTAINER_NAME,
+            "image": image,
+            "command": ["sh", "-c", _build_indexed_script(cmds, env_vars)],
+        }
+        if isinstance(env_vars, dict):
+            container["env"] = [
+                {"name": name, "value": value} for name, value in env_vars.items()
+            ]
+        if container_type is not None:
+            container_config = ContainerTypeConfig.get_config(
+                CloudProvider.AWS, container_type
+            )
+            resources = {
+                "cpu": str(container_config.cpu),
+                "memory": f"{container_config.memory}Gi",
+            }
+            container["resources"] = {"requests": resources, "limits": resources}
+        pod_spec: Dict[str, Any] = {
+            "restartPolicy": "Never",
+            "containers": [container],
+        }
+        if permission is not None:
+            pod_spec["serviceAccountName"] = permission.role_id
+
+        return {
+            "apiVersion": "batch/v1",
+            "kind": "Job",
+            "metadata": {"name": job_name, "labels": labels},
+            "spec": {
+                "completionMode": "Indexed",
+                "completions": len(cmds),
+                "parallelism": len(cmds),
+                # instances are not retried, like ECS tasks
+                "backoffLimitPerIndex": 0,
+                "podFailurePolicy": {
+                    "rules": [
+                        {
+                            "action": "FailIndex",
+                            "onPodConditions": [{"type": "DisruptionTarget"}],
+                        }
+                    ]
+                },
+                "template": {"metadata": {"labels": labels}, "spec": pod_spec},
+            },
+        }
+
+    def _read_job_instances(self, job_name: str) -> Dict[str, ContainerInstance]:
+        job = self.k8s_gateway.read_job(job_name)
+        if job is None:
+            return {}
+        pods, _ = self.k8s_gateway.list_pods(f"{JOB_NAME_LABEL}={job_name}")
+        with self._lock:
+            for pod in pods:
+                self._update(pod, deleted=False)
+            instances = {
+                f"{job_name}/{index}": self._instances.get(
+                    f"{job_name}/{index}",
+                    # the job controller has not created the pod yet
+                    ContainerInstance(
+                        instance_id=f"{job_name}/{index}",
+                        status=ContainerInstanceStatus.UNKNOWN,
+                    ),
+                )
+                for index in range(job.spec.completions or 0)
+            }
+        return instances
+
+    def _update(self, pod: Any, deleted: bool) -> None:
+        annotations = pod.metadata.annotations or {}
+        labels = pod.metadata.labels or {}
+        index = annotations.get(COMPLETION_INDEX_KEY)
+        job_name = labels.get(JOB_NAME_LABEL)
+        if index is None or job_name is None:
+            return
+        instance_id = f"{job_name}/{index}"
+        self._instances[instance_id] = map_k8spod_to_containerinstance(
+            pod, instance_id, deleted=deleted or instance_id in self._cancelled
+        )
+
+    def _ensure_watcher(self) -> None:
+        with self._lock:
+            if self._watcher is None or not self._watcher.is_alive():
+                self._stop_event.clear()
+                self._watcher = threading.Thread(target=self._watch, daemon=True)
+                self._watcher.start()
+
+    def _watch(self) -> None:
+        resource_version = None
+        while not self._stop_event.is_set():
+            try:
+                if resource_version is None:
+                    pods, resource_version = self.k8s_gateway.list_pods(
+                        self.label_selector
+                    )
+                    with self._lock:
+                        for pod in pods:
+                            self._update(pod, deleted=False)
+                for event_type, pod in self.k8s_gateway.watch_pods(
+                    self.label_selector, resource_version, self.watch_timeout
+                ):
+                    with self._lock:
+                        self._update(pod, deleted=event_type == "DELETED")
+                    resource_version = pod.metadata.resource_version
+                    if self._stop_event.is_set():
+                        return
+            except PcpError as err:
+                # e.g. the resource version expired: list the pods again
+                self.logger.warning(f"Watch of {self.label_selector} failed: {err}")
+                resource_version = None
+                time.sleep(DEFAULT_RELIST_DELAY)
+
+
+def _split_instance_id(instance_id: str) -> Tuple[str, int]:
+    job_name, _, index = instance_id.rpartition("/")
+    if not job_name or not index.isdigit():
+        raise PcpError(f"Instance {instance_id} not found.")
+    return job_name, int(index)
+
+
+def _build_indexed_script(
+    cmds: List[str],
+    env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+) -> str:
+    """Shell script running cmds[JOB_COMPLETION_INDEX] with its own env vars"""
+    branches = [
+        _build_branch(index, cmd, env_vars[index] if isinstance(env_vars, list) else {})
+        for index, cmd in enumerate(cmds)
+    ]
+    return 'case "$JOB_COMPLETION_INDEX" in\n' + "\n".join(branches) + "\nesac"
+
+
+def _build_branch(index: int, cmd: str, env_vars: Dict[str, str]) -> str:
+    exports = "".join(
+        f"export {name}={shlex.quote(value)}; " for name, value in env_vars.items()
+    )
+    return f"{index}) {exports}exec sh -c {shlex.quote(cmd)};;"
+
+
+def _split_by_script_size(
+    cmds: List[str],
+    env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+) -> List[Tuple[int, int]]:
+    """Split cmds into [start, end) ranges whose scripts fit in MAX_JOB_SCRIPT_SIZE"""
+    ranges = []
+    start, size = 0, 0
+    for i, cmd in enumerate(cmds):
+        # i is at least the index of the command within its Job, so the size is an upper bound
+        branch = _build_branch(
+            i, cmd, env_vars[i] if isinstance(env_vars, list) else {}
+        )
+        branch_size = len(branch.encode()) + 1
+        if i > start and size + branch_size > MAX_JOB_SCRIPT_SIZE:
+            ranges.append((start, i))
+            start, size = i, 0
+        size += branch_size
+    ranges.append((start, len(cmds)))
+    return ranges
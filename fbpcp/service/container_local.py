@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+import os
+import resource
+import signal
+import subprocess
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional, Set, Union
+from uuid import uuid4
+
+from fbpcp.entity.cloud_provider import CloudProvider
+from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_metadata import ContainerTimeline
+from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.entity.container_type import ContainerSize, ContainerTypeConfig
+from fbpcp.error.pcp import PcpError
+from fbpcp.service.container import ContainerService
+
+LOCAL_REGION = "local"
+LOCAL_IP_ADDRESS = "127.0.0.1"
+DEFAULT_LOCAL_CLUSTER = "local"
+DEFAULT_SCHEDULE_INTERVAL = 0.1
+# exit code reported by ECS (and shells) for a process killed by a signal
+SIGNAL_EXIT_CODE_BASE = 128
+GB_TO_BYTES = 1024**3
+SHELL = "/bin/sh"
+# blocks on stdin until the parent applied the cpu affinity and memory limit of the
+# instance, then runs the command (passed as $0) with stdin from /dev/null
+GATED_SCRIPT = 'read _; exec /bin/sh -c "$0" </dev/null'
+
+
+@dataclass
+class _LocalInstance:
+    instance_id: str
+    cmd: str
+    env: Dict[str, str]
+    cpu: int
+    memory: Optional[int]
+    permission: Optional[ContainerPermissionConfig]
+    created_at: float = field(default_factory=time.time)
+    slots: List[int] = field(default_factory=list)
+    proc: Optional["subprocess.Popen[bytes]"] = None
+    exit_code: Optional[int] = None
+    started_at: Optional[float] = None
+    stopping_at: Optional[float] = None
+    stopped_at: Optional[float] = None
+
+
+class LocalContainerService(ContainerService):
+    """A ContainerService running each instance as a process group on the local host.
+
+    Instances queue until enough cores are free for their container type, then run pinned
+    to their own cores with their memory capped through RLIMIT_AS. The limits are applied
+    before the command runs, so every process it forks inherits them. RLIMIT_AS caps the
+    virtual address space of each process, not its resident memory. Commands run through the
+    shell like the "sh -c" entry point of OneDocker task definitions, so a OneDockerService
+    built on top of it runs packages with its usual container_cmd_prefix.
+
+    Instances report the same statuses as ECS tasks: UNKNOWN without IP while queued,
+    STARTED with a loopback IP while running, then COMPLETED or FAILED with the exit code.
+    """
+
+    def __init__(
+        self,
+        cluster: str = DEFAULT_LOCAL_CLUSTER,
+        max_cpus: Optional[int] = None,
+        cwd: Optional[str] = None,
+        log_dir: Optional[str] = None,
+        schedule_interval: float = DEFAULT_SCHEDULE_INTERVAL,
+    ) -> None:
+        """
+        Args:
+            cluster: name reported as the cluster of the instances.
+            max_cpus: number of cpus instances are scheduled on. Defaults to the cores available to this process.
+            cwd: working directory of the instances.
+            log_dir: if set, the output of each instance is written to <log_dir>/<instance id>.log.
+            schedule_interval: seconds between two checks for finished instances and free cores.
+        """
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.cluster = cluster
+        available_cores = (
+            sorted(os.sched_getaffinity(0))
+            if hasattr(os, "sched_getaffinity")
+            else list(range(os.cpu_count() or 1))
+        )
+        # one scheduling slot per cpu, mapped round-robin onto the host cores so that a
+        # max_cpus larger than the host oversubscribes it
+        self.cores: List[int] = [
+            available_cores[slot % len(available_cores)]
+            for slot in range(max_cpus or len(available_cores))
+        ]
+        self.cwd = cwd
+        self.log_dir = log_dir
+        self.schedule_interval = schedule_interval
+        self._instances: Dict[str, _LocalInstance] = {}
+        self._queue: Deque[_LocalInstance] = deque()
+        self._free_slots: List[int] = list(range(len(self.cores)))
+        self._lock = threading.RLock()
+        self._scheduler: Optional[threading.Thread] = None
+
+    def get_region(
+        self,
+    ) -> str:
+        return LOCAL_REGION
+
+    def get_cluster(
+        self,
+    ) -> str:
+        return self.cluster
+
+    def create_instance(
+        self,
+        container_definition: str,
+        cmd: str,
+        env_vars: Optional[Dict[str, str]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> ContainerInstance:
+        return self.create_instances(
+            container_definition, [cmd], env_vars, container_type, permission
+        )[0]
+
+    def create_instances(
+        self,
+        container_definition: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Queue one local instance per cmd. container_definition is only logged, as
+        instances run on the host rather than in an image.
+
+        Returns:
+            The created instances, in the same order as cmds.
+        """
+        if type(env_vars) is list and len(env_vars) != len(cmds):
+            raise ValueError(
+                f"Length of env_vars list {len(env_vars)} is different from length of cmds {len(cmds)}."
+            )
+        cpu, memory = 1, None
+        if container_type is not None:
+            container_config = ContainerTypeConfig.get_config(
+                CloudProvider.AWS, container_type
+            )
+            cpu, memory = container_config.cpu, container_config.memory
+        # an instance larger than the host gets the whole host
+        cpu = min(cpu, len(self.cores))
+
+        instances = []
+        with self._lock:
+            for i, cmd in enumerate(cmds):
+                instance = _LocalInstance(
+                    instance_id=f"{self.cluster}/{uuid4().hex}",
+                    cmd=cmd,
+                    env=(env_vars[i] if type(env_vars) is list else env_vars) or {},
+                    cpu=cpu,
+                    memory=memory,
+                    permission=permission,
+                )
+                self._instances[instance.instance_id] = instance
+                self._queue.append(instance)
+                instances.append(instance)
+            self._schedule()
+            self._ensure_scheduler()
+            created = [self._to_container_instance(instance) for instance in instances]
+
+        self.logger.info(
+            f"LocalContainerService created {len(created)} instances of {container_definition}"
+        )
+        return created
+
+    def get_instance(self, instance_id: str) -> Optional[ContainerInstance]:
+        return self.get_instances([instance_id])[0]
+
+    def get_instances(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        with self._lock:
+            self._schedule()
+            return [
+                (
+                    self._to_container_instance(self._instances[instance_id])
+                    if instance_id in self._instances
+                    else None
+                )
+                for instance_id in instance_ids
+            ]
+
+    def cancel_instance(self, instance_id: str) -> None:
+        """Send SIGTERM to the process group of a running instance, or drop a queued one"""
+        with self._lock:
+            instance = self._instances.get(instance_id)
+            if instance is None:
+                raise PcpError(f"Instance {instance_id} not found.")
+            if instance.stopped_at is not None or instance.stopping_at is not None:
+                return
+            instance.stopping_at = time.time()
+            if instance.proc is None:
+                self._queue.remove(instance)
+                instance.stopped_at = instance.stopping_at
+                return
+            try:
+                os.killpg(instance.proc.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                # exited in the meantime, reaped by the next schedule
+                pass
+
+    def cancel_instances(self, instance_ids: List[str]) -> List[Optional[PcpError]]:
+        errors: List[Optional[PcpError]] = []
+        for instance_id in instance_ids:
+            try:
+                self.cancel_instance(instance_id)
+                errors.append(None)
+            except PcpError as err:
+                errors.append(err)
+        return errors
+
+    def get_current_instances_count(self) -> int:
+        with self._lock:
+            self._schedule()
+            return sum(
+                instance.stopped_at is None for instance in self._instances.values()
+            )
+
+    def get_cluster_instance(self) -> Cluster:
+        with self._lock:
+            self._schedule()
+            running = sum(
+                instance.proc is not None and instance.stopped_at is None
+                for instance in self._instances.values()
+            )
+            return Cluster(
+                cluster_arn=self.cluster,
+                cluster_name=self.cluster,
+                pending_tasks=len(self._queue),
+                running_tasks=running,
+                status=ClusterStatus.ACTIVE,
+            )
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until all instances stopped.
+
+        Returns:
+            False if some instances were still running after timeout seconds.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else None
+        while self.get_current_instances_count():
+            if deadline is not None and time.monotonic() >= deadline:
+                return False
+            time.sleep(self.schedule_interval)
+        return True
+
+    def _schedule(self) -> None:
+        """Reap the finished instances, then start queued instances while cores are free"""
+        with self._lock:
+            for instance in self._instances.values():
+                if instance.proc is None or instance.stopped_at is not None:
+                    continue
+                return_code = instance.proc.poll()
+                if return_code is None:
+                    continue
+                instance.stopped_at = time.time()
+                instance.exit_code = (
+                    SIGNAL_EXIT_CODE_BASE - return_code
+                    if return_code < 0
+                    else return_code
+                )
+                self._free_slots.extend(instance.slots)
+
+            while self._queue and self._queue[0].cpu <= len(self._free_slots):
+                instance = self._queue.popleft()
+                self._free_slots.sort()
+                instance.slots = self._free_slots[: instance.cpu]
+                del self._free_slots[: instance.cpu]
+                self._start(instance)
+
+    def _start(self, instance: _LocalInstance) -> None:
+        stdout = None
+        if self.log_dir:
+            log_path = os.path.join(self.log_dir, f"{instance.instance_id}.log")
+            os.makedirs(os.path.dirname(log_path), exist_ok=True)
+            stdout = open(log_path, "wb")
+        # no preexec_fn: it is unsafe to run between fork and exec while the scheduler
+        # thread runs, so the child waits on a pipe until the parent limited it
+        gate_read, gate_write = os.pipe()
+        try:
+            proc = subprocess.Popen(
+                [SHELL, "-c", GATED_SCRIPT, instance.cmd],
+                env={**os.environ, **instance.env},
+                cwd=self.cwd,
+                stdout=stdout,
+                stderr=subprocess.STDOUT if stdout else None,
+                start_new_session=True,
+                stdin=gate_read,
+            )
+            try:
+                self._limit(
+                    proc.pid,
+                    {self.cores[slot] for slot in instance.slots},
+                    instance.memory,
+                )
+            except OSError:
+                proc.kill()
+                proc.wait()
+                raise
+            instance.proc = proc
+        except OSError as err:
+            self.logger.error(f"Failed to start {instance.instance_id}: {err}")
+            instance.stopped_at = time.time()
+            instance.exit_code = 1
+            self._free_slots.extend(instance.slots)
+            return
+        finally:
+            # closing the write end releases the child
+            os.close(gate_read)
+            os.close(gate_write)
+            if stdout:
+                stdout.close()
+        instance.started_at = time.time()
+
+    def _limit(self, pid: int, cores: Set[int], memory: Optional[int]) -> None:
+        """Pin the process to cores and cap its address space to memory GB"""
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(pid, cores)
+        if memory and hasattr(resource, "prlimit"):
+            limit_bytes = memory * GB_TO_BYTES
+            resource.prlimit(pid, resource.RLIMIT_AS, (limit_bytes, limit_bytes))
+
+    def _ensure_scheduler(self) -> None:
+        with self._lock:
+            if self._scheduler is None:
+                self._scheduler = threading.Thread(
+                    target=self._schedule_loop, daemon=True
+                )
+                self._scheduler.start()
+
+    def _schedule_loop(self) -> None:
+        # exits once every instance stopped, restarted by the next create_instances
+        while True:
+            time.sleep(self.schedule_interval)
+            with self._lock:
+                self._schedule()
+                if all(
+                    instance.stopped_at is not None
+                    for instance in self._instances.values()
+                ):
+                    self._scheduler = None
+                    return
+
+    def _to_container_instance(self, instance: _LocalInstance) -> ContainerInstance:
+        if instance.stopped_at is not None:
+            status = (
+                ContainerInstanceStatus.COMPLETED
+                if instance.exit_code == 0
+                else ContainerInstanceStatus.FAILED
+            )
+        elif instance.proc is not None:
+            status = ContainerInstanceStatus.STARTED
+        else:
+            status = ContainerInstanceStatus.UNKNOWN
+        return ContainerInstance(
+            instance_id=instance.instance_id,
+            ip_address=LOCAL_IP_ADDRESS if instance.proc is not None else None,
+            status=status,
+            cpu=instance.cpu,
+            memory=instance.memory,
+            exit_code=instance.exit_code,
+            permission=instance.permission,
+            timeline=ContainerTimeline(
+                created_at=instance.created_at,
+                started_at=instance.started_at,
+                stopping_at=instance.stopping_at,
+                stopped_at=instance.stopped_at,
+            ),
+        )
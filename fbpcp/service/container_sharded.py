@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import heapq
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar, Union
+
+from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
+from fbpcp.entity.container_instance import ContainerInstance
+from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.entity.container_type import ContainerSize
+from fbpcp.error.pcp import PcpError
+from fbpcp.service.container import ContainerService
+
+R = TypeVar("R")
+
+# owners of the least recently used instances are dropped beyond this many instances
+DEFAULT_MAX_OWNERS = 100000
+
+
+class ShardPlacement(Enum):
+    # split instances proportionally to the shard weights
+    WEIGHTED = "WEIGHTED"
+    # place each instance on the shard with the lowest weighted load
+    LEAST_LOADED = "LEAST_LOADED"
+
+
+class ShardedContainerService(ContainerService):
+    """A ContainerService spreading instances over several underlying container services.
+
+    Each shard is usually an AWSContainerService bound to a different cluster or region.
+    Instances are routed back to the shard that created them through an instance id map,
+    bounded to the max_owners most recently used instances. Instances missing from the
+    map are routed by the region and cluster in their ECS task ARN.
+    """
+
+    def __init__(
+        self,
+        container_svcs: List[ContainerService],
+        weights: Optional[List[float]] = None,
+        placement: ShardPlacement = ShardPlacement.LEAST_LOADED,
+        max_owners: int = DEFAULT_MAX_OWNERS,
+    ) -> None:
+        """
+        Args:
+            container_svcs: the underlying container services, one per cluster.
+            weights: relative capacity of each shard. Defaults to equal weights.
+            placement: how create_instances picks the shards.
+            max_owners: the maximum number of instances whose shard is remembered.
+        """
+        if not container_svcs:
+            raise ValueError("At least one container service is required.")
+        weights = weights or [1.0] * len(container_svcs)
+        if len(weights) != len(container_svcs) or any(w <= 0 for w in weights):
+            raise ValueError(
+                f"Expected {len(container_svcs)} positive weights, got {weights}."
+            )
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.container_svcs = container_svcs
+        self.weights = weights
+        self.placement = placement
+        self.max_owners = max_owners
+        self._owners: "OrderedDict[str, int]" = OrderedDict()
+        self._owners_lock = threading.Lock()
+
+    def get_region(
+        self,
+    ) -> str:
+        return self._join_unique([svc.get_region() for svc in self.container_svcs])
+
+    def get_cluster(
+        self,
+    ) -> str:
+        return self._join_unique([svc.get_cluster() for svc in self.container_svcs])
+
+    def create_instance(
+        self,
+        container_definition: str,
+        cmd: str,
+        env_vars: Optional[Dict[str, str]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> ContainerInstance:
+        shard = self._place(1)[0]
+        instance = self.container_svcs[shard].create_instance(
+            container_definition, cmd, env_vars, container_type, permission
+        )
+        self._record_owner(instance.instance_id, shard)
+        return instance
+
+    def create_instances(
+        self,
+        container_definition: str,
+        cmds: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Create instances across the shards.
+
+        Returns:
+            The created instances, in the same order as cmds.
+        """
+        if type(env_vars) is list and len(env_vars) != len(cmds):
+            raise ValueError(
+                f"Length of env_vars list {len(env_vars)} is different from length of cmds {len(cmds)}."
+            )
+
+        shards = self._place(len(cmds))
+        positions = self._group_by_shard(shards)
+        self.logger.info(
+            f"Placing {len(cmds)} instances on shards: "
+            + ", ".join(f"{shard}: {len(p)}" for shard, p in positions.items())
+        )
+
+        def create(shard: int) -> List[ContainerInstance]:
+            return self.container_svcs[shard].create_instances(
+                container_definition=container_definition,
+                cmds=[cmds[i] for i in positions[shard]],
+                env_vars=(
+                    [env_vars[i] for i in positions[shard]]
+                    if type(env_vars) is list
+                    else env_vars
+                ),
+                container_type=container_type,
+                permission=permission,
+            )
+
+        def try_create(shard: int) -> Union[List[ContainerInstance], Exception]:
+            try:
+                return create(shard)
+            except Exception as err:
+                return err
+
+        created: Dict[int, List[ContainerInstance]] = {}
+        errors: List[Exception] = []
+        for shard, result in self._map_shards(try_create, list(positions)):
+            if isinstance(result, Exception):
+                errors.append(result)
+            else:
+                created[shard] = result
+        if errors:
+            self._cancel_created(created)
+            raise errors[0]
+
+        instances: List[Optional[ContainerInstance]] = [None] * len(cmds)
+        for shard, shard_instances in created.items():
+            for i, instance in zip(positions[shard], shard_instances):
+                self._record_owner(instance.instance_id, shard)
+                instances[i] = instance
+        return [instance for instance in instances if instance is not None]
+
+    def _cancel_created(self, created: Dict[int, List[ContainerInstance]]) -> None:
+        """Cancel the instances created on the other shards when a shard failed"""
+
+        def cancel(shard: int) -> List[Optional[PcpError]]:
+            return self.container_svcs[shard].cancel_instances(
+                [instance.instance_id for instance in created[shard]]
+            )
+
+        for shard, shard_errors in self._map_shards(cancel, list(created)):
+            self.logger.warning(
+                f"Cancelled the {len(created[shard])} instances created on shard {shard} after another shard failed"
+            )
+            for instance, error in zip(created[shard], shard_errors):
+                if error:
+                    self.logger.error(
+                        f"Failed to cancel instance {instance.instance_id}: {error}"
+                    )
+
+    def get_instance(self, instance_id: str) -> Optional[ContainerInstance]:
+        shard = self._find_owner(instance_id)
+        if shard is None:
+            return None
+        return self.container_svcs[shard].get_instance(instance_id)
+
+    def get_instances(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        """Get instances from their owning shards.
+
+        Returns:
+            A list of Optional, in the same order as the input ids. Ids that do not belong
+            to any shard are None.
+        """
+        positions = self._group_by_owner(instance_ids)
+
+        def get(shard: int) -> List[Optional[ContainerInstance]]:
+            return self.container_svcs[shard].get_instances(
+                [instance_ids[i] for i in positions[shard]]
+            )
+
+        res: List[Optional[ContainerInstance]] = [None] * len(instance_ids)
+        for shard, shard_instances in self._map_shards(get, list(positions)):
+            for i, instance in zip(positions[shard], shard_instances):
+                res[i] = instance
+        return res
+
+    def cancel_instance(self, instance_id: str) -> None:
+        shard = self._find_owner(instance_id)
+        if shard is None:
+            raise PcpError(f"Instance {instance_id} does not belong to any shard.")
+        self.container_svcs[shard].cancel_instance(instance_id)
+
+    def cancel_instances(self, instance_ids: List[str]) -> List[Optional[PcpError]]:
+        """Cancel instances on their owning shards.
+
+        Returns:
+            A list of Optionals, in the same order as the input instance ids. Ids that do
+            not belong to any shard get a PcpError.
+        """
+        positions = self._group_by_owner(instance_ids)
+
+        def cancel(shard: int) -> List[Optional[PcpError]]:
+            return self.container_svcs[shard].cancel_instances(
+                [instance_ids[i] for i in positions[shard]]
+            )
+
+        res: List[Optional[PcpError]] = [
+            PcpError(f"Instance {instance_id} does not belong to any shard.")
+            for instance_id in instance_ids
+        ]
+        for shard, shard_errors in self._map_shards(cancel, list(positions)):
+            for i, error in zip(positions[shard], shard_errors):
+                res[i] = error
+        return res
+
+    def get_current_instances_count(self) -> int:
+        return sum(self._get_shard_loads())
+
+    def get_cluster_instance(self) -> Cluster:
+        """Get an aggregated view of the shard clusters"""
+        clusters = [svc.get_cluster_instance() for svc in self.container_svcs]
+        statuses = {cluster.status for cluster in clusters}
+        return Cluster(
+            cluster_arn=",".join(cluster.cluster_arn for cluster in clusters),
+            cluster_name=",".join(cluster.cluster_name for cluster in clusters),
+            pending_tasks=sum(cluster.pending_tasks for cluster in clusters),
+            running_tasks=sum(cluster.running_tasks for cluster in clusters),
+            status=statuses.pop() if len(statuses) == 1 else ClusterStatus.UNKNOWN,
+        )
+
+    def _place(self, count: int) -> List[int]:
+        """Returns the shard index of each of the count new instances"""
+        if self.placement is ShardPlacement.WEIGHTED:
+            return self._place_weighted(count)
+        return self._place_least_loaded(count, self._get_shard_loads())
+
+    def _place_weighted(self, count: int) -> List[int]:
+        # largest remainder apportionment of count over the weights
+        total = sum(self.weights)
+        quotas = [count * w / total for w in self.weights]
+        sizes = [int(q) for q in quotas]
+        by_remainder = sorted(range(len(quotas)), key=lambda i: sizes[i] - quotas[i])
+        for i in by_remainder[: count - sum(sizes)]:
+            sizes[i] += 1
+        return [shard for shard, size in enumerate(sizes) for _ in range(size)]
+
+    def _place_least_loaded(self, count: int, loads: List[int]) -> List[int]:
+        heap = [
+            (load / w, shard)
+            for shard, (load, w) in enumerate(zip(loads, self.weights))
+        ]
+        heapq.heapify(heap)
+        shards = []
+        for _ in range(count):
+            _, shard = heapq.heappop(heap)
+            shards.append(shard)
+            loads[shard] += 1
+            heapq.heappush(heap, (loads[shard] / self.weights[shard], shard))
+        return shards
+
+    def _get_shard_loads(self) -> List[int]:
+        return [
+            load
+            for _, load in self._map_shards(
+                lambda shard: self.container_svcs[shard].get_current_instances_count(),
+                list(range(len(self.container_svcs))),
+            )
+        ]
+
+    def _record_owner(self, instance_id: str, shard: int) -> None:
+        with self._owners_lock:
+            self._owners[instance_id] = shard
+            self._owners.move_to_end(instance_id)
+            while len(self._owners) > self.max_owners:
+                self._owners.popitem(last=False)
+
+    def _find_owner(self, instance_id: str) -> Optional[int]:
+        with self._owners_lock:
+            shard = self._owners.get(instance_id)
+            if shard is not None:
+                self._owners.move_to_end(instance_id)
+        if shard is not None:
+            return shard
+        # instances created by another process: ECS task ARNs embed their region and cluster,
+        # e.g. arn:aws:ecs:us-west-2:123456789012:task/my-cluster/0123456789abcdef
+        for i, svc in enumerate(self.container_svcs):
+            if (
+                f":{svc.get_region()}:" in instance_id
+                and f"/{svc.get_cluster()}/" in instance_id
+            ):
+                self._record_owner(instance_id, i)
+                return i
+        return None
+
+    def _group_by_shard(self, shards: List[int]) -> Dict[int, List[int]]:
+        positions: Dict[int, List[int]] = {}
+        for i, shard in enumerate(shards):
+            positions.setdefault(shard, []).append(i)
+        return positions
+
+    def _group_by_owner(self, instance_ids: List[str]) -> Dict[int, List[int]]:
+        positions: Dict[int, List[int]] = {}
+        for i, instance_id in enumerate(instance_ids):
+            shard = self._find_owner(instance_id)
+            if shard is not None:
+                positions.setdefault(shard, []).append(i)
+        return positions
+
+    def _map_shards(
+        self, f: Callable[[int], R], shards: List[int]
+    ) -> List[Tuple[int, R]]:
+        """Call f for each shard concurrently, returning (shard, result) pairs"""
+        if len(shards) <= 1:
+            return [(shard, f(shard)) for shard in shards]
+        with ThreadPoolExecutor(max_workers=len(shards)) as executor:
+            return list(zip(shards, executor.map(f, shards)))
+
+    def _join_unique(self, values: List[str]) -> str:
+        return ",".join(dict.fromkeys(values))
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from fbpcp.entity.cloud_provider import CloudProvider
+from fbpcp.entity.container_type import (
+    CONTAINER_TYPES,
+    ContainerSize,
+    ContainerTypeConfig,
+)
+from fbpcp.entity.resource_usage import get_run_fingerprint, ResourceUsage
+from fbpcp.service.resource_usage_store import DEFAULT_USAGE_HISTORY, ResourceUsageStore
+from fbpcp.util import reflect
+
+DEFAULT_MEMORY_HEADROOM = 0.2
+GB_TO_BYTES = 1024**3
+
+
+class ContainerSizer:
+    """Picks container sizes from the resource usage recorded by OneDocker runners.
+
+    A recommendation is based on the latest successful runs with the same fingerprint, or
+    else of the same package version, or else of the same package. The memory of the
+    container has to fit the largest peak RSS plus headroom. The runtime on c vCPU is
+    predicted as wall_time * max(1, p / c), where p = cpu_time / wall_time is the
+    parallelism the run achieved: fewer vCPU slow a run down proportionally, and more vCPU
+    are not assumed to speed it up.
+
+    The smallest candidate (by vCPU, then memory) whose predicted runtime meets
+    target_runtime is picked, or else the fastest one that fits in memory.
+    """
+
+    def __init__(
+        self,
+        usage_store_config: Dict[str, Any],
+        target_runtime: Optional[float] = None,
+        candidates: Optional[List[ContainerSize]] = None,
+        cloud_provider: CloudProvider = CloudProvider.AWS,
+        memory_headroom: float = DEFAULT_MEMORY_HEADROOM,
+        history: int = DEFAULT_USAGE_HISTORY,
+    ) -> None:
+        """
+        Args:
+            usage_store_config: class path and constructor arguments of the ResourceUsageStore, shared with the runners.
+            target_runtime: seconds a run should take at most. None picks the smallest size fitting in memory.
+            candidates: the sizes to pick from, predefined types or custom ContainerTypeConfig. Defaults to the predefined types of cloud_provider.
+            memory_headroom: fraction of memory added to the recorded peak RSS.
+            history: the maximum number of recorded runs considered.
+        """
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.usage_store_config = usage_store_config
+        self.usage_store: ResourceUsageStore = reflect.get_class(
+            usage_store_config["class"]
+        )(**usage_store_config.get("constructor", {}))
+        self.target_runtime = target_runtime
+        self.cloud_provider = cloud_provider
+        self.memory_headroom = memory_headroom
+        self.history = history
+        candidates = candidates or list(CONTAINER_TYPES[cloud_provider])
+        self.candidates: List[ContainerSize] = sorted(candidates, key=self._get_key)
+
+    def recommend(
+        self,
+        package_name: str,
+        version: str,
+        exe_args_list: Optional[Sequence[Optional[str]]] = None,
+    ) -> Optional[ContainerSize]:
+        """Pick a size for runs of a package version, one per exe_args.
+
+        Returns:
+            The size fitting all the runs, or None if no run of the package was recorded.
+        """
+        usages = []
+        for exe_args in exe_args_list or [None]:
+            usages.extend(self._get_usages(package_name, version, exe_args))
+        if not usages:
+            self.logger.info(f"No resource usage recorded for {package_name}")
+            return None
+
+        needed_memory = max(usage.peak_memory for usage in usages) * (
+            1 + self.memory_headroom
+        )
+        fitting = [
+            candidate
+            for candidate in self.candidates
+            if self._get_config(candidate).memory * GB_TO_BYTES >= needed_memory
+        ]
+        if not fitting:
+            self.logger.warning(
+                f"{package_name} peaked at {needed_memory / GB_TO_BYTES:.1f}GB with headroom, more than any candidate"
+            )
+            return self.candidates[-1]
+        for candidate in fitting:
+            runtime = self.predict_runtime(usages, self._get_config(candidate).cpu)
+            if self.target_runtime is None or runtime <= self.target_runtime:
+                return candidate
+        return min(
+            fitting,
+            key=lambda candidate: self.predict_runtime(
+                usages, self._get_config(candidate).cpu
+            ),
+        )
+
+    @staticmethod
+    def predict_runtime(usages: List[ResourceUsage], cpu: int) -> float:
+        """Predicted seconds of the slowest of the runs on cpu vCPU"""
+        return max(
+            (
+                usage.wall_time * max(1.0, usage.cpu_time / usage.wall_time / cpu)
+                if usage.wall_time > 0
+                else 0.0
+            )
+            for usage in usages
+        )
+
+    def _get_usages(
+        self, package_name: str, version: str, exe_args: Optional[str]
+    ) -> List[ResourceUsage]:
+        fingerprint = get_run_fingerprint(package_name, version, exe_args)
+        for query in (
+            {"version": version, "fingerprint": fingerprint},
+            {"version": version},
+            {},
+        ):
+            usages = [
+                usage
+                for usage in self.usage_store.get_usages(
+                    package_name, limit=self.history, **query
+                )
+                if usage.exit_code == 0
+            ]
+            if usages:
+                return usages
+        return []
+
+    def _get_config(self, candidate: ContainerSize) -> ContainerTypeConfig:
+        return ContainerTypeConfig.get_config(self.cloud_provider, candidate)
+
+    def _get_key(self, candidate: ContainerSize) -> Tuple[int, int]:
+        config = self._get_config(candidate)
+        return (config.cpu, config.memory)
@@ -7,20 +7,25 @@
 # pyre-strict
 
 import asyncio
+import json
 import logging
+import re
+import threading
 import time
-from typing import Dict, Final, List, Optional, Union
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Dict, Final, List, Optional, Set, Tuple, Union
 
 from fbpcp.decorator.metrics import duration_time, error_counter, request_counter
 from fbpcp.entity.certificate_request import CertificateRequest
 from fbpcp.entity.container_insight import ContainerInsight
 from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
 from fbpcp.entity.container_permission import ContainerPermissionConfig
-from fbpcp.entity.container_type import ContainerType
+from fbpcp.entity.container_type import ContainerSize
 from fbpcp.error.pcp import PcpError
 from fbpcp.metrics.emitter import MetricsEmitter
 from fbpcp.metrics.getter import MetricsGetter
 from fbpcp.service.container import ContainerService
+from fbpcp.service.container_sizer import ContainerSizer
 from fbpcp.service.insights import InsightsService
 from fbpcp.util.arg_builder import build_cmd_args
 from fbpcp.util.typing import checked_cast
@@ -31,6 +36,15 @@ ONEDOCKER_CMD_PREFIX = (
 )
 
 DEFAULT_BINARY_VERSION = "latest"
+# Package name placeholder that starts the runner in serve mode
+ONEDOCKER_SERVE_MODE = "serve"
+# container_type letting the ContainerSizer pick the size from past runs
+AUTO_CONTAINER_TYPE = "auto"
+DEFAULT_MAX_CONCURRENT_LAUNCHES = 8
+DEFAULT_POLL_INTERVAL = 1.0
+# seconds a launched container may be missing from lookups before it is considered lost,
+# as tasks can be reported missing for a moment after they were run
+MISSING_CONTAINER_GRACE_PERIOD = 10.0
 
 METRICS_CONTAINER_COUNT = "onedocker.container.count"
 METRICS_START_CONTAINERS_COUNT = "onedocker.start_containers.count"
@@ -39,6 +53,11 @@ METRICS_START_CONTAINERS_DURATION = "onedocker.start_containers.duration"
 
 METRICS_FAILED_CONTAINERS_COUNT = "onedocker.failed.containers.count"
 METRICS_REQUESTED_CONTAINERS_COUNT = "onedocker.requested.containers.count"
+# emitted as onedocker.container.phase.duration.<phase>.<cluster>.<task definition>, in ms
+METRICS_CONTAINER_PHASE_DURATION = "onedocker.container.phase.duration"
+# containers whose emitted phases are remembered, so that each phase is emitted once
+MAX_RECORDED_TIMELINES = 10000
+TERMINAL_STATUSES = (ContainerInstanceStatus.COMPLETED, ContainerInstanceStatus.FAILED)
 
 
 class OneDockerService(MetricsGetter):
@@ -51,12 +70,14 @@ class OneDockerService(MetricsGetter):
         metrics: Optional[MetricsEmitter] = None,
         container_cmd_prefix: Optional[str] = None,
         insights: Optional[InsightsService] = None,
+        container_sizer: Optional[ContainerSizer] = None,
     ) -> None:
         """Constructor of OneDockerService
         container_svc -- service to spawn container instances
         task_definition -- container definition to spawn container instances
         metrics -- metrics emitter to emit metrics
         insights -- insights service to emit insights
+        container_sizer -- when set, runners record their resource usage to its store and container_type="auto" is supported
         """
         if container_svc is None:
             raise ValueError(f"Dependency is missing. container_svc={container_svc}, ")
@@ -67,7 +88,11 @@ class OneDockerService(MetricsGetter):
             container_cmd_prefix if container_cmd_prefix else ONEDOCKER_CMD_PREFIX
         )
         self.insights: Final[Optional[InsightsService]] = insights
+        self.container_sizer = container_sizer
         self.logger: logging.Logger = logging.getLogger(__name__)
+        # instance id -> phases of its timeline already emitted
+        self._recorded_phases: "OrderedDict[str, Set[str]]" = OrderedDict()
+        self._recorded_phases_lock = threading.Lock()
 
     def get_cluster(self) -> str:
         """Get the cluster of the container service
@@ -97,7 +122,7 @@ class OneDockerService(MetricsGetter):
         tag: Optional[str] = None,
         certificate_request: Optional[CertificateRequest] = None,
         opa_workflow_path: Optional[str] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[Union[ContainerSize, str]] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> ContainerInstance:
         """
@@ -147,7 +172,7 @@ class OneDockerService(MetricsGetter):
         tag: Optional[str] = None,
         certificate_request: Optional[CertificateRequest] = None,
         opa_workflow_path: Optional[str] = None,
-        container_type: Optional[ContainerType] = None,
+        container_type: Optional[Union[ContainerSize, str]] = None,
         permission: Optional[ContainerPermissionConfig] = None,
     ) -> List[ContainerInstance]:
         """Spin up cloud containers according to command arg list.
@@ -165,11 +190,257 @@ class OneDockerService(MetricsGetter):
             tag:                Tag for docker containers
             certificate_request: An optional instance of CertificateRequest that contains the parameters required to create a TLS certificate
             opa_workflow_path:  A string that denotes the path to a specified opa workflow. Supported Path type: local.
+            container_type:     A ContainerType, a custom ContainerTypeConfig, or "auto" to let the container sizer pick
+                                the size from past runs. Without recorded runs, the size of the task definition is used
             permission:         A configuration which describes the container permissions
 
         Returns:
             A list of the containers that were successfuly started
         """
+        cmds, task_definition, container_type = self._prepare_start(
+            package_name,
+            task_definition,
+            version,
+            cmd_args_list,
+            env_vars,
+            timeout,
+            certificate_request,
+            opa_workflow_path,
+            container_type,
+        )
+        containers = self.container_svc.create_instances(
+            container_definition=task_definition,
+            cmds=cmds,
+            env_vars=env_vars,
+            container_type=container_type,
+            permission=permission,
+        )
+        self._record_started_containers(containers, tag)
+
+        if self.insights:
+            for container in containers:
+                self.insights.emit(self._get_insight(container))
+
+        return containers
+
+    @error_counter(METRICS_START_CONTAINERS_ERROR_COUNT)
+    @request_counter(METRICS_START_CONTAINERS_COUNT)
+    @duration_time(METRICS_START_CONTAINERS_DURATION)
+    async def start_containers_async(
+        self,
+        package_name: str,
+        task_definition: Optional[str] = None,
+        version: str = DEFAULT_BINARY_VERSION,
+        cmd_args_list: Optional[List[str]] = None,
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        timeout: Optional[int] = None,
+        tag: Optional[str] = None,
+        certificate_request: Optional[CertificateRequest] = None,
+        opa_workflow_path: Optional[str] = None,
+        container_type: Optional[Union[ContainerSize, str]] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Async version of start_containers, which does not block the event loop.
+
+        Args:
+            Same as start_containers.
+
+        Returns:
+            A list of the containers that were successfuly started
+        """
+        cmds, task_definition, container_type = self._prepare_start(
+            package_name,
+            task_definition,
+            version,
+            cmd_args_list,
+            env_vars,
+            timeout,
+            certificate_request,
+            opa_workflow_path,
+            container_type,
+        )
+        containers = await self.container_svc.create_instances_async(
+            container_definition=task_definition,
+            cmds=cmds,
+            env_vars=env_vars,
+            container_type=container_type,
+            permission=permission,
+        )
+        self._record_started_containers(containers, tag)
+
+        if self.insights:
+            for container in containers:
+                await self.insights.emit_async(self._get_insight(container))
+
+        return containers
+
+    async def start_containers_as_ready(
+        self,
+        package_name: str,
+        task_definition: Optional[str] = None,
+        version: str = DEFAULT_BINARY_VERSION,
+        cmd_args_list: Optional[List[str]] = None,
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        timeout: Optional[int] = None,
+        tag: Optional[str] = None,
+        certificate_request: Optional[CertificateRequest] = None,
+        opa_workflow_path: Optional[str] = None,
+        container_type: Optional[Union[ContainerSize, str]] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+        max_concurrent_launches: int = DEFAULT_MAX_CONCURRENT_LAUNCHES,
+        poll_interval: float = DEFAULT_POLL_INTERVAL,
+    ) -> AsyncIterator[Tuple[int, ContainerInstance]]:
+        """Launch containers and yield each one as soon as it is ready.
+
+        Launching and readiness polling overlap: the containers launched so far are polled
+        in a single batched lookup every poll_interval seconds while the remaining ones are
+        still being launched.
+
+        Args:
+            Same as start_containers, plus
+            max_concurrent_launches: the maximum number of launch requests in flight.
+            poll_interval: seconds between two readiness lookups.
+
+        Yields:
+            (index, container) pairs in readiness order, where index is the position of the
+            container's command in cmd_args_list. A container is ready once it has an IP address
+            and a known status: STARTED, or COMPLETED/FAILED if it exited before being observed.
+
+        Raises:
+            PcpError: a launched container could not be found for MISSING_CONTAINER_GRACE_PERIOD seconds.
+
+        If the iteration stops early, on an error or when the caller breaks out of it or
+        closes it, no further container is launched, the launches in flight are awaited and
+        the launched containers that were not yielded yet are stopped.
+        """
+        cmds, task_definition, container_type = self._prepare_start(
+            package_name,
+            task_definition,
+            version,
+            cmd_args_list,
+            env_vars,
+            timeout,
+            certificate_request,
+            opa_workflow_path,
+            container_type,
+        )
+        semaphore = asyncio.Semaphore(max_concurrent_launches)
+        stopping = asyncio.Event()
+
+        async def launch(index: int) -> Optional[Tuple[int, ContainerInstance]]:
+            async with semaphore:
+                if stopping.is_set():
+                    return None
+                containers = await self.container_svc.create_instances_async(
+                    container_definition=task_definition,
+                    cmds=[cmds[index]],
+                    env_vars=env_vars[index] if type(env_vars) is list else env_vars,
+                    container_type=container_type,
+                    permission=permission,
+                )
+            return index, containers[0]
+
+        loop = asyncio.get_running_loop()
+        launches = {asyncio.ensure_future(launch(i)) for i in range(len(cmds))}
+        launched: List[ContainerInstance] = []
+        # instance id -> index of the container's command
+        pending: Dict[str, int] = {}
+        # instance id -> loop time it was first found missing at
+        missing_since: Dict[str, float] = {}
+        next_poll = loop.time()
+        completed = False
+        try:
+            while launches or pending:
+                wait_time = max(0, next_poll - loop.time()) if pending else None
+                if launches:
+                    done, launches = await asyncio.wait(
+                        launches,
+                        timeout=wait_time,
+                        return_when=asyncio.FIRST_COMPLETED,
+                    )
+                    # record the launched containers before raising a failed launch
+                    for task in sorted(done, key=lambda task: bool(task.exception())):
+                        index, container = checked_cast(tuple, task.result())
+                        launched.append(container)
+                        pending[container.instance_id] = index
+                else:
+                    await asyncio.sleep(wait_time or 0)
+
+                if not pending or loop.time() < next_poll:
+                    continue
+                instance_ids = list(pending)
+                updated_containers = await self.get_containers_async(instance_ids)
+                next_poll = loop.time() + poll_interval
+                for instance_id, container in zip(instance_ids, updated_containers):
+                    if container is None:
+                        first_missing = missing_since.setdefault(
+                            instance_id, loop.time()
+                        )
+                        if (
+                            loop.time() - first_missing
+                            >= MISSING_CONTAINER_GRACE_PERIOD
+                        ):
+                            raise PcpError(
+                                f"Container {instance_id} could not be found"
+                            )
+                        continue
+                    missing_since.pop(instance_id, None)
+                    if self._is_ready(container):
+                        self.record_container_timelines([container], task_definition)
+                        if self.insights:
+                            await self.insights.emit_async(self._get_insight(container))
+                        yield pending.pop(instance_id), container
+            completed = True
+        finally:
+            if not completed:
+                stopping.set()
+                await self._stop_unyielded_containers(launches, pending)
+
+        self._record_started_containers(launched, tag)
+
+    async def _stop_unyielded_containers(
+        self,
+        launches: Set["asyncio.Future[Optional[Tuple[int, ContainerInstance]]]"],
+        pending: Dict[str, int],
+    ) -> None:
+        # launches are not cancelled: cancelling one in flight would not stop its request,
+        # only lose the container it starts
+        for result in await asyncio.gather(*launches, return_exceptions=True):
+            if isinstance(result, tuple):
+                pending[result[1].instance_id] = result[0]
+        if not pending:
+            return
+        instance_ids = list(pending)
+        self.logger.warning(
+            f"Stopping the {len(instance_ids)} containers launched but not yielded yet"
+        )
+        errors = await self.stop_containers_async(instance_ids)
+        for instance_id, error in zip(instance_ids, errors):
+            if error:
+                self.logger.error(f"Failed to stop container {instance_id}: {error}")
+
+    def _is_ready(self, container: ContainerInstance) -> bool:
+        return bool(container.ip_address) and (
+            container.status is not ContainerInstanceStatus.UNKNOWN
+        )
+
+    def _prepare_start(
+        self,
+        package_name: str,
+        task_definition: Optional[str],
+        version: str,
+        cmd_args_list: Optional[List[str]],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+        timeout: Optional[int],
+        certificate_request: Optional[CertificateRequest],
+        opa_workflow_path: Optional[str],
+        container_type: Optional[Union[ContainerSize, str]],
+    ) -> Tuple[List[str], str, Optional[ContainerSize]]:
+        """Validate start arguments and build the container commands
+
+        Returns:
+            The commands to run in the containers, the task definition and the container type to run them with
+        """
         if not cmd_args_list:
             raise ValueError("Command Argument List shouldn't be None or Empty")
 
@@ -178,6 +449,17 @@ class OneDockerService(MetricsGetter):
                 f"Length of env_vars {len(env_vars)} not equal to the length of cmd_args_list {len(cmd_args_list)}."
             )
 
+        if container_type == AUTO_CONTAINER_TYPE:
+            if not self.container_sizer:
+                raise ValueError(
+                    f'container_type "{AUTO_CONTAINER_TYPE}" requires a container sizer'
+                )
+            container_type = self.container_sizer.recommend(
+                package_name, version, cmd_args_list
+            )
+        elif isinstance(container_type, str):
+            raise ValueError(f"Unknown container type {container_type}")
+
         cmds = [
             self._get_cmd(
                 package_name,
@@ -199,13 +481,11 @@ class OneDockerService(MetricsGetter):
             raise ValueError(
                 "task definition should be specified when spinning up containers"
             )
-        containers = self.container_svc.create_instances(
-            container_definition=task_definition,
-            cmds=cmds,
-            env_vars=env_vars,
-            container_type=container_type,
-            permission=permission,
-        )
+        return cmds, task_definition, container_type
+
+    def _record_started_containers(
+        self, containers: List[ContainerInstance], tag: Optional[str]
+    ) -> None:
         if containers:
             self.logger.info(
                 f"Spun up {len(containers)} ({containers[0].cpu}vCPU, {containers[0].memory}GB) containers"
@@ -216,11 +496,61 @@ class OneDockerService(MetricsGetter):
             name = f"{METRICS_CONTAINER_COUNT}.{tag}" if tag else name
             self.metrics.count(name, len(containers))
 
-        if self.insights:
-            for container in containers:
-                self.insights.emit(self._get_insight(container))
+    def start_serving_containers(
+        self,
+        count: int,
+        work_queue_config: Dict[str, Any],
+        queue_name: str,
+        task_definition: Optional[str] = None,
+        idle_timeout: Optional[int] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> List[ContainerInstance]:
+        """Spin up containers running the OneDocker runner in serve mode.
 
-        return containers
+        Serving runners pull work items from a queue and run them one after another,
+        so they pay the container cold start only once.
+
+        Args:
+            count:              Number of containers to start
+            work_queue_config:  Class path and constructor arguments of the WorkQueueService, e.g.
+                                {"class": "fbpcp.service.work_queue_local.LocalWorkQueueService", "constructor": {...}}
+            queue_name:         Name of the queue the runners pull work items from
+            task_definition:    Task definition of the containers. Defaults to OneDockerService's task definition
+            idle_timeout:       Runners exit after this many seconds without work. None keeps them running
+            container_type:     The type of container to create
+            permission:         A configuration which describes the container permissions
+
+        Returns:
+            A list of the containers that were successfuly started
+        """
+        task_definition = task_definition or self.task_definition
+        if not task_definition:
+            raise ValueError(
+                "task definition should be specified when spinning up containers"
+            )
+        runner_args = build_cmd_args(
+            work_queue=json.dumps(work_queue_config),
+            queue_name=queue_name,
+            idle_timeout=idle_timeout,
+            usage_store=(
+                json.dumps(self.container_sizer.usage_store_config)
+                if self.container_sizer
+                else None
+            ),
+        )
+        cmd = self.container_cmd_prefix.format(
+            package_name=ONEDOCKER_SERVE_MODE, runner_args=runner_args
+        ).strip()
+        self.logger.info(
+            f"Spinning up {count} serving container instance[s] for queue {queue_name}"
+        )
+        return self.container_svc.create_instances(
+            container_definition=task_definition,
+            cmds=[cmd] * count,
+            container_type=container_type,
+            permission=permission,
+        )
 
     async def wait_for_pending_containers(
         self, container_ids: List[str]
@@ -249,6 +579,7 @@ class OneDockerService(MetricsGetter):
                 failed_count,
             )
         containers = [checked_cast(ContainerInstance, container) for container in res]
+        self.record_container_timelines(containers)
 
         if self.insights:
             for container in containers:
@@ -256,17 +587,62 @@ class OneDockerService(MetricsGetter):
 
         return containers
 
+    def record_container_timelines(
+        self,
+        containers: List[ContainerInstance],
+        task_definition: Optional[str] = None,
+    ) -> None:
+        """Emit the duration of each known lifecycle phase of the containers.
+
+        Phases are provisioning, image_pull, container_start and launch (their sum) once a
+        container started, then run and stopping once it stopped. Each phase of a container
+        is emitted once. Durations are gauges named after the phase, cluster and task
+        definition.
+
+        Launch phases are recorded when containers become ready, stop phases when
+        get_container(s) return stopped containers.
+
+        Args:
+            containers: containers whose timeline is known, e.g. as returned by get_containers
+            task_definition: task definition of the containers. Defaults to OneDockerService's task definition
+        """
+        if not self.metrics:
+            return
+        task_definition = re.sub(
+            r"[^\w\-]", "_", task_definition or self.task_definition or "unknown"
+        )
+        cluster = self.container_svc.get_cluster()
+        for container in containers:
+            if not container.timeline:
+                continue
+            durations = container.timeline.get_phase_durations()
+            with self._recorded_phases_lock:
+                recorded = self._recorded_phases.setdefault(
+                    container.instance_id, set()
+                )
+                self._recorded_phases.move_to_end(container.instance_id)
+                while len(self._recorded_phases) > MAX_RECORDED_TIMELINES:
+                    self._recorded_phases.popitem(last=False)
+                phases = [phase for phase in durations if phase not in recorded]
+                recorded.update(phases)
+            for phase in phases:
+                duration = durations[phase]
+                self.metrics.gauge(
+                    f"{METRICS_CONTAINER_PHASE_DURATION}.{phase}.{cluster}.{task_definition}",
+                    duration,
+                )
+
     async def wait_for_pending_container(
         self, container_id: str
     ) -> Optional[ContainerInstance]:
-        updated_container = self.get_containers([container_id])[0]
+        updated_container = (await self.get_containers_async([container_id]))[0]
         while (
             not updated_container
             or not updated_container.ip_address
             or updated_container.status is ContainerInstanceStatus.UNKNOWN
         ):
             await asyncio.sleep(1)
-            updated_container = self.get_containers([container_id])[0]
+            updated_container = (await self.get_containers_async([container_id]))[0]
             if updated_container is None:
                 break
         return updated_container
@@ -274,6 +650,11 @@ class OneDockerService(MetricsGetter):
     def stop_containers(self, containers: List[str]) -> List[Optional[PcpError]]:
         return self.container_svc.cancel_instances(containers)
 
+    async def stop_containers_async(
+        self, containers: List[str]
+    ) -> List[Optional[PcpError]]:
+        return await self.container_svc.cancel_instances_async(containers)
+
     def get_containers(
         self, instance_ids: List[str]
     ) -> List[Optional[ContainerInstance]]:
@@ -288,10 +669,35 @@ class OneDockerService(MetricsGetter):
             users pass 3 instance_ids and the second instance could not be found,
             then returned list should also have 3 elements, with the 2nd elements being None.
         """
-        return self.container_svc.get_instances(instance_ids)
+        containers = self.container_svc.get_instances(instance_ids)
+        self._record_stopped_timelines(containers)
+        return containers
+
+    async def get_containers_async(
+        self, instance_ids: List[str]
+    ) -> List[Optional[ContainerInstance]]:
+        """Async version of get_containers, with the same ordered result"""
+        containers = await self.container_svc.get_instances_async(instance_ids)
+        self._record_stopped_timelines(containers)
+        return containers
 
     def get_container(self, instance_id: str) -> Optional[ContainerInstance]:
-        return self.container_svc.get_instance(instance_id)
+        container = self.container_svc.get_instance(instance_id)
+        self._record_stopped_timelines([container])
+        return container
+
+    def _record_stopped_timelines(
+        self, containers: List[Optional[ContainerInstance]]
+    ) -> None:
+        if not self.metrics:
+            return
+        stopped = [
+            container
+            for container in containers
+            if container and container.status in TERMINAL_STATUSES
+        ]
+        if stopped:
+            self.record_container_timelines(stopped)
 
     def _get_exe_name(self, package_name: str) -> str:
         return package_name.split("/")[1]
@@ -310,6 +716,10 @@ class OneDockerService(MetricsGetter):
             args_dict["cert_params"] = certificate_request.convert_to_cert_params()
         if opa_workflow_path:
             args_dict["opa_workflow_path"] = opa_workflow_path
+        if self.container_sizer:
+            args_dict["usage_store"] = json.dumps(
+                self.container_sizer.usage_store_config
+            )
         runner_args = build_cmd_args(**args_dict)
         return self.container_cmd_prefix.format(
             package_name=package_name,
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import asyncio
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Deque, Dict, Final, List, Optional, Tuple, Union
+
+from fbpcp.entity.container_instance import ContainerInstance
+from fbpcp.error.pcp import LimitExceededError, PcpError
+from fbpcp.metrics.emitter import MetricsEmitter
+from fbpcp.metrics.getter import MetricsGetter
+from fbpcp.service.onedocker import OneDockerService
+
+DEFAULT_MAX_WAVE_SIZE = 100
+DEFAULT_ADMISSION_POLL_INTERVAL = 10.0
+# seconds after which the cluster instances count is assumed to include a launched wave
+DEFAULT_LAUNCH_SETTLE_TIME = 60.0
+
+METRICS_SCHEDULER_QUEUE_DELAY = "onedocker.scheduler.queue_delay"
+METRICS_SCHEDULER_WAVES_COUNT = "onedocker.scheduler.waves.count"
+
+
+class OneDockerWaveScheduler(MetricsGetter):
+    """Admission control in front of OneDockerService.start_containers.
+
+    Large requests are split into waves. A wave is only admitted while the cluster's pending
+    plus running instances count is under max_instances; the remaining containers wait in a
+    FIFO queue shared by all callers of the scheduler, sync and async alike. The caller at
+    the head of the queue starts all its waves before the next one is admitted.
+
+    The count is eventually consistent, so waves admitted in the last launch_settle_time
+    seconds are counted on top of it until it reaches what it should be after their launch.
+    If a wave fails to start, the containers already started by the call are stopped.
+    """
+
+    def __init__(
+        self,
+        onedocker_svc: OneDockerService,
+        max_instances: int,
+        max_wave_size: int = DEFAULT_MAX_WAVE_SIZE,
+        poll_interval: float = DEFAULT_ADMISSION_POLL_INTERVAL,
+        metrics: Optional[MetricsEmitter] = None,
+        launch_settle_time: float = DEFAULT_LAUNCH_SETTLE_TIME,
+    ) -> None:
+        """Constructor of OneDockerWaveScheduler
+        onedocker_svc -- service used to start the containers
+        max_instances -- ceiling on the pending and running instances of the cluster
+        max_wave_size -- the maximum number of containers started at once
+        poll_interval -- seconds to wait before checking the cluster capacity again
+        metrics -- metrics emitter to emit queueing delay metrics
+        launch_settle_time -- seconds for a launched wave to show in the instances count
+        """
+        if max_instances <= 0 or max_wave_size <= 0:
+            raise ValueError(
+                f"max_instances {max_instances} and max_wave_size {max_wave_size} should be positive"
+            )
+        self.onedocker_svc = onedocker_svc
+        self.max_instances = max_instances
+        self.max_wave_size = max_wave_size
+        self.poll_interval = poll_interval
+        self.metrics: Final[Optional[MetricsEmitter]] = metrics
+        self.launch_settle_time = launch_settle_time
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        # wake up callbacks of the callers queued behind the one whose turn it is
+        self._waiters: Deque[Callable[[], None]] = deque()
+        self._turn_taken = False
+        self._queue_lock = threading.Lock()
+        # (admitted at, size, instances count expected once observed) of recent waves
+        self._launches: List[Tuple[float, int, int]] = []
+        self._launches_lock = threading.Lock()
+
+    def has_metrics(self) -> bool:
+        return self.metrics is not None
+
+    def get_metrics(self) -> MetricsEmitter:
+        if not self.metrics:
+            raise PcpError("OneDockerWaveScheduler doesn't have metrics emitter")
+
+        return self.metrics
+
+    def start_containers(
+        self,
+        package_name: str,
+        cmd_args_list: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        max_wait: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[ContainerInstance]:
+        """Start containers in waves, blocking while the cluster is at capacity.
+
+        Args:
+            package_name: Name of running package within docker image
+            cmd_args_list: A list of command overrides in docker containers
+            env_vars: A dictionary applied to all containers, or a list with one dictionary per container
+            max_wait: the maximum number of seconds to wait for capacity. None waits forever.
+            kwargs: the other arguments of OneDockerService.start_containers
+
+        Returns:
+            The started containers, in the same order as cmd_args_list
+
+        Raises:
+            LimitExceededError: capacity did not free up within max_wait seconds.
+        """
+        self._check_env_vars(cmd_args_list, env_vars)
+        containers: List[ContainerInstance] = []
+        queued_at = time.monotonic()
+        self._take_turn()
+        try:
+            try:
+                while len(containers) < len(cmd_args_list):
+                    wave_size = self._get_wave_size(
+                        len(cmd_args_list) - len(containers)
+                    )
+                    if wave_size == 0:
+                        self._check_max_wait(queued_at, max_wait)
+                        time.sleep(self.poll_interval)
+                        continue
+                    self._record_admission(queued_at)
+                    start, end = len(containers), len(containers) + wave_size
+                    containers.extend(
+                        self.onedocker_svc.start_containers(
+                            package_name=package_name,
+                            cmd_args_list=cmd_args_list[start:end],
+                            env_vars=self._slice_env_vars(env_vars, start, end),
+                            **kwargs,
+                        )
+                    )
+                    queued_at = time.monotonic()
+            except BaseException:
+                if containers:
+                    self._log_stop_errors(
+                        containers,
+                        self.onedocker_svc.stop_containers(
+                            [container.instance_id for container in containers]
+                        ),
+                    )
+                raise
+        finally:
+            self._pass_turn()
+        return containers
+
+    async def start_containers_async(
+        self,
+        package_name: str,
+        cmd_args_list: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]] = None,
+        max_wait: Optional[float] = None,
+        **kwargs: Any,
+    ) -> List[ContainerInstance]:
+        """Async version of start_containers, which does not block the event loop while queued"""
+        self._check_env_vars(cmd_args_list, env_vars)
+        loop = asyncio.get_running_loop()
+        containers: List[ContainerInstance] = []
+        queued_at = time.monotonic()
+        await self._take_turn_async()
+        try:
+            try:
+                while len(containers) < len(cmd_args_list):
+                    wave_size = await loop.run_in_executor(
+                        None,
+                        self._get_wave_size,
+                        len(cmd_args_list) - len(containers),
+                    )
+                    if wave_size == 0:
+                        self._check_max_wait(queued_at, max_wait)
+                        await asyncio.sleep(self.poll_interval)
+                        continue
+                    self._record_admission(queued_at)
+                    start, end = len(containers), len(containers) + wave_size
+                    containers.extend(
+                        await self.onedocker_svc.start_containers_async(
+                            package_name=package_name,
+                            cmd_args_list=cmd_args_list[start:end],
+                            env_vars=self._slice_env_vars(env_vars, start, end),
+                            **kwargs,
+                        )
+                    )
+                    queued_at = time.monotonic()
+            except BaseException:
+                if containers:
+                    self._log_stop_errors(
+                        containers,
+                        await self.onedocker_svc.stop_containers_async(
+                            [container.instance_id for container in containers]
+                        ),
+                    )
+                raise
+        finally:
+            self._pass_turn()
+        return containers
+
+    def _queue(self, wake: Callable[[], None]) -> bool:
+        """Returns whether the turn was free and taken, or else queues wake to be called
+        once the turn is passed to the caller
+        """
+        with self._queue_lock:
+            if not self._turn_taken:
+                self._turn_taken = True
+                return True
+            self._waiters.append(wake)
+            return False
+
+    def _unqueue(self, wake: Callable[[], None]) -> bool:
+        """Returns whether wake was still queued, i.e. the turn was not passed to it"""
+        with self._queue_lock:
+            if wake in self._waiters:
+                self._waiters.remove(wake)
+                return True
+            return False
+
+    def _pass_turn(self) -> None:
+        with self._queue_lock:
+            if not self._waiters:
+                self._turn_taken = False
+                return
+            wake = self._waiters.popleft()
+        wake()
+
+    def _take_turn(self) -> None:
+        turn = threading.Event()
+        wake = turn.set
+        if self._queue(wake):
+            return
+        try:
+            turn.wait()
+        except BaseException:
+            if not self._unqueue(wake):
+                self._pass_turn()
+            raise
+
+    async def _take_turn_async(self) -> None:
+        loop = asyncio.get_running_loop()
+        turn = loop.create_future()
+
+        def hand_over() -> None:
+            # the turn may arrive after the caller stopped waiting for it
+            if turn.cancelled():
+                self._pass_turn()
+            else:
+                turn.set_result(None)
+
+        def wake() -> None:
+            try:
+                loop.call_soon_threadsafe(hand_over)
+            except RuntimeError:
+                # the event loop of the caller is closed
+                self._pass_turn()
+
+        if self._queue(wake):
+            return
+        try:
+            await turn
+        except BaseException:
+            if not self._unqueue(wake) and turn.done() and not turn.cancelled():
+                # the turn was handed over right before the cancellation
+                self._pass_turn()
+            raise
+
+    def _get_wave_size(self, remaining: int) -> int:
+        current = self.onedocker_svc.container_svc.get_current_instances_count()
+        with self._launches_lock:
+            if self._launches:
+                settled_at = time.monotonic() - self.launch_settle_time
+                self._launches = [
+                    launch
+                    for launch in self._launches
+                    if launch[0] > settled_at and current < launch[2]
+                ]
+            unobserved = sum(launch[1] for launch in self._launches)
+            capacity = max(0, self.max_instances - current - unobserved)
+            wave_size = min(capacity, self.max_wave_size, remaining)
+            if wave_size:
+                self._launches.append(
+                    (time.monotonic(), wave_size, current + unobserved + wave_size)
+                )
+        if wave_size < remaining:
+            self.logger.info(
+                f"Cluster has {current}/{self.max_instances} instances and {unobserved} launched but not counted yet, admitting {wave_size} of {remaining} queued containers"
+            )
+        return wave_size
+
+    def _log_stop_errors(
+        self,
+        containers: List[ContainerInstance],
+        errors: List[Optional[PcpError]],
+    ) -> None:
+        self.logger.warning(
+            f"Stopped the {len(containers)} containers started before the failure"
+        )
+        for container, error in zip(containers, errors):
+            if error:
+                self.logger.error(
+                    f"Failed to stop container {container.instance_id}: {error}"
+                )
+
+    def _record_admission(self, queued_at: float) -> None:
+        if self.metrics:
+            self.metrics.gauge(
+                METRICS_SCHEDULER_QUEUE_DELAY,
+                int((time.monotonic() - queued_at) * 1e3),
+            )
+            self.metrics.count(METRICS_SCHEDULER_WAVES_COUNT, 1)
+
+    def _check_max_wait(self, queued_at: float, max_wait: Optional[float]) -> None:
+        if max_wait is not None and time.monotonic() - queued_at > max_wait:
+            raise LimitExceededError(
+                f"Cluster stayed at its {self.max_instances} instances ceiling for more than {max_wait} seconds"
+            )
+
+    def _check_env_vars(
+        self,
+        cmd_args_list: List[str],
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+    ) -> None:
+        if type(env_vars) is list and len(env_vars) != len(cmd_args_list):
+            raise ValueError(
+                f"Length of env_vars {len(env_vars)} not equal to the length of cmd_args_list {len(cmd_args_list)}."
+            )
+
+    def _slice_env_vars(
+        self,
+        env_vars: Optional[Union[Dict[str, str], List[Dict[str, str]]]],
+        start: int,
+        end: int,
+    ) -> Optional[Union[Dict[str, str], List[Dict[str, str]]]]:
+        return env_vars[start:end] if type(env_vars) is list else env_vars
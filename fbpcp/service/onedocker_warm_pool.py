@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+import re
+import threading
+from typing import Any, Dict, List, Optional, Set
+
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.entity.container_type import ContainerSize
+from fbpcp.entity.work_item import WorkItem
+from fbpcp.service.onedocker import DEFAULT_BINARY_VERSION, OneDockerService
+from fbpcp.service.work_queue import RESULTS_QUEUE_SUFFIX, WorkQueueService
+from fbpcp.util import reflect
+
+DEFAULT_REPLENISH_INTERVAL = 30.0
+
+
+class OneDockerWarmPool:
+    """Keeps idle OneDocker runners of one task definition warm.
+
+    Runners are started in serve mode and pull work items from a queue, so submitted
+    package runs skip container provisioning, image pull and runner start up.
+    The pool is topped up to pool_size idle runners, in the background once start() is called.
+    """
+
+    def __init__(
+        self,
+        onedocker_svc: OneDockerService,
+        work_queue_config: Dict[str, Any],
+        pool_size: int,
+        task_definition: Optional[str] = None,
+        queue_name: Optional[str] = None,
+        max_runners: Optional[int] = None,
+        idle_timeout: Optional[int] = None,
+        container_type: Optional[ContainerSize] = None,
+        permission: Optional[ContainerPermissionConfig] = None,
+    ) -> None:
+        """Constructor of OneDockerWarmPool
+        onedocker_svc -- service to spawn the runner containers
+        work_queue_config -- class path and constructor arguments of the WorkQueueService shared with the runners
+        pool_size -- number of idle runners to keep
+        task_definition -- task definition of the runners. Defaults to onedocker_svc's task definition
+        queue_name -- name of the work queue. Derived from the task definition by default
+        max_runners -- cap on the total number of runners, busy or idle
+        idle_timeout -- runners exit after this many seconds without work
+        """
+        task_definition = task_definition or onedocker_svc.task_definition
+        if not task_definition:
+            raise ValueError("task definition should be specified for a warm pool")
+        self.onedocker_svc = onedocker_svc
+        self.work_queue_config = work_queue_config
+        self.work_queue: WorkQueueService = reflect.get_class(
+            work_queue_config["class"]
+        )(**work_queue_config.get("constructor", {}))
+        self.pool_size = pool_size
+        self.task_definition: str = task_definition
+        self.queue_name: str = queue_name or re.sub(
+            r"[^\w\-]", "-", f"onedocker-pool-{task_definition}"
+        )
+        self.max_runners = max_runners
+        self.idle_timeout = idle_timeout
+        self.container_type = container_type
+        self.permission = permission
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.runner_ids: List[str] = []
+        self._outstanding: Set[str] = set()
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._replenish_thread: Optional[threading.Thread] = None
+
+    def submit(
+        self,
+        package_name: str,
+        version: str = DEFAULT_BINARY_VERSION,
+        cmd_args: Optional[str] = None,
+        timeout: Optional[int] = None,
+    ) -> str:
+        """Queue a package run for the warm runners.
+
+        Returns:
+            The id of the work item, reported back by get_result
+        """
+        item = WorkItem(
+            package_name=package_name,
+            version=version,
+            exe_args=cmd_args,
+            timeout=timeout,
+        )
+        with self._lock:
+            self._outstanding.add(item.item_id)
+        self.work_queue.put(self.queue_name, item)
+        return item.item_id
+
+    def get_result(self, wait_time: float = 0) -> Optional[WorkItem]:
+        """Get a finished work item, with its exit_code set by the runner"""
+        item = self.work_queue.get(self.queue_name + RESULTS_QUEUE_SUFFIX, wait_time)
+        if item:
+            with self._lock:
+                self._outstanding.discard(item.item_id)
+        return item
+
+    def replenish(self) -> List[ContainerInstance]:
+        """Start runners until pool_size of them are idle.
+
+        Returns:
+            The newly started runners
+        """
+        with self._lock:
+            alive = self._get_alive_runners()
+            idle = len(alive) - len(self._outstanding)
+            missing = self.pool_size - idle
+            if self.max_runners is not None:
+                missing = min(missing, self.max_runners - len(alive))
+            if missing <= 0:
+                self.runner_ids = alive
+                return []
+
+            started = self.onedocker_svc.start_serving_containers(
+                count=missing,
+                work_queue_config=self.work_queue_config,
+                queue_name=self.queue_name,
+                task_definition=self.task_definition,
+                idle_timeout=self.idle_timeout,
+                container_type=self.container_type,
+                permission=self.permission,
+            )
+            self.runner_ids = alive + [c.instance_id for c in started]
+        self.logger.info(
+            f"Warm pool {self.queue_name}: started {len(started)} runners, {len(self.runner_ids)} in total"
+        )
+        return started
+
+    def start(self, interval: float = DEFAULT_REPLENISH_INTERVAL) -> None:
+        """Fill the pool, then keep replenishing it in a background thread"""
+        self.replenish()
+        self._stop_event.clear()
+        self._replenish_thread = threading.Thread(
+            target=self._replenish_loop, args=(interval,), daemon=True
+        )
+        self._replenish_thread.start()
+
+    def stop(self, cancel_runners: bool = True) -> None:
+        """Stop replenishing the pool and optionally cancel its runners"""
+        self._stop_event.set()
+        if self._replenish_thread:
+            self._replenish_thread.join()
+            self._replenish_thread = None
+        if cancel_runners:
+            with self._lock:
+                self.onedocker_svc.stop_containers(self.runner_ids)
+                self.runner_ids = []
+
+    def _replenish_loop(self, interval: float) -> None:
+        while not self._stop_event.wait(interval):
+            try:
+                self.replenish()
+            except Exception as err:
+                self.logger.exception(
+                    f"Warm pool {self.queue_name} failed to replenish: {err}"
+                )
+
+    def _get_alive_runners(self) -> List[str]:
+        if not self.runner_ids:
+            return []
+        containers = self.onedocker_svc.get_containers(self.runner_ids)
+        return [
+            container.instance_id
+            for container in containers
+            if container
+            and container.status
+            in (ContainerInstanceStatus.UNKNOWN, ContainerInstanceStatus.STARTED)
+        ]
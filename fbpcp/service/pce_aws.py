@@ -7,6 +7,7 @@
 # pyre-strict
 
 import logging
+import time
 from typing import Any, Dict, Optional
 
 from fbpcp.entity.pce import PCE
@@ -15,10 +16,13 @@ from fbpcp.entity.pce_network import PCENetwork
 from fbpcp.gateway.ec2 import EC2Gateway
 from fbpcp.gateway.ecs import ECSGateway
 from fbpcp.service.pce import PCEService
+from fbpcp.util.task_definition_registry import TaskDefinitionRegistry
 
 
 PCE_ID_KEY = "pce:pce-id"
 SHARED_TASK_DEFINITION_PREFIX = "onedocker-task-shared-"
+# seconds between two full task definition refreshes triggered by a tag lookup miss
+DEFAULT_FULL_REFRESH_INTERVAL = 600.0
 
 
 class AWSPCEService(PCEService):
@@ -28,11 +32,25 @@ class AWSPCEService(PCEService):
         access_key_id: Optional[str] = None,
         access_key_data: Optional[str] = None,
         config: Optional[Dict[str, Any]] = None,
+        task_definition_cache_path: Optional[str] = None,
+        full_refresh_interval: float = DEFAULT_FULL_REFRESH_INTERVAL,
     ) -> None:
+        """
+        Args:
+            task_definition_cache_path: optional file persisting the described task definitions
+            across processes.
+            full_refresh_interval: minimum seconds between two full task definition refreshes,
+            which pick up tags added to existing revisions when no definition has the PCE tag.
+        """
         self.logger: logging.Logger = logging.getLogger(__name__)
         self.region = region
         self.ec2_gateway = EC2Gateway(region, access_key_id, access_key_data, config)
         self.ecs_gateway = ECSGateway(region, access_key_id, access_key_data, config)
+        self.task_definition_registry = TaskDefinitionRegistry(
+            self.ecs_gateway, cache_path=task_definition_cache_path
+        )
+        self.full_refresh_interval = full_refresh_interval
+        self._last_full_refresh: Optional[float] = None
 
     def get_pce(
         self,
@@ -70,7 +88,13 @@ class AWSPCEService(PCEService):
         tags = {PCE_ID_KEY: pce_id}
         clusters = self.ecs_gateway.describe_clusters(tags=tags)
         cluster = clusters[0] if clusters else None
-        container_definitions = self.ecs_gateway.describe_task_definitions(tags=tags)
+        self.task_definition_registry.refresh()
+        container_definitions = self.task_definition_registry.find(tags)
+        if not container_definitions and self._is_full_refresh_due():
+            # the PCE tag may have been added to a revision described before
+            self._last_full_refresh = time.monotonic()
+            self.task_definition_registry.refresh(full=True)
+            container_definitions = self.task_definition_registry.find(tags)
         if container_definitions:
             container_definition = container_definitions[0]
         else:
@@ -84,3 +108,9 @@ class AWSPCEService(PCEService):
                 container_definition = None
                 self.logger.exception(err)
         return PCECompute(self.region, cluster, container_definition)
+
+    def _is_full_refresh_due(self) -> bool:
+        return (
+            self._last_full_refresh is None
+            or time.monotonic() - self._last_full_refresh >= self.full_refresh_interval
+        )
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import abc
+from typing import List, Optional
+
+from fbpcp.entity.resource_usage import ResourceUsage
+
+DEFAULT_USAGE_HISTORY = 20
+
+
+class ResourceUsageStore(abc.ABC):
+    @abc.abstractmethod
+    def record(self, usage: ResourceUsage) -> None:
+        """Add the resource usage of a run"""
+        pass
+
+    @abc.abstractmethod
+    def get_usages(
+        self,
+        package_name: str,
+        version: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        limit: int = DEFAULT_USAGE_HISTORY,
+    ) -> List[ResourceUsage]:
+        """Get the latest resource usages of a package.
+
+        Args:
+            package_name: the package of the runs.
+            version: if set, only the runs of this version.
+            fingerprint: if set, only the runs with this fingerprint.
+            limit: the maximum number of usages returned.
+
+        Returns:
+            The matching usages, most recent first.
+        """
+        pass
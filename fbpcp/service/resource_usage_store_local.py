@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import re
+from typing import List, Optional
+
+from fbpcp.entity.resource_usage import ResourceUsage
+from fbpcp.service.resource_usage_store import DEFAULT_USAGE_HISTORY, ResourceUsageStore
+
+
+class LocalResourceUsageStore(ResourceUsageStore):
+    """Resource usage store backed by a local (or shared, e.g. EFS) directory.
+
+    The usages of each package are appended as JSON lines to their own file. Every line is
+    written with a single append, so several runners can record to the same store.
+    """
+
+    def __init__(self, root_dir: str) -> None:
+        self.root_dir = root_dir
+
+    def record(self, usage: ResourceUsage) -> None:
+        os.makedirs(self.root_dir, exist_ok=True)
+        line = (usage.to_json() + "\n").encode()
+        fd = os.open(
+            self._get_path(usage.package_name),
+            os.O_WRONLY | os.O_APPEND | os.O_CREAT,
+            0o644,
+        )
+        try:
+            os.write(fd, line)
+        finally:
+            os.close(fd)
+
+    def get_usages(
+        self,
+        package_name: str,
+        version: Optional[str] = None,
+        fingerprint: Optional[str] = None,
+        limit: int = DEFAULT_USAGE_HISTORY,
+    ) -> List[ResourceUsage]:
+        path = self._get_path(package_name)
+        if not os.path.exists(path):
+            return []
+        with open(path) as f:
+            lines = f.read().splitlines()
+        usages = []
+        for line in reversed(lines):
+            if len(usages) >= limit:
+                break
+            if not line:
+                continue
+            usage = ResourceUsage.from_json(line)
+            if (version is None or usage.version == version) and (
+                fingerprint is None or usage.fingerprint == fingerprint
+            ):
+                usages.append(usage)
+        return usages
+
+    def _get_path(self, package_name: str) -> str:
+        return os.path.join(
+            self.root_dir, re.sub(r"[^\w\-.]", "_", package_name) + ".jsonl"
+        )
@@ -9,7 +9,7 @@
 import abc
 import re
 from enum import Enum
-from typing import List
+from typing import List, Optional, Tuple
 
 from fbpcp.entity.file_information import FileInfo
 from fbpcp.entity.policy_statement import PolicyStatement, PublicAccessBlockConfig
@@ -75,3 +75,31 @@ class StorageService(abc.ABC):
     @abc.abstractmethod
     def list_files(self, dirPath: str) -> List[str]:
         pass
+
+    def list_files_info(self, dirPath: str) -> List[FileInfo]:
+        """List the files under dirPath recursively with their size and last modified time.
+
+        Raises:
+            NotImplementedError: the storage service cannot list files with their info
+        """
+        raise NotImplementedError
+
+    def read_versioned(self, filename: str) -> Optional[Tuple[str, str]]:
+        """Read a file and its version, None if the file does not exist.
+
+        Raises:
+            NotImplementedError: the storage service cannot version files
+        """
+        raise NotImplementedError
+
+    def write_conditional(
+        self, filename: str, data: str, version: Optional[str]
+    ) -> str:
+        """Write a file only if its current version is version, or if it does not exist
+        when version is None, and return its new version.
+
+        Raises:
+            PreconditionFailedError: the file was changed or created concurrently
+            NotImplementedError: the storage service cannot write files conditionally
+        """
+        raise NotImplementedError
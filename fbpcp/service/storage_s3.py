@@ -6,10 +6,13 @@
 
 # pyre-strict
 
+import hashlib
 import os
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from os import path
 from os.path import join, normpath, relpath
-from typing import Any, Dict, List, Optional
+from typing import Any, Deque, Dict, IO, List, Optional, Tuple
 
 from fbpcp.entity.file_information import FileInfo
 from fbpcp.entity.policy_statement import PolicyStatement, PublicAccessBlockConfig
@@ -17,6 +20,11 @@ from fbpcp.gateway.s3 import S3Gateway
 from fbpcp.service.storage import PathType, StorageService
 from fbpcp.util.s3path import S3Path
 
+# Size of the byte ranges of parallel downloads
+DEFAULT_DOWNLOAD_PART_SIZE: int = 8 * 1024**2
+# Bytes of the parts being fetched at once by a parallel download, which bounds its memory
+DEFAULT_DOWNLOAD_MAX_IN_FLIGHT_BYTES: int = 64 * 1024**2
+
 
 class S3StorageService(StorageService):
     def __init__(
@@ -53,6 +61,28 @@ class S3StorageService(StorageService):
         s3_path = S3Path(filename)
         self.s3_gateway.put_object(s3_path.bucket, s3_path.key, data)
 
+    def read_versioned(self, filename: str) -> Optional[Tuple[str, str]]:
+        """Read a file data and its version (ETag), None if the file does not exist
+        Keyword arguments:
+        filename -- "https://bucket-name.s3.Region.amazonaws.com/key-name"
+        """
+        s3_path = S3Path(filename)
+        return self.s3_gateway.get_object_with_etag(s3_path.bucket, s3_path.key)
+
+    def write_conditional(
+        self, filename: str, data: str, version: Optional[str]
+    ) -> str:
+        """Write data into a file only if it is still at version (ETag), or does not exist
+        if version is None, and return the new version. Raises PreconditionFailedError if
+        the file was changed in between.
+        Keyword arguments:
+        filename -- "https://bucket-name.s3.Region.amazonaws.com/key-name"
+        """
+        s3_path = S3Path(filename)
+        return self.s3_gateway.put_object_conditional(
+            s3_path.bucket, s3_path.key, data, version
+        )
+
     def copy(self, source: str, destination: str, recursive: bool = False) -> None:
         """Move a file or folder between local storage and S3, as well as, S3 and S3
         Keyword arguments:
@@ -117,6 +147,79 @@ class S3StorageService(StorageService):
                         source_s3_path.bucket, source_s3_path.key, destination
                     )
 
+    def read_stream(self, filename: str) -> IO[bytes]:
+        """Open an S3 file for streaming reads, without downloading it first"""
+        s3_path = S3Path(filename)
+        return self.s3_gateway.get_object_stream(s3_path.bucket, s3_path.key)
+
+    def download_file_parallel(
+        self,
+        source: str,
+        destination: str,
+        max_workers: int,
+        part_size: int = DEFAULT_DOWNLOAD_PART_SIZE,
+        max_in_flight_bytes: int = DEFAULT_DOWNLOAD_MAX_IN_FLIGHT_BYTES,
+    ) -> str:
+        """Download an S3 file with concurrent ranged GETs and return its sha256.
+
+        The destination is preallocated and each part is written at its offset as soon as
+        it arrives, then hashed in order by reading it back from the file. Memory is bounded
+        by the parts being fetched, at most max_in_flight_bytes, plus the part being hashed.
+        Keyword arguments:
+        source -- source S3 file
+        destination -- destination local file
+        max_workers -- maximum number of concurrent ranged GETs
+        part_size -- size in bytes of each ranged GET
+        max_in_flight_bytes -- maximum bytes of the ranged GETs in flight, which caps max_workers
+        """
+        if StorageService.path_type(destination) != PathType.Local:
+            raise ValueError(f"Destination {destination} is not a local file")
+        s3_path = S3Path(source)
+        size = self.s3_gateway.get_object_size(s3_path.bucket, s3_path.key)
+        sha256 = hashlib.sha256()
+
+        fd = os.open(destination, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        try:
+            if size > 0:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(fd, 0, size)
+                else:
+                    os.ftruncate(fd, size)
+
+            def download_part(start: int) -> Tuple[int, int]:
+                end = min(start + part_size, size) - 1
+                data = self.s3_gateway.get_object_range(
+                    s3_path.bucket, s3_path.key, start, end
+                )
+                if len(data) != end - start + 1:
+                    raise ValueError(
+                        f"Got {len(data)} bytes for range {start}-{end} of {source}"
+                    )
+                os.pwrite(fd, data, start)
+                return start, len(data)
+
+            workers = max(1, min(max_workers, max_in_flight_bytes // part_size))
+            offsets = iter(range(0, size, part_size))
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                # parts downloaded ahead of the one being hashed are not held in memory
+                pending: Deque[Future[Tuple[int, int]]] = deque(
+                    executor.submit(download_part, start)
+                    for _, start in zip(range(2 * workers), offsets)
+                )
+                try:
+                    while pending:
+                        offset, length = pending.popleft().result()
+                        sha256.update(os.pread(fd, length, offset))
+                        start = next(offsets, None)
+                        if start is not None:
+                            pending.append(executor.submit(download_part, start))
+                finally:
+                    for future in pending:
+                        future.cancel()
+        finally:
+            os.close(fd)
+        return sha256.hexdigest()
+
     def upload_dir(self, source: str, s3_path_bucket: str, s3_path_key: str) -> None:
         for root, dirs, files in os.walk(source):
             for file in files:
@@ -211,6 +314,7 @@ class S3StorageService(StorageService):
             file_name=filename,
             last_modified=file_info_dict.get("LastModified").ctime(),
             file_size=file_info_dict.get("ContentLength"),
+            etag=file_info_dict.get("ETag", "").strip('"') or None,
         )
 
     def get_file_size(self, filename: str) -> int:
@@ -234,3 +338,25 @@ class S3StorageService(StorageService):
         """
         s3_path = S3Path(dirPath)
         return self.s3_gateway.list_object2(s3_path.bucket, s3_path.key)
+
+    def list_files_info(self, dirPath: str) -> List[FileInfo]:
+        """Returns the information of all files in folders and sub folders recursively,
+        from a single listing instead of one request per file
+        Keyword arguments:
+        dirPath -- s3 dir path
+        """
+        s3_path = S3Path(dirPath)
+        # S3Path strips the trailing slash, which keeps sibling prefixes out of the listing
+        key = (
+            s3_path.key + "/" if dirPath.endswith("/") and s3_path.key else s3_path.key
+        )
+        base_url = dirPath[: dirPath.index(".amazonaws.com/") + len(".amazonaws.com/")]
+        return [
+            FileInfo(
+                file_name=base_url + content["Key"],
+                last_modified=content["LastModified"].ctime(),
+                file_size=content["Size"],
+                etag=content.get("ETag", "").strip('"') or None,
+            )
+            for content in self.s3_gateway.list_objects_info(s3_path.bucket, key)
+        ]
@@ -0,0 +1,35 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import abc
+from typing import Optional
+
+from fbpcp.entity.work_item import WorkItem
+
+# Serving runners report finished items to the queue named <queue_name><RESULTS_QUEUE_SUFFIX>
+RESULTS_QUEUE_SUFFIX = "-results"
+
+
+class WorkQueueService(abc.ABC):
+    @abc.abstractmethod
+    def put(self, queue_name: str, item: WorkItem) -> None:
+        """Add an item at the end of a queue"""
+        pass
+
+    @abc.abstractmethod
+    def get(self, queue_name: str, wait_time: float = 0) -> Optional[WorkItem]:
+        """Remove and return the item at the head of a queue.
+
+        Args:
+            queue_name: the queue to read from.
+            wait_time: the maximum number of seconds to wait for an item.
+
+        Returns:
+            The item, or None if the queue stayed empty for wait_time seconds.
+        """
+        pass
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import os
+import time
+from typing import Optional
+
+from fbpcp.entity.work_item import WorkItem
+from fbpcp.service.work_queue import WorkQueueService
+
+DEFAULT_LOCAL_QUEUE_POLL_INTERVAL = 0.1
+
+
+class LocalWorkQueueService(WorkQueueService):
+    """Work queue backed by a local (or shared, e.g. EFS) directory.
+
+    Each queue is a folder and each item a JSON file named after its enqueue time.
+    Items are claimed with an atomic rename, so several processes can consume a queue.
+    """
+
+    def __init__(
+        self,
+        root_dir: str,
+        poll_interval: float = DEFAULT_LOCAL_QUEUE_POLL_INTERVAL,
+    ) -> None:
+        self.root_dir = root_dir
+        self.poll_interval = poll_interval
+
+    def put(self, queue_name: str, item: WorkItem) -> None:
+        queue_dir = self._get_queue_dir(queue_name)
+        os.makedirs(queue_dir, exist_ok=True)
+        file_name = f"{time.time_ns():020d}-{item.item_id}.json"
+        tmp_path = os.path.join(queue_dir, f".{file_name}.tmp")
+        with open(tmp_path, "w") as f:
+            f.write(item.to_json())
+        os.replace(tmp_path, os.path.join(queue_dir, file_name))
+
+    def get(self, queue_name: str, wait_time: float = 0) -> Optional[WorkItem]:
+        queue_dir = self._get_queue_dir(queue_name)
+        deadline = time.monotonic() + wait_time
+        while True:
+            item = self._claim_head(queue_dir)
+            if item is not None or time.monotonic() >= deadline:
+                return item
+            time.sleep(self.poll_interval)
+
+    def _claim_head(self, queue_dir: str) -> Optional[WorkItem]:
+        if not os.path.isdir(queue_dir):
+            return None
+        for file_name in sorted(os.listdir(queue_dir)):
+            if file_name.startswith("."):
+                continue
+            claimed_path = os.path.join(queue_dir, f".{file_name}.claimed")
+            try:
+                os.rename(os.path.join(queue_dir, file_name), claimed_path)
+            except FileNotFoundError:
+                # claimed by another consumer
+                continue
+            with open(claimed_path) as f:
+                item = WorkItem.from_json(f.read())
+            os.remove(claimed_path)
+            return item
+        return None
+
+    def _get_queue_dir(self, queue_name: str) -> str:
+        return os.path.join(self.root_dir, queue_name)
@@ -8,7 +8,6 @@
 
 
 import re
-from functools import reduce
 from typing import Any, Dict, List, Optional, Tuple, Union
 
 from fbpcp.error.pcp import InvalidParameterError
@@ -28,9 +27,7 @@ def convert_dict_to_list(
             {"Name": "k2", "Values": ["v2"]},
         ]
     """
-    return reduce(
-        lambda x, y: [*x, {key: y, value: [target_dict[y]]}], target_dict.keys(), []
-    )
+    return [{key: k, value: [v]} for k, v in target_dict.items()]
 
 
 def convert_list_to_dict(
@@ -48,7 +45,7 @@ def convert_list_to_dict(
     Output examples: {"k1": "v1", "k2": "v2"}
     """
     if target_list is not None:
-        return reduce(lambda x, y: {**x, **{y[key]: y[value]}}, target_list, {})
+        return {item[key]: item[value] for item in target_list}
     else:
         return {}
 
@@ -76,7 +73,7 @@ def prepare_tags(tags: Dict[str, str]) -> Dict[str, str]:
     Input examples: {"k1": "v1", "k2": "v2"}
     Output examples: {"tag:k1": "v1", "tag:k2", "v2"}
     """
-    return reduce(lambda x, y: {**x, **{f"tag:{y}": tags[y]}}, tags.keys(), {})
+    return {f"tag:{k}": v for k, v in tags.items()}
 
 
 def convert_vpc_tags_to_filter(
@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional, Tuple
+
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+
+# Terminal statuses never change, so they are cached until evicted (None = no expiry)
+DEFAULT_STATUS_TTLS: Dict[ContainerInstanceStatus, Optional[float]] = {
+    ContainerInstanceStatus.UNKNOWN: 2.0,
+    ContainerInstanceStatus.STARTED: 5.0,
+    ContainerInstanceStatus.COMPLETED: None,
+    ContainerInstanceStatus.FAILED: None,
+}
+DEFAULT_MAX_ENTRIES = 10000
+
+
+class ContainerInstanceCache:
+    """Short-lived cache of container instances keyed by instance id.
+
+    Entries expire according to a per status TTL. Concurrent lookups of the same
+    instance id are merged into a single load (single-flight). Instances that
+    could not be found are not cached.
+    """
+
+    def __init__(
+        self,
+        status_ttls: Optional[Dict[ContainerInstanceStatus, Optional[float]]] = None,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+    ) -> None:
+        self.status_ttls: Dict[ContainerInstanceStatus, Optional[float]] = {
+            **DEFAULT_STATUS_TTLS,
+            **(status_ttls or {}),
+        }
+        self.max_entries = max_entries
+        # instance id -> (instance, expiry time or None)
+        self._entries: "OrderedDict[str, Tuple[ContainerInstance, Optional[float]]]" = (
+            OrderedDict()
+        )
+        self._in_flight: Dict[str, "Future[Optional[ContainerInstance]]"] = {}
+        self._lock = threading.Lock()
+
+    def get_many(
+        self,
+        instance_ids: List[str],
+        loader: Callable[[List[str]], List[Optional[ContainerInstance]]],
+    ) -> List[Optional[ContainerInstance]]:
+        """Get instances from the cache, loading the missing or expired ones.
+
+        Args:
+            instance_ids: the instance ids to look up.
+            loader: called with the ids that need loading, returns instances in the same order.
+
+        Returns:
+            A list of Optional, in the same order as the input ids.
+        """
+        results: Dict[str, Optional[ContainerInstance]] = {}
+        waiting: Dict[str, "Future[Optional[ContainerInstance]]"] = {}
+        to_load: List[str] = []
+        owned: Dict[str, "Future[Optional[ContainerInstance]]"] = {}
+
+        with self._lock:
+            now = time.monotonic()
+            for instance_id in instance_ids:
+                if (
+                    instance_id in results
+                    or instance_id in waiting
+                    or instance_id in owned
+                ):
+                    continue
+                cached = self._get_fresh(instance_id, now)
+                if cached is not None:
+                    results[instance_id] = cached
+                elif instance_id in self._in_flight:
+                    waiting[instance_id] = self._in_flight[instance_id]
+                else:
+                    future: "Future[Optional[ContainerInstance]]" = Future()
+                    self._in_flight[instance_id] = future
+                    owned[instance_id] = future
+                    to_load.append(instance_id)
+
+        if to_load:
+            try:
+                loaded = loader(to_load)
+            except BaseException as err:
+                with self._lock:
+                    for instance_id, future in owned.items():
+                        del self._in_flight[instance_id]
+                        future.set_exception(err)
+                raise
+
+            with self._lock:
+                try:
+                    now = time.monotonic()
+                    for instance_id, instance in zip(to_load, loaded):
+                        if instance is not None:
+                            self._put(instance_id, instance, now)
+                        del self._in_flight[instance_id]
+                        owned[instance_id].set_result(instance)
+                        results[instance_id] = instance
+                finally:
+                    # ids missing from a short loader result are not found
+                    for instance_id, future in owned.items():
+                        if not future.done():
+                            del self._in_flight[instance_id]
+                            future.set_result(None)
+                            results[instance_id] = None
+
+        for instance_id, future in waiting.items():
+            results[instance_id] = future.result()
+
+        return [results[instance_id] for instance_id in instance_ids]
+
+    def invalidate(self, instance_id: str) -> None:
+        with self._lock:
+            self._entries.pop(instance_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _get_fresh(self, instance_id: str, now: float) -> Optional[ContainerInstance]:
+        entry = self._entries.get(instance_id)
+        if entry is None:
+            return None
+        instance, expiry = entry
+        if expiry is not None and expiry <= now:
+            del self._entries[instance_id]
+            return None
+        self._entries.move_to_end(instance_id)
+        return instance
+
+    def _put(self, instance_id: str, instance: ContainerInstance, now: float) -> None:
+        ttl = self.status_ttls.get(instance.status)
+        if ttl is not None and ttl <= 0:
+            return
+        self._entries[instance_id] = (instance, now + ttl if ttl is not None else None)
+        self._entries.move_to_end(instance_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
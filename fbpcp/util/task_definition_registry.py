@@ -0,0 +1,152 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import json
+import logging
+import os
+import threading
+from dataclasses import asdict
+from typing import Dict, List, Optional, Set, Tuple
+
+from fbpcp.entity.container_definition import ContainerDefinition
+from fbpcp.gateway.ecs import ECSGateway
+
+DEFAULT_LIST_LIMIT = 1000
+DEFAULT_DESCRIBE_WORKERS = 8
+
+
+class TaskDefinitionRegistry:
+    """Cache of ECS task definitions keyed by task definition ARN, with a tag index.
+
+    Task definition revisions are immutable, so a revision is described once and then
+    served from the cache. refresh() lists the ARNs again and only describes the new
+    revisions; deregistered ones are dropped. Tags can be changed on an existing revision,
+    which refresh(full=True) picks up.
+
+    When cache_path is set, the cache is persisted to that JSON file and reloaded on start.
+    """
+
+    def __init__(
+        self,
+        ecs_gateway: ECSGateway,
+        cache_path: Optional[str] = None,
+        list_limit: int = DEFAULT_LIST_LIMIT,
+        max_workers: int = DEFAULT_DESCRIBE_WORKERS,
+    ) -> None:
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.ecs_gateway = ecs_gateway
+        self.cache_path = cache_path
+        self.list_limit = list_limit
+        self.max_workers = max_workers
+        # task definition ARN -> definition, in listing order
+        self._definitions: Dict[str, ContainerDefinition] = {}
+        # (tag key, tag value) -> task definition ARNs
+        self._tag_index: Dict[Tuple[str, str], Set[str]] = {}
+        self._lock = threading.Lock()
+        self._refreshed = False
+        if cache_path and os.path.exists(cache_path):
+            self._load()
+
+    def refresh(self, full: bool = False) -> int:
+        """Sync the registry with the active task definitions of the account.
+
+        Args:
+            full: describe every task definition again instead of only the new revisions.
+
+        Returns:
+            The number of task definitions that were described.
+        """
+        with self._lock:
+            arns = self.ecs_gateway.list_task_definitions(limit=self.list_limit)
+            to_describe = (
+                arns if full else [arn for arn in arns if arn not in self._definitions]
+            )
+            described = (
+                dict(
+                    zip(
+                        to_describe,
+                        self.ecs_gateway.describe_task_definitions_in_parallel(
+                            task_definitions=to_describe,
+                            max_workers=self.max_workers,
+                        ),
+                    )
+                )
+                if to_describe
+                else {}
+            )
+            self._definitions = {
+                arn: described.get(arn) or self._definitions[arn] for arn in arns
+            }
+            self._rebuild_index()
+            self._refreshed = True
+            if self.cache_path:
+                self._save()
+        self.logger.info(
+            f"Task definition registry refreshed: {len(to_describe)} described, {len(arns)} in total"
+        )
+        return len(to_describe)
+
+    def find(self, tags: Optional[Dict[str, str]] = None) -> List[ContainerDefinition]:
+        """Get the task definitions having all the given tags, in listing order.
+
+        The registry is refreshed first if it has never been synced in this process.
+        """
+        if not self._refreshed:
+            self.refresh()
+        with self._lock:
+            if not tags:
+                return list(self._definitions.values())
+            matches = set.intersection(
+                *[self._tag_index.get(tag, set()) for tag in tags.items()]
+            )
+            return [
+                definition
+                for arn, definition in self._definitions.items()
+                if arn in matches
+            ]
+
+    def get(self, task_definition_arn: str) -> Optional[ContainerDefinition]:
+        """Get a cached task definition by ARN, without calling ECS"""
+        with self._lock:
+            return self._definitions.get(task_definition_arn)
+
+    def _rebuild_index(self) -> None:
+        self._tag_index = {}
+        for arn, definition in self._definitions.items():
+            for tag in definition.tags.items():
+                self._tag_index.setdefault(tag, set()).add(arn)
+
+    def _load(self) -> None:
+        cache_path = self.cache_path
+        assert cache_path
+        try:
+            with open(cache_path) as f:
+                cached = json.load(f)
+        except (OSError, ValueError) as err:
+            self.logger.warning(
+                f"Ignoring unreadable task definition cache {cache_path}: {err}"
+            )
+            return
+        self._definitions = {
+            arn: ContainerDefinition(**definition) for arn, definition in cached.items()
+        }
+        self._rebuild_index()
+
+    def _save(self) -> None:
+        cache_path = self.cache_path
+        assert cache_path
+        tmp_path = f"{cache_path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(
+                {
+                    arn: asdict(definition)
+                    for arn, definition in self._definitions.items()
+                },
+                f,
+            )
+        os.replace(tmp_path, cache_path)
@@ -17,3 +17,9 @@ ONEDOCKER_EXE_PATH = "ONEDOCKER_EXE_PATH"
 
 # This is the type of checksum we want to compare when running program
 ONEDOCKER_CHECKSUM_TYPE = "ONEDOCKER_CHECKSUM_TYPE"
+
+# This is the local directory, e.g. on a shared volume, that caches downloaded binaries
+ONEDOCKER_PACKAGE_CACHE = "ONEDOCKER_PACKAGE_CACHE"
+
+# Download binaries with concurrent ranged GETs, verifying their sha256 on the fly, if set
+ONEDOCKER_PACKAGE_PARALLEL_DOWNLOAD = "ONEDOCKER_PACKAGE_PARALLEL_DOWNLOAD"
@@ -9,23 +9,34 @@
 import os
 import signal
 import subprocess
+import threading
+from contextlib import nullcontext
 from types import FrameType
 from typing import Optional
 
 
-def run_cmd(cmd: str, timeout: Optional[int]) -> int:
+def run_cmd(cmd: str, timeout: Optional[int], log_path: Optional[str] = None) -> int:
     # The handler dealing signal SIGINT, which could be Ctrl + C from user's terminal
     def _handler(signum: int, frame: Optional[FrameType]) -> None:
         raise InterruptedError
 
-    signal.signal(signal.SIGINT, _handler)
+    # signal handlers can only be set from the main thread
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGINT, _handler)
     """
      If start_new_session is true the setsid() system call will be made in the
      child process prior to the execution of the subprocess, which makes sure
      every process in the same process group can be killed by OS if timeout occurs.
      note: setsid() will set the pgid to its pid.
     """
-    with subprocess.Popen(cmd, shell=True, start_new_session=True) as proc:
+    # stdout and stderr of the process go to log_path if set
+    with open(log_path, "ab") if log_path else nullcontext() as log, subprocess.Popen(
+        cmd,
+        shell=True,
+        start_new_session=True,
+        stdout=log,
+        stderr=subprocess.STDOUT if log else None,
+    ) as proc:
         try:
             proc.communicate(timeout=timeout)
         except (subprocess.TimeoutExpired, InterruptedError) as e:
@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from enum import Enum
+
+
+class CompressionType(Enum):
+    gzip = "gzip"
+    zstd = "zstd"
+
+    @property
+    def suffix(self) -> str:
+        """Suffix of the compressed artifact stored next to the package binary"""
+        return ".gz" if self is CompressionType.gzip else ".zst"
@@ -7,8 +7,9 @@
 # pyre-strict
 
 from dataclasses import dataclass, field
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.measurement import MeasurementType
 
 
@@ -17,10 +18,21 @@ class PackageMetadata:
     package_name: str
     version: str
     measurements: Dict[MeasurementType, str] = field(default_factory=dict)
+    # compression of the artifact stored next to the binary, if any
+    compression: Optional[CompressionType] = None
+    # version and sha256 of the base binary of the delta stored next to the binary, if any
+    delta_base_version: Optional[str] = None
+    delta_base_sha256: Optional[str] = None
 
     def to_dict(self) -> Dict[str, Any]:
-        return {
+        md_dict = {
             "package_name": self.package_name,
             "version": self.version,
             "measurements": {k.value: v for k, v in self.measurements.items()},
         }
+        if self.compression:
+            md_dict["compression"] = self.compression.value
+        if self.delta_base_version:
+            md_dict["delta_base_version"] = self.delta_base_version
+            md_dict["delta_base_sha256"] = self.delta_base_sha256
+        return md_dict
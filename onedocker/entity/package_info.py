@@ -7,6 +7,7 @@
 # pyre-strict
 
 from dataclasses import dataclass
+from typing import Optional
 
 
 @dataclass
@@ -15,3 +16,4 @@ class PackageInfo:
     version: str
     last_modified: str
     package_size: int
+    etag: Optional[str] = None
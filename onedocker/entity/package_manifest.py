@@ -0,0 +1,40 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from dataclasses_json import DataClassJsonMixin
+
+
+@dataclass
+class PackageVersionEntry(DataClassJsonMixin):
+    version: str
+    package_size: int
+    last_modified: str
+    # measurement type value to measurement, e.g. {"sha256": ...}
+    measurements: Dict[str, str] = field(default_factory=dict)
+    # suffixes of the artifacts stored next to the binary, e.g. [".gz", ".delta"]
+    artifacts: List[str] = field(default_factory=list)
+    archived: bool = False
+    # storage ETag of the binary, None if unknown
+    etag: Optional[str] = None
+
+
+@dataclass
+class PackageManifest(DataClassJsonMixin):
+    """Index of the versions of a package, kept next to them in the repository.
+
+    generation is incremented on every update, which is written conditionally on the
+    manifest not having changed since it was read.
+    """
+
+    package_name: str
+    generation: int = 0
+    updated_at: float = 0.0
+    versions: Dict[str, PackageVersionEntry] = field(default_factory=dict)
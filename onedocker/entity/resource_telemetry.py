@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+from dataclasses_json import dataclass_json
+
+PERCENTILES: List[int] = [50, 90, 99]
+
+
+@dataclass_json
+@dataclass
+class ResourceTelemetry:
+    """Time series of the resource usage of a process tree, one list entry per sample.
+
+    cpu_percent is summed over the processes, so it goes up to 100 times the number of
+    vCPUs. read_bytes and write_bytes are the I/O counters of the live processes and net
+    bytes are counted host wide since sampling started.
+    """
+
+    interval: float
+    timestamps: List[float] = field(default_factory=list)
+    cpu_percent: List[float] = field(default_factory=list)
+    rss: List[int] = field(default_factory=list)
+    num_threads: List[int] = field(default_factory=list)
+    read_bytes: List[int] = field(default_factory=list)
+    write_bytes: List[int] = field(default_factory=list)
+    net_bytes_sent: List[int] = field(default_factory=list)
+    net_bytes_recv: List[int] = field(default_factory=list)
+
+    def summarize(self) -> Dict[str, Dict[str, float]]:
+        """Percentiles and peaks of the gauges, totals and peak rates of the counters"""
+        summary = {
+            name: _summarize_gauge(values)
+            for name, values in (
+                ("cpu_percent", self.cpu_percent),
+                ("rss", self.rss),
+                ("num_threads", self.num_threads),
+            )
+        }
+        for name, values in (
+            ("read_bytes", self.read_bytes),
+            ("write_bytes", self.write_bytes),
+            ("net_bytes_sent", self.net_bytes_sent),
+            ("net_bytes_recv", self.net_bytes_recv),
+        ):
+            summary[name] = _summarize_counter(self.timestamps, values)
+        return summary
+
+
+def _percentile(sorted_values: Sequence[float], percentile: int) -> float:
+    # nearest rank percentile
+    rank = max(math.ceil(percentile / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+def _summarize_gauge(values: Sequence[float]) -> Dict[str, float]:
+    if not values:
+        return {}
+    sorted_values = sorted(values)
+    summary = {f"p{p}": _percentile(sorted_values, p) for p in PERCENTILES}
+    summary["max"] = sorted_values[-1]
+    return summary
+
+
+def _summarize_counter(
+    timestamps: Sequence[float], values: Sequence[int]
+) -> Dict[str, float]:
+    total = 0
+    peak_rate = 0.0
+    for i in range(1, len(values)):
+        # counters of processes that exited are lost, so only increases are counted
+        delta = max(values[i] - values[i - 1], 0)
+        total += delta
+        elapsed = timestamps[i] - timestamps[i - 1]
+        if elapsed > 0:
+            peak_rate = max(peak_rate, delta / elapsed)
+    return {"total": total, "peak_rate": peak_rate}
@@ -7,6 +7,7 @@
 # pyre-strict
 from typing import Any, Dict
 
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.measurement import MeasurementType
 
 from onedocker.entity.metadata import PackageMetadata
@@ -23,4 +24,11 @@ def map_dynamodbitem_to_packagemetadata(
         package_name=dynamodb_item.get("package_name"),
         version=dynamodb_item.get("version"),
         measurements=measurements,
+        compression=(
+            CompressionType(dynamodb_item["compression"])
+            if dynamodb_item.get("compression")
+            else None
+        ),
+        delta_base_version=dynamodb_item.get("delta_base_version"),
+        delta_base_sha256=dynamodb_item.get("delta_base_sha256"),
     )
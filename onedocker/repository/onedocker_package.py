@@ -5,13 +5,37 @@
 # LICENSE file in the root directory of this source tree.
 
 # pyre-strict
-from typing import List
+import random
+import time
+from typing import Callable, Dict, List, Optional, Tuple
 
+from fbpcp.entity.file_information import FileInfo
+from fbpcp.error.pcp import PreconditionFailedError
 from fbpcp.service.storage import StorageService
+from onedocker.entity.compression import CompressionType
+from onedocker.entity.measurement import MeasurementType
 from onedocker.entity.package_info import PackageInfo
+from onedocker.entity.package_manifest import PackageManifest, PackageVersionEntry
+
+DELTA_SUFFIX = ".delta"
+ARTIFACT_SUFFIXES: List[str] = [c.suffix for c in CompressionType] + [DELTA_SUFFIX]
+
+MANIFEST_FILE_NAME = "manifest.json"
+MANIFEST_UPDATE_ATTEMPTS = 5
+MANIFEST_UPDATE_BACKOFF = 0.1
 
 
 class OneDockerPackageRepository:
+    """Package binaries stored at <repository_path><package_name>/<version>/<exe_name>.
+
+    Each package has a manifest indexing its versions next to them, which lookups read
+    instead of probing storage. Packages uploaded before manifests existed fall back to
+    listing until their manifest is created by an upload, an archive or
+    repair_manifest, and versions missing from a manifest, e.g. uploaded by older
+    clients, are still probed. Storage services that cannot write files conditionally
+    keep no manifests.
+    """
+
     def __init__(self, storage_svc: StorageService, repository_path: str) -> None:
         self.storage_svc = storage_svc
         self.repository_path = repository_path
@@ -22,42 +46,330 @@ class OneDockerPackageRepository:
     def _build_archive_path(self, package_name: str, version: str) -> str:
         return f"{self.repository_path}archived/{package_name}/{version}/{package_name.split('/')[-1]}"
 
-    def upload(self, package_name: str, version: str, source: str) -> None:
+    def _build_manifest_path(self, package_name: str) -> str:
+        return f"{self.repository_path}{package_name}/{MANIFEST_FILE_NAME}"
+
+    def build_artifact_path(
+        self,
+        package_name: str,
+        version: str,
+        compression: Optional[CompressionType] = None,
+    ) -> str:
+        """Path of the package binary, or of its compressed artifact if compression is set"""
         package_path = self._build_package_path(package_name, version)
+        return package_path + compression.suffix if compression else package_path
+
+    def build_delta_path(self, package_name: str, version: str) -> str:
+        """Path of the binary delta rebuilding the package from its delta base version"""
+        return self._build_package_path(package_name, version) + DELTA_SUFFIX
+
+    def upload(
+        self,
+        package_name: str,
+        version: str,
+        source: str,
+        compression: Optional[CompressionType] = None,
+        measurements: Optional[Dict[MeasurementType, str]] = None,
+    ) -> None:
+        package_path = self.build_artifact_path(package_name, version, compression)
         self.storage_svc.copy(source, package_path)
+        if compression:
+            self._record_artifact(package_name, version, compression.suffix)
+            return
 
-    def download(self, package_name: str, version: str, destination: str) -> None:
-        package_path = self._build_package_path(package_name, version)
+        file_info = self.storage_svc.get_file_info(package_path)
+
+        def record_version(manifest: PackageManifest) -> None:
+            # artifacts of a replaced binary are stale, so the entry starts over
+            manifest.versions[version] = PackageVersionEntry(
+                version=version,
+                package_size=file_info.file_size,
+                last_modified=file_info.last_modified,
+                measurements={k.value: v for k, v in (measurements or {}).items()},
+                etag=file_info.etag,
+            )
+
+        self.update_manifest(package_name, record_version)
+
+    def upload_delta(self, package_name: str, version: str, source: str) -> None:
+        self.storage_svc.copy(source, self.build_delta_path(package_name, version))
+        self._record_artifact(package_name, version, DELTA_SUFFIX)
+
+    def _record_artifact(self, package_name: str, version: str, suffix: str) -> None:
+        def record_artifact(manifest: PackageManifest) -> None:
+            entry = manifest.versions.get(version)
+            if entry and suffix not in entry.artifacts:
+                entry.artifacts.append(suffix)
+
+        self.update_manifest(package_name, record_artifact)
+
+    def download(
+        self,
+        package_name: str,
+        version: str,
+        destination: str,
+        compression: Optional[CompressionType] = None,
+    ) -> None:
+        package_path = self.build_artifact_path(package_name, version, compression)
         self.storage_svc.copy(package_path, destination)
 
     def get_package_versions(
         self,
         package_name: str,
     ) -> List[str]:
+        manifest = self.get_manifest(package_name)
+        if manifest:
+            return list(manifest.versions)
         package_parent_path = f"{self.repository_path}{package_name}/"
         return self.storage_svc.list_folders(package_parent_path)
 
     def get_package_info(self, package_name: str, version: str) -> PackageInfo:
-        package_path = self._build_package_path(package_name, version)
+        manifest = self.get_manifest(package_name)
+        if manifest and version in manifest.versions:
+            return self._build_package_info(package_name, manifest.versions[version])
 
-        if not self.storage_svc.file_exists(package_path):
+        package_info = self._probe_package_info(package_name, version)
+        if not package_info:
             raise ValueError(
                 f"Package {package_name}, version {version} not found in repository"
             )
+        return package_info
 
+    def _probe_package_info(
+        self, package_name: str, version: str
+    ) -> Optional[PackageInfo]:
+        package_path = self._build_package_path(package_name, version)
+        if not self.storage_svc.file_exists(package_path):
+            return None
         file_info = self.storage_svc.get_file_info(package_path)
         return PackageInfo(
             package_name=package_name,
             version=version,
             last_modified=file_info.last_modified,
             package_size=file_info.file_size,
+            etag=file_info.etag,
+        )
+
+    def get_package_inventory(
+        self, package_name: str, version: Optional[str] = None
+    ) -> Dict[str, PackageInfo]:
+        """Map each version of a package, or only the given version, to its binary info.
+
+        The table is read from the package manifest alone when there is one, versions
+        written without updating it being picked up by repair_manifest. Otherwise it is
+        built from a single recursive listing of the package folder, or by probing every
+        version if the storage service cannot list files with their info.
+        """
+        manifest = self.get_manifest(package_name)
+        if manifest:
+            inventory = {
+                v: self._build_package_info(package_name, entry)
+                for v, entry in manifest.versions.items()
+                if not version or v == version
+            }
+            if version and not inventory:
+                package_info = self._probe_package_info(package_name, version)
+                if package_info:
+                    inventory[version] = package_info
+            return inventory
+
+        try:
+            return self._list_package_inventory(package_name, version)
+        except NotImplementedError:
+            pass
+        versions = (
+            [version]
+            if version
+            else self.storage_svc.list_folders(f"{self.repository_path}{package_name}/")
+        )
+        probed: Dict[str, PackageInfo] = {}
+        for v in versions:
+            package_info = self._probe_package_info(package_name, v)
+            if package_info:
+                probed[v] = package_info
+        return probed
+
+    def _list_package_inventory(
+        self, package_name: str, version: Optional[str]
+    ) -> Dict[str, PackageInfo]:
+        return {
+            file_version: PackageInfo(
+                package_name=package_name,
+                version=file_version,
+                last_modified=files[""].last_modified,
+                package_size=files[""].file_size,
+                etag=files[""].etag,
+            )
+            for file_version, files in self._list_package_files(
+                f"{self.repository_path}{package_name}/", package_name, version
+            ).items()
+            if "" in files
+        }
+
+    def _build_package_info(
+        self, package_name: str, entry: PackageVersionEntry
+    ) -> PackageInfo:
+        return PackageInfo(
+            package_name=package_name,
+            version=entry.version,
+            last_modified=entry.last_modified,
+            package_size=entry.package_size,
+            etag=entry.etag,
+        )
+
+    def _list_package_files(
+        self, package_parent_path: str, package_name: str, version: Optional[str] = None
+    ) -> Dict[str, Dict[str, FileInfo]]:
+        """Map each version under package_parent_path to its binary and artifacts keyed
+        by suffix, the binary having the empty suffix, from a single listing
+        """
+        list_path = (
+            f"{package_parent_path}{version}/" if version else package_parent_path
         )
+        exe_name = package_name.split("/")[-1]
+        files: Dict[str, Dict[str, FileInfo]] = {}
+        for file_info in self.storage_svc.list_files_info(list_path):
+            # <version>/<exe_name><suffix>
+            file_version, _, file_name = file_info.file_name[
+                len(package_parent_path) :
+            ].partition("/")
+            suffix = file_name[len(exe_name) :]
+            if not file_name.startswith(exe_name) or (
+                suffix and suffix not in ARTIFACT_SUFFIXES
+            ):
+                continue
+            files.setdefault(file_version, {})[suffix] = file_info
+        return files
 
     def archive_package(self, package_name: str, version: str) -> None:
         current_path = self._build_package_path(package_name, version)
-        if not self.storage_svc.file_exists(current_path):
+        manifest = self.get_manifest(package_name)
+        entry = manifest.versions.get(version) if manifest else None
+        if entry:
+            exists = True
+            artifacts = entry.artifacts
+        else:
+            exists = self.storage_svc.file_exists(current_path)
+            artifacts = [
+                suffix
+                for suffix in ARTIFACT_SUFFIXES
+                if self.storage_svc.file_exists(current_path + suffix)
+            ]
+        if not exists:
             raise FileNotFoundError(
                 f"Cant find the package to be archived for package {package_name}, version {version}"
             )
         archive_path = self._build_archive_path(package_name, version)
         self.storage_svc.copy(current_path, archive_path)
+        for suffix in artifacts:
+            self.storage_svc.copy(current_path + suffix, archive_path + suffix)
+
+        def record_archived(manifest: PackageManifest) -> None:
+            if version in manifest.versions:
+                manifest.versions[version].archived = True
+
+        self.update_manifest(package_name, record_archived)
+
+    def get_manifest(self, package_name: str) -> Optional[PackageManifest]:
+        """Read the manifest of a package, None if it has none yet or if the storage
+        service keeps no manifests
+        """
+        try:
+            return self._read_manifest(package_name)[0]
+        except NotImplementedError:
+            return None
+
+    def _read_manifest(
+        self, package_name: str
+    ) -> Tuple[Optional[PackageManifest], Optional[str]]:
+        res = self.storage_svc.read_versioned(self._build_manifest_path(package_name))
+        if res is None:
+            return None, None
+        data, version = res
+        return PackageManifest.from_json(data), version
+
+    def update_manifest(
+        self,
+        package_name: str,
+        update: Callable[[PackageManifest], None],
+        rebuild_missing: bool = True,
+    ) -> Optional[PackageManifest]:
+        """Apply update to the manifest of a package and write it back atomically.
+
+        The write is conditional on the manifest not having changed since it was read and
+        is retried on a fresh read when a concurrent writer got in first, so concurrent
+        uploads and archives never drop each other's changes. A missing manifest is first
+        rebuilt from a listing, so that it does not hide the versions uploaded before it.
+        Returns None without writing anything if the storage service keeps no manifests.
+        """
+        manifest_path = self._build_manifest_path(package_name)
+        for attempt in range(MANIFEST_UPDATE_ATTEMPTS):
+            try:
+                manifest, version = self._read_manifest(package_name)
+            except NotImplementedError:
+                return None
+            if manifest is None:
+                manifest = (
+                    self._build_manifest_from_listing(package_name)
+                    if rebuild_missing
+                    else PackageManifest(package_name=package_name)
+                )
+            update(manifest)
+            manifest.generation += 1
+            manifest.updated_at = time.time()
+            try:
+                self.storage_svc.write_conditional(
+                    manifest_path, manifest.to_json(), version
+                )
+                return manifest
+            except PreconditionFailedError:
+                time.sleep(random.uniform(0, MANIFEST_UPDATE_BACKOFF * 2**attempt))
+        raise PreconditionFailedError(
+            f"Failed to update the manifest of {package_name} in {MANIFEST_UPDATE_ATTEMPTS} attempts due to concurrent updates"
+        )
+
+    def repair_manifest(self, package_name: str) -> Optional[PackageManifest]:
+        """Rebuild the manifest of a package from a listing of its versions and archives.
+
+        Measurements cannot be listed, so those of the previous manifest are kept for the
+        versions whose size did not change. Returns None if the storage service keeps no
+        manifests.
+        """
+
+        def rebuild(manifest: PackageManifest) -> None:
+            manifest.versions = self._build_manifest_from_listing(
+                package_name, manifest
+            ).versions
+
+        return self.update_manifest(package_name, rebuild, rebuild_missing=False)
+
+    def _build_manifest_from_listing(
+        self, package_name: str, previous: Optional[PackageManifest] = None
+    ) -> PackageManifest:
+        archived = self._list_package_files(
+            f"{self.repository_path}archived/{package_name}/", package_name
+        )
+        manifest = PackageManifest(package_name=package_name)
+        for version, files in sorted(
+            self._list_package_files(
+                f"{self.repository_path}{package_name}/", package_name
+            ).items()
+        ):
+            if "" not in files:
+                continue
+            previous_entry = previous.versions.get(version) if previous else None
+            manifest.versions[version] = PackageVersionEntry(
+                version=version,
+                package_size=files[""].file_size,
+                last_modified=files[""].last_modified,
+                measurements=(
+                    previous_entry.measurements
+                    if previous_entry
+                    and previous_entry.package_size == files[""].file_size
+                    else {}
+                ),
+                artifacts=sorted(suffix for suffix in files if suffix),
+                archived="" in archived.get(version, {}),
+                etag=files[""].etag,
+            )
+        return manifest
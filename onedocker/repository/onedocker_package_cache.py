@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import hashlib
+import logging
+import os
+import shutil
+import time
+import uuid
+from typing import Callable, List, Optional, Tuple
+
+# Default upper bound of the total size of the cached packages: 10 GB
+DEFAULT_MAX_CACHE_SIZE: int = 10 * 1024**3
+
+# Temporary files of installs older than this are left over by crashed writers
+STALE_TMP_FILE_AGE = 3600
+
+TMP_FILE_SUFFIX = ".tmp"
+# Mode of installed entries, executable so that the binaries linked from them never need
+# to be changed by their users
+ENTRY_MODE = 0o755
+HASH_CHUNK_SIZE: int = 1024**2
+
+
+class OneDockerPackageCache:
+    """Local cache of OneDocker package binaries, e.g. on a volume shared by containers.
+
+    Entries are stored at <cache_dir>/<package_name>/<version>/<sha256>, so an entry is
+    only found for the measurement the repository currently records for a version. Entries
+    are written to a temporary file and renamed in place once verified, so concurrent
+    readers never see a partial binary and a hit needs no further verification. The least
+    recently used entries are evicted once the cache grows over max_size bytes.
+    """
+
+    def __init__(self, cache_dir: str, max_size: int = DEFAULT_MAX_CACHE_SIZE) -> None:
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.logger: logging.Logger = logging.getLogger(__name__)
+
+    def _build_entry_path(self, package_name: str, version: str, sha256: str) -> str:
+        return os.path.join(self.cache_dir, package_name, version, sha256)
+
+    def get(
+        self, package_name: str, version: str, sha256: str, verify: bool = False
+    ) -> Optional[str]:
+        """Return the path of the cached binary for sha256 if present.
+
+        Entries were verified when installed. With verify, the entry is hashed again and
+        removed if corrupted so that the next install replaces it.
+        """
+        entry_path = self._build_entry_path(package_name, version, sha256)
+        if not os.path.isfile(entry_path):
+            return None
+        if verify and get_file_sha256(entry_path) != sha256:
+            self.logger.warning(
+                f"Cached {package_name}: {version} does not match sha256 {sha256}, removing it"
+            )
+            self._remove(entry_path)
+            return None
+        # mark the entry as recently used for eviction
+        try:
+            os.utime(entry_path)
+        except OSError as err:
+            # e.g. a cache mounted read-only
+            self.logger.debug(f"Failed to mark {entry_path} as recently used: {err}")
+        return entry_path
+
+    def install(
+        self,
+        package_name: str,
+        version: str,
+        sha256: str,
+        fetch: Callable[[str], Optional[str]],
+    ) -> str:
+        """Fetch a binary into the cache and return the path of the installed entry.
+
+        fetch is called with a temporary path to write the binary to, and may return the
+        sha256 it computed while writing to save reading the binary again. The binary is
+        only installed if its sha256 matches, otherwise a ValueError is raised.
+        """
+        entry_path = self._build_entry_path(package_name, version, sha256)
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        tmp_path = f"{entry_path}.{uuid.uuid4().hex}{TMP_FILE_SUFFIX}"
+        try:
+            actual_sha256 = fetch(tmp_path) or get_file_sha256(tmp_path)
+            if actual_sha256 != sha256:
+                raise ValueError(
+                    f"Downloaded {package_name}: {version} has sha256 {actual_sha256}, expected {sha256}"
+                )
+            os.chmod(tmp_path, ENTRY_MODE)
+            os.replace(tmp_path, entry_path)
+        finally:
+            self._remove(tmp_path)
+        self.evict(keep=entry_path)
+        return entry_path
+
+    def evict(self, keep: Optional[str] = None) -> None:
+        """Remove least recently used entries until the cache fits in max_size bytes"""
+        entries: List[Tuple[float, int, str]] = []
+        now = time.time()
+        for dir_path, _, file_names in os.walk(self.cache_dir):
+            for file_name in file_names:
+                path = os.path.join(dir_path, file_name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if file_name.endswith(TMP_FILE_SUFFIX):
+                    if now - st.st_mtime > STALE_TMP_FILE_AGE:
+                        self._remove(path)
+                    continue
+                entries.append((st.st_mtime, st.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            if path == keep:
+                continue
+            self.logger.info(f"Evicting {path} from the package cache")
+            self._remove(path)
+            total_size -= size
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+def get_file_sha256(file_path: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+def copy_from_cache(entry_path: str, destination: str) -> None:
+    """Place a cached binary at destination, hard linking it when on the same filesystem.
+
+    Entries that are not executable, e.g. installed by older versions, are copied instead
+    so that making the binary executable does not change the shared entry.
+    """
+    tmp_path = f"{destination}.{uuid.uuid4().hex}{TMP_FILE_SUFFIX}"
+    linked = False
+    if os.access(entry_path, os.X_OK):
+        try:
+            os.link(entry_path, tmp_path)
+            linked = True
+        except OSError:
+            pass
+    if not linked:
+        shutil.copy(entry_path, tmp_path)
+    os.replace(tmp_path, destination)
@@ -6,16 +6,23 @@
 
 # pyre-unsafe
 
+import os
+import tempfile
 from typing import Dict, List, Optional
 
 from fbpcp.error.pcp import PcpError
 from fbpcp.service.storage import StorageService
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.measurement import MeasurementType
 from onedocker.entity.metadata import PackageMetadata
 
-from onedocker.repository.onedocker_package import OneDockerPackageRepository
+from onedocker.repository.onedocker_package import (
+    DELTA_SUFFIX,
+    OneDockerPackageRepository,
+)
 from onedocker.service.measurement import MeasurementService
 from onedocker.service.metadata import MetadataService
+from onedocker.util.compression import compress_file, create_delta
 
 DEFAULT_PROD_VERSION: str = "latest"
 MEASUREMENT_TYPES: List[MeasurementType] = [MeasurementType.sha256]
@@ -39,22 +46,76 @@ class OneDockerRepositoryService:
         package_name: str,
         version: str,
         source: str,
+        compression: Optional[CompressionType] = None,
+        delta_base: Optional[str] = None,
     ) -> None:
+        """Upload a package binary, and next to it a compressed artifact if compression
+        is set and a binary delta against version delta_base if it is set. Runners only
+        find these artifacts through the package metadata.
+        """
+        if (compression or delta_base) and not self.metadata_svc:
+            raise ValueError(
+                "Compressed packages and deltas are recorded in the package metadata, which requires a MetadataService"
+            )
         if not self._skip_version_validation_check(version):
             all_versions = self.package_repo.get_package_versions(package_name)
             if version in all_versions:
                 raise ValueError(
                     f"Version {version} already exists. Please specify another version."
                 )
-        self.package_repo.upload(package_name, version, source)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            # the delta is built first so that a missing or corrupted base fails the upload
+            delta_path = os.path.join(tmp_dir, os.path.basename(source) + DELTA_SUFFIX)
+            delta_base_sha256 = (
+                self._create_delta(package_name, delta_base, source, delta_path)
+                if delta_base
+                else None
+            )
+            measurements = self._generate_measurements(source)
+            self.package_repo.upload(
+                package_name, version, source, measurements=measurements
+            )
+            if compression:
+                compressed = os.path.join(
+                    tmp_dir, os.path.basename(source) + compression.suffix
+                )
+                compress_file(source, compressed, compression)
+                self.package_repo.upload(package_name, version, compressed, compression)
+            if delta_base:
+                self.package_repo.upload_delta(package_name, version, delta_path)
 
         if self.metadata_svc:
             self.metadata_svc.put_metadata(
                 metadata=self._generate_metadata(
-                    package_name=package_name, version=version, source=source
+                    package_name=package_name,
+                    version=version,
+                    measurements=measurements,
+                    compression=compression,
+                    delta_base_version=delta_base,
+                    delta_base_sha256=delta_base_sha256,
                 )
             )
 
+    def _create_delta(
+        self, package_name: str, base_version: str, source: str, destination: str
+    ) -> str:
+        """Write the delta from base_version to source and return the base sha256"""
+        base_metadata = self.get_package_metadata(package_name, base_version)
+        base_sha256 = base_metadata.measurements.get(MeasurementType.sha256)
+        if not base_sha256:
+            raise ValueError(
+                f"No sha256 measurement of {package_name}: {base_version} is available to build a delta against"
+            )
+        base_path = destination + ".base"
+        self.package_repo.download(package_name, base_version, base_path)
+        actual_sha256 = self._generate_measurements(base_path)[MeasurementType.sha256]
+        if actual_sha256 != base_sha256:
+            raise ValueError(
+                f"Downloaded {package_name}: {base_version} has sha256 {actual_sha256}, expected {base_sha256}"
+            )
+        create_delta(base_path, source, destination)
+        return base_sha256
+
     def download(self, package_name: str, version: str, destination: str) -> None:
         self.package_repo.download(package_name, version, destination)
 
@@ -68,11 +129,18 @@ class OneDockerRepositoryService:
         self,
         package_name: str,
         version: str,
-        source: str,
+        measurements: Dict[MeasurementType, str],
+        compression: Optional[CompressionType] = None,
+        delta_base_version: Optional[str] = None,
+        delta_base_sha256: Optional[str] = None,
     ) -> PackageMetadata:
-        measurements = self._generate_measurements(source)
         return PackageMetadata(
-            package_name=package_name, version=version, measurements=measurements
+            package_name=package_name,
+            version=version,
+            measurements=measurements,
+            compression=compression,
+            delta_base_version=delta_base_version,
+            delta_base_sha256=delta_base_sha256,
         )
 
     def archive_package(self, package_name: str, version: str) -> None:
@@ -85,14 +153,32 @@ class OneDockerRepositoryService:
             return True
         return False
 
-    def get_package_measurements(
-        self, package_name: str, version: str
-    ) -> Dict[str, str]:
-        if not self.metadata_svc:
+    def get_package_metadata(self, package_name: str, version: str) -> PackageMetadata:
+        """Read the metadata of a package from the MetadataService, or else only its
+        measurements from the package manifest
+        """
+        if self.metadata_svc:
+            return self.metadata_svc.get_medadata(
+                package_name=package_name, version=version
+            )
+
+        manifest = self.package_repo.get_manifest(package_name)
+        if not manifest or version not in manifest.versions:
             raise PcpError(
-                "No MetadataService has been provided for OneDockerRepositoryService, which is required for get_package_measurements function"
+                f"No MetadataService has been provided for OneDockerRepositoryService and the manifest of {package_name} has no version {version}"
             )
+        return PackageMetadata(
+            package_name=package_name,
+            version=version,
+            measurements={
+                MeasurementType(k): v
+                for k, v in manifest.versions[version].measurements.items()
+            },
+        )
 
-        md = self.metadata_svc.get_medadata(package_name=package_name, version=version)
+    def get_package_measurements(
+        self, package_name: str, version: str
+    ) -> Dict[str, str]:
+        md = self.get_package_metadata(package_name, version)
 
         return {k.value: v for k, v in md.measurements.items()}
@@ -12,19 +12,25 @@ CLI for uploading an executable to one docker repo
 
 
 Usage:
-    onedocker-cli upload --config=<config> --package_name=<package_name> --package_path=<package_path> --version=<version>
+    onedocker-cli upload --config=<config> --package_name=<package_name> --package_path=<package_path> --version=<version> [--compression=<compression> --delta_base=<delta_base>]
     onedocker-cli archive --config=<config> --package_name=<package_name> [--version=<version> ] [options]
     onedocker-cli test --config=<config> --package_name=<package_name> --cmd_args=<cmd_args> [--version=<version> --timeout=<timeout>][options]
-    onedocker-cli show --config=<config> --package_name=<package_name> [--version=<version>] [options]
+    onedocker-cli show --config=<config> --package_name=<package_name> [--version=<version> --format=<format>] [options]
     onedocker-cli stop --config=<config> --container=<container_id> [options]
+    onedocker-cli repair --config=<config> --package_name=<package_name> [options]
 
 Options:
     -h --help                Show this help
     --log_path=<path>        Override the default path where logs are saved
     --verbose                Set logging level to DEBUG
+    --compression=<compression>  Also upload a gzip or zstd compressed artifact, requires a MetadataService
+    --delta_base=<delta_base>    Also upload a binary delta from this version, requires a MetadataService and the zstd extra: pip install "fbpcp[zstd]"
+    --format=<format>            Render show as "text" or "json" [default: text]
 """
 
 import asyncio
+import dataclasses
+import json
 import logging
 import os
 import time
@@ -39,7 +45,9 @@ from fbpcp.service.log import LogService
 from fbpcp.service.onedocker import OneDockerService
 from fbpcp.service.storage import StorageService
 from fbpcp.util import reflect, yaml
+from onedocker.entity.compression import CompressionType
 from onedocker.repository.onedocker_repository_service import OneDockerRepositoryService
+from onedocker.service.metadata import MetadataService
 
 logger = None
 onedocker_svc = None
@@ -62,12 +70,16 @@ def _upload(
     package_path: str,
     package_name: str,
     version: str,
+    compression: Optional[CompressionType] = None,
+    delta_base: Optional[str] = None,
 ) -> None:
     logger.info(
         f" Starting uploading package {package_name} at '{package_path}', version {version}..."
     )
     logger.info(f"Uploading binary for package {package_name}: {version}")
-    onedocker_repo_svc.upload(package_name, version, package_path)
+    onedocker_repo_svc.upload(
+        package_name, version, package_path, compression, delta_base
+    )
     logger.info(f" Finished uploading '{package_name}, version {version}'.\n")
 
 
@@ -121,32 +133,49 @@ def _test(
 def _show(
     package_name: str,
     version: Optional[str] = None,
+    output_format: str = "text",
 ) -> None:
     logger.info(
         f"Show package [{package_name}], version {version} information on storage "
     )
 
-    if version:
-        package_info = onedocker_repo_svc.package_repo.get_package_info(
-            package_name, version
+    inventory = onedocker_repo_svc.package_repo.get_package_inventory(
+        package_name, version
+    )
+    if version and version not in inventory:
+        raise ValueError(
+            f"Package {package_name}, version {version} not found in repository"
         )
+    if output_format == "json":
         print(
-            f" Package [{package_info.package_name}], version {package_info.version}: Last modified: {package_info.last_modified}; Size: {package_info.package_size} bytes"
-        )
-    else:
-        package_versions = onedocker_repo_svc.package_repo.get_package_versions(
-            package_name
+            json.dumps(
+                [
+                    dataclasses.asdict(package_info)
+                    for package_info in inventory.values()
+                ],
+                indent=2,
+            )
         )
+        return
+    if not version:
+        print(f" All available versions for package {package_name} : {list(inventory)}")
+    for package_info in inventory.values():
         print(
-            f" All available versions for package {package_name} : {package_versions}"
+            f" Package [{package_info.package_name}], version {package_info.version}: Last modified: {package_info.last_modified}; Size: {package_info.package_size} bytes; ETag: {package_info.etag}"
         )
-        for version in package_versions:
-            package_info = onedocker_repo_svc.package_repo.get_package_info(
-                package_name, version
-            )
-            print(
-                f"Package [{package_info.package_name}], version {package_info.version}: Last modified: {package_info.last_modified}; Size: {package_info.package_size} bytes"
-            )
+
+
+def _repair(package_name: str) -> None:
+    logger.info(f"Rebuilding the manifest of package {package_name} from storage...")
+    manifest = onedocker_repo_svc.package_repo.repair_manifest(package_name)
+    if manifest is None:
+        logger.info(
+            f"The repository storage of package {package_name} does not support manifests"
+        )
+        return
+    logger.info(
+        f"Rebuilt the manifest of package {package_name} at generation {manifest.generation} with versions {list(manifest.versions)}"
+    )
 
 
 def _stop(container_id: str) -> None:
@@ -196,7 +225,18 @@ def _build_repo_service(config: Dict[str, Any]) -> OneDockerRepositoryService:
     if not config_setting or "repository_path" not in config_setting:
         raise KeyError("repository_path is absent in the config.")
     storage_svc = _build_storage_service(config)
-    return OneDockerRepositoryService(storage_svc, config_setting["repository_path"])
+    return OneDockerRepositoryService(
+        storage_svc, config_setting["repository_path"], _build_metadata_service(config)
+    )
+
+
+def _build_metadata_service(config: Dict[str, Any]) -> Optional[MetadataService]:
+    config_dependency: Optional[Dict[str, Any]] = config.get("dependency")
+    if not config_dependency or "MetadataService" not in config_dependency:
+        return None
+    metadata_svc_config: Dict[str, Any] = config_dependency["MetadataService"]
+    metadata_class = reflect.get_class(metadata_svc_config["class"])
+    return metadata_class(**metadata_svc_config["constructor"])
 
 
 def _build_onedocker_service(
@@ -228,6 +268,7 @@ def main() -> None:
             "show": bool,
             "stop": bool,
             "archive": bool,
+            "repair": bool,
             "--verbose": bool,
             "--help": bool,
             "--config": schema.And(schema.Use(PurePath), os.path.exists),
@@ -238,6 +279,9 @@ def main() -> None:
             "--log_path": schema.Or(None, schema.Use(Path)),
             "--version": schema.Or(None, schema.And(str, len)),
             "--timeout": schema.Or(None, schema.Use(int)),
+            "--compression": schema.Or(None, schema.Use(CompressionType)),
+            "--delta_base": schema.Or(None, schema.And(str, len)),
+            "--format": schema.Or("text", "json"),
         }
     )
 
@@ -255,7 +299,13 @@ def main() -> None:
 
     if arguments["upload"]:
         onedocker_repo_svc = _build_repo_service(config)
-        _upload(package_path, package_name, version)
+        _upload(
+            package_path,
+            package_name,
+            version,
+            arguments["--compression"],
+            arguments["--delta_base"],
+        )
     elif arguments["archive"]:
         onedocker_repo_svc = _build_repo_service(config)
         _archive(package_name, version)
@@ -267,7 +317,10 @@ def main() -> None:
         _test(package_name, version, arguments["--cmd_args"], timeout)
     elif arguments["show"]:
         onedocker_repo_svc = _build_repo_service(config)
-        _show(package_name, arguments["--version"])
+        _show(package_name, arguments["--version"], arguments["--format"])
+    elif arguments["repair"]:
+        onedocker_repo_svc = _build_repo_service(config)
+        _repair(package_name)
     elif arguments["stop"]:
         container_svc = _build_container_service(config)
         onedocker_svc = _build_onedocker_service(config, container_svc)
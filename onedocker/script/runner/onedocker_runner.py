@@ -12,6 +12,8 @@ CLI for running an executable in OneDocker containers.
 
 Usage:
     onedocker-runner <package_name> --version=<version> [options]
+    onedocker-runner serve --work_queue=<work_queue> --queue_name=<queue_name> [options]
+    onedocker-runner batch --manifest=<manifest> [options]
 
 Options:
     -h --help                                               Show this help
@@ -22,30 +24,60 @@ Options:
     --log_path=<path>                                       Override the default path where logs are saved.
     --cert_params=<cert_params>                             String format of CertificateRequest dictionary if a TLS certificate is requested
     --opa_workflow_path=<workflow_path>                     Set path of a pre-defined workflow for OneDocker Plugin Architecture usage. When set, OPA exeuction according to the predefined workflow is triggered.
+    --work_queue=<work_queue>                               Serve mode: JSON config ({"class": ..., "constructor": {...}}) of the WorkQueueService to pull work items from.
+    --queue_name=<queue_name>                               Serve mode: name of the queue to pull work items from. Results are put to <queue_name>-results.
+    --idle_timeout=<idle_timeout>                           Serve mode: exit after this many seconds without work items.
+    --manifest=<manifest>                                   Batch mode: JSON file with a list of {"package_name", "version", "exe_args", "timeout"} entries to run concurrently.
+    --batch_log_dir=<batch_log_dir>                         Batch mode: directory for the output of each entry and the results.json of the batch. Defaults to <manifest>.logs/.
+    --usage_store=<usage_store>                             JSON config ({"class": ..., "constructor": {...}}) of the ResourceUsageStore to record the peak memory, cpu time and wall time of runs to.
+    --package_cache=<package_cache>                         Local directory, e.g. on a shared volume, to cache downloaded executables in. Requires --metadata_service.
+    --package_cache_size=<package_cache_size>               Maximum total size (in bytes) of the package cache before least recently used executables are evicted.
+    --telemetry_interval=<telemetry_interval>               Sample the CPU, memory, I/O, network and threads of the executable every this many seconds and log a summary when it exits.
+    --telemetry_path=<telemetry_path>                       Write the sampled time series and its summary as JSON to this file. Samples every second unless --telemetry_interval is set.
+    --metadata_service=<metadata_service>                   JSON config ({"class": ..., "constructor": {...}}) of the MetadataService holding the package measurements cached executables are verified against.
     --verbose                                               Set logging level to DEBUG.
 """
+import json
 import logging
 import os
 import resource
 import stat
 import subprocess
 import sys
+import time
 import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
 from shlex import join, split
-from typing import Optional
+from typing import Any, Dict, List, Optional, Set, Tuple, TYPE_CHECKING
 
 import psutil
 import schema
 from docopt import docopt
 from fbpcp.entity.certificate_request import CertificateRequest
-
-from fbpcp.service.storage_s3 import S3StorageService
+from fbpcp.entity.resource_usage import get_run_fingerprint, ResourceUsage
+from fbpcp.entity.work_item import WorkItem
+from fbpcp.service.resource_usage_store import ResourceUsageStore
+from fbpcp.service.work_queue import RESULTS_QUEUE_SUFFIX, WorkQueueService
+from fbpcp.util import reflect
 from fbpcp.util.s3path import S3Path
-from onedocker.common.env import ONEDOCKER_EXE_PATH, ONEDOCKER_REPOSITORY_PATH
+from onedocker.common.env import (
+    ONEDOCKER_EXE_PATH,
+    ONEDOCKER_PACKAGE_CACHE,
+    ONEDOCKER_PACKAGE_PARALLEL_DOWNLOAD,
+    ONEDOCKER_REPOSITORY_PATH,
+)
 from onedocker.common.util import run_cmd
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.exit_code import ExitCode
-from onedocker.repository.onedocker_repository_service import OneDockerRepositoryService
+from onedocker.entity.measurement import MeasurementType
+from onedocker.entity.metadata import PackageMetadata
+from onedocker.entity.resource_telemetry import ResourceTelemetry
+from onedocker.repository.onedocker_package_cache import (
+    copy_from_cache,
+    DEFAULT_MAX_CACHE_SIZE,
+    OneDockerPackageCache,
+)
 from onedocker.repository.opawdl_workflow_instance_repository import (
     OPAWDLWorkflowInstanceRepository,
 )
@@ -53,6 +85,17 @@ from onedocker.repository.opawdl_workflow_instance_repository_local import (
     LocalOPAWDLWorkflowInstanceRepository,
 )
 from onedocker.service.opawdl_driver import OPAWDLDriver
+from onedocker.service.resource_sampler import DEFAULT_SAMPLE_INTERVAL, ResourceSampler
+from onedocker.util.compression import apply_delta, decompress_stream
+
+# The storage and metadata services pull in boto3, so they are only imported when a
+# package is actually downloaded: the runner starts faster with a LOCAL repository.
+if TYPE_CHECKING:
+    from fbpcp.service.storage_s3 import S3StorageService
+    from onedocker.repository.onedocker_repository_service import (
+        OneDockerRepositoryService,
+    )
+    from onedocker.service.metadata import MetadataService
 
 
 # The default OneDocker repository path on S3
@@ -66,6 +109,16 @@ DEFAULT_EXE_FOLDER = "/root/onedocker/package/"
 # The default path in Docker image that hosts OPA workflow instances
 DEFAULT_OPA_WORKFLOW_INSTANCE_FOLDER = "/home/onedocker/"
 
+# Seconds a serving runner without idle timeout waits on the queue per poll
+SERVE_QUEUE_WAIT_TIME = 20
+
+# The version that moves to each new release, so serve mode downloads it on every run
+LATEST_VERSION = "latest"
+
+# Concurrent ranged GETs per vCPU of parallel package downloads, which are network bound.
+# download_file_parallel caps them by its in-flight bytes, which bounds the runner memory
+DOWNLOAD_WORKERS_PER_CPU = 2
+
 logger: logging.Logger
 
 
@@ -84,6 +137,8 @@ def _prepare_executable(
     exe_path: str,
     package_name: str,
     version: str,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
 ) -> str:
     # package details
     exe_name = _parse_package_name(package_name)
@@ -91,7 +146,14 @@ def _prepare_executable(
 
     # download executable from s3
     if repository_path.upper() != "LOCAL":
-        _download_executables(repository_path, exe_path, package_name, version)
+        _download_executables(
+            repository_path,
+            exe_path,
+            package_name,
+            version,
+            package_cache,
+            metadata_svc,
+        )
 
     else:
         logger.info("Local repository, skip download and attestation ...")
@@ -103,7 +165,14 @@ def _prepare_executable(
 
 
 def _run_executable(
-    executable: str, timeout: int, exe_args: Optional[str] = None
+    executable: str,
+    timeout: int,
+    exe_args: Optional[str] = None,
+    usage_store: Optional[ResourceUsageStore] = None,
+    package_name: str = "",
+    version: str = "",
+    telemetry_interval: Optional[float] = None,
+    telemetry_path: Optional[str] = None,
 ) -> None:
     # run execution cmd
     cmd = _build_cmd(executable, exe_args)
@@ -111,7 +180,19 @@ def _run_executable(
     logger.info(f"Running cmd: {cmd} ...")
     net_start = psutil.net_io_counters()
 
-    return_code = run_cmd(cmd, timeout)
+    if telemetry_interval or telemetry_path:
+        sampler = ResourceSampler(telemetry_interval or DEFAULT_SAMPLE_INTERVAL)
+        try:
+            with sampler:
+                return_code = _run_cmd_with_usage(
+                    cmd, timeout, usage_store, package_name, version, exe_args
+                )
+        finally:
+            _report_telemetry(sampler.telemetry, telemetry_path)
+    else:
+        return_code = _run_cmd_with_usage(
+            cmd, timeout, usage_store, package_name, version, exe_args
+        )
 
     net_end = psutil.net_io_counters()
     logger.info(
@@ -126,6 +207,144 @@ def _run_executable(
     sys.exit(return_code)
 
 
+def _report_telemetry(
+    telemetry: ResourceTelemetry, telemetry_path: Optional[str]
+) -> None:
+    """Log the summary of the sampled resource usage, and write it to telemetry_path if set"""
+    summary = telemetry.summarize()
+    logger.info(
+        f"Resource telemetry over {len(telemetry.timestamps)} samples: {json.dumps(summary)}"
+    )
+    if telemetry_path:
+        try:
+            with open(telemetry_path, "w") as f:
+                json.dump({"summary": summary, "series": telemetry.to_dict()}, f)
+        except OSError as err:
+            logger.warning(f"Failed to write the resource telemetry: {err}")
+
+
+def _run_cmd_with_usage(
+    cmd: str,
+    timeout: Optional[int],
+    usage_store: Optional[ResourceUsageStore],
+    package_name: str,
+    version: str,
+    exe_args: Optional[str],
+) -> int:
+    """Run cmd, recording its resource usage to usage_store if set.
+
+    Usage is measured from the rusage of the terminated children of the runner. Their
+    cpu time is cumulative and thus diffed, but the peak RSS is a high-water mark: in serve
+    mode it is an upper bound of the peak of the current run.
+    """
+    if usage_store is None:
+        return run_cmd(cmd, timeout)
+
+    usage_before = resource.getrusage(resource.RUSAGE_CHILDREN)
+    start_time = time.monotonic()
+    return_code = run_cmd(cmd, timeout)
+    wall_time = time.monotonic() - start_time
+    usage_after = resource.getrusage(resource.RUSAGE_CHILDREN)
+
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    rss_unit = 1 if sys.platform == "darwin" else 1024
+    usage = ResourceUsage(
+        package_name=package_name,
+        version=version,
+        fingerprint=get_run_fingerprint(package_name, version, exe_args),
+        peak_memory=usage_after.ru_maxrss * rss_unit,
+        cpu_time=(usage_after.ru_utime - usage_before.ru_utime)
+        + (usage_after.ru_stime - usage_before.ru_stime),
+        wall_time=wall_time,
+        cpu=_get_cpu_count(),
+        exit_code=return_code,
+    )
+    logger.info(
+        f"Resource usage: {usage.peak_memory} bytes peak RSS, {usage.cpu_time:.2f}s cpu, {usage.wall_time:.2f}s wall"
+    )
+    try:
+        usage_store.record(usage)
+    except Exception as err:
+        logger.warning(f"Failed to record the resource usage: {err}")
+    return return_code
+
+
+def _get_cpu_count() -> int:
+    """Number of vCPUs available to the runner, as limited by the container"""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def _get_usage_store(
+    usage_store_config: Optional[Dict[str, Any]]
+) -> Optional[ResourceUsageStore]:
+    if not usage_store_config:
+        return None
+    return reflect.get_class(usage_store_config["class"])(
+        **usage_store_config.get("constructor", {})
+    )
+
+
+def _get_package_cache(
+    cache_dir: Optional[str], max_size: Optional[int]
+) -> Optional[OneDockerPackageCache]:
+    if not cache_dir:
+        return None
+    return OneDockerPackageCache(
+        cache_dir, max_size if max_size is not None else DEFAULT_MAX_CACHE_SIZE
+    )
+
+
+def _get_metadata_service(
+    metadata_service_config: Optional[Dict[str, Any]]
+) -> Optional["MetadataService"]:
+    if not metadata_service_config:
+        return None
+    return reflect.get_class(metadata_service_config["class"])(
+        **metadata_service_config.get("constructor", {})
+    )
+
+
+def _bootstrap(
+    repository_path: str,
+    exe_path: str,
+    package_name: str,
+    version: str,
+    certificate_request: Optional[CertificateRequest] = None,
+    opa_workflow_path: Optional[str] = None,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
+) -> "Future[str]":
+    """Start preparing the executable, the certificate and the OPAWDL workflow at once.
+
+    Returns once the certificate and the workflow are done, raising their errors, with
+    the executable preparation possibly still running.
+    """
+    executor = ThreadPoolExecutor(thread_name_prefix="bootstrap")
+    executable_future = executor.submit(
+        _prepare_executable,
+        repository_path=repository_path,
+        exe_path=exe_path,
+        package_name=package_name,
+        version=version,
+        package_cache=package_cache,
+        metadata_svc=metadata_svc,
+    )
+    setup_futures: List["Future[Any]"] = []
+    if certificate_request:
+        setup_futures.append(
+            executor.submit(_generate_certificate, certificate_request, exe_path)
+        )
+    if opa_workflow_path:
+        setup_futures.append(executor.submit(_run_opawdl, opa_workflow_path))
+    executor.shutdown(wait=False)
+
+    for future in setup_futures:
+        future.result()
+    return executable_future
+
+
 def _run_package(
     repository_path: str,
     exe_path: str,
@@ -134,20 +353,30 @@ def _run_package(
     timeout: int,
     exe_args: Optional[str] = None,
     certificate_request: Optional[CertificateRequest] = None,
+    usage_store: Optional[ResourceUsageStore] = None,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
+    opa_workflow_path: Optional[str] = None,
+    telemetry_interval: Optional[float] = None,
+    telemetry_path: Optional[str] = None,
 ) -> None:
     logger.info(f"Starting to run {package_name}, version: {version}")
     executable = ""
 
-    if certificate_request:
-        _generate_certificate(certificate_request, exe_path)
-
+    start_time = time.monotonic()
+    executable_future = _bootstrap(
+        repository_path=repository_path,
+        exe_path=exe_path,
+        package_name=package_name,
+        version=version,
+        certificate_request=certificate_request,
+        opa_workflow_path=opa_workflow_path,
+        package_cache=package_cache,
+        metadata_svc=metadata_svc,
+    )
     try:
-        executable = _prepare_executable(
-            repository_path=repository_path,
-            exe_path=exe_path,
-            package_name=package_name,
-            version=version,
-        )
+        executable = executable_future.result()
+        logger.info(f"Bootstrap took {time.monotonic() - start_time:.2f}s")
     except Exception as err:
         logger.exception(
             f"An error was raised while preparing {package_name}:{version} from {repository_path}, error: {err}"
@@ -159,6 +388,11 @@ def _run_package(
             executable=executable,
             timeout=timeout,
             exe_args=exe_args,
+            usage_store=usage_store,
+            package_name=package_name,
+            version=version,
+            telemetry_interval=telemetry_interval,
+            telemetry_path=telemetry_path,
         )
     except subprocess.TimeoutExpired as err:
         logger.exception(
@@ -177,6 +411,258 @@ def _run_package(
         sys.exit(ExitCode.ERROR)
 
 
+def _run_work_item(
+    repository_path: str,
+    exe_path: str,
+    item: WorkItem,
+    prepared: Dict[str, str],
+    usage_store: Optional[ResourceUsageStore] = None,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
+) -> ExitCode:
+    """Run a work item in serve mode, mapping failures to the exit codes of a single run.
+
+    prepared maps each package to the version of its executable on disk, which only
+    has to be downloaded again for another version or for the latest one.
+    """
+    logger.info(
+        f"Starting to run work item {item.item_id}: {item.package_name}, version: {item.version}"
+    )
+    try:
+        if (
+            item.version != LATEST_VERSION
+            and prepared.get(item.package_name) == item.version
+        ):
+            executable = _build_executable_path(
+                exe_path, _parse_package_name(item.package_name)
+            )
+        else:
+            # a failed download may leave another version half overwritten
+            prepared.pop(item.package_name, None)
+            executable = _prepare_executable(
+                repository_path=repository_path,
+                exe_path=exe_path,
+                package_name=item.package_name,
+                version=item.version,
+                package_cache=package_cache,
+                metadata_svc=metadata_svc,
+            )
+            prepared[item.package_name] = item.version
+    except Exception as err:
+        logger.exception(
+            f"An error was raised while preparing {item.package_name}:{item.version} from {repository_path}, error: {err}"
+        )
+        return ExitCode.SERVICE_UNAVAILABLE
+
+    cmd = _build_cmd(executable, item.exe_args)
+    logger.info(f"Running cmd: {cmd} ...")
+    try:
+        return_code = _run_cmd_with_usage(
+            cmd,
+            item.timeout,
+            usage_store,
+            item.package_name,
+            item.version,
+            item.exe_args,
+        )
+    except subprocess.TimeoutExpired as err:
+        logger.exception(f"{item.timeout} seconds have passed, stopping the run\n{err}")
+        return ExitCode.TIMEOUT
+    except Exception as err:
+        logger.exception(
+            f"An error was raised while running {item.package_name}, error: {err}"
+        )
+        return ExitCode.ERROR
+
+    if return_code != 0:
+        logger.error(
+            f"Subprocess returned non-zero exit code {return_code} for cmd '{cmd}'"
+        )
+        return ExitCode.EXE_ERROR
+    return ExitCode.SUCCESS
+
+
+def _serve(
+    repository_path: str,
+    exe_path: str,
+    work_queue_config: Dict[str, Any],
+    queue_name: str,
+    idle_timeout: Optional[int] = None,
+    usage_store: Optional[ResourceUsageStore] = None,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
+) -> None:
+    """Run work items from a queue one after another, reporting each to the results queue.
+
+    Executables are only downloaded again when a package version differs from the
+    previous run of the package.
+    Exits once no work item arrived for idle_timeout seconds.
+    """
+    work_queue: WorkQueueService = reflect.get_class(work_queue_config["class"])(
+        **work_queue_config.get("constructor", {})
+    )
+    prepared: Dict[str, str] = {}
+    logger.info(f"Serving work items from queue {queue_name}")
+    while True:
+        item = work_queue.get(
+            queue_name,
+            wait_time=(
+                idle_timeout if idle_timeout is not None else SERVE_QUEUE_WAIT_TIME
+            ),
+        )
+        if item is None:
+            if idle_timeout is not None:
+                logger.info(f"No work item for {idle_timeout} seconds, exiting")
+                sys.exit(ExitCode.SUCCESS)
+            continue
+        item.exit_code = _run_work_item(
+            repository_path,
+            exe_path,
+            item,
+            prepared,
+            usage_store,
+            package_cache,
+            metadata_svc,
+        )
+        work_queue.put(queue_name + RESULTS_QUEUE_SUFFIX, item)
+
+
+def _read_manifest(manifest_path: str) -> List[WorkItem]:
+    """Read the entries of a batch, identified by their position unless given an item_id"""
+    with open(manifest_path) as f:
+        entries = json.load(f)
+    return [
+        WorkItem.from_dict({"item_id": str(index), **entry})
+        for index, entry in enumerate(entries)
+    ]
+
+
+def _is_valid_item_id(item_id: str) -> bool:
+    """Whether item_id can name the log file of its entry within the log directory"""
+    return (
+        item_id not in ("", ".", "..")
+        and os.sep not in item_id
+        and (os.altsep is None or os.altsep not in item_id)
+    )
+
+
+def _run_batch_entry(executable: str, item: WorkItem, log_path: str) -> ExitCode:
+    """Run a batch entry with its output to log_path, mapping failures to exit codes"""
+    cmd = _build_cmd(executable, item.exe_args)
+    logger.info(f"Running batch entry {item.item_id}: {cmd} ...")
+    try:
+        return_code = run_cmd(cmd, item.timeout, log_path)
+    except subprocess.TimeoutExpired:
+        logger.error(f"Batch entry {item.item_id} timed out after {item.timeout}s")
+        return ExitCode.TIMEOUT
+    except Exception as err:
+        logger.exception(
+            f"An error was raised while running batch entry {item.item_id}, error: {err}"
+        )
+        return ExitCode.ERROR
+
+    if return_code != 0:
+        logger.error(
+            f"Batch entry {item.item_id} returned non-zero exit code {return_code}, see {log_path}"
+        )
+        return ExitCode.EXE_ERROR
+    return ExitCode.SUCCESS
+
+
+def _run_batch(
+    repository_path: str,
+    exe_path: str,
+    manifest_path: str,
+    log_dir: Optional[str] = None,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
+) -> None:
+    """Run the entries of a manifest concurrently, as many at a time as there are vCPUs.
+
+    Each package version is downloaded once before the entries run. The output of each
+    entry goes to <log_dir>/<item_id>.log and the entries with their exit codes are
+    written to <log_dir>/results.json. Resource usage is not recorded: the rusage of
+    concurrent children cannot be told apart.
+    Exits with the exit code of the first failed entry, SUCCESS if all succeeded.
+    """
+    items = _read_manifest(manifest_path)
+    # item ids name the log files and results of the entries
+    seen: Set[str] = set()
+    invalid: Set[str] = set()
+    for item in items:
+        if item.item_id in seen or not _is_valid_item_id(item.item_id):
+            invalid.add(item.item_id)
+        seen.add(item.item_id)
+    if invalid:
+        logger.error(
+            f"Batch item ids must be unique file names, invalid ids: {sorted(invalid)}"
+        )
+        sys.exit(ExitCode.ERROR)
+
+    log_dir = log_dir or f"{manifest_path}.logs"
+    os.makedirs(log_dir, exist_ok=True)
+
+    # different versions of a package would be downloaded to the same executable path
+    versions: Dict[str, Set[str]] = {}
+    for item in items:
+        versions.setdefault(_parse_package_name(item.package_name), set()).add(
+            item.version
+        )
+    conflicts = {exe: v for exe, v in versions.items() if len(v) > 1}
+    if conflicts:
+        logger.error(f"Batch runs several versions of the same packages: {conflicts}")
+        sys.exit(ExitCode.ERROR)
+
+    max_workers = _get_cpu_count()
+    logger.info(
+        f"Running {len(items)} batch entries from {manifest_path} with {max_workers} workers"
+    )
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        packages = {(item.package_name, item.version) for item in items}
+        prepare_futures = {
+            (package_name, version): executor.submit(
+                _prepare_executable,
+                repository_path=repository_path,
+                exe_path=exe_path,
+                package_name=package_name,
+                version=version,
+                package_cache=package_cache,
+                metadata_svc=metadata_svc,
+            )
+            for package_name, version in packages
+        }
+        executables: Dict[Tuple[str, str], str] = {}
+        for (package_name, version), future in prepare_futures.items():
+            try:
+                executables[(package_name, version)] = future.result()
+            except Exception as err:
+                logger.exception(
+                    f"An error was raised while preparing {package_name}:{version} from {repository_path}, error: {err}"
+                )
+
+        run_futures: Dict[str, "Future[ExitCode]"] = {
+            item.item_id: executor.submit(
+                _run_batch_entry,
+                executables[(item.package_name, item.version)],
+                item,
+                os.path.join(log_dir, f"{item.item_id}.log"),
+            )
+            for item in items
+            if (item.package_name, item.version) in executables
+        }
+        for item in items:
+            future = run_futures.get(item.item_id)
+            item.exit_code = future.result() if future else ExitCode.SERVICE_UNAVAILABLE
+
+    with open(os.path.join(log_dir, "results.json"), "w") as f:
+        json.dump([item.to_dict() for item in items], f, indent=2)
+    failed = [item for item in items if item.exit_code != ExitCode.SUCCESS]
+    logger.info(
+        f"{len(items) - len(failed)} of {len(items)} batch entries succeeded, results in {log_dir}"
+    )
+    sys.exit(failed[0].exit_code if failed else ExitCode.SUCCESS)
+
+
 def _build_cmd(executable: str, exe_args: Optional[str]) -> str:
     args_list = split(exe_args) if exe_args else []
     args_list.insert(0, executable)
@@ -188,7 +674,14 @@ def _download_executables(
     executable_path: str,
     package_name: str,
     version: str,
+    package_cache: Optional[OneDockerPackageCache] = None,
+    metadata_svc: Optional["MetadataService"] = None,
 ) -> None:
+    from fbpcp.service.storage_s3 import S3StorageService
+    from onedocker.repository.onedocker_repository_service import (
+        OneDockerRepositoryService,
+    )
+
     exe_name = _parse_package_name(package_name)
     exe_local_path = executable_path + exe_name
     exe_s3_path = f"{repository_path}{package_name}/{version}/{exe_name}"
@@ -200,14 +693,179 @@ def _download_executables(
         S3Path(repository_path).region,
         unsigned_enabled=is_onedocker_package_unsigned_request,
     )
-    onedocker_repo_svc = OneDockerRepositoryService(storage_svc, repository_path)
+    onedocker_repo_svc = OneDockerRepositoryService(
+        storage_svc, repository_path, metadata_svc
+    )
+    is_parallel_download = bool(
+        os.environ.get(ONEDOCKER_PACKAGE_PARALLEL_DOWNLOAD, False)
+    )
+    metadata = _get_package_metadata(onedocker_repo_svc, package_name, version)
+    sha256 = metadata.measurements.get(MeasurementType.sha256) if metadata else None
+    compression = metadata.compression if metadata else None
+
+    def fetch(destination: str) -> Optional[str]:
+        if delta_base_entry and _rebuild_executable_from_delta(
+            storage_svc,
+            onedocker_repo_svc.package_repo.build_delta_path(package_name, version),
+            delta_base_entry,
+            destination,
+            sha256,
+        ):
+            return sha256
+        if compression:
+            actual_sha256 = _download_executable_compressed(
+                storage_svc,
+                onedocker_repo_svc.package_repo.build_artifact_path(
+                    package_name, version, compression
+                ),
+                destination,
+                compression,
+            )
+            if actual_sha256:
+                return actual_sha256
+        if is_parallel_download:
+            return _download_executable_parallel(storage_svc, exe_s3_path, destination)
+        onedocker_repo_svc.download(package_name, version, destination)
+        return None
+
+    # cached binary of the version the package delta is built against, if any
+    delta_base_entry = None
+    if package_cache and sha256:
+        entry_path = package_cache.get(package_name, version, sha256)
+        if entry_path:
+            logger.info(
+                f"Found package {package_name}: {version} with sha256 {sha256} in the package cache"
+            )
+        else:
+            if metadata and metadata.delta_base_sha256:
+                delta_base_entry = package_cache.get(
+                    package_name,
+                    metadata.delta_base_version,
+                    metadata.delta_base_sha256,
+                )
+            logger.info(
+                f"Downloading package {package_name}: {version} from {exe_s3_path} to the package cache"
+                + (f" as a delta from {delta_base_entry}" if delta_base_entry else "")
+            )
+            entry_path = package_cache.install(package_name, version, sha256, fetch)
+        copy_from_cache(entry_path, exe_local_path)
+        logger.info(
+            f"Copied package {package_name}: {version} from {entry_path} to {exe_local_path}"
+        )
+        return
+    if package_cache:
+        logger.warning(
+            f"No sha256 measurement of {package_name}: {version} is available, skip the package cache"
+        )
+
     logger.info(f"Downloading package {package_name}: {version} from {exe_s3_path}")
-    onedocker_repo_svc.download(package_name, version, exe_local_path)
+    actual_sha256 = fetch(exe_local_path)
+    if actual_sha256 and sha256 and actual_sha256 != sha256:
+        raise ValueError(
+            f"Downloaded {package_name}: {version} has sha256 {actual_sha256}, expected {sha256}"
+        )
     logger.info(
         f"Downloaded package {package_name}: {version} from {exe_s3_path} to {exe_local_path}"
     )
 
 
+def _download_executable_parallel(
+    storage_svc: "S3StorageService", source: str, destination: str
+) -> str:
+    """Download an executable with concurrent ranged GETs, returning its sha256"""
+    max_workers = _get_cpu_count() * DOWNLOAD_WORKERS_PER_CPU
+    start_time = time.monotonic()
+    sha256 = storage_svc.download_file_parallel(source, destination, max_workers)
+    elapsed = time.monotonic() - start_time
+    size = os.path.getsize(destination)
+    logger.info(
+        f"Downloaded {size} bytes in {elapsed:.2f}s ({size / max(elapsed, 1e-6) / 1024**2:.1f} MB/s) with {max_workers} concurrent range requests, sha256 {sha256}"
+    )
+    return sha256
+
+
+def _rebuild_executable_from_delta(
+    storage_svc: "S3StorageService",
+    source: str,
+    base: str,
+    destination: str,
+    sha256: Optional[str],
+) -> bool:
+    """Stream a binary delta and rebuild the executable from the cached base binary.
+
+    Returns whether the rebuilt executable matches sha256, so that the caller can fall
+    back to downloading the full binary.
+    """
+    start_time = time.monotonic()
+    try:
+        stream = storage_svc.read_stream(source)
+        try:
+            actual_sha256 = apply_delta(base, stream, destination)
+        finally:
+            stream.close()
+    except Exception as err:
+        logger.warning(
+            f"Failed to rebuild {destination} from delta {source}, downloading the full binary: {err}"
+        )
+        return False
+    if actual_sha256 != sha256:
+        logger.warning(
+            f"Rebuilt {destination} has sha256 {actual_sha256}, expected {sha256}, downloading the full binary"
+        )
+        return False
+    elapsed = time.monotonic() - start_time
+    logger.info(
+        f"Rebuilt {os.path.getsize(destination)} bytes from {base} and delta {source} in {elapsed:.2f}s, sha256 {sha256}"
+    )
+    return True
+
+
+def _download_executable_compressed(
+    storage_svc: "S3StorageService",
+    source: str,
+    destination: str,
+    compression: CompressionType,
+) -> Optional[str]:
+    """Stream a compressed executable, decompressing it on the fly and returning the
+    sha256 of the decompressed executable.
+
+    Returns None if it cannot be decompressed, e.g. zstd without the zstandard package,
+    so that the caller can fall back to downloading the uncompressed binary.
+    """
+    start_time = time.monotonic()
+    try:
+        stream = storage_svc.read_stream(source)
+        try:
+            sha256 = decompress_stream(stream, destination, compression)
+        finally:
+            stream.close()
+    except Exception as err:
+        logger.warning(
+            f"Failed to download and decompress {source}, downloading the uncompressed binary: {err}"
+        )
+        return None
+    elapsed = time.monotonic() - start_time
+    size = os.path.getsize(destination)
+    logger.info(
+        f"Downloaded and decompressed {compression.value} {source} to {size} bytes in {elapsed:.2f}s ({size / max(elapsed, 1e-6) / 1024**2:.1f} MB/s), sha256 {sha256}"
+    )
+    return sha256
+
+
+def _get_package_metadata(
+    onedocker_repo_svc: "OneDockerRepositoryService", package_name: str, version: str
+) -> Optional[PackageMetadata]:
+    """Look up the metadata of a package from the MetadataService, or else its
+    measurements from the package manifest, None if neither is available
+    """
+    try:
+        return onedocker_repo_svc.get_package_metadata(package_name, version)
+    except Exception as err:
+        log = logger.warning if onedocker_repo_svc.metadata_svc else logger.info
+        log(f"Failed to get the metadata of {package_name}: {version}: {err}")
+        return None
+
+
 def _parse_package_name(package_name: str) -> str:
     # Some existing packages are like private_lift/lift, so we have to split it by slash
     return package_name.split("/")[-1]
@@ -271,8 +929,21 @@ def main() -> None:
     global logger
     s = schema.Schema(
         {
-            "<package_name>": str,
-            "--version": str,
+            "<package_name>": schema.Or(None, str),
+            "--version": schema.Or(None, str),
+            "serve": bool,
+            "batch": bool,
+            "--manifest": schema.Or(None, schema.And(str, len)),
+            "--batch_log_dir": schema.Or(None, schema.And(str, len)),
+            "--work_queue": schema.Or(None, schema.Use(json.loads)),
+            "--queue_name": schema.Or(None, schema.And(str, len)),
+            "--idle_timeout": schema.Or(None, schema.Use(int)),
+            "--usage_store": schema.Or(None, schema.Use(json.loads)),
+            "--package_cache": schema.Or(None, schema.And(str, len)),
+            "--package_cache_size": schema.Or(None, schema.Use(int)),
+            "--metadata_service": schema.Or(None, schema.Use(json.loads)),
+            "--telemetry_interval": schema.Or(None, schema.Use(float)),
+            "--telemetry_path": schema.Or(None, schema.And(str, len)),
             "--repository_path": schema.Or(None, schema.And(str, len)),
             "--exe_path": schema.Or(None, schema.And(str, len)),
             "--exe_args": schema.Or(None, schema.And(str, len)),
@@ -309,10 +980,34 @@ def main() -> None:
         if arguments["--cert_params"]
         else None
     )
+    usage_store = _get_usage_store(arguments["--usage_store"])
+    package_cache = _get_package_cache(
+        arguments["--package_cache"] or os.getenv(ONEDOCKER_PACKAGE_CACHE),
+        arguments["--package_cache_size"],
+    )
+    metadata_svc = _get_metadata_service(arguments["--metadata_service"])
 
-    # run OPAWDL
-    if arguments["--opa_workflow_path"]:
-        _run_opawdl(arguments["--opa_workflow_path"])
+    if arguments["serve"]:
+        _serve(
+            repository_path=repository_path,
+            exe_path=exe_path,
+            work_queue_config=arguments["--work_queue"],
+            queue_name=arguments["--queue_name"],
+            idle_timeout=arguments["--idle_timeout"],
+            usage_store=usage_store,
+            package_cache=package_cache,
+            metadata_svc=metadata_svc,
+        )
+
+    if arguments["batch"]:
+        _run_batch(
+            repository_path=repository_path,
+            exe_path=exe_path,
+            manifest_path=arguments["--manifest"],
+            log_dir=arguments["--batch_log_dir"],
+            package_cache=package_cache,
+            metadata_svc=metadata_svc,
+        )
 
     _run_package(
         repository_path=repository_path,
@@ -322,6 +1017,12 @@ def main() -> None:
         timeout=arguments["--timeout"],
         exe_args=arguments["--exe_args"],
         certificate_request=certificate_request,
+        usage_store=usage_store,
+        package_cache=package_cache,
+        metadata_svc=metadata_svc,
+        opa_workflow_path=arguments["--opa_workflow_path"],
+        telemetry_interval=arguments["--telemetry_interval"],
+        telemetry_path=arguments["--telemetry_path"],
     )
 
 
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import logging
+import threading
+import time
+from types import TracebackType
+from typing import Dict, Optional, Type
+
+import psutil
+from onedocker.entity.resource_telemetry import ResourceTelemetry
+
+DEFAULT_SAMPLE_INTERVAL = 1.0
+
+
+class ResourceSampler:
+    """Samples the resource usage of the descendants of a process on a background thread.
+
+    Usage:
+        with ResourceSampler(interval) as sampler:
+            run_cmd(...)
+        telemetry = sampler.telemetry
+    """
+
+    def __init__(
+        self, interval: float = DEFAULT_SAMPLE_INTERVAL, pid: Optional[int] = None
+    ) -> None:
+        self.logger: logging.Logger = logging.getLogger(__name__)
+        self.telemetry = ResourceTelemetry(interval=interval)
+        self._root = psutil.Process(pid)
+        # processes are kept between samples since cpu_percent is measured from the
+        # previous call on the same Process object, so a new process reads 0 at first
+        self._processes: Dict[int, psutil.Process] = {}
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name="resource-sampler", daemon=True
+        )
+        self._net_bytes_sent = 0
+        self._net_bytes_recv = 0
+
+    def start(self) -> None:
+        net = psutil.net_io_counters()
+        self._net_bytes_sent, self._net_bytes_recv = net.bytes_sent, net.bytes_recv
+        self._thread.start()
+
+    def stop(self) -> ResourceTelemetry:
+        self._stop_event.set()
+        self._thread.join()
+        return self.telemetry
+
+    def __enter__(self) -> "ResourceSampler":
+        self.start()
+        return self
+
+    def __exit__(
+        self,
+        exc_type: Optional[Type[BaseException]],
+        exc_value: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        self.stop()
+
+    def _run(self) -> None:
+        while not self._stop_event.wait(self.telemetry.interval):
+            try:
+                self._sample()
+            except Exception as err:
+                self.logger.debug(f"Failed to sample the resource usage: {err}")
+
+    def _sample(self) -> None:
+        try:
+            children = self._root.children(recursive=True)
+        except psutil.NoSuchProcess:
+            return
+        processes = {p.pid: self._processes.get(p.pid, p) for p in children}
+        self._processes = processes
+
+        cpu_percent = 0.0
+        rss = num_threads = read_bytes = write_bytes = 0
+        for process in processes.values():
+            try:
+                with process.oneshot():
+                    cpu_percent += process.cpu_percent()
+                    rss += process.memory_info().rss
+                    num_threads += process.num_threads()
+                    if hasattr(process, "io_counters"):
+                        io = process.io_counters()
+                        read_bytes += io.read_bytes
+                        write_bytes += io.write_bytes
+            except (psutil.NoSuchProcess, psutil.AccessDenied):
+                continue
+
+        net = psutil.net_io_counters()
+        telemetry = self.telemetry
+        telemetry.timestamps.append(time.time())
+        telemetry.cpu_percent.append(cpu_percent)
+        telemetry.rss.append(rss)
+        telemetry.num_threads.append(num_threads)
+        telemetry.read_bytes.append(read_bytes)
+        telemetry.write_bytes.append(write_bytes)
+        telemetry.net_bytes_sent.append(net.bytes_sent - self._net_bytes_sent)
+        telemetry.net_bytes_recv.append(net.bytes_recv - self._net_bytes_recv)
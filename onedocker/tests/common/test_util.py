@@ -6,8 +6,11 @@
 
 # pyre-strict
 
+import os
 import subprocess
+import tempfile
 import unittest
+from concurrent.futures import ThreadPoolExecutor
 
 from onedocker.common.util import run_cmd
 
@@ -18,3 +21,14 @@ class TestUtil(unittest.TestCase):
 
     def test_run_cmd_with_timeout(self) -> None:
         self.assertRaises(subprocess.TimeoutExpired, run_cmd, "vi", 1)
+
+    def test_run_cmd_with_log_path(self) -> None:
+        with tempfile.TemporaryDirectory() as tmpdir:
+            log_path = os.path.join(tmpdir, "cmd.log")
+            self.assertEqual(0, run_cmd("echo out; echo err >&2", 1, log_path))
+            with open(log_path) as f:
+                self.assertEqual(f.read(), "out\nerr\n")
+
+    def test_run_cmd_in_thread(self) -> None:
+        with ThreadPoolExecutor() as executor:
+            self.assertEqual(0, executor.submit(run_cmd, "true", 1).result())
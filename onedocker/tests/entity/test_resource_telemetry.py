@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import unittest
+
+from onedocker.entity.resource_telemetry import ResourceTelemetry
+
+
+class TestResourceTelemetry(unittest.TestCase):
+    def test_summarize(self):
+        # Arrange
+        telemetry = ResourceTelemetry(
+            interval=1.0,
+            timestamps=[float(t) for t in range(10)],
+            cpu_percent=[float(c) for c in range(10, 110, 10)],
+            rss=[100] * 9 + [500],
+            num_threads=[4] * 10,
+            # the process doing I/O exits after the 4th sample
+            read_bytes=[0, 10, 30, 60, 0, 0, 0, 0, 0, 5],
+            write_bytes=[0] * 10,
+            net_bytes_sent=[0, 100, 100, 100, 100, 100, 100, 100, 100, 400],
+            net_bytes_recv=[0] * 10,
+        )
+
+        # Act
+        summary = telemetry.summarize()
+
+        # Assert
+        self.assertEqual(
+            summary["cpu_percent"],
+            {"p50": 50.0, "p90": 90.0, "p99": 100.0, "max": 100.0},
+        )
+        self.assertEqual(
+            summary["rss"], {"p50": 100, "p90": 100, "p99": 500, "max": 500}
+        )
+        self.assertEqual(summary["read_bytes"], {"total": 65, "peak_rate": 30.0})
+        self.assertEqual(summary["net_bytes_sent"], {"total": 400, "peak_rate": 300.0})
+        self.assertEqual(summary["write_bytes"], {"total": 0, "peak_rate": 0.0})
+
+    def test_summarize_no_samples(self):
+        # Act
+        summary = ResourceTelemetry(interval=1.0).summarize()
+
+        # Assert
+        self.assertEqual(summary["cpu_percent"], {})
+        self.assertEqual(summary["read_bytes"], {"total": 0, "peak_rate": 0.0})
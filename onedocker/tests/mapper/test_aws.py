@@ -8,6 +8,7 @@
 
 import unittest
 
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.measurement import MeasurementType
 from onedocker.entity.metadata import PackageMetadata
 from onedocker.mapper.aws import map_dynamodbitem_to_packagemetadata
@@ -35,3 +36,29 @@ class TestAWSMapper(unittest.TestCase):
 
         # Assert
         self.assertEqual(expect_res, res)
+
+    def test_map_dynamodbitem_to_packagemetadata_with_compression(self):
+        # Arrange
+        test_dynamodb_item = {
+            "package_name": "PA",
+            "version": "0.0.1",
+            "measurements": {"sha256": "123"},
+            "compression": "zstd",
+            "delta_base_version": "0.0.0",
+            "delta_base_sha256": "012",
+        }
+        expect_res = PackageMetadata(
+            package_name="PA",
+            version="0.0.1",
+            measurements={MeasurementType.sha256: "123"},
+            compression=CompressionType.zstd,
+            delta_base_version="0.0.0",
+            delta_base_sha256="012",
+        )
+
+        # Act
+        res = map_dynamodbitem_to_packagemetadata(dynamodb_item=test_dynamodb_item)
+
+        # Assert
+        self.assertEqual(expect_res, res)
+        self.assertEqual(test_dynamodb_item, {"package_name": "PA", **res.to_dict()})
@@ -8,10 +8,14 @@
 
 
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import call, MagicMock, patch
 
 from fbpcp.entity.file_information import FileInfo
+from fbpcp.error.pcp import PreconditionFailedError
+from onedocker.entity.compression import CompressionType
+from onedocker.entity.measurement import MeasurementType
 from onedocker.entity.package_info import PackageInfo
+from onedocker.entity.package_manifest import PackageManifest, PackageVersionEntry
 from onedocker.repository.onedocker_package import OneDockerPackageRepository
 
 
@@ -26,7 +30,20 @@ class TestOneDockerPackageRepository(unittest.TestCase):
         self.onedocker_repository = OneDockerPackageRepository(
             MockStorageService, self.repository_url
         )
+        # packages have no manifest unless a test writes one
+        MockStorageService.read_versioned.return_value = None
+        MockStorageService.list_files_info.return_value = []
+        MockStorageService.get_file_size.return_value = 1048576
+        MockStorageService.get_file_info.return_value = FileInfo(
+            file_name="exe_name",
+            last_modified="Sun Jan 01 01:01:05 2022",
+            file_size=1048576,
+            etag="etag-exe",
+        )
         self.expected_s3_dest = f"{self.repository_url}{self.TEST_PACKAGE_PATH}/{self.TEST_PACKAGE_VERSION}/{self.TEST_PACKAGE_NAME}"
+        self.expected_manifest_path = (
+            f"{self.repository_url}{self.TEST_PACKAGE_PATH}/manifest.json"
+        )
         self.expected_archive_path = f"{self.repository_url}archived/{self.TEST_PACKAGE_PATH}/{self.TEST_PACKAGE_VERSION}/{self.TEST_PACKAGE_NAME}"
 
     def test_onedockerrepo_upload(self):
@@ -43,6 +60,34 @@ class TestOneDockerPackageRepository(unittest.TestCase):
             source, self.expected_s3_dest
         )
 
+    def test_onedockerrepo_upload_compressed(self):
+        # Arrange
+        source = "xyz.gz"
+
+        # Act
+        self.onedocker_repository.upload(
+            self.TEST_PACKAGE_PATH,
+            self.TEST_PACKAGE_VERSION,
+            source,
+            CompressionType.gzip,
+        )
+
+        # Assert
+        self.onedocker_repository.storage_svc.copy.assert_called_with(
+            source, f"{self.expected_s3_dest}.gz"
+        )
+
+    def test_onedockerrepo_upload_delta(self):
+        # Act
+        self.onedocker_repository.upload_delta(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION, "xyz.delta"
+        )
+
+        # Assert
+        self.onedocker_repository.storage_svc.copy.assert_called_with(
+            "xyz.delta", f"{self.expected_s3_dest}.delta"
+        )
+
     def test_onedockerrepo_download(self):
         # Arrange
 
@@ -125,7 +170,91 @@ class TestOneDockerPackageRepository(unittest.TestCase):
 
         self.assertEqual(expected_package_info, package_info)
 
+    def test_onedockerrepo_get_package_inventory(self):
+        # Arrange
+        package_folder = f"{self.repository_url}{self.TEST_PACKAGE_PATH}/"
+        self.onedocker_repository.storage_svc.list_files_info.return_value = [
+            FileInfo(
+                file_name=f"{package_folder}1.0/{self.TEST_PACKAGE_NAME}",
+                last_modified="Sun Jan 01 01:01:05 2022",
+                file_size=1048576,
+                etag="etag1",
+            ),
+            FileInfo(
+                file_name=f"{package_folder}1.0/{self.TEST_PACKAGE_NAME}.gz",
+                last_modified="Sun Jan 01 01:01:05 2022",
+                file_size=1024,
+                etag="etag2",
+            ),
+            FileInfo(
+                file_name=f"{package_folder}2.0/{self.TEST_PACKAGE_NAME}",
+                last_modified="Mon Jan 02 01:01:05 2022",
+                file_size=2097152,
+                etag="etag3",
+            ),
+        ]
+        expected_inventory = {
+            "1.0": PackageInfo(
+                package_name=self.TEST_PACKAGE_PATH,
+                version="1.0",
+                last_modified="Sun Jan 01 01:01:05 2022",
+                package_size=1048576,
+                etag="etag1",
+            ),
+            "2.0": PackageInfo(
+                package_name=self.TEST_PACKAGE_PATH,
+                version="2.0",
+                last_modified="Mon Jan 02 01:01:05 2022",
+                package_size=2097152,
+                etag="etag3",
+            ),
+        }
+
+        # Act
+        inventory = self.onedocker_repository.get_package_inventory(
+            self.TEST_PACKAGE_PATH
+        )
+
+        # Assert
+        self.assertEqual(expected_inventory, inventory)
+        self.onedocker_repository.storage_svc.list_files_info.assert_called_once_with(
+            package_folder
+        )
+        self.onedocker_repository.storage_svc.get_file_info.assert_not_called()
+
+    def test_onedockerrepo_get_package_inventory_without_listing(self):
+        # Arrange: e.g. GCS, which cannot list files with their info
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.list_files_info.side_effect = NotImplementedError
+        storage_svc.list_folders.return_value = ["1.0", "2.0"]
+        storage_svc.file_exists.side_effect = lambda path: "/2.0/" not in path
+
+        # Act
+        inventory = self.onedocker_repository.get_package_inventory(
+            self.TEST_PACKAGE_PATH
+        )
+
+        # Assert
+        self.assertEqual(
+            inventory,
+            {
+                "1.0": PackageInfo(
+                    package_name=self.TEST_PACKAGE_PATH,
+                    version="1.0",
+                    last_modified="Sun Jan 01 01:01:05 2022",
+                    package_size=1048576,
+                    etag="etag-exe",
+                )
+            },
+        )
+        storage_svc.get_file_info.assert_called_once_with(self.expected_s3_dest)
+
     def test_onedockerrepo_archive_package(self):
+        # Arrange
+        self.onedocker_repository.storage_svc.file_exists.side_effect = (
+            lambda path: path == self.expected_s3_dest
+        )
+
         # Act
         self.onedocker_repository.archive_package(
             self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
@@ -136,6 +265,26 @@ class TestOneDockerPackageRepository(unittest.TestCase):
             self.expected_s3_dest, self.expected_archive_path
         )
 
+    def test_onedockerrepo_archive_package_with_compressed_artifact(self):
+        # Arrange
+        self.onedocker_repository.storage_svc.file_exists.side_effect = lambda path: (
+            path in (self.expected_s3_dest, f"{self.expected_s3_dest}.gz")
+        )
+
+        # Act
+        self.onedocker_repository.archive_package(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+        )
+
+        # Assert
+        self.onedocker_repository.storage_svc.copy.assert_has_calls(
+            [
+                call(self.expected_s3_dest, self.expected_archive_path),
+                call(f"{self.expected_s3_dest}.gz", f"{self.expected_archive_path}.gz"),
+            ]
+        )
+        self.assertEqual(self.onedocker_repository.storage_svc.copy.call_count, 2)
+
     def test_onedockerrepo_archive_nonexisting_package(self):
         # Arrange
         self.onedocker_repository.storage_svc.file_exists.return_value = False
@@ -146,3 +295,292 @@ class TestOneDockerPackageRepository(unittest.TestCase):
                 self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION
             )
             self.onedocker_repository.storage_svc.copy.assert_not_called()
+
+    def _build_manifest(self, *versions: str) -> PackageManifest:
+        return PackageManifest(
+            package_name=self.TEST_PACKAGE_PATH,
+            generation=len(versions),
+            versions={
+                version: PackageVersionEntry(
+                    version=version,
+                    package_size=1048576,
+                    last_modified="Sun Jan 01 01:01:05 2022",
+                    measurements={"sha256": f"sha256-{version}"},
+                )
+                for version in versions
+            },
+        )
+
+    def _get_written_manifest(self) -> PackageManifest:
+        path, data, _ = (
+            self.onedocker_repository.storage_svc.write_conditional.call_args.args
+        )
+        self.assertEqual(path, self.expected_manifest_path)
+        return PackageManifest.from_json(data)
+
+    def test_onedockerrepo_upload_creates_manifest(self):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.list_files_info.side_effect = lambda path: (
+            [
+                FileInfo(
+                    file_name=f"{path}0.9/{self.TEST_PACKAGE_NAME}",
+                    last_modified="Sun Jan 01 01:01:05 2022",
+                    file_size=1024,
+                )
+            ]
+            if "archived" not in path
+            else []
+        )
+
+        # Act
+        self.onedocker_repository.upload(
+            self.TEST_PACKAGE_PATH,
+            self.TEST_PACKAGE_VERSION,
+            "xyz",
+            measurements={MeasurementType.sha256: "sha256-1.0"},
+        )
+
+        # Assert
+        manifest = self._get_written_manifest()
+        # the versions uploaded before the manifest are kept
+        self.assertEqual(list(manifest.versions), ["0.9", self.TEST_PACKAGE_VERSION])
+        self.assertEqual(
+            manifest.versions[self.TEST_PACKAGE_VERSION].measurements,
+            {"sha256": "sha256-1.0"},
+        )
+        self.assertEqual(manifest.versions[self.TEST_PACKAGE_VERSION].etag, "etag-exe")
+        self.assertEqual(manifest.generation, 1)
+        self.assertIsNone(storage_svc.write_conditional.call_args.args[2])
+
+    @patch("onedocker.repository.onedocker_package.time.sleep")
+    def test_onedockerrepo_update_manifest_retries_on_conflict(self, mock_sleep):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.read_versioned.side_effect = [
+            (self._build_manifest("0.9").to_json(), "etag1"),
+            (self._build_manifest("0.9", "0.10").to_json(), "etag2"),
+        ]
+        storage_svc.write_conditional.side_effect = [
+            PreconditionFailedError("conflict"),
+            "etag3",
+        ]
+
+        # Act
+        self.onedocker_repository.upload_delta(
+            self.TEST_PACKAGE_PATH, "0.10", "xyz.delta"
+        )
+
+        # Assert
+        manifest = self._get_written_manifest()
+        self.assertEqual(manifest.versions["0.10"].artifacts, [".delta"])
+        self.assertEqual(manifest.generation, 3)
+        self.assertEqual(storage_svc.write_conditional.call_args.args[2], "etag2")
+        mock_sleep.assert_called_once()
+
+    @patch("onedocker.repository.onedocker_package.time.sleep")
+    def test_onedockerrepo_update_manifest_gives_up(self, mock_sleep):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.read_versioned.return_value = (
+            self._build_manifest("0.9").to_json(),
+            "etag1",
+        )
+        storage_svc.write_conditional.side_effect = PreconditionFailedError("conflict")
+
+        # Act & Assert
+        with self.assertRaises(PreconditionFailedError):
+            self.onedocker_repository.update_manifest(
+                self.TEST_PACKAGE_PATH, lambda manifest: None
+            )
+        self.assertEqual(storage_svc.write_conditional.call_count, 5)
+
+    def test_onedockerrepo_lookups_read_manifest(self):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.read_versioned.return_value = (
+            self._build_manifest("0.9", self.TEST_PACKAGE_VERSION).to_json(),
+            "etag1",
+        )
+
+        # Act
+        versions = self.onedocker_repository.get_package_versions(
+            self.TEST_PACKAGE_PATH
+        )
+        package_info = self.onedocker_repository.get_package_info(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+        )
+        inventory = self.onedocker_repository.get_package_inventory(
+            self.TEST_PACKAGE_PATH, "0.9"
+        )
+
+        # Assert
+        self.assertEqual(versions, ["0.9", self.TEST_PACKAGE_VERSION])
+        self.assertEqual(
+            package_info,
+            PackageInfo(
+                package_name=self.TEST_PACKAGE_PATH,
+                version=self.TEST_PACKAGE_VERSION,
+                last_modified="Sun Jan 01 01:01:05 2022",
+                package_size=1048576,
+            ),
+        )
+        self.assertEqual(list(inventory), ["0.9"])
+        storage_svc.read_versioned.assert_called_with(self.expected_manifest_path)
+        storage_svc.file_exists.assert_not_called()
+        storage_svc.get_file_info.assert_not_called()
+        storage_svc.list_files_info.assert_not_called()
+        storage_svc.list_folders.assert_not_called()
+
+    def test_onedockerrepo_archive_package_from_manifest(self):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        manifest = self._build_manifest(self.TEST_PACKAGE_VERSION)
+        manifest.versions[self.TEST_PACKAGE_VERSION].artifacts = [".gz"]
+        storage_svc.read_versioned.return_value = (manifest.to_json(), "etag1")
+
+        # Act
+        self.onedocker_repository.archive_package(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+        )
+
+        # Assert
+        storage_svc.file_exists.assert_not_called()
+        storage_svc.copy.assert_has_calls(
+            [
+                call(self.expected_s3_dest, self.expected_archive_path),
+                call(f"{self.expected_s3_dest}.gz", f"{self.expected_archive_path}.gz"),
+            ]
+        )
+        self.assertTrue(
+            self._get_written_manifest().versions[self.TEST_PACKAGE_VERSION].archived
+        )
+
+    def test_onedockerrepo_lookups_probe_only_requested_missing_version(self):
+        # Arrange: version 1.0 was uploaded without updating the manifest
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.read_versioned.return_value = (
+            self._build_manifest("0.9").to_json(),
+            "etag1",
+        )
+        storage_svc.file_exists.return_value = True
+        expected_package_info = PackageInfo(
+            package_name=self.TEST_PACKAGE_PATH,
+            version=self.TEST_PACKAGE_VERSION,
+            last_modified="Sun Jan 01 01:01:05 2022",
+            package_size=1048576,
+            etag="etag-exe",
+        )
+
+        # Act
+        versions = self.onedocker_repository.get_package_versions(
+            self.TEST_PACKAGE_PATH
+        )
+        package_info = self.onedocker_repository.get_package_info(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+        )
+        inventory = self.onedocker_repository.get_package_inventory(
+            self.TEST_PACKAGE_PATH
+        )
+        version_inventory = self.onedocker_repository.get_package_inventory(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+        )
+
+        # Assert: only lookups of that very version probe it, until repair_manifest
+        self.assertEqual(versions, ["0.9"])
+        self.assertEqual(package_info, expected_package_info)
+        self.assertEqual(list(inventory), ["0.9"])
+        self.assertEqual(
+            version_inventory, {self.TEST_PACKAGE_VERSION: expected_package_info}
+        )
+        storage_svc.file_exists.assert_called_with(self.expected_s3_dest)
+        storage_svc.list_folders.assert_not_called()
+
+    def test_onedockerrepo_without_manifest_support(self):
+        # Arrange: e.g. GCS, which cannot write files conditionally
+        storage_svc = self.onedocker_repository.storage_svc
+        storage_svc.read_versioned.side_effect = NotImplementedError
+        storage_svc.list_folders.return_value = [self.TEST_PACKAGE_VERSION]
+
+        # Act
+        self.onedocker_repository.upload(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION, "xyz"
+        )
+        versions = self.onedocker_repository.get_package_versions(
+            self.TEST_PACKAGE_PATH
+        )
+
+        # Assert
+        self.assertIsNone(
+            self.onedocker_repository.get_manifest(self.TEST_PACKAGE_PATH)
+        )
+        self.assertEqual(versions, [self.TEST_PACKAGE_VERSION])
+        storage_svc.copy.assert_called_once_with("xyz", self.expected_s3_dest)
+        storage_svc.write_conditional.assert_not_called()
+
+    def test_onedockerrepo_archive_package_not_in_manifest(self):
+        # Arrange
+        self.onedocker_repository.storage_svc.read_versioned.return_value = (
+            self._build_manifest("0.9").to_json(),
+            "etag1",
+        )
+        self.onedocker_repository.storage_svc.file_exists.return_value = False
+
+        # Act & Assert
+        with self.assertRaises(FileNotFoundError):
+            self.onedocker_repository.archive_package(
+                self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION
+            )
+        self.onedocker_repository.storage_svc.copy.assert_not_called()
+
+    def test_onedockerrepo_repair_manifest(self):
+        # Arrange
+        storage_svc = self.onedocker_repository.storage_svc
+        package_folder = f"{self.repository_url}{self.TEST_PACKAGE_PATH}/"
+        archive_folder = f"{self.repository_url}archived/{self.TEST_PACKAGE_PATH}/"
+
+        def list_files_info(path):
+            file_names = {
+                package_folder: [
+                    "manifest.json",
+                    f"0.9/{self.TEST_PACKAGE_NAME}",
+                    f"0.9/{self.TEST_PACKAGE_NAME}.gz",
+                    f"0.9/{self.TEST_PACKAGE_NAME}.unknown",
+                    f"{self.TEST_PACKAGE_VERSION}/{self.TEST_PACKAGE_NAME}",
+                ],
+                archive_folder: [f"0.9/{self.TEST_PACKAGE_NAME}"],
+            }[path]
+            return [
+                FileInfo(
+                    file_name=path + file_name,
+                    last_modified="Mon Jan 02 01:01:05 2022",
+                    file_size=1048576 if file_name.endswith("0.9/exe_name") else 2048,
+                )
+                for file_name in file_names
+            ]
+
+        storage_svc.list_files_info.side_effect = list_files_info
+        # the manifest lost track of version 1.0
+        previous = self._build_manifest("0.9")
+        storage_svc.read_versioned.return_value = (previous.to_json(), "etag1")
+
+        # Act
+        manifest = self.onedocker_repository.repair_manifest(self.TEST_PACKAGE_PATH)
+
+        # Assert
+        self.assertEqual(manifest, self._get_written_manifest())
+        self.assertEqual(list(manifest.versions), ["0.9", self.TEST_PACKAGE_VERSION])
+        self.assertEqual(
+            manifest.versions["0.9"],
+            PackageVersionEntry(
+                version="0.9",
+                package_size=1048576,
+                last_modified="Mon Jan 02 01:01:05 2022",
+                measurements={"sha256": "sha256-0.9"},
+                artifacts=[".gz"],
+                archived=True,
+            ),
+        )
+        self.assertEqual(manifest.versions[self.TEST_PACKAGE_VERSION].measurements, {})
+        self.assertFalse(manifest.versions[self.TEST_PACKAGE_VERSION].archived)
+        self.assertEqual(manifest.generation, 2)
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import hashlib
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from onedocker.repository.onedocker_package_cache import (
+    copy_from_cache,
+    OneDockerPackageCache,
+)
+
+
+class TestOneDockerPackageCache(unittest.TestCase):
+    TEST_PACKAGE_NAME = "project/exe_name"
+    TEST_PACKAGE_VERSION = "1.0"
+    TEST_CONTENT = b"binary"
+    TEST_SHA256 = hashlib.sha256(TEST_CONTENT).hexdigest()
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.cache = OneDockerPackageCache(self.tmp_dir.name, max_size=10)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def _fetch(self, content):
+        def fetch(path):
+            with open(path, "wb") as f:
+                f.write(content)
+
+        return MagicMock(side_effect=fetch)
+
+    def test_install_and_get(self):
+        # Arrange
+        fetch = self._fetch(self.TEST_CONTENT)
+
+        # Act
+        miss = self.cache.get(
+            self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256
+        )
+        entry_path = self.cache.install(
+            self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256, fetch
+        )
+        hit = self.cache.get(
+            self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256
+        )
+
+        # Assert
+        self.assertIsNone(miss)
+        self.assertEqual(hit, entry_path)
+        fetch.assert_called_once()
+        self.assertEqual(os.listdir(os.path.dirname(entry_path)), [self.TEST_SHA256])
+
+    def test_install_sha256_mismatch(self):
+        # Arrange
+        fetch = self._fetch(b"tampered")
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            self.cache.install(
+                self.TEST_PACKAGE_NAME,
+                self.TEST_PACKAGE_VERSION,
+                self.TEST_SHA256,
+                fetch,
+            )
+        self.assertIsNone(
+            self.cache.get(
+                self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256
+            )
+        )
+        self.assertEqual(
+            os.listdir(
+                os.path.join(
+                    self.tmp_dir.name, self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION
+                )
+            ),
+            [],
+        )
+
+    def test_get_corrupted_entry(self):
+        # Arrange
+        entry_path = self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+        with open(entry_path, "wb") as f:
+            f.write(b"corrupted")
+
+        # Act
+        trusted = self.cache.get(
+            self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256
+        )
+        verified = self.cache.get(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            verify=True,
+        )
+
+        # Assert: hits trust the verification at install unless asked to verify again
+        self.assertEqual(trusted, entry_path)
+        self.assertIsNone(verified)
+        self.assertFalse(os.path.exists(entry_path))
+
+    def test_get_does_not_hash_entry(self):
+        # Arrange
+        self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+
+        # Act
+        with patch(
+            "onedocker.repository.onedocker_package_cache.get_file_sha256"
+        ) as mock_get_file_sha256, patch(
+            "onedocker.repository.onedocker_package_cache.os.utime",
+            side_effect=OSError("Read-only file system"),
+        ):
+            hit = self.cache.get(
+                self.TEST_PACKAGE_NAME, self.TEST_PACKAGE_VERSION, self.TEST_SHA256
+            )
+
+        # Assert
+        self.assertIsNotNone(hit)
+        mock_get_file_sha256.assert_not_called()
+
+    def test_evict_least_recently_used(self):
+        # Arrange
+        old_path = self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            "0.9",
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+        os.utime(old_path, (0, 0))
+
+        # Act
+        new_path = self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+
+        # Assert
+        self.assertFalse(os.path.exists(old_path))
+        self.assertTrue(os.path.exists(new_path))
+
+    def test_copy_from_cache(self):
+        # Arrange
+        entry_path = self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+        destination = os.path.join(self.tmp_dir.name, "exe_name")
+
+        # Act
+        copy_from_cache(entry_path, destination)
+
+        # Assert: the entry is executable, so the binary never needs to be changed
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), self.TEST_CONTENT)
+        self.assertEqual(os.stat(destination).st_ino, os.stat(entry_path).st_ino)
+        self.assertTrue(os.access(destination, os.X_OK))
+
+    def test_copy_from_cache_copies_non_executable_entry(self):
+        # Arrange
+        entry_path = self.cache.install(
+            self.TEST_PACKAGE_NAME,
+            self.TEST_PACKAGE_VERSION,
+            self.TEST_SHA256,
+            self._fetch(self.TEST_CONTENT),
+        )
+        os.chmod(entry_path, 0o644)
+        destination = os.path.join(self.tmp_dir.name, "exe_name")
+
+        # Act
+        copy_from_cache(entry_path, destination)
+
+        # Assert
+        self.assertNotEqual(os.stat(destination).st_ino, os.stat(entry_path).st_ino)
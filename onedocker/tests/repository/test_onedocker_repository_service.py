@@ -7,11 +7,14 @@
 # pyre-unsafe
 
 import unittest
-from unittest.mock import MagicMock, patch
+from unittest.mock import call, MagicMock, patch
 
+from fbpcp.error.pcp import PcpError
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.measurement import MeasurementType
 
 from onedocker.entity.metadata import PackageMetadata
+from onedocker.entity.package_manifest import PackageManifest, PackageVersionEntry
 from onedocker.repository.onedocker_repository_service import (
     DEFAULT_PROD_VERSION,
     OneDockerRepositoryService,
@@ -70,9 +73,142 @@ class TestOneDockerRepositoryService(unittest.TestCase):
             self.TEST_PACKAGE_PATH
         )
         self.package_repo.upload.assert_called_with(
-            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION, source_path
+            self.TEST_PACKAGE_PATH,
+            self.TEST_PACKAGE_VERSION,
+            source_path,
+            measurements=expected_measurements,
+        )
+
+    @patch("onedocker.repository.onedocker_repository_service.compress_file")
+    def test_onedocker_repo_service_upload_compressed(self, mock_compress_file) -> None:
+        # Arrange
+        source_path = "test_source_path"
+        self.repo_service.measurement_svc.generate_measurements = MagicMock(
+            return_value={MeasurementType.sha256: self.TEST_MEASUREMENT2}
         )
 
+        # Act
+        self.repo_service.upload(
+            self.TEST_PACKAGE_PATH,
+            self.TEST_PACKAGE_VERSION,
+            source_path,
+            CompressionType.gzip,
+        )
+
+        # Assert
+        compressed_path = mock_compress_file.call_args.args[1]
+        self.assertTrue(compressed_path.endswith(f"{source_path}.gz"))
+        self.package_repo.upload.assert_has_calls(
+            [
+                call(
+                    self.TEST_PACKAGE_PATH,
+                    self.TEST_PACKAGE_VERSION,
+                    source_path,
+                    measurements={MeasurementType.sha256: self.TEST_MEASUREMENT2},
+                ),
+                call(
+                    self.TEST_PACKAGE_PATH,
+                    self.TEST_PACKAGE_VERSION,
+                    compressed_path,
+                    CompressionType.gzip,
+                ),
+            ]
+        )
+        self.metadata_service.put_metadata.assert_called_with(
+            metadata=PackageMetadata(
+                package_name=self.TEST_PACKAGE_PATH,
+                version=self.TEST_PACKAGE_VERSION,
+                measurements={MeasurementType.sha256: self.TEST_MEASUREMENT2},
+                compression=CompressionType.gzip,
+            )
+        )
+
+    @patch("onedocker.repository.onedocker_repository_service.create_delta")
+    def test_onedocker_repo_service_upload_delta(self, mock_create_delta) -> None:
+        # Arrange
+        source_path = "test_source_path"
+        base_version = "0.9"
+        self.metadata_service.get_medadata.return_value = PackageMetadata(
+            package_name=self.TEST_PACKAGE_PATH,
+            version=base_version,
+            measurements={MeasurementType.sha256: "base-sha256-hash"},
+        )
+        self.repo_service.measurement_svc.generate_measurements = MagicMock(
+            side_effect=lambda measurement_types, file_path: {
+                MeasurementType.sha256: (
+                    "base-sha256-hash"
+                    if file_path.endswith(".base")
+                    else self.TEST_MEASUREMENT2
+                )
+            }
+        )
+
+        # Act
+        self.repo_service.upload(
+            self.TEST_PACKAGE_PATH,
+            self.TEST_PACKAGE_VERSION,
+            source_path,
+            delta_base=base_version,
+        )
+
+        # Assert
+        base_path, target_path, delta_path = mock_create_delta.call_args.args
+        self.package_repo.download.assert_called_once_with(
+            self.TEST_PACKAGE_PATH, base_version, base_path
+        )
+        self.assertEqual(target_path, source_path)
+        self.package_repo.upload_delta.assert_called_once_with(
+            self.TEST_PACKAGE_PATH, self.TEST_PACKAGE_VERSION, delta_path
+        )
+        self.metadata_service.put_metadata.assert_called_with(
+            metadata=PackageMetadata(
+                package_name=self.TEST_PACKAGE_PATH,
+                version=self.TEST_PACKAGE_VERSION,
+                measurements={MeasurementType.sha256: self.TEST_MEASUREMENT2},
+                delta_base_version=base_version,
+                delta_base_sha256="base-sha256-hash",
+            )
+        )
+
+    @patch("onedocker.repository.onedocker_repository_service.create_delta")
+    def test_onedocker_repo_service_upload_delta_base_mismatch(
+        self, mock_create_delta
+    ) -> None:
+        # Arrange
+        self.metadata_service.get_medadata.return_value = PackageMetadata(
+            package_name=self.TEST_PACKAGE_PATH,
+            version="0.9",
+            measurements={MeasurementType.sha256: "base-sha256-hash"},
+        )
+        self.repo_service.measurement_svc.generate_measurements = MagicMock(
+            return_value={MeasurementType.sha256: "unexpected"}
+        )
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            self.repo_service.upload(
+                self.TEST_PACKAGE_PATH,
+                self.TEST_PACKAGE_VERSION,
+                "test_source_path",
+                delta_base="0.9",
+            )
+        mock_create_delta.assert_not_called()
+        self.package_repo.upload.assert_not_called()
+
+    def test_onedocker_repo_service_upload_compressed_without_metadata(self) -> None:
+        # Arrange
+        self.repo_service.metadata_svc = None
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            self.repo_service.upload(
+                self.TEST_PACKAGE_PATH,
+                self.TEST_PACKAGE_VERSION,
+                "test_source_path",
+                CompressionType.gzip,
+            )
+        self.package_repo.upload.assert_not_called()
+
     def test_onedocker_repo_service_download(self) -> None:
         # Arrange
         destination = "test_destination_path"
@@ -109,7 +245,10 @@ class TestOneDockerRepositoryService(unittest.TestCase):
         # Assert
         self.package_repo.get_package_versions.assert_not_called()
         self.package_repo.upload.assert_called_with(
-            self.TEST_PACKAGE_PATH, DEFAULT_PROD_VERSION, source_path
+            self.TEST_PACKAGE_PATH,
+            DEFAULT_PROD_VERSION,
+            source_path,
+            measurements=self.repo_service.measurement_svc.generate_measurements.return_value,
         )
 
     def test_get_package_measurements(self) -> None:
@@ -137,3 +276,38 @@ class TestOneDockerRepositoryService(unittest.TestCase):
         self.metadata_service.get_medadata.assert_called_with(
             package_name=self.TEST_PACKAGE_NAME, version=self.TEST_PACKAGE_VERSION
         )
+
+    def test_get_package_measurements_from_manifest(self) -> None:
+        # Arrange
+        self.repo_service.metadata_svc = None
+        self.package_repo.get_manifest.return_value = PackageManifest(
+            package_name=self.TEST_PACKAGE_NAME,
+            versions={
+                self.TEST_PACKAGE_VERSION: PackageVersionEntry(
+                    version=self.TEST_PACKAGE_VERSION,
+                    package_size=1024,
+                    last_modified="Sun Jan 01 01:01:05 2022",
+                    measurements={self.TEST_MEASUREMENT_KEY2: self.TEST_MEASUREMENT2},
+                )
+            },
+        )
+
+        # Act
+        res = self.repo_service.get_package_measurements(
+            package_name=self.TEST_PACKAGE_NAME, version=self.TEST_PACKAGE_VERSION
+        )
+
+        # Assert
+        self.assertEqual({self.TEST_MEASUREMENT_KEY2: self.TEST_MEASUREMENT2}, res)
+        self.package_repo.get_manifest.assert_called_once_with(self.TEST_PACKAGE_NAME)
+
+    def test_get_package_measurements_not_in_manifest(self) -> None:
+        # Arrange
+        self.repo_service.metadata_svc = None
+        self.package_repo.get_manifest.return_value = None
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            self.repo_service.get_package_measurements(
+                package_name=self.TEST_PACKAGE_NAME, version=self.TEST_PACKAGE_VERSION
+            )
@@ -6,6 +6,7 @@
 
 # pyre-unsafe
 
+import json
 import os
 import sys
 import unittest
@@ -21,9 +22,13 @@ from fbpcp.service.container_aws import AWSContainerService
 from fbpcp.service.log_cloudwatch import CloudWatchLogService
 from fbpcp.service.onedocker import OneDockerService
 from fbpcp.util import yaml as util_yaml
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.package_info import PackageInfo
+from onedocker.entity.package_manifest import PackageManifest
 from onedocker.repository.onedocker_package import OneDockerPackageRepository
+from onedocker.repository.onedocker_repository_service import OneDockerRepositoryService
 from onedocker.script.cli.onedocker_cli import __doc__ as __onedocker_cli_doc__, main
+from onedocker.service.measurement import MeasurementService
 
 
 class TestOnedockerCli(unittest.TestCase):
@@ -51,6 +56,7 @@ class TestOnedockerCli(unittest.TestCase):
             "test": False,
             "show": False,
             "stop": False,
+            "repair": False,
             "--help": False,
             "--verbose": False,
             "--package_name": None,
@@ -61,6 +67,9 @@ class TestOnedockerCli(unittest.TestCase):
             "--cmd_args": None,
             "--timeout": None,
             "--container": None,
+            "--compression": None,
+            "--delta_base": None,
+            "--format": "text",
         }
 
         # mock objects for functions
@@ -98,6 +107,21 @@ class TestOnedockerCli(unittest.TestCase):
             "get_package_info",
             MagicMock(return_value=self.package_info),
         ).start()
+        self.mockODPRRepairManifest = patch.object(
+            OneDockerPackageRepository,
+            "repair_manifest",
+            MagicMock(return_value=PackageManifest(package_name=self.package_name)),
+        ).start()
+        self.mockGenerateMeasurements = patch.object(
+            MeasurementService,
+            "generate_measurements",
+            MagicMock(return_value={}),
+        ).start()
+        self.mockODPRGetPackageInventory = patch.object(
+            OneDockerPackageRepository,
+            "get_package_inventory",
+            MagicMock(return_value={self.version: self.package_info}),
+        ).start()
 
         self.mockContainerService = patch.object(
             AWSContainerService,
@@ -352,7 +376,35 @@ class TestOnedockerCli(unittest.TestCase):
         # Assert
         self.mockYamlLoad.assert_called_once()
         self.mockODPRUpload.assert_called_once_with(
-            self.package_name, self.version, self.package_path
+            self.package_name, self.version, self.package_path, measurements={}
+        )
+
+    @patch.object(OneDockerRepositoryService, "upload")
+    def test_upload_compressed_with_delta(self, mockRepoSvcUpload):
+        # Arrange & Act
+        with patch.object(
+            sys,
+            "argv",
+            [
+                "onedocker-cli",
+                "upload",
+                "--config=" + self.config_file,
+                "--package_name=" + self.package_name,
+                "--package_path=" + self.package_path,
+                "--version=" + self.version,
+                "--compression=gzip",
+                "--delta_base=0.9",
+            ],
+        ):
+            main()
+
+        # Assert
+        mockRepoSvcUpload.assert_called_once_with(
+            self.package_name,
+            self.version,
+            self.package_path,
+            CompressionType.gzip,
+            "0.9",
         )
 
     @patch(
@@ -386,7 +438,7 @@ class TestOnedockerCli(unittest.TestCase):
         # Assert
         mockYamlLoad.assert_called_once()
         self.mockODPRUpload.assert_called_once_with(
-            self.package_name, self.version, self.package_path
+            self.package_name, self.version, self.package_path, measurements={}
         )
 
     def test_upload_with_partial_config_throw(self):
@@ -621,7 +673,7 @@ class TestOnedockerCli(unittest.TestCase):
 
         # Assert
         self.mockYamlLoad.assert_called_once()
-        self.mockODPRGetPackageInfo.assert_called_once_with(
+        self.mockODPRGetPackageInventory.assert_called_once_with(
             self.package_name, self.version
         )
 
@@ -650,7 +702,7 @@ class TestOnedockerCli(unittest.TestCase):
 
         # Assert
         mockYamlLoad.assert_called_once()
-        self.mockODPRGetPackageInfo.assert_called_once_with(
+        self.mockODPRGetPackageInventory.assert_called_once_with(
             self.package_name, self.version
         )
 
@@ -699,11 +751,76 @@ class TestOnedockerCli(unittest.TestCase):
 
         # Assert
         self.mockYamlLoad.assert_called_once()
-        self.mockODPRGetPackageVersions.assert_called_once_with(self.package_name)
-        self.mockODPRGetPackageInfo.assert_called_once_with(
-            self.package_name, self.version
+        self.mockODPRGetPackageInventory.assert_called_once_with(
+            self.package_name, None
+        )
+        self.mockODPRGetPackageVersions.assert_not_called()
+        self.mockODPRGetPackageInfo.assert_not_called()
+
+    @patch("builtins.print")
+    def test_show_json(self, mockPrint):
+        # Arrange & Act
+        with patch.object(
+            sys,
+            "argv",
+            [
+                "onedocker-cli",
+                "show",
+                "--config=" + self.config_file,
+                "--package_name=" + self.package_name,
+                "--format=json",
+            ],
+        ):
+            main()
+
+        # Assert
+        self.assertEqual(
+            json.loads(mockPrint.call_args.args[0]),
+            [
+                {
+                    "package_name": self.package_name,
+                    "version": self.version,
+                    "last_modified": "Sun Jan 01 01:01:05 2022",
+                    "package_size": 1048576,
+                    "etag": None,
+                }
+            ],
         )
 
+    def test_show_version_not_found(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-cli",
+                    "show",
+                    "--config=" + self.config_file,
+                    "--package_name=" + self.package_name,
+                    "--version=missing",
+                ],
+            ):
+                main()
+
+    def test_repair(self):
+        # Arrange & Act
+        with patch.object(
+            sys,
+            "argv",
+            [
+                "onedocker-cli",
+                "repair",
+                "--config=" + self.config_file,
+                "--package_name=" + self.package_name,
+            ],
+        ):
+            main()
+
+        # Assert
+        self.mockYamlLoad.assert_called_once()
+        self.mockODPRRepairManifest.assert_called_once_with(self.package_name)
+
     @patch.object(OneDockerService, "stop_containers")
     def test_stop(self, mockOnedockerServiceStopContainers):
         # Arrange
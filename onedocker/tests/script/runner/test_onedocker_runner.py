@@ -6,14 +6,32 @@
 
 # pyre-unsafe
 
+import gzip
+import hashlib
+import importlib.util
+import io
+import json
+import os
+import subprocess
 import sys
+import tempfile
+import threading
 import unittest
+from pathlib import Path
 from unittest.mock import MagicMock, patch
 
 from docopt import docopt
 from fbpcp.entity.certificate_request import CertificateRequest, KeyAlgorithm
-from fbpcp.error.pcp import InvalidParameterError
+from fbpcp.entity.resource_usage import get_run_fingerprint
+from fbpcp.entity.work_item import WorkItem
+from fbpcp.error.pcp import InvalidParameterError, PcpError
+from fbpcp.service.resource_usage_store_local import LocalResourceUsageStore
+from fbpcp.service.work_queue_local import LocalWorkQueueService
+from onedocker.entity.compression import CompressionType
 from onedocker.entity.exit_code import ExitCode
+from onedocker.entity.measurement import MeasurementType
+from onedocker.entity.metadata import PackageMetadata
+from onedocker.repository.onedocker_package_cache import OneDockerPackageCache
 from onedocker.repository.onedocker_repository_service import OneDockerRepositoryService
 from onedocker.repository.opawdl_workflow_instance_repository_local import (
     LocalOPAWDLWorkflowInstanceRepository,
@@ -21,8 +39,12 @@ from onedocker.repository.opawdl_workflow_instance_repository_local import (
 from onedocker.script.runner.onedocker_runner import (
     __doc__ as __onedocker_runner_doc__,
     _gen_opawdl_instance_id,
+    _run_work_item,
     main,
 )
+from onedocker.util.compression import create_delta
+
+HAS_ZSTANDARD: bool = importlib.util.find_spec("zstandard") is not None
 
 
 class TestOnedockerRunner(unittest.TestCase):
@@ -44,6 +66,23 @@ class TestOnedockerRunner(unittest.TestCase):
         )
         self.test_cert_params = expected.convert_to_cert_params()
 
+    def test_import_does_not_load_cloud_sdks(self):
+        # Act
+        loaded = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, onedocker.script.runner.onedocker_runner; "
+                + "print(' '.join(m for m in ('boto3', 'google.cloud', 'kubernetes') if m in sys.modules))",
+            ],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.split()
+
+        # Assert
+        self.assertEqual(loaded, [])
+
     def test_simple_args(self):
         # Arrange
         doc = __onedocker_runner_doc__
@@ -93,7 +132,9 @@ class TestOnedockerRunner(unittest.TestCase):
             main()
         self.assertEqual(
             str(cm.exception),
-            "Usage:\n    onedocker-runner <package_name> --version=<version> [options]",
+            "Usage:\n    onedocker-runner <package_name> --version=<version> [options]\n"
+            "    onedocker-runner serve --work_queue=<work_queue> --queue_name=<queue_name> [options]\n"
+            "    onedocker-runner batch --manifest=<manifest> [options]",
         )
 
     def test_main_local(self):
@@ -117,6 +158,70 @@ class TestOnedockerRunner(unittest.TestCase):
             # Assert
             self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
 
+    def test_main_local_usage_store(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            usage_store_config = {
+                "class": "fbpcp.service.resource_usage_store_local.LocalResourceUsageStore",
+                "constructor": {"root_dir": tmpdir},
+            }
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "echo",
+                    "--version=latest",
+                    "--repository_path=local",
+                    "--exe_path=/usr/bin/",
+                    "--exe_args=test_message",
+                    f"--usage_store={json.dumps(usage_store_config)}",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+            (usage,) = LocalResourceUsageStore(tmpdir).get_usages("echo")
+            self.assertEqual(
+                usage.fingerprint,
+                get_run_fingerprint("echo", "latest", "test_message"),
+            )
+            self.assertEqual(usage.exit_code, 0)
+            self.assertGreater(usage.peak_memory, 0)
+            self.assertGreater(usage.wall_time, 0)
+
+    def test_main_local_telemetry(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            telemetry_path = os.path.join(tmpdir, "telemetry.json")
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "sleep",
+                    "--version=latest",
+                    "--repository_path=local",
+                    "--exe_path=/usr/bin/",
+                    "--exe_args=0.5",
+                    "--telemetry_interval=0.05",
+                    f"--telemetry_path={telemetry_path}",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+            with open(telemetry_path) as f:
+                telemetry = json.load(f)
+        self.assertGreater(len(telemetry["series"]["timestamps"]), 0)
+        self.assertGreater(telemetry["summary"]["rss"]["max"], 0)
+
     def test_main_local_timeout(self):
         # Arrange
         with patch.object(
@@ -208,7 +313,7 @@ class TestOnedockerRunner(unittest.TestCase):
 
     @patch.object(OneDockerRepositoryService, "download")
     @patch("onedocker.script.runner.onedocker_runner.S3Path")
-    @patch("onedocker.script.runner.onedocker_runner.S3StorageService")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
     def test_main(
         self,
         MockS3StorageService,
@@ -242,6 +347,368 @@ class TestOnedockerRunner(unittest.TestCase):
                 "/usr/bin/echo",
             )
 
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch.object(OneDockerRepositoryService, "download")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_package_cache(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceDownload,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+    ):
+        # Arrange
+        content = b"#!/bin/sh\necho $1\n"
+
+        def download(package_name, version, destination):
+            with open(destination, "wb") as f:
+                f.write(content)
+
+        mockOneDockerRepositoryServiceDownload.side_effect = download
+        mockOneDockerRepositoryServiceGetPackageMetadata.return_value = PackageMetadata(
+            package_name="test/echo_test",
+            version="1.0",
+            measurements={MeasurementType.sha256: hashlib.sha256(content).hexdigest()},
+        )
+        metadata_service_config = {
+            "class": "onedocker.service.metadata.MetadataService",
+            "constructor": {
+                "region": "us-west-2",
+                "table_name": "test_table",
+                "key_name": "test_key",
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            argv = [
+                "onedocker-runner",
+                "test/echo_test",
+                "--version=1.0",
+                "--repository_path=test_repo_path",
+                f"--exe_path={tmpdir}/",
+                "--exe_args=test_message",
+                f"--package_cache={tmpdir}/cache",
+                f"--metadata_service={json.dumps(metadata_service_config)}",
+            ]
+            exit_codes = []
+            for _ in range(2):
+                with patch.object(sys, "argv", argv):
+                    with self.assertRaises(SystemExit) as cm:
+                        # Act
+                        main()
+                exit_codes.append(cm.exception.code)
+
+            # Assert
+            self.assertEqual(exit_codes, [ExitCode.SUCCESS, ExitCode.SUCCESS])
+            mockOneDockerRepositoryServiceDownload.assert_called_once()
+            self.assertEqual(
+                mockOneDockerRepositoryServiceGetPackageMetadata.call_count, 2
+            )
+
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_parallel_download(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+    ):
+        # Arrange
+        content = b"#!/bin/sh\necho $1\n"
+
+        def download_file_parallel(source, destination, max_workers):
+            with open(destination, "wb") as f:
+                f.write(content)
+            return hashlib.sha256(content).hexdigest()
+
+        MockS3StorageService.return_value.download_file_parallel.side_effect = (
+            download_file_parallel
+        )
+        # the package has no manifest, then its metadata has an unexpected sha256
+        mockOneDockerRepositoryServiceGetPackageMetadata.side_effect = [
+            PcpError("No manifest"),
+            PackageMetadata(
+                package_name="test/echo_test",
+                version="1.0",
+                measurements={MeasurementType.sha256: "unexpected"},
+            ),
+        ]
+        metadata_service_config = {
+            "class": "onedocker.service.metadata.MetadataService",
+            "constructor": {
+                "region": "us-west-2",
+                "table_name": "test_table",
+                "key_name": "test_key",
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            argv = [
+                "onedocker-runner",
+                "test/echo_test",
+                "--version=1.0",
+                "--repository_path=test_repo_path",
+                f"--exe_path={tmpdir}/",
+                "--exe_args=test_message",
+            ]
+            with patch.dict("os.environ", {"ONEDOCKER_PACKAGE_PARALLEL_DOWNLOAD": "1"}):
+                with patch.object(sys, "argv", argv):
+                    with self.assertRaises(SystemExit) as cm:
+                        # Act
+                        main()
+                with patch.object(
+                    sys,
+                    "argv",
+                    argv
+                    + [f"--metadata_service={json.dumps(metadata_service_config)}"],
+                ):
+                    with self.assertRaises(SystemExit) as cm_mismatch:
+                        main()
+
+            # Assert
+            self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+            self.assertEqual(cm_mismatch.exception.code, ExitCode.SERVICE_UNAVAILABLE)
+            download_file_parallel_mock = (
+                MockS3StorageService.return_value.download_file_parallel
+            )
+            self.assertEqual(download_file_parallel_mock.call_count, 2)
+            self.assertEqual(
+                download_file_parallel_mock.call_args.args[0],
+                "test_repo_pathtest/echo_test/1.0/echo_test",
+            )
+
+    def _run_main_with_delta(
+        self, MockS3StorageService, mockGetPackageMetadata, mockDownload, delta
+    ):
+        base_content = b"#!/bin/sh\necho base $1\n"
+        content = b"#!/bin/sh\necho $1\n"
+        base_sha256 = hashlib.sha256(base_content).hexdigest()
+
+        def download(package_name, version, destination):
+            with open(destination, "wb") as f:
+                f.write(base_content if version == "0.9" else content)
+
+        mockDownload.side_effect = download
+        MockS3StorageService.return_value.read_stream.return_value = io.BytesIO(
+            delta(base_content, content)
+        )
+        mockGetPackageMetadata.return_value = PackageMetadata(
+            package_name="test/echo_test",
+            version="1.0",
+            measurements={MeasurementType.sha256: hashlib.sha256(content).hexdigest()},
+            delta_base_version="0.9",
+            delta_base_sha256=base_sha256,
+        )
+        metadata_service_config = {
+            "class": "onedocker.service.metadata.MetadataService",
+            "constructor": {
+                "region": "us-west-2",
+                "table_name": "test_table",
+                "key_name": "test_key",
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            cache = OneDockerPackageCache(f"{tmpdir}/cache")
+            cache.install(
+                "test/echo_test",
+                "0.9",
+                base_sha256,
+                lambda path: download("test/echo_test", "0.9", path),
+            )
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "test/echo_test",
+                    "--version=1.0",
+                    "--repository_path=test_repo_path",
+                    f"--exe_path={tmpdir}/",
+                    "--exe_args=test_message",
+                    f"--package_cache={tmpdir}/cache",
+                    f"--metadata_service={json.dumps(metadata_service_config)}",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    main()
+            self.assertEqual(
+                Path(tmpdir, "echo_test").read_bytes(),
+                content,
+            )
+        return cm.exception.code
+
+    @unittest.skipUnless(HAS_ZSTANDARD, "zstandard is not installed")
+    @patch.object(OneDockerRepositoryService, "download")
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_delta_download(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+        mockOneDockerRepositoryServiceDownload,
+    ):
+        # Arrange
+        def delta(base_content, content):
+            with tempfile.TemporaryDirectory() as tmpdir:
+                base, target = Path(tmpdir, "base"), Path(tmpdir, "target")
+                base.write_bytes(base_content)
+                target.write_bytes(content)
+                create_delta(str(base), str(target), f"{tmpdir}/delta")
+                return Path(tmpdir, "delta").read_bytes()
+
+        # Act
+        exit_code = self._run_main_with_delta(
+            MockS3StorageService,
+            mockOneDockerRepositoryServiceGetPackageMetadata,
+            mockOneDockerRepositoryServiceDownload,
+            delta,
+        )
+
+        # Assert
+        self.assertEqual(exit_code, ExitCode.SUCCESS)
+        MockS3StorageService.return_value.read_stream.assert_called_once_with(
+            "test_repo_pathtest/echo_test/1.0/echo_test.delta"
+        )
+        mockOneDockerRepositoryServiceDownload.assert_not_called()
+
+    @patch.object(OneDockerRepositoryService, "download")
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_delta_download_fallback(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+        mockOneDockerRepositoryServiceDownload,
+    ):
+        # Arrange & Act
+        exit_code = self._run_main_with_delta(
+            MockS3StorageService,
+            mockOneDockerRepositoryServiceGetPackageMetadata,
+            mockOneDockerRepositoryServiceDownload,
+            lambda base_content, content: b"not a delta",
+        )
+
+        # Assert
+        self.assertEqual(exit_code, ExitCode.SUCCESS)
+        MockS3StorageService.return_value.read_stream.assert_called_once()
+        mockOneDockerRepositoryServiceDownload.assert_called_once()
+
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_compressed_download(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+    ):
+        # Arrange
+        content = b"#!/bin/sh\necho $1\n"
+        MockS3StorageService.return_value.read_stream.return_value = io.BytesIO(
+            gzip.compress(content)
+        )
+        mockOneDockerRepositoryServiceGetPackageMetadata.return_value = PackageMetadata(
+            package_name="test/echo_test",
+            version="1.0",
+            measurements={MeasurementType.sha256: hashlib.sha256(content).hexdigest()},
+            compression=CompressionType.gzip,
+        )
+        metadata_service_config = {
+            "class": "onedocker.service.metadata.MetadataService",
+            "constructor": {
+                "region": "us-west-2",
+                "table_name": "test_table",
+                "key_name": "test_key",
+            },
+        }
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "test/echo_test",
+                    "--version=1.0",
+                    "--repository_path=test_repo_path",
+                    f"--exe_path={tmpdir}/",
+                    "--exe_args=test_message",
+                    f"--metadata_service={json.dumps(metadata_service_config)}",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            with open(os.path.join(tmpdir, "echo_test"), "rb") as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+        MockS3StorageService.return_value.read_stream.assert_called_once_with(
+            "test_repo_pathtest/echo_test/1.0/echo_test.gz"
+        )
+
+    @patch(
+        "onedocker.util.compression._import_zstandard",
+        side_effect=ValueError("zstandard is not installed"),
+    )
+    @patch.object(OneDockerRepositoryService, "download")
+    @patch.object(OneDockerRepositoryService, "get_package_metadata")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_compressed_download_falls_back(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceGetPackageMetadata,
+        mockOneDockerRepositoryServiceDownload,
+        mockImportZstandard,
+    ):
+        # Arrange
+        content = b"#!/bin/sh\necho $1\n"
+
+        def download(package_name, version, destination):
+            with open(destination, "wb") as f:
+                f.write(content)
+
+        mockOneDockerRepositoryServiceDownload.side_effect = download
+        MockS3StorageService.return_value.read_stream.return_value = io.BytesIO(
+            b"zstd compressed"
+        )
+        mockOneDockerRepositoryServiceGetPackageMetadata.return_value = PackageMetadata(
+            package_name="test/echo_test",
+            version="1.0",
+            measurements={MeasurementType.sha256: hashlib.sha256(content).hexdigest()},
+            compression=CompressionType.zstd,
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "test/echo_test",
+                    "--version=1.0",
+                    "--repository_path=test_repo_path",
+                    f"--exe_path={tmpdir}/",
+                    "--exe_args=test_message",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            self.assertEqual(Path(tmpdir, "echo_test").read_bytes(), content)
+        self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+        mockImportZstandard.assert_called_once()
+        mockOneDockerRepositoryServiceDownload.assert_called_once_with(
+            "test/echo_test", "1.0", f"{tmpdir}/echo_test"
+        )
+
     def test_main_bad_cert(self):
         # Arrange
         wrong_cert_params = str(
@@ -293,7 +760,7 @@ class TestOnedockerRunner(unittest.TestCase):
 
     @patch.object(OneDockerRepositoryService, "download")
     @patch("onedocker.script.runner.onedocker_runner.S3Path")
-    @patch("onedocker.script.runner.onedocker_runner.S3StorageService")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
     @patch("onedocker.script.runner.onedocker_runner._run_opawdl")
     def test_main_with_opa_enabled(
         self,
@@ -326,6 +793,258 @@ class TestOnedockerRunner(unittest.TestCase):
             self.assertEqual(cm.exception.code, 0)
             mockOneDockerRunOPAWDL.assert_called_once_with(test_opa_workflow_path)
 
+    def test_main_bootstrap_concurrent(self):
+        # Arrange
+        download_started = threading.Event()
+
+        def prepare_executable(**kwargs):
+            download_started.set()
+            return "/usr/bin/echo"
+
+        def run_opawdl(workflow_path):
+            # the workflow only completes once the download runs alongside it
+            self.assertTrue(download_started.wait(timeout=10))
+
+        with patch.object(
+            sys,
+            "argv",
+            [
+                "onedocker-runner",
+                "echo",
+                "--version=latest",
+                "--repository_path=test_repo_path",
+                "--exe_args=test_message",
+                "--opa_workflow_path=/home/xyz.json",
+            ],
+        ), patch(
+            "onedocker.script.runner.onedocker_runner._prepare_executable",
+            side_effect=prepare_executable,
+        ), patch(
+            "onedocker.script.runner.onedocker_runner._run_opawdl",
+            side_effect=run_opawdl,
+        ) as mockRunOPAWDL:
+            with self.assertRaises(SystemExit) as cm:
+                # Act
+                main()
+
+        # Assert
+        self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+        mockRunOPAWDL.assert_called_once_with("/home/xyz.json")
+
+    def test_main_batch(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            with open(manifest_path, "w") as f:
+                json.dump(
+                    [
+                        {"package_name": "echo", "version": "latest", "exe_args": "a"},
+                        {"package_name": "echo", "version": "latest", "exe_args": "b"},
+                        {"package_name": "false", "version": "latest"},
+                        {
+                            "package_name": "sleep",
+                            "version": "latest",
+                            "exe_args": "10",
+                            "timeout": 1,
+                            "item_id": "slow",
+                        },
+                    ],
+                    f,
+                )
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "batch",
+                    f"--manifest={manifest_path}",
+                    "--repository_path=local",
+                    "--exe_path=/usr/bin/",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            log_dir = f"{manifest_path}.logs"
+            with open(os.path.join(log_dir, "results.json")) as f:
+                results = json.load(f)
+            with open(os.path.join(log_dir, "1.log")) as f:
+                entry_log = f.read()
+        self.assertEqual(cm.exception.code, ExitCode.EXE_ERROR)
+        self.assertEqual(
+            [(r["item_id"], r["exit_code"]) for r in results],
+            [
+                ("0", ExitCode.SUCCESS),
+                ("1", ExitCode.SUCCESS),
+                ("2", ExitCode.EXE_ERROR),
+                ("slow", ExitCode.TIMEOUT),
+            ],
+        )
+        self.assertEqual(entry_log, "b\n")
+
+    def test_main_batch_rejects_invalid_item_ids(self):
+        for item_ids in (["a", "a"], ["../a"], [".."], ["a/b"]):
+            with self.subTest(item_ids=item_ids):
+                # Arrange
+                with tempfile.TemporaryDirectory() as tmpdir:
+                    manifest_path = os.path.join(tmpdir, "manifest.json")
+                    with open(manifest_path, "w") as f:
+                        json.dump(
+                            [
+                                {
+                                    "package_name": "echo",
+                                    "version": "latest",
+                                    "item_id": item_id,
+                                }
+                                for item_id in item_ids
+                            ],
+                            f,
+                        )
+                    with patch.object(
+                        sys,
+                        "argv",
+                        [
+                            "onedocker-runner",
+                            "batch",
+                            f"--manifest={manifest_path}",
+                            "--repository_path=local",
+                            "--exe_path=/usr/bin/",
+                        ],
+                    ):
+                        with self.assertRaises(SystemExit) as cm:
+                            # Act
+                            main()
+
+                    # Assert
+                    self.assertEqual(cm.exception.code, ExitCode.ERROR)
+                    self.assertEqual(os.listdir(tmpdir), ["manifest.json"])
+
+    @patch.object(OneDockerRepositoryService, "download")
+    @patch("onedocker.script.runner.onedocker_runner.S3Path")
+    @patch("fbpcp.service.storage_s3.S3StorageService")
+    def test_main_batch_downloads_once(
+        self,
+        MockS3StorageService,
+        MockS3Path,
+        mockOneDockerRepositoryServiceDownload,
+    ):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            manifest_path = os.path.join(tmpdir, "manifest.json")
+            with open(manifest_path, "w") as f:
+                json.dump(
+                    [
+                        {
+                            "package_name": "echo",
+                            "version": "latest",
+                            "exe_args": str(i),
+                        }
+                        for i in range(5)
+                    ],
+                    f,
+                )
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "batch",
+                    f"--manifest={manifest_path}",
+                    "--repository_path=test_repo_path",
+                    "--exe_path=/usr/bin/",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+        # Assert
+        self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+        mockOneDockerRepositoryServiceDownload.assert_called_once_with(
+            "echo", "latest", "/usr/bin/echo"
+        )
+
+    def test_main_serve(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as tmpdir:
+            work_queue_config = {
+                "class": "fbpcp.service.work_queue_local.LocalWorkQueueService",
+                "constructor": {"root_dir": tmpdir, "poll_interval": 0.01},
+            }
+            work_queue = LocalWorkQueueService(tmpdir)
+            items = [
+                WorkItem(package_name="echo", version="latest", exe_args="hello"),
+                WorkItem(package_name="foo", version="latest"),
+                WorkItem(
+                    package_name="sleep", version="latest", exe_args="2", timeout=1
+                ),
+            ]
+            for item in items:
+                work_queue.put("test_queue", item)
+
+            with patch.object(
+                sys,
+                "argv",
+                [
+                    "onedocker-runner",
+                    "serve",
+                    f"--work_queue={json.dumps(work_queue_config)}",
+                    "--queue_name=test_queue",
+                    "--idle_timeout=1",
+                    "--repository_path=local",
+                    "--exe_path=/usr/bin/",
+                ],
+            ):
+                with self.assertRaises(SystemExit) as cm:
+                    # Act
+                    main()
+
+            # Assert
+            self.assertEqual(cm.exception.code, ExitCode.SUCCESS)
+            results = [work_queue.get("test_queue-results") for _ in items]
+            self.assertEqual(
+                [(r.item_id, r.exit_code) for r in results],
+                [
+                    (items[0].item_id, ExitCode.SUCCESS),
+                    (items[1].item_id, ExitCode.SERVICE_UNAVAILABLE),
+                    (items[2].item_id, ExitCode.TIMEOUT),
+                ],
+            )
+            self.assertIsNone(work_queue.get("test_queue"))
+
+    @patch(
+        "onedocker.script.runner.onedocker_runner._run_cmd_with_usage", return_value=0
+    )
+    @patch(
+        "onedocker.script.runner.onedocker_runner._prepare_executable",
+        return_value="/usr/bin/echo",
+    )
+    def test_run_work_item_prepares_changed_versions(
+        self, mockPrepareExecutable, mockRunCmd
+    ):
+        # Arrange
+        prepared = {}
+        versions = ["1.0", "1.0", "2.0", "1.0", "latest", "latest"]
+
+        # Act
+        for version in versions:
+            _run_work_item(
+                "local",
+                "/usr/bin/",
+                WorkItem(package_name="echo", version=version),
+                prepared,
+            )
+
+        # Assert: the executable on disk is replaced by every other version
+        self.assertEqual(
+            [c.kwargs["version"] for c in mockPrepareExecutable.call_args_list],
+            ["1.0", "2.0", "1.0", "latest", "latest"],
+        )
+        self.assertEqual(prepared, {"echo": "latest"})
+        self.assertEqual(mockRunCmd.call_count, len(versions))
+
     @patch(
         "onedocker.script.runner.onedocker_runner.uuid.uuid4",
         side_effect=[123, 456],
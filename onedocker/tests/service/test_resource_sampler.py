@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import subprocess
+import sys
+import unittest
+
+from onedocker.service.resource_sampler import ResourceSampler
+
+
+class TestResourceSampler(unittest.TestCase):
+    def test_sample_child_process_tree(self):
+        # Arrange
+        busy_loop = (
+            "import time\nend = time.time() + 0.6\nwhile time.time() < end: pass"
+        )
+        cmd = [
+            sys.executable,
+            "-c",
+            f"import subprocess, sys; subprocess.run([sys.executable, '-c', {busy_loop!r}])",
+        ]
+
+        # Act
+        with ResourceSampler(interval=0.05) as sampler:
+            subprocess.run(cmd, check=True)
+        telemetry = sampler.telemetry
+
+        # Assert
+        self.assertGreater(len(telemetry.timestamps), 3)
+        self.assertEqual(len(telemetry.rss), len(telemetry.timestamps))
+        # both the child and the grandchild are sampled
+        self.assertGreater(max(telemetry.rss), 0)
+        self.assertGreaterEqual(max(telemetry.num_threads), 2)
+        self.assertGreater(max(telemetry.cpu_percent), 0)
+
+    def test_stop_without_children(self):
+        # Act
+        sampler = ResourceSampler(interval=0.01)
+        sampler.start()
+        telemetry = sampler.stop()
+
+        # Assert
+        self.assertTrue(all(rss == 0 for rss in telemetry.rss))
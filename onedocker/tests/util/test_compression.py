@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import hashlib
+import importlib.util
+import io
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from onedocker.entity.compression import CompressionType
+from onedocker.util import compression as compression_util
+from onedocker.util.compression import (
+    apply_delta,
+    CHUNK_SIZE,
+    compress_file,
+    create_delta,
+    decompress_stream,
+)
+
+HAS_ZSTANDARD: bool = importlib.util.find_spec("zstandard") is not None
+
+
+class TestCompression(unittest.TestCase):
+    def setUp(self) -> None:
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, "binary")
+        self.content = os.urandom(1024) * 3000
+        with open(self.source, "wb") as f:
+            f.write(self.content)
+
+    def tearDown(self) -> None:
+        self.tmp_dir.cleanup()
+
+    def _round_trip(self, compression: CompressionType) -> None:
+        # Arrange
+        compressed = self.source + compression.suffix
+        destination = os.path.join(self.tmp_dir.name, "decompressed")
+        compress_file(self.source, compressed, compression)
+
+        # Act
+        with open(compressed, "rb") as stream:
+            sha256 = decompress_stream(stream, destination, compression)
+
+        # Assert
+        self.assertLess(os.path.getsize(compressed), len(self.content))
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), self.content)
+        self.assertEqual(sha256, hashlib.sha256(self.content).hexdigest())
+
+    def test_gzip_round_trip(self) -> None:
+        self._round_trip(CompressionType.gzip)
+
+    @unittest.skipUnless(HAS_ZSTANDARD, "zstandard is not installed")
+    def test_zstd_round_trip(self) -> None:
+        self._round_trip(CompressionType.zstd)
+
+    def _round_trip_bounded(self, compression: CompressionType) -> None:
+        # Arrange: the whole compressed stream is read in one chunk
+        chunk_sizes = []
+        write_chunks = compression_util._write_chunks
+
+        def record_chunks(chunks, destination):
+            return write_chunks(
+                (chunk_sizes.append(len(chunk)) or chunk for chunk in chunks),
+                destination,
+            )
+
+        # Act
+        with patch(
+            "onedocker.util.compression._write_chunks", side_effect=record_chunks
+        ):
+            self._round_trip(compression)
+
+        # Assert
+        self.assertLessEqual(max(chunk_sizes), CHUNK_SIZE)
+        self.assertGreaterEqual(len(chunk_sizes), len(self.content) // CHUNK_SIZE)
+
+    def test_gzip_decompression_is_bounded(self) -> None:
+        self._round_trip_bounded(CompressionType.gzip)
+
+    @unittest.skipUnless(HAS_ZSTANDARD, "zstandard is not installed")
+    def test_zstd_decompression_is_bounded(self) -> None:
+        self._round_trip_bounded(CompressionType.zstd)
+
+    def test_gzip_is_deterministic(self) -> None:
+        # Arrange
+        first = self.source + ".1.gz"
+        second = self.source + ".2.gz"
+
+        # Act
+        compress_file(self.source, first, CompressionType.gzip)
+        compress_file(self.source, second, CompressionType.gzip)
+
+        # Assert
+        with open(first, "rb") as f1, open(second, "rb") as f2:
+            self.assertEqual(f1.read(), f2.read())
+
+    def test_decompress_truncated_stream(self) -> None:
+        # Arrange
+        compressed = self.source + ".gz"
+        compress_file(self.source, compressed, CompressionType.gzip)
+        with open(compressed, "rb") as f:
+            truncated = f.read()[:-100]
+
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            decompress_stream(
+                io.BytesIO(truncated),
+                os.path.join(self.tmp_dir.name, "decompressed"),
+                CompressionType.gzip,
+            )
+
+    @unittest.skipUnless(HAS_ZSTANDARD, "zstandard is not installed")
+    def test_delta_round_trip(self) -> None:
+        # Arrange
+        target = os.path.join(self.tmp_dir.name, "target")
+        target_content = self.content[:5000] + b"patch" + self.content[5000:]
+        with open(target, "wb") as f:
+            f.write(target_content)
+        delta = os.path.join(self.tmp_dir.name, "delta")
+        destination = os.path.join(self.tmp_dir.name, "rebuilt")
+        create_delta(self.source, target, delta)
+
+        # Act
+        with open(delta, "rb") as stream:
+            sha256 = apply_delta(self.source, stream, destination)
+
+        # Assert
+        self.assertLess(os.path.getsize(delta), 1024)
+        with open(destination, "rb") as f:
+            self.assertEqual(f.read(), target_content)
+        self.assertEqual(sha256, hashlib.sha256(target_content).hexdigest())
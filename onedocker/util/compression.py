@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-strict
+
+import gzip
+import hashlib
+import os
+import shutil
+import zlib
+from typing import Any, IO, Iterator
+
+from onedocker.entity.compression import CompressionType
+
+CHUNK_SIZE: int = 1024**2
+
+# zstd levels above 19 need much more memory to decompress
+ZSTD_LEVEL = 19
+
+# A delta window spans its base and target, the largest zstd window being 2 GB
+DELTA_MIN_WINDOW_LOG = 27
+DELTA_MAX_WINDOW_LOG = 31
+
+
+def _import_zstandard() -> Any:
+    try:
+        import zstandard
+    except ImportError:
+        raise ValueError(
+            'zstd compression requires the zstandard package: pip install "fbpcp[zstd]"'
+        ) from None
+    return zstandard
+
+
+def compress_file(source: str, destination: str, compression: CompressionType) -> None:
+    with open(source, "rb") as src, open(destination, "wb") as dst:
+        if compression is CompressionType.gzip:
+            with gzip.GzipFile(filename="", fileobj=dst, mode="wb", mtime=0) as gz:
+                shutil.copyfileobj(src, gz, CHUNK_SIZE)
+        else:
+            zstandard = _import_zstandard()
+            zstandard.ZstdCompressor(level=ZSTD_LEVEL, threads=-1).copy_stream(
+                src, dst, read_size=CHUNK_SIZE, write_size=CHUNK_SIZE
+            )
+
+
+def decompress_stream(
+    stream: IO[bytes], destination: str, compression: CompressionType
+) -> str:
+    """Decompress stream chunk by chunk into destination and return the sha256 of the
+    decompressed content, so that neither side is ever held fully in memory.
+    """
+    if compression is CompressionType.gzip:
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        sha256 = _write_chunks(_inflate_chunks(stream, decompressor), destination)
+        if not decompressor.eof:
+            raise ValueError(f"Compressed stream of {destination} is truncated")
+        return sha256
+    return _write_zstd_chunks(
+        _import_zstandard().ZstdDecompressor(), stream, destination
+    )
+
+
+def _get_delta_window_log(size: int) -> int:
+    window_log = max(DELTA_MIN_WINDOW_LOG, (size - 1).bit_length())
+    if window_log > DELTA_MAX_WINDOW_LOG:
+        raise ValueError(
+            f"Base and target of {size} bytes are too large for a binary delta"
+        )
+    return window_log
+
+
+def create_delta(base: str, target: str, destination: str) -> None:
+    """Write a binary delta rebuilding target from base to destination.
+
+    The delta is a zstd frame compressed with base as a raw content dictionary and long
+    distance matching, as done by zstd --patch-from, so the window covers both files and
+    base is read fully in memory.
+    """
+    zstandard = _import_zstandard()
+    with open(base, "rb") as f:
+        base_dict = zstandard.ZstdCompressionDict(
+            f.read(), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    target_size = os.path.getsize(target)
+    params = zstandard.ZstdCompressionParameters.from_level(
+        ZSTD_LEVEL,
+        window_log=_get_delta_window_log(os.path.getsize(base) + target_size),
+        enable_ldm=True,
+        source_size=target_size,
+    )
+    compressor = zstandard.ZstdCompressor(
+        dict_data=base_dict, compression_params=params
+    )
+    with open(target, "rb") as src, open(destination, "wb") as dst:
+        compressor.copy_stream(
+            src, dst, size=target_size, read_size=CHUNK_SIZE, write_size=CHUNK_SIZE
+        )
+
+
+def apply_delta(base: str, stream: IO[bytes], destination: str) -> str:
+    """Rebuild a binary from base and a delta stream written by create_delta, returning
+    the sha256 of the rebuilt binary
+    """
+    zstandard = _import_zstandard()
+    with open(base, "rb") as f:
+        base_dict = zstandard.ZstdCompressionDict(
+            f.read(), dict_type=zstandard.DICT_TYPE_RAWCONTENT
+        )
+    decompressor = zstandard.ZstdDecompressor(
+        dict_data=base_dict, max_window_size=1 << DELTA_MAX_WINDOW_LOG
+    )
+    return _write_zstd_chunks(decompressor, stream, destination)
+
+
+def _inflate_chunks(stream: IO[bytes], decompressor: Any) -> Iterator[bytes]:
+    # each call inflates at most CHUNK_SIZE bytes, however compressible the input
+    for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+        while chunk and not decompressor.eof:
+            yield decompressor.decompress(chunk, CHUNK_SIZE)
+            chunk = decompressor.unconsumed_tail
+    yield decompressor.flush()
+
+
+def _write_zstd_chunks(decompressor: Any, stream: IO[bytes], destination: str) -> str:
+    # reads return at most CHUNK_SIZE decompressed bytes, however compressible the input
+    with decompressor.stream_reader(
+        stream, read_size=CHUNK_SIZE, closefd=False
+    ) as reader:
+        return _write_chunks(iter(lambda: reader.read(CHUNK_SIZE), b""), destination)
+
+
+def _write_chunks(chunks: Iterator[bytes], destination: str) -> str:
+    sha256 = hashlib.sha256()
+    with open(destination, "wb") as dst:
+        for data in chunks:
+            sha256.update(data)
+            dst.write(data)
+    return sha256.hexdigest()
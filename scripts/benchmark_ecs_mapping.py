@@ -0,0 +1,193 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Usage: python3 -m scripts.benchmark_ecs_mapping [--tasks=N] [--tags=N]
+#
+# Micro-benchmark of the ECS response mapping: DescribeTasks responses and cluster tags
+# mapped through the previous implementation (eager f-string debug log, dict based
+# dataclasses, reduce based tag conversion) and through the current bulk mappers.
+import argparse
+import logging
+import timeit
+import tracemalloc
+from dataclasses import dataclass
+from functools import reduce
+from typing import Any, Callable, Dict, List, Optional
+
+from dataclasses_json import dataclass_json
+from fbpcp.entity.container_instance import ContainerInstanceStatus
+from fbpcp.mapper.aws import map_ecstasks_to_containerinstances
+from fbpcp.util.aws import convert_list_to_dict
+
+
+@dataclass_json
+@dataclass
+class LegacyContainerPermissionConfig:
+    role_id: str
+
+
+@dataclass_json
+@dataclass
+class LegacyContainerTimeline:
+    created_at: Optional[float] = None
+    pull_started_at: Optional[float] = None
+    pull_stopped_at: Optional[float] = None
+    started_at: Optional[float] = None
+    stopping_at: Optional[float] = None
+    stopped_at: Optional[float] = None
+
+
+@dataclass_json
+@dataclass
+class LegacyContainerInstance:
+    instance_id: str
+    ip_address: Optional[str] = None
+    status: ContainerInstanceStatus = ContainerInstanceStatus.UNKNOWN
+    cpu: Optional[int] = None
+    memory: Optional[int] = None
+    exit_code: Optional[int] = None
+    permission: Optional[LegacyContainerPermissionConfig] = None
+    stopped_metadata: Optional[Any] = None
+    timeline: Optional[LegacyContainerTimeline] = None
+
+
+LEGACY_TIMELINE_FIELDS = {
+    "createdAt": "created_at",
+    "pullStartedAt": "pull_started_at",
+    "pullStoppedAt": "pull_stopped_at",
+    "startedAt": "started_at",
+    "stoppingAt": "stopping_at",
+    "stoppedAt": "stopped_at",
+}
+
+
+def legacy_convert_list_to_dict(
+    target_list: List[Dict[str, str]], key: str, value: str
+) -> Dict[str, str]:
+    return reduce(lambda x, y: {**x, **{y[key]: y[value]}}, target_list, {})
+
+
+def legacy_map_ecstask(task: Dict[str, Any]) -> LegacyContainerInstance:
+    container = task["containers"][0]
+    logging.debug(f"The ECS task response from AWS: {task}")
+    ip_v4 = (
+        container["networkInterfaces"][0].get("privateIpv4Address")
+        if len(container["networkInterfaces"]) > 0
+        else None
+    )
+    status = container["lastStatus"]
+    if status == "RUNNING":
+        status = ContainerInstanceStatus.STARTED
+    elif status == "STOPPED":
+        if container.get("exitCode") == 0:
+            status = ContainerInstanceStatus.COMPLETED
+        else:
+            status = ContainerInstanceStatus.FAILED
+    else:
+        status = ContainerInstanceStatus.UNKNOWN
+    permission = None
+    overrides = task.get("overrides")
+    if overrides and overrides.get("taskRoleArn"):
+        permission = LegacyContainerPermissionConfig(overrides["taskRoleArn"])
+    timestamps = {
+        field: task[key]
+        for key, field in LEGACY_TIMELINE_FIELDS.items()
+        if task.get(key) is not None
+    }
+    return LegacyContainerInstance(
+        instance_id=task["taskArn"],
+        ip_address=ip_v4,
+        status=status,
+        cpu=int(task["cpu"]) // 1024 if "cpu" in task else None,
+        memory=int(task["memory"]) // 1024 if "memory" in task else None,
+        exit_code=container.get("exitCode"),
+        permission=permission,
+        timeline=LegacyContainerTimeline(**timestamps) if timestamps else None,
+    )
+
+
+def make_task(i: int) -> Dict[str, Any]:
+    return {
+        "taskArn": f"arn:aws:ecs:us-west-2:123456789012:task/cluster/{i:032x}",
+        "cpu": "4096",
+        "memory": "30720",
+        "lastStatus": "RUNNING",
+        "createdAt": 1680805642.1,
+        "pullStartedAt": 1680805650.2,
+        "pullStoppedAt": 1680805660.3,
+        "startedAt": 1680805665.4,
+        "overrides": {"taskRoleArn": "arn:aws:iam::123456789012:role/onedocker"},
+        "containers": [
+            {
+                "name": "onedocker-container",
+                "lastStatus": "RUNNING",
+                "networkInterfaces": [{"privateIpv4Address": f"10.0.{i % 256}.1"}],
+            }
+        ],
+        "attachments": [{"details": [{"name": "subnetId", "value": "subnet-1"}] * 8}],
+    }
+
+
+def make_cluster(i: int, tags: int) -> Dict[str, Any]:
+    return {
+        "clusterArn": f"arn:aws:ecs:us-west-2:123456789012:cluster/c{i}",
+        "clusterName": f"c{i}",
+        "status": "ACTIVE",
+        "pendingTasksCount": 0,
+        "runningTasksCount": i,
+        "tags": [{"key": f"k{t}", "value": f"v{t}"} for t in range(tags)],
+    }
+
+
+def best_of(f: Callable[[], Any], repeat: int = 5) -> float:
+    return min(timeit.repeat(f, number=1, repeat=repeat))
+
+
+def peak_bytes(f: Callable[[], Any]) -> int:
+    tracemalloc.start()
+    result = f()  # noqa: F841 keep the mapped objects alive while measuring
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak
+
+
+def report(name: str, legacy: float, current: float, unit: str) -> None:
+    print(
+        f"{name:<40} legacy {legacy:>12.4f}{unit}  current {current:>12.4f}{unit}  x{legacy / current:.1f}"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--tasks", type=int, default=20000)
+    parser.add_argument("--tags", type=int, default=200)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    tasks = [make_task(i) for i in range(args.tasks)]
+    tags = make_cluster(0, args.tags)["tags"]
+
+    report(
+        f"map {args.tasks} tasks (s)",
+        best_of(lambda: [legacy_map_ecstask(task) for task in tasks]),
+        best_of(lambda: map_ecstasks_to_containerinstances(tasks)),
+        "s",
+    )
+    report(
+        f"map {args.tasks} tasks (MB peak)",
+        peak_bytes(lambda: [legacy_map_ecstask(task) for task in tasks]) / 2**20,
+        peak_bytes(lambda: map_ecstasks_to_containerinstances(tasks)) / 2**20,
+        "MB",
+    )
+    report(
+        f"{args.tags} tags convert_list_to_dict (ms)",
+        best_of(lambda: legacy_convert_list_to_dict(tags, "key", "value")) * 1e3,
+        best_of(lambda: convert_list_to_dict(tags, "key", "value")) * 1e3,
+        "ms",
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# Usage: python3 -m scripts.benchmark_runner_import [--runs=N] [--budget_ms=MS]
+#
+# Import-time benchmark of the OneDocker runner entry point, which is paid on every
+# container start. Each run imports the runner in a fresh interpreter with -X importtime.
+# Exits with 1 if the median import time is over the budget or if a cloud SDK the runner
+# only needs on demand is loaded at import.
+import argparse
+import statistics
+import subprocess
+import sys
+from typing import List, Tuple
+
+RUNNER_MODULE = "onedocker.script.runner.onedocker_runner"
+
+# Median import time of the runner was ~120ms after lazy loading the cloud SDKs, ~700ms before
+DEFAULT_BUDGET_MS = 300
+
+# SDKs that must only be loaded when a download, or a gateway of the matching cloud, is used
+LAZY_MODULES = ["boto3", "botocore", "google.cloud", "kubernetes", "tqdm"]
+
+
+def import_runner() -> Tuple[float, List[str]]:
+    """Import the runner in a fresh interpreter, returning ms taken and lazy modules loaded"""
+    check = (
+        f"import sys; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {RUNNER_MODULE}; {check}"],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    for line in proc.stderr.splitlines():
+        fields = line.split("|")
+        if len(fields) == 3 and fields[2].strip() == RUNNER_MODULE:
+            return int(fields[1]) / 1e3, proc.stdout.split()
+    raise RuntimeError(f"No import time of {RUNNER_MODULE} in:\n{proc.stderr}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--budget_ms", type=float, default=DEFAULT_BUDGET_MS)
+    args = parser.parse_args()
+
+    results = [import_runner() for _ in range(args.runs)]
+    times = [ms for ms, _ in results]
+    loaded = sorted({m for _, modules in results for m in modules})
+    median = statistics.median(times)
+    print(
+        f"import {RUNNER_MODULE}: median {median:.1f}ms, min {min(times):.1f}ms, max {max(times):.1f}ms over {args.runs} runs (budget {args.budget_ms:.0f}ms)"
+    )
+    if loaded:
+        print(f"FAIL: lazily loaded modules imported at startup: {', '.join(loaded)}")
+    if median > args.budget_ms:
+        print(f"FAIL: median import time is over the {args.budget_ms:.0f}ms budget")
+    if loaded or median > args.budget_ms:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
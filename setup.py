@@ -9,7 +9,8 @@
 from setuptools import find_packages, setup
 
 install_requires = [
-    "boto3==1.18.57",
+    # must support PutObject IfMatch/IfNoneMatch conditional writes
+    "boto3==1.35.99",
     "urllib3==1.26.19",
     "dataclasses-json==0.5.2",
     "pyyaml==5.4.1",
@@ -22,6 +23,11 @@ install_requires = [
     "kubernetes==12.0.1",
 ]
 
+extras_require = {
+    # zstd compressed artifacts and binary deltas of OneDocker packages
+    "zstd": ["zstandard==0.23.0"],
+}
+
 with open("README.md", encoding="utf-8") as f:
     long_description = f.read()
 
@@ -33,6 +39,7 @@ setup(
     author_email="researchtool-help@fb.com",
     url="https://github.com/facebookresearch/fbpcp",
     install_requires=install_requires,
+    extras_require=extras_require,
     packages=find_packages(),
     long_description_content_type="text/markdown",
     long_description=long_description,
@@ -12,6 +12,7 @@ from botocore.exceptions import ClientError
 from fbpcp.decorator.error_handler import error_handler
 from fbpcp.error.pcp import LimitExceededError, PcpError, ThrottlingError
 from google.cloud.exceptions import TooManyRequests
+from kubernetes.client.exceptions import ApiException
 
 
 class TestErrorHandler(unittest.TestCase):
@@ -70,6 +71,13 @@ class TestErrorHandler(unittest.TestCase):
 
         self.assertRaises(ThrottlingError, foo)
 
+    def test_k8s_throttling_error(self):
+        @error_handler
+        def foo():
+            raise ApiException(status=429, reason="Too Many Requests")
+
+        self.assertRaises(ThrottlingError, foo)
+
     def test_limit_exceeded_error(self):
         @error_handler
         def foo():
@@ -0,0 +1,39 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import pickle
+import unittest
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+
+from dataclasses_json import dataclass_json
+from fbpcp.decorator.slots import add_slots
+
+
+@dataclass_json
+@add_slots
+@dataclass
+class SlottedEntity:
+    name: str
+    size: Optional[int] = None
+    tags: Dict[str, str] = field(default_factory=dict)
+
+
+class TestSlots(unittest.TestCase):
+    def test_add_slots(self):
+        # Act
+        entity = SlottedEntity("test")
+
+        # Assert
+        self.assertEqual(SlottedEntity.__slots__, ("name", "size", "tags"))
+        self.assertFalse(hasattr(entity, "__dict__"))
+        self.assertEqual((entity.size, entity.tags), (None, {}))
+        with self.assertRaises(AttributeError):
+            entity.other = 1
+        self.assertEqual(SlottedEntity.from_json(entity.to_json()), entity)
+        self.assertEqual(pickle.loads(pickle.dumps(entity)), entity)
@@ -10,7 +10,7 @@ import unittest
 
 from botocore.exceptions import ClientError
 from fbpcp.error.mapper.aws import map_aws_error
-from fbpcp.error.pcp import PcpError, ThrottlingError
+from fbpcp.error.pcp import PcpError, PreconditionFailedError, ThrottlingError
 
 
 class TestMapAwsError(unittest.TestCase):
@@ -53,3 +53,23 @@ class TestMapAwsError(unittest.TestCase):
 
         self.assertIsInstance(err, ThrottlingError)
         self.assertIn(request_id, str(err))
+
+    def test_precondition_failed_error(self):
+        request_id = "0b1bb7b2-7a48-4b2a-9a4e-4b2c0b5a5f3d"
+        err = ClientError(
+            {
+                "Error": {
+                    "Code": "PreconditionFailed",
+                    "Message": "test",
+                },
+                "ResponseMetadata": {
+                    "RequestId": request_id,
+                    "HTTPStatusCode": 412,
+                },
+            },
+            "test",
+        )
+        err = map_aws_error(err)
+
+        self.assertIsInstance(err, PreconditionFailedError)
+        self.assertIn(request_id, str(err))
@@ -10,10 +10,12 @@ import unittest
 from typing import Callable, Dict, List
 from unittest.mock import call, MagicMock, patch
 
+from botocore.exceptions import ClientError
 from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
 from fbpcp.entity.container_definition import ContainerDefinition
 from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
 from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.error.pcp import InvalidParameterError, PcpError
 from fbpcp.gateway.ecs import ECSGateway
 from fbpcp.mapper.aws import map_gb_to_mb, map_vcpu_to_unit
 from fbpcp.util.aws import convert_list_to_dict, get_container_definition_id
@@ -145,6 +147,89 @@ class TestECSGateway(unittest.TestCase):
             },
         )
 
+    def test_run_tasks(self) -> None:
+        # Arrange
+        self.gw.client.run_task = MagicMock(
+            return_value={
+                "tasks": [
+                    {
+                        "containers": [
+                            {
+                                "name": self.TEST_CONTAINER,
+                                "lastStatus": "PENDING",
+                                "networkInterfaces": [],
+                            }
+                        ],
+                        "taskArn": task_arn,
+                    }
+                    for task_arn in (self.TEST_TASK_ARN, self.TEST_TASK_ARN_2)
+                ],
+                "failures": [{"reason": "RESOURCE:CPU"}],
+            }
+        )
+
+        # Act
+        tasks = self.gw.run_tasks(
+            self.TEST_TASK_DEFINITION,
+            self.TEST_CONTAINER,
+            self.TEST_CMD,
+            self.TEST_CLUSTER,
+            self.TEST_SUBNETS,
+            count=3,
+        )
+
+        # Assert
+        self.assertEqual(
+            [task.instance_id for task in tasks],
+            [self.TEST_TASK_ARN, self.TEST_TASK_ARN_2],
+        )
+        self.gw.client.run_task.assert_called_once_with(
+            taskDefinition=self.TEST_TASK_DEFINITION,
+            cluster=self.TEST_CLUSTER,
+            networkConfiguration={
+                "awsvpcConfiguration": {
+                    "subnets": self.TEST_SUBNETS,
+                    "assignPublicIp": "ENABLED",
+                }
+            },
+            overrides={
+                "containerOverrides": [
+                    {
+                        "name": self.TEST_CONTAINER,
+                        "command": [self.TEST_CMD],
+                        "environment": [],
+                    }
+                ],
+            },
+            count=3,
+        )
+
+    def test_run_tasks_errors(self) -> None:
+        # Arrange
+        self.gw.client.run_task = MagicMock(
+            return_value={"tasks": [], "failures": [{"reason": "RESOURCE:MEMORY"}]}
+        )
+
+        # Act & Assert
+        with self.assertRaises(InvalidParameterError):
+            self.gw.run_tasks(
+                self.TEST_TASK_DEFINITION,
+                self.TEST_CONTAINER,
+                self.TEST_CMD,
+                self.TEST_CLUSTER,
+                self.TEST_SUBNETS,
+                count=11,
+            )
+        with self.assertRaisesRegex(PcpError, "RESOURCE:MEMORY"):
+            self.gw.run_tasks(
+                self.TEST_TASK_DEFINITION,
+                self.TEST_CONTAINER,
+                self.TEST_CMD,
+                self.TEST_CLUSTER,
+                self.TEST_SUBNETS,
+                count=2,
+            )
+
     def test_describe_task(self) -> None:
         client_return_response = {
             "tasks": [
@@ -385,6 +470,108 @@ class TestECSGateway(unittest.TestCase):
         self.assertEqual(list(tasks), expected_tasks)
         self.assertEqual(self.gw.client.list_tasks.call_count, 2)
 
+    def test_iter_cluster_instances(self) -> None:
+        # Arrange
+        pages = {
+            None: {"taskArns": [f"arn-{i}" for i in range(150)], "nextToken": "t1"},
+            "t1": {"taskArns": [f"arn-{i}" for i in range(150, 200)]},
+        }
+        self.gw.client.list_tasks = MagicMock(
+            side_effect=lambda **kwargs: pages[kwargs.get("nextToken")]
+        )
+        self.gw.client.describe_tasks = MagicMock(
+            side_effect=lambda cluster, tasks: {
+                "tasks": [
+                    {
+                        "taskArn": arn,
+                        "containers": [
+                            {"lastStatus": "RUNNING", "networkInterfaces": []}
+                        ],
+                    }
+                    # one task disappeared before it was described
+                    for arn in tasks
+                    if arn != "arn-42"
+                ],
+                "failures": (
+                    [{"arn": "arn-42", "reason": "MISSING"}]
+                    if "arn-42" in tasks
+                    else []
+                ),
+            }
+        )
+        self.gw.create_ecs_client = MagicMock(return_value=self.gw.client)
+
+        # Act
+        instances = list(
+            self.gw.iter_cluster_instances(
+                self.TEST_CLUSTER, desired_status="RUNNING", max_workers=2
+            )
+        )
+
+        # Assert
+        self.assertEqual(
+            sorted(instance.instance_id for instance in instances),
+            sorted(f"arn-{i}" for i in range(200) if i != 42),
+        )
+        self.assertEqual(
+            sorted(
+                len(c.kwargs["tasks"])
+                for c in self.gw.client.describe_tasks.call_args_list
+            ),
+            [50, 50, 100],
+        )
+        self.gw.client.list_tasks.assert_has_calls(
+            [
+                call(cluster=self.TEST_CLUSTER, desiredStatus="RUNNING"),
+                call(
+                    cluster=self.TEST_CLUSTER, nextToken="t1", desiredStatus="RUNNING"
+                ),
+            ]
+        )
+
+    def test_iter_cluster_instances_maps_errors_raised_mid_iteration(self) -> None:
+        # Arrange
+        pages = {
+            None: {"taskArns": [f"arn-{i}" for i in range(100)], "nextToken": "t1"},
+            "t1": {"taskArns": [f"arn-{i}" for i in range(100, 200)]},
+        }
+        self.gw.client.list_tasks = MagicMock(
+            side_effect=lambda **kwargs: pages[kwargs.get("nextToken")]
+        )
+        self.gw.client.describe_tasks = MagicMock(
+            side_effect=[
+                {
+                    "tasks": [
+                        {
+                            "taskArn": f"arn-{i}",
+                            "containers": [
+                                {"lastStatus": "RUNNING", "networkInterfaces": []}
+                            ],
+                        }
+                        for i in range(100)
+                    ],
+                    "failures": [],
+                },
+                ClientError(
+                    {
+                        "Error": {"Code": "InvalidParameterException", "Message": ""},
+                        "ResponseMetadata": {},
+                    },
+                    "DescribeTasks",
+                ),
+            ]
+        )
+        self.gw.create_ecs_client = MagicMock(return_value=self.gw.client)
+
+        # Act
+        instances = self.gw.iter_cluster_instances(self.TEST_CLUSTER, max_workers=1)
+        first = next(instances)
+
+        # Assert
+        self.assertEqual(first.instance_id, "arn-0")
+        with self.assertRaises(InvalidParameterError):
+            list(instances)
+
     def test_describe_clusers(self) -> None:
         test_tasks = 100
         client_return_response = {
@@ -485,6 +672,25 @@ class TestECSGateway(unittest.TestCase):
 
         self.describe_task_definition(test_function)
 
+    def test_describe_task_definition_in_parallel_reuses_clients(self) -> None:
+        # Arrange
+        self.gw.create_ecs_client = MagicMock(side_effect=lambda: MagicMock())
+        self.gw._describe_task_definition_core = MagicMock(
+            side_effect=lambda client, arn: client
+        )
+
+        # Act
+        first = self.gw.describe_task_definitions_in_parallel(
+            task_definitions=["arn-1", "arn-2", "arn-3"], max_workers=1
+        )
+        second = self.gw.describe_task_definitions_in_parallel(
+            task_definitions=["arn-4"], max_workers=1
+        )
+
+        # Assert
+        self.assertEqual(self.gw.create_ecs_client.call_count, 1)
+        self.assertEqual(len({id(client) for client in first + second}), 1)
+
     def describe_task_definition(
         self,
         describe_task_definitions_function: Callable[
@@ -10,7 +10,8 @@ import unittest
 from unittest.mock import MagicMock, patch
 
 from botocore.exceptions import ClientError
-from fbpcp.error.pcp import PcpError
+from botocore.stub import Stubber
+from fbpcp.error.pcp import PcpError, PreconditionFailedError
 from fbpcp.gateway.s3 import S3Gateway
 
 TEST_LOCAL_FILE = "test-local-file"
@@ -68,6 +69,112 @@ class TestS3Gateway(unittest.TestCase):
         gw.download_file(TEST_BUCKET, TEST_FILE, TEST_LOCAL_FILE)
         gw.client.download_file.assert_called()
 
+    @patch("boto3.client")
+    def test_get_object_range(self, BotoClient):
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        gw.client.get_object.return_value = {"Body": MagicMock(read=lambda: b"abc")}
+        self.assertEqual(gw.get_object_range(TEST_BUCKET, TEST_FILE, 2, 4), b"abc")
+        gw.client.get_object.assert_called_with(
+            Bucket=TEST_BUCKET, Key=TEST_FILE, Range="bytes=2-4"
+        )
+
+    @patch("boto3.client")
+    def test_get_object_stream(self, BotoClient):
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        body = MagicMock()
+        gw.client.get_object.return_value = {"Body": body}
+        self.assertIs(gw.get_object_stream(TEST_BUCKET, TEST_FILE), body)
+        gw.client.get_object.assert_called_with(Bucket=TEST_BUCKET, Key=TEST_FILE)
+
+    @patch("boto3.client")
+    def test_put_object_conditional(self, BotoClient):
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        gw.client.put_object.return_value = {"ETag": '"etag2"'}
+        self.assertEqual(
+            gw.put_object_conditional(TEST_BUCKET, TEST_FILE, "data", '"etag1"'),
+            '"etag2"',
+        )
+        gw.client.put_object.assert_called_with(
+            Bucket=TEST_BUCKET, Key=TEST_FILE, Body=b"data", IfMatch='"etag1"'
+        )
+        gw.put_object_conditional(TEST_BUCKET, TEST_FILE, "data", None)
+        gw.client.put_object.assert_called_with(
+            Bucket=TEST_BUCKET, Key=TEST_FILE, Body=b"data", IfNoneMatch="*"
+        )
+
+    def test_put_object_conditional_matches_service_model(self):
+        # Arrange: a real client validates the request against the botocore S3 model
+        gw = S3Gateway(REGION, TEST_ACCESS_KEY_ID, TEST_ACCESS_KEY_DATA)
+        with Stubber(gw.client) as stubber:
+            stubber.add_response(
+                "put_object",
+                {"ETag": '"etag2"'},
+                {
+                    "Bucket": TEST_BUCKET,
+                    "Key": TEST_FILE,
+                    "Body": b"data",
+                    "IfMatch": '"etag1"',
+                },
+            )
+            stubber.add_response(
+                "put_object",
+                {"ETag": '"etag1"'},
+                {
+                    "Bucket": TEST_BUCKET,
+                    "Key": TEST_FILE,
+                    "Body": b"data",
+                    "IfNoneMatch": "*",
+                },
+            )
+
+            # Act & Assert
+            self.assertEqual(
+                gw.put_object_conditional(TEST_BUCKET, TEST_FILE, "data", '"etag1"'),
+                '"etag2"',
+            )
+            self.assertEqual(
+                gw.put_object_conditional(TEST_BUCKET, TEST_FILE, "data", None),
+                '"etag1"',
+            )
+            stubber.assert_no_pending_responses()
+
+    @patch("boto3.client")
+    def test_put_object_conditional_precondition_failed(self, BotoClient):
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        gw.client.put_object.side_effect = ClientError(
+            {
+                "Error": {"Code": "PreconditionFailed", "Message": "test"},
+                "ResponseMetadata": {"HTTPStatusCode": 412},
+            },
+            "PutObject",
+        )
+        with self.assertRaises(PreconditionFailedError):
+            gw.put_object_conditional(TEST_BUCKET, TEST_FILE, "data", '"etag1"')
+
+    @patch("boto3.client")
+    def test_get_object_with_etag(self, BotoClient):
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        gw.client.get_object.return_value = {
+            "Body": MagicMock(read=lambda: b"data"),
+            "ETag": '"etag1"',
+        }
+        self.assertEqual(
+            gw.get_object_with_etag(TEST_BUCKET, TEST_FILE), ("data", '"etag1"')
+        )
+        gw.client.get_object.side_effect = ClientError(
+            {
+                "Error": {"Code": "NoSuchKey", "Message": "test"},
+                "ResponseMetadata": {"HTTPStatusCode": 404},
+            },
+            "GetObject",
+        )
+        self.assertIsNone(gw.get_object_with_etag(TEST_BUCKET, TEST_FILE))
+
     @patch("boto3.client")
     def test_delete_object(self, BotoClient):
         gw = S3Gateway(REGION)
@@ -184,6 +291,19 @@ class TestS3Gateway(unittest.TestCase):
         self.assertEqual(key_list, expected_key_list)
         gw.client.get_paginator("list_object_v2").paginate.assert_called()
 
+    @patch("boto3.client")
+    def test_list_objects_info(self, BotoClient):
+        contents = [{"Key": "key1", "Size": 1}, {"Key": "key2", "Size": 2}]
+        gw = S3Gateway(REGION)
+        gw.client = BotoClient()
+        gw.client.get_paginator("list_objects_v2").paginate = MagicMock(
+            return_value=[{"Contents": contents[:1]}, {"Contents": contents[1:]}, {}]
+        )
+        self.assertEqual(gw.list_objects_info(TEST_BUCKET, "prefix/"), contents)
+        gw.client.get_paginator("list_objects_v2").paginate.assert_called_with(
+            Bucket=TEST_BUCKET, Prefix="prefix/"
+        )
+
     @patch("boto3.client")
     def test_auth_keys(self, mock_boto_client):
         gateway = S3Gateway(REGION, TEST_ACCESS_KEY_ID, TEST_ACCESS_KEY_DATA)
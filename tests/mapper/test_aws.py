@@ -7,11 +7,15 @@
 # pyre-unsafe
 
 import unittest
+from datetime import datetime, timezone
 from decimal import Decimal
+from unittest.mock import ANY, patch
 
 from fbpcp.entity.cloud_cost import CloudCost, CloudCostItem
 from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
 from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_metadata import ContainerTimeline
+from fbpcp.entity.container_permission import ContainerPermissionConfig
 from fbpcp.entity.policy_statement import PolicyStatement
 from fbpcp.entity.route_table import Route, RouteState, RouteTarget, RouteTargetType
 from fbpcp.entity.subnet import Subnet
@@ -21,6 +25,7 @@ from fbpcp.mapper.aws import (
     map_ec2route_to_route,
     map_ec2subnet_to_subnet,
     map_ecstask_to_containerinstance,
+    map_ecstasks_to_containerinstances,
     map_esccluster_to_clusterinstance,
     map_gb_to_mb,
     map_vcpu_to_unit,
@@ -130,6 +135,77 @@ class TestAWSMapper(unittest.TestCase):
         # Assert
         self.assertEqual(tasks_list, expected_task_list)
 
+    @patch("fbpcp.mapper.aws.logging.debug")
+    def test_map_ecstasks_to_containerinstances(self, mock_debug):
+        # Arrange
+        role_arn = "test-role-arn"
+        ecs_tasks = [
+            {
+                "containers": [
+                    {
+                        "lastStatus": "RUNNING",
+                        "networkInterfaces": [
+                            {"privateIpv4Address": self.TEST_IP_ADDRESS}
+                        ],
+                    },
+                ],
+                "taskArn": f"{self.TEST_TASK_ARN}-{i}",
+                "overrides": {"taskRoleArn": role_arn},
+            }
+            for i in range(2)
+        ]
+
+        # Act
+        containers = map_ecstasks_to_containerinstances(ecs_tasks)
+
+        # Assert
+        self.assertEqual(
+            containers,
+            [map_ecstask_to_containerinstance(task) for task in ecs_tasks],
+        )
+        self.assertEqual(containers[0].permission, ContainerPermissionConfig(role_arn))
+        # instances do not share their mutable permission
+        self.assertIsNot(containers[0].permission, containers[1].permission)
+        # the task is only formatted by the logger, when debug logging is enabled
+        mock_debug.assert_called_with(ANY, ecs_tasks[1])
+
+    def test_map_ecstask_to_containerinstance_with_timeline(self):
+        # Arrange
+        created_at = datetime(2023, 4, 6, 18, 0, 0, tzinfo=timezone.utc)
+        ecs_task = {
+            "containers": [
+                {"lastStatus": "RUNNING", "networkInterfaces": []},
+            ],
+            "taskArn": self.TEST_TASK_ARN,
+            "createdAt": created_at,
+            "pullStartedAt": datetime(2023, 4, 6, 18, 0, 20, tzinfo=timezone.utc),
+            "pullStoppedAt": datetime(2023, 4, 6, 18, 0, 50, tzinfo=timezone.utc),
+            "startedAt": datetime(2023, 4, 6, 18, 0, 52, 500000, tzinfo=timezone.utc),
+        }
+
+        # Act
+        container = map_ecstask_to_containerinstance(ecs_task)
+
+        # Assert
+        self.assertEqual(
+            container.timeline,
+            ContainerTimeline(
+                created_at=created_at.timestamp(),
+                pull_started_at=created_at.timestamp() + 20,
+                pull_stopped_at=created_at.timestamp() + 50,
+                started_at=created_at.timestamp() + 52.5,
+            ),
+        )
+        self.assertEqual(
+            container.timeline.get_phase_durations(),
+            {
+                "provisioning": 20000,
+                "image_pull": 30000,
+                "container_start": 2500,
+                "launch": 52500,
+            },
+        )
+
     def test_map_esccluster_to_clusterinstance(self):
         tag_key_1 = "tag-key-1"
         tag_key_2 = "tag-key-2"
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import unittest
+from datetime import datetime, timezone
+
+from fbpcp.entity.container_instance import ContainerInstanceStatus
+from fbpcp.mapper.k8s import map_k8spod_to_containerinstance
+from kubernetes import client
+
+
+class TestK8sMapper(unittest.TestCase):
+    TEST_INSTANCE_ID = "fbpcp-job/0"
+    TEST_TIME = datetime(2022, 1, 1, tzinfo=timezone.utc)
+
+    def _pod(self, phase, state=None, pod_ip=None):
+        return client.V1Pod(
+            metadata=client.V1ObjectMeta(creation_timestamp=self.TEST_TIME),
+            status=client.V1PodStatus(
+                phase=phase,
+                pod_ip=pod_ip,
+                container_statuses=[
+                    client.V1ContainerStatus(
+                        name="main",
+                        image="image",
+                        image_id="",
+                        ready=False,
+                        restart_count=0,
+                        state=state or client.V1ContainerState(),
+                    )
+                ],
+            ),
+        )
+
+    def test_map_k8spod_to_containerinstance(self):
+        # Arrange
+        running = client.V1ContainerState(
+            running=client.V1ContainerStateRunning(started_at=self.TEST_TIME)
+        )
+        terminated = client.V1ContainerState(
+            terminated=client.V1ContainerStateTerminated(
+                exit_code=2, started_at=self.TEST_TIME, finished_at=self.TEST_TIME
+            )
+        )
+
+        # Act
+        pending = map_k8spod_to_containerinstance(
+            self._pod("Pending"), self.TEST_INSTANCE_ID
+        )
+        started = map_k8spod_to_containerinstance(
+            self._pod("Running", running, "10.0.0.1"), self.TEST_INSTANCE_ID
+        )
+        failed = map_k8spod_to_containerinstance(
+            self._pod("Failed", terminated), self.TEST_INSTANCE_ID
+        )
+        deleted = map_k8spod_to_containerinstance(
+            self._pod("Pending"), self.TEST_INSTANCE_ID, deleted=True
+        )
+
+        # Assert
+        self.assertEqual(
+            (pending.status, pending.ip_address),
+            (ContainerInstanceStatus.UNKNOWN, None),
+        )
+        self.assertEqual(
+            (started.status, started.ip_address),
+            (ContainerInstanceStatus.STARTED, "10.0.0.1"),
+        )
+        self.assertEqual(started.timeline.started_at, self.TEST_TIME.timestamp())
+        self.assertEqual(
+            (failed.status, failed.exit_code), (ContainerInstanceStatus.FAILED, 2)
+        )
+        self.assertEqual(failed.timeline.stopped_at, self.TEST_TIME.timestamp())
+        self.assertEqual(deleted.status, ContainerInstanceStatus.FAILED)
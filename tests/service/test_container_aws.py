@@ -7,8 +7,10 @@
 # pyre-unsafe
 
 import math
+import threading
 import unittest
 from typing import List
+from unittest import IsolatedAsyncioTestCase
 from unittest.mock import call, MagicMock, patch
 from uuid import uuid4
 
@@ -20,6 +22,7 @@ from fbpcp.entity.container_permission import ContainerPermissionConfig
 from fbpcp.entity.container_type import ContainerType, ContainerTypeConfig
 from fbpcp.error.pcp import PcpError
 from fbpcp.service.container_aws import AWS_API_INPUT_SIZE_LIMIT, AWSContainerService
+from fbpcp.util.container_instance_cache import ContainerInstanceCache
 
 TEST_INSTANCE_ID_1 = "test-instance-id-1"
 TEST_INSTANCE_ID_2 = "test-instance-id-2"
@@ -261,6 +264,56 @@ class TestAWSContainerService(unittest.TestCase):
             self.container_svc.ecs_gateway.run_task.call_count, len(run_task_calls)
         )
 
+    def test_create_instances_batches_identical_launches(self):
+        # Arrange
+        launched = iter(range(100))
+
+        def run_tasks(count, **kwargs):
+            # ECS only places 8 of the first 10 tasks
+            return [
+                ContainerInstance(f"{kwargs['cmd']}-{next(launched)}")
+                for _ in range(min(count, 8))
+            ]
+
+        self.container_svc.ecs_gateway.run_tasks = MagicMock(side_effect=run_tasks)
+        self.container_svc.ecs_gateway.run_task = MagicMock(
+            side_effect=lambda **kwargs: ContainerInstance(
+                f"{kwargs['cmd']}-{next(launched)}"
+            )
+        )
+        cmd_list = [TEST_CMD_1] * 6 + [TEST_CMD_2] + [TEST_CMD_1] * 6
+
+        # Act
+        container_instances = self.container_svc.create_instances(
+            container_definition=f"{TEST_TASK_DEFNITION}#{TEST_CONTAINER_DEFNITION}",
+            cmds=cmd_list,
+            env_vars=TEST_ENV_VARS,
+        )
+
+        # Assert
+        self.assertEqual(
+            [c.instance_id.rsplit("-", 1)[0] for c in container_instances], cmd_list
+        )
+        self.assertEqual(len({c.instance_id for c in container_instances}), 13)
+        self.assertEqual(
+            [
+                c.kwargs["count"]
+                for c in self.container_svc.ecs_gateway.run_tasks.call_args_list
+            ],
+            [10, 2, 2],
+        )
+        self.container_svc.ecs_gateway.run_task.assert_called_once_with(
+            task_definition=TEST_TASK_DEFNITION,
+            container=TEST_CONTAINER_DEFNITION,
+            cmd=TEST_CMD_2,
+            cluster=TEST_CLUSTER,
+            subnets=TEST_SUBNETS,
+            env_vars=TEST_ENV_VARS,
+            cpu=None,
+            memory=None,
+            task_role_arn=None,
+        )
+
     def test_create_instances_throw_with_invalid_list_of_env_vars(self):
         # Arrange
         cmd_list = [TEST_CMD_1, TEST_CMD_2, TEST_CMD_2]
@@ -361,8 +414,13 @@ class TestAWSContainerService(unittest.TestCase):
             for instance_id in instance_ids[AWS_API_INPUT_SIZE_LIMIT:num_instances]
         ]
 
+        shards = {
+            instance_ids[0]: expected_container_shard_0,
+            instance_ids[AWS_API_INPUT_SIZE_LIMIT]: expected_container_shard_1,
+        }
+        # batches are described concurrently, so the mock answers by batch content
         self.container_svc.ecs_gateway.describe_tasks = MagicMock(
-            side_effect=[expected_container_shard_0, expected_container_shard_1]
+            side_effect=lambda cluster, ids: shards[ids[0]]
         )
 
         calls = [
@@ -378,7 +436,7 @@ class TestAWSContainerService(unittest.TestCase):
 
         # Assert
         self.container_svc.ecs_gateway.describe_tasks.assert_has_calls(
-            calls, any_order=False
+            calls, any_order=True
         )
         self.assertEqual(
             self.container_svc.ecs_gateway.describe_tasks.call_count,
@@ -412,9 +470,77 @@ class TestAWSContainerService(unittest.TestCase):
     def test_cancel_instances(self):
         instance_ids = [TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2]
         errors = [None, PcpError("instance id not found")]
-        self.container_svc.ecs_gateway.stop_task = MagicMock(side_effect=errors)
+        id_to_error = dict(zip(instance_ids, errors))
+
+        def stop_task(cluster, task_id):
+            if id_to_error[task_id]:
+                raise id_to_error[task_id]
+
+        self.container_svc.ecs_gateway.stop_task = MagicMock(side_effect=stop_task)
         self.assertEqual(self.container_svc.cancel_instances(instance_ids), errors)
 
+    def test_cancel_instances_with_timeout(self):
+        # Arrange
+        instance_ids = [TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2]
+        release = threading.Event()
+
+        def stop_task(cluster, task_id):
+            if task_id == TEST_INSTANCE_ID_2:
+                release.wait(5)
+
+        self.container_svc.ecs_gateway.stop_task = MagicMock(side_effect=stop_task)
+
+        # Act
+        res = self.container_svc.cancel_instances(instance_ids, timeout=0.2)
+        release.set()
+
+        # Assert
+        self.assertIsNone(res[0])
+        self.assertIsInstance(res[1], PcpError)
+
+    def test_get_instances_rate_limited(self):
+        # Arrange
+        num_instances = 3 * AWS_API_INPUT_SIZE_LIMIT
+        instance_ids = [str(uuid4()) for _ in range(num_instances)]
+        self.container_svc.rate_limiter = MagicMock()
+        self.container_svc.ecs_gateway.describe_tasks = MagicMock(
+            side_effect=lambda cluster, ids: [None] * len(ids)
+        )
+
+        # Act
+        instances = self.container_svc.get_instances(instance_ids)
+
+        # Assert
+        self.assertEqual(instances, [None] * num_instances)
+        self.assertEqual(self.container_svc.rate_limiter.acquire.call_count, 3)
+
+    def test_get_instances_with_cache(self):
+        # Arrange
+        self.container_svc.cache = ContainerInstanceCache()
+        completed = ContainerInstance(
+            TEST_INSTANCE_ID_1, TEST_IP_ADDRESS, ContainerInstanceStatus.COMPLETED
+        )
+        started = ContainerInstance(
+            TEST_INSTANCE_ID_2, TEST_IP_ADDRESS, ContainerInstanceStatus.STARTED
+        )
+        self.container_svc.ecs_gateway.describe_tasks = MagicMock(
+            return_value=[completed, started]
+        )
+        self.container_svc.ecs_gateway.describe_task = MagicMock()
+
+        # Act
+        self.container_svc.get_instances([TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2])
+        self.container_svc.cancel_instances([TEST_INSTANCE_ID_2])
+        instance = self.container_svc.get_instance(TEST_INSTANCE_ID_1)
+
+        # Assert
+        self.assertEqual(instance, completed)
+        self.container_svc.ecs_gateway.describe_task.assert_not_called()
+        refreshed = self.container_svc.cache.get_many(
+            [TEST_INSTANCE_ID_2], lambda ids: [None]
+        )
+        self.assertEqual(refreshed, [None])
+
     def test_get_current_instances_count(self):
         # Arrange
         TEST_PENDING_TASKS_COUNT = 2
@@ -492,3 +618,86 @@ class TestAWSContainerService(unittest.TestCase):
         cluster_instance = self.container_svc.get_cluster_instance()
         # Assert
         self.assertEqual(cluster_instance, expected_cluster_instance)
+
+
+class TestAWSContainerServiceAsync(IsolatedAsyncioTestCase):
+    @patch("fbpcp.gateway.ecs.ECSGateway")
+    def setUp(self, MockECSGateway):
+        self.container_svc = AWSContainerService(
+            TEST_REGION, TEST_CLUSTER, TEST_SUBNETS, TEST_KEY_ID, TEST_KEY_DATA
+        )
+        self.container_svc.ecs_gateway = MockECSGateway()
+
+    async def test_create_instances_async(self):
+        # Arrange
+        self.container_svc.ecs_gateway.run_task = MagicMock(
+            side_effect=lambda **kwargs: ContainerInstance(
+                kwargs["cmd"], TEST_IP_ADDRESS, ContainerInstanceStatus.UNKNOWN
+            )
+        )
+
+        # Act
+        instances = await self.container_svc.create_instances_async(
+            container_definition=f"{TEST_TASK_DEFNITION}#{TEST_CONTAINER_DEFNITION}",
+            cmds=[TEST_CMD_1, TEST_CMD_2],
+            env_vars=[TEST_ENV_VARS, TEST_ENV_VARS_2],
+        )
+
+        # Assert
+        self.assertEqual(
+            [instance.instance_id for instance in instances], [TEST_CMD_1, TEST_CMD_2]
+        )
+        self.container_svc.ecs_gateway.run_task.assert_any_call(
+            task_definition=TEST_TASK_DEFNITION,
+            container=TEST_CONTAINER_DEFNITION,
+            cmd=TEST_CMD_2,
+            cluster=TEST_CLUSTER,
+            subnets=TEST_SUBNETS,
+            env_vars=TEST_ENV_VARS_2,
+            cpu=None,
+            memory=None,
+            task_role_arn=None,
+        )
+
+    async def test_create_instances_async_throw_with_invalid_list_of_env_vars(self):
+        with self.assertRaises(ValueError):
+            await self.container_svc.create_instances_async(
+                container_definition=f"{TEST_TASK_DEFNITION}#{TEST_CONTAINER_DEFNITION}",
+                cmds=[TEST_CMD_1, TEST_CMD_2],
+                env_vars=[TEST_ENV_VARS],
+            )
+
+    async def test_get_instances_async(self):
+        # Arrange
+        num_instances = 234
+        instance_ids = [str(uuid4()) for _ in range(num_instances)]
+        self.container_svc.ecs_gateway.describe_tasks = MagicMock(
+            side_effect=lambda cluster, ids: [
+                ContainerInstance(instance_id) for instance_id in ids
+            ]
+        )
+
+        # Act
+        instances = await self.container_svc.get_instances_async(instance_ids)
+
+        # Assert
+        self.assertEqual([instance.instance_id for instance in instances], instance_ids)
+        self.assertEqual(
+            self.container_svc.ecs_gateway.describe_tasks.call_count,
+            math.ceil(num_instances / AWS_API_INPUT_SIZE_LIMIT),
+        )
+
+    async def test_cancel_instances_async(self):
+        instance_ids = [TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2]
+        error = PcpError("instance id not found")
+
+        def stop_task(cluster, task_id):
+            if task_id == TEST_INSTANCE_ID_2:
+                raise error
+
+        self.container_svc.ecs_gateway.stop_task = MagicMock(side_effect=stop_task)
+
+        self.assertEqual(
+            await self.container_svc.cancel_instances_async(instance_ids),
+            [None, error],
+        )
@@ -0,0 +1,450 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import json
+import re
+import subprocess
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+from urllib.parse import parse_qs, urlparse
+
+from fbpcp.entity.container_instance import ContainerInstanceStatus
+from fbpcp.entity.container_permission import ContainerPermissionConfig
+from fbpcp.entity.container_type import ContainerType
+from fbpcp.service.container_k8s import K8sContainerService
+from kubernetes import client
+
+TEST_NAMESPACE = "test-namespace"
+TEST_TIMEOUT = 10
+TEST_TIMESTAMP = "2022-01-01T00:00:00Z"
+JOBS_PATH = re.compile(r"^/apis/batch/v1/namespaces/([^/]+)/jobs(?:/([^/]+))?$")
+PODS_PATH = re.compile(r"^/api/v1/namespaces/([^/]+)/pods$")
+SELECTOR_TERM = re.compile(r"([\w./-]+)\s*(?:=\s*([\w./-]+)|\s+in\s+\(([^)]*)\))")
+
+
+class FakeK8sApiServer:
+    """Serves the subset of the Kubernetes REST API used by K8sContainerService.
+
+    Jobs get their pods right away, with the labels and annotations of the job controller.
+    Tests move pods through their phases with set_pod_phase.
+    """
+
+    def __init__(self):
+        self.jobs = {}
+        self.pods = {}
+        self.requests = []
+        self.resource_version = 0
+        # (resource version, event type, pod)
+        self.events = []
+        self.changed = threading.Condition()
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._make_handler())
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+
+    @property
+    def host(self):
+        return f"http://127.0.0.1:{self.server.server_address[1]}"
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def set_pod_phase(self, job_name, index, phase, exit_code=None):
+        with self.changed:
+            pod = self.pods[f"{job_name}-{index}"]
+            status = pod["status"]
+            container_status = status["containerStatuses"][0]
+            status["phase"] = phase
+            if phase == "Running":
+                status["podIP"] = f"10.0.0.{index + 1}"
+                container_status["state"] = {"running": {"startedAt": TEST_TIMESTAMP}}
+            elif phase in ("Succeeded", "Failed"):
+                container_status["state"] = {
+                    "terminated": {
+                        "exitCode": exit_code or 0,
+                        "startedAt": TEST_TIMESTAMP,
+                        "finishedAt": TEST_TIMESTAMP,
+                    }
+                }
+            self._record("MODIFIED", pod)
+
+    def _record(self, event_type, pod):
+        self.resource_version += 1
+        pod["metadata"]["resourceVersion"] = str(self.resource_version)
+        self.events.append(
+            (self.resource_version, event_type, json.loads(json.dumps(pod)))
+        )
+        self.changed.notify_all()
+
+    def _select(self, label_selector):
+        return [pod for pod in self.pods.values() if self._matches(pod, label_selector)]
+
+    def _matches(self, pod, label_selector):
+        labels = pod["metadata"]["labels"]
+        return all(
+            labels.get(key)
+            in ([value] if value else [v.strip() for v in values.split(",")])
+            for key, value, values in SELECTOR_TERM.findall(label_selector or "")
+        )
+
+    def _create_job(self, job):
+        name = job["metadata"]["name"]
+        job["metadata"]["namespace"] = TEST_NAMESPACE
+        self.jobs[name] = job
+        template = job["spec"]["template"]
+        for index in range(job["spec"]["completions"]):
+            pod = {
+                "metadata": {
+                    "name": f"{name}-{index}",
+                    "namespace": TEST_NAMESPACE,
+                    "creationTimestamp": TEST_TIMESTAMP,
+                    "labels": {
+                        **template["metadata"]["labels"],
+                        "job-name": name,
+                        "batch.kubernetes.io/job-completion-index": str(index),
+                    },
+                    "annotations": {
+                        "batch.kubernetes.io/job-completion-index": str(index)
+                    },
+                },
+                "spec": template["spec"],
+                "status": {
+                    "phase": "Pending",
+                    "containerStatuses": [
+                        {
+                            "name": "main",
+                            "image": template["spec"]["containers"][0]["image"],
+                            "imageID": "",
+                            "ready": False,
+                            "restartCount": 0,
+                            "state": {"waiting": {"reason": "ContainerCreating"}},
+                        }
+                    ],
+                },
+            }
+            self.pods[pod["metadata"]["name"]] = pod
+            self._record("ADDED", pod)
+
+    def _delete_pods(self, pods):
+        for pod in pods:
+            del self.pods[pod["metadata"]["name"]]
+            pod["metadata"]["deletionTimestamp"] = TEST_TIMESTAMP
+            self._record("DELETED", pod)
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, code, body):
+                data = json.dumps(body).encode()
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def _not_found(self, name):
+                self._send(
+                    404,
+                    {
+                        "kind": "Status",
+                        "apiVersion": "v1",
+                        "status": "Failure",
+                        "reason": "NotFound",
+                        "message": f"{name} not found",
+                        "code": 404,
+                    },
+                )
+
+            def _handle(self, method):
+                url = urlparse(self.path)
+                query = {k: v[0] for k, v in parse_qs(url.query).items()}
+                fake.requests.append((method, url.path, query))
+                jobs_match = JOBS_PATH.match(url.path)
+                if jobs_match:
+                    return self._handle_jobs(method, jobs_match.group(2))
+                if PODS_PATH.match(url.path):
+                    return self._handle_pods(method, query)
+                self._not_found(url.path)
+
+            def _handle_jobs(self, method, name):
+                with fake.changed:
+                    if method == "POST":
+                        length = int(self.headers["Content-Length"])
+                        job = json.loads(self.rfile.read(length))
+                        fake._create_job(job)
+                        return self._send(201, job)
+                    if name not in fake.jobs:
+                        return self._not_found(name)
+                    if method == "GET":
+                        return self._send(200, fake.jobs[name])
+                    del fake.jobs[name]
+                    fake._delete_pods(fake._select(f"job-name={name}"))
+                    return self._send(200, {"kind": "Status", "status": "Success"})
+
+            def _handle_pods(self, method, query):
+                selector = query.get("labelSelector")
+                if method == "DELETE":
+                    with fake.changed:
+                        fake._delete_pods(fake._select(selector))
+                    return self._send(200, {"kind": "Status", "status": "Success"})
+                if query.get("watch") != "true":
+                    with fake.changed:
+                        return self._send(
+                            200,
+                            {
+                                "kind": "PodList",
+                                "apiVersion": "v1",
+                                "metadata": {
+                                    "resourceVersion": str(fake.resource_version)
+                                },
+                                "items": fake._select(selector),
+                            },
+                        )
+                self._watch(selector, int(query.get("resourceVersion") or 0), query)
+
+            def _watch(self, selector, resource_version, query):
+                deadline = time.monotonic() + int(query.get("timeoutSeconds", 1))
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                while time.monotonic() < deadline:
+                    with fake.changed:
+                        events = [
+                            (rv, event_type, pod)
+                            for rv, event_type, pod in fake.events
+                            if rv > resource_version
+                        ]
+                        if not events:
+                            fake.changed.wait(deadline - time.monotonic())
+                            continue
+                    for rv, event_type, pod in events:
+                        resource_version = rv
+                        if fake._matches(pod, selector):
+                            line = json.dumps({"type": event_type, "object": pod})
+                            self.wfile.write(line.encode() + b"\n")
+                            self.wfile.flush()
+
+            def do_GET(self):
+                self._handle("GET")
+
+            def do_POST(self):
+                self._handle("POST")
+
+            def do_DELETE(self):
+                self._handle("DELETE")
+
+        return Handler
+
+
+class TestK8sContainerService(unittest.TestCase):
+    def setUp(self):
+        self.fake = FakeK8sApiServer()
+        client_config = client.Configuration()
+        client_config.host = self.fake.host
+        self.container_svc = K8sContainerService(
+            namespace=TEST_NAMESPACE,
+            cluster="test",
+            client_config=client_config,
+            watch_timeout=1,
+        )
+
+    def tearDown(self):
+        self.container_svc.close()
+        self.fake.shutdown()
+
+    def _wait_for_status(self, instance_id, status):
+        deadline = time.monotonic() + TEST_TIMEOUT
+        while time.monotonic() < deadline:
+            instance = self.container_svc.get_instance(instance_id)
+            if instance and instance.status is status:
+                return instance
+            time.sleep(0.01)
+        self.fail(f"{instance_id} did not reach {status}")
+
+    def test_create_instances(self):
+        # Act
+        instances = self.container_svc.create_instances(
+            "image:latest",
+            ["echo a", "echo b"],
+            env_vars={"K": "V"},
+            container_type=ContainerType.SMALL,
+            permission=ContainerPermissionConfig("runner"),
+        )
+
+        # Assert
+        job_name = instances[0].instance_id.split("/")[0]
+        self.assertEqual(
+            [instance.instance_id for instance in instances],
+            [f"{job_name}/0", f"{job_name}/1"],
+        )
+        self.assertEqual(
+            [method for method, path, _ in self.fake.requests if "/jobs" in path],
+            ["POST"],
+        )
+        spec = self.fake.jobs[job_name]["spec"]
+        self.assertEqual(spec["completionMode"], "Indexed")
+        self.assertEqual((spec["completions"], spec["parallelism"]), (2, 2))
+        self.assertEqual(spec["backoffLimitPerIndex"], 0)
+        pod_spec = spec["template"]["spec"]
+        self.assertEqual(pod_spec["serviceAccountName"], "runner")
+        self.assertEqual(
+            pod_spec["containers"][0]["env"], [{"name": "K", "value": "V"}]
+        )
+        self.assertEqual(
+            pod_spec["containers"][0]["resources"]["limits"],
+            {"cpu": "1", "memory": "8Gi"},
+        )
+        self.assertEqual(
+            self._wait_for_status(
+                instances[1].instance_id, ContainerInstanceStatus.UNKNOWN
+            ).ip_address,
+            None,
+        )
+
+    def test_indexed_command(self):
+        # Arrange
+        self.container_svc.create_instances(
+            "image:latest",
+            ['echo "a $K"', 'echo "b $K"'],
+            env_vars=[{"K": "x y"}, {"K": "it's"}],
+        )
+        (job,) = self.fake.jobs.values()
+        command = job["spec"]["template"]["spec"]["containers"][0]["command"]
+
+        # Act
+        outputs = [
+            subprocess.run(
+                command,
+                env={"JOB_COMPLETION_INDEX": str(index)},
+                capture_output=True,
+                text=True,
+            ).stdout
+            for index in range(2)
+        ]
+
+        # Assert
+        self.assertEqual(outputs, ["a x y\n", "b it's\n"])
+
+    @patch("fbpcp.service.container_k8s.MAX_JOB_SCRIPT_SIZE", 64)
+    def test_large_batch_is_split_across_jobs(self):
+        # Arrange
+        cmds = [f'echo "{i} $K"' for i in range(3)]
+
+        # Act
+        instances = self.container_svc.create_instances(
+            "image:latest", cmds, env_vars=[{"K": str(i)} for i in range(3)]
+        )
+
+        # Assert
+        self.assertEqual(len(self.fake.jobs), 3)
+        outputs = []
+        for instance in instances:
+            job_name, index = instance.instance_id.split("/")
+            job = self.fake.jobs[job_name]
+            self.assertEqual(job["spec"]["completions"], 1)
+            outputs.append(
+                subprocess.run(
+                    job["spec"]["template"]["spec"]["containers"][0]["command"],
+                    env={"JOB_COMPLETION_INDEX": index},
+                    capture_output=True,
+                    text=True,
+                ).stdout
+            )
+        self.assertEqual(outputs, ["0 0\n", "1 1\n", "2 2\n"])
+
+    def test_watch_statuses(self):
+        # Arrange
+        instances = self.container_svc.create_instances("image", ["a", "b", "c"])
+        job_name = instances[0].instance_id.split("/")[0]
+        ids = [instance.instance_id for instance in instances]
+        self._wait_for_status(ids[2], ContainerInstanceStatus.UNKNOWN)
+        job_reads = len([r for r in self.fake.requests if r[1].endswith(job_name)])
+
+        # Act
+        self.fake.set_pod_phase(job_name, 0, "Running")
+        self.fake.set_pod_phase(job_name, 1, "Failed", exit_code=3)
+        self.fake.set_pod_phase(job_name, 2, "Succeeded")
+
+        # Assert
+        running = self._wait_for_status(ids[0], ContainerInstanceStatus.STARTED)
+        self.assertEqual(running.ip_address, "10.0.0.1")
+        failed = self._wait_for_status(ids[1], ContainerInstanceStatus.FAILED)
+        self.assertEqual(failed.exit_code, 3)
+        completed = self._wait_for_status(ids[2], ContainerInstanceStatus.COMPLETED)
+        self.assertEqual(completed.exit_code, 0)
+        self.assertIsNotNone(completed.timeline.stopped_at)
+        # statuses come from the watch, not from reading the job again
+        self.assertEqual(
+            len([r for r in self.fake.requests if r[1].endswith(job_name)]),
+            job_reads,
+        )
+
+    def test_get_unknown_instance(self):
+        # Act & Assert
+        self.assertEqual(
+            self.container_svc.get_instances(["fbpcp-unknown/0", "invalid"]),
+            [None, None],
+        )
+
+    def test_cancel_instances(self):
+        # Arrange
+        partial = self.container_svc.create_instances("image", ["a", "b", "c"])
+        full = self.container_svc.create_instances("image", ["a", "b"])
+        partial_job = partial[0].instance_id.split("/")[0]
+        full_job = full[0].instance_id.split("/")[0]
+
+        # Act
+        errors = self.container_svc.cancel_instances(
+            [partial[0].instance_id, partial[2].instance_id]
+            + [instance.instance_id for instance in full]
+            + ["fbpcp-unknown/0"]
+        )
+
+        # Assert
+        self.assertEqual(errors[:4], [None] * 4)
+        self.assertIsNotNone(errors[4])
+        deletes = [
+            (path, query)
+            for method, path, query in self.fake.requests
+            if method == "DELETE"
+        ]
+        self.assertIn(
+            (
+                f"/api/v1/namespaces/{TEST_NAMESPACE}/pods",
+                {
+                    "labelSelector": f"job-name={partial_job},batch.kubernetes.io/job-completion-index in (0,2)"
+                },
+            ),
+            deletes,
+        )
+        self.assertNotIn(full_job, self.fake.jobs)
+        self.assertEqual(sorted(self.fake.pods), [f"{partial_job}-1"])
+        self._wait_for_status(partial[0].instance_id, ContainerInstanceStatus.FAILED)
+        self._wait_for_status(full[1].instance_id, ContainerInstanceStatus.FAILED)
+        self.assertIs(
+            self.container_svc.get_instance(partial[1].instance_id).status,
+            ContainerInstanceStatus.UNKNOWN,
+        )
+
+    def test_get_cluster_instance(self):
+        # Arrange
+        instances = self.container_svc.create_instances("image", ["a", "b"])
+        self.fake.set_pod_phase(instances[0].instance_id.split("/")[0], 0, "Running")
+
+        # Act
+        cluster = self.container_svc.get_cluster_instance()
+
+        # Assert
+        self.assertEqual((cluster.pending_tasks, cluster.running_tasks), (1, 1))
+        self.assertEqual(self.container_svc.get_current_instances_count(), 2)
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import asyncio
+import os
+import subprocess
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from fbpcp.entity.container_instance import ContainerInstanceStatus
+from fbpcp.entity.container_type import ContainerType
+from fbpcp.service.container_local import LOCAL_IP_ADDRESS, LocalContainerService
+from fbpcp.service.onedocker import OneDockerService
+
+TEST_TIMEOUT = 10
+
+
+class TestLocalContainerService(unittest.TestCase):
+    def setUp(self):
+        self.container_svc = LocalContainerService(
+            cluster="test", max_cpus=2, schedule_interval=0.01
+        )
+
+    def tearDown(self):
+        self.container_svc.cancel_instances(list(self.container_svc._instances))
+        self.container_svc.wait(TEST_TIMEOUT)
+
+    def test_create_instances(self):
+        # Act
+        instances = self.container_svc.create_instances(
+            "task_def",
+            ["exit 0", 'exit "$CODE"'],
+            env_vars=[{}, {"CODE": "3"}],
+        )
+        self.assertTrue(self.container_svc.wait(TEST_TIMEOUT))
+        finished = self.container_svc.get_instances(
+            [instance.instance_id for instance in instances] + ["test/unknown"]
+        )
+
+        # Assert
+        self.assertEqual(
+            [instance.status for instance in instances],
+            [ContainerInstanceStatus.STARTED] * 2,
+        )
+        self.assertEqual(instances[0].ip_address, LOCAL_IP_ADDRESS)
+        self.assertEqual(
+            [(c.status, c.exit_code) for c in finished[:2]],
+            [
+                (ContainerInstanceStatus.COMPLETED, 0),
+                (ContainerInstanceStatus.FAILED, 3),
+            ],
+        )
+        self.assertIsNone(finished[2])
+        self.assertIsNotNone(finished[0].timeline.stopped_at)
+
+    def test_schedule_across_cores(self):
+        # Act
+        instances = self.container_svc.create_instances("task_def", ["sleep 0.2"] * 3)
+        cluster = self.container_svc.get_cluster_instance()
+
+        # Assert
+        # the third instance waits for a free core
+        self.assertEqual(
+            [instance.status for instance in instances],
+            [ContainerInstanceStatus.STARTED] * 2 + [ContainerInstanceStatus.UNKNOWN],
+        )
+        self.assertIsNone(instances[2].ip_address)
+        self.assertEqual((cluster.pending_tasks, cluster.running_tasks), (1, 2))
+        self.assertTrue(self.container_svc.wait(TEST_TIMEOUT))
+        self.assertEqual(
+            self.container_svc.get_instance(instances[2].instance_id).status,
+            ContainerInstanceStatus.COMPLETED,
+        )
+
+    def test_resource_limits(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as log_dir:
+            container_svc = LocalContainerService(
+                cluster="test", max_cpus=2, log_dir=log_dir, schedule_interval=0.01
+            )
+
+            # Act
+            instance = container_svc.create_instance(
+                "task_def",
+                "ulimit -v; python3 -c 'import os; print(len(os.sched_getaffinity(0)))'",
+                container_type=ContainerType.SMALL,
+            )
+            container_svc.wait(TEST_TIMEOUT)
+
+            # Assert
+            with open(os.path.join(log_dir, f"{instance.instance_id}.log")) as f:
+                self.assertEqual(f.read().split(), [str(8 * 1024 * 1024), "1"])
+            self.assertEqual((instance.cpu, instance.memory), (1, 8))
+
+    def test_resource_limits_without_preexec_fn(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as log_dir:
+            container_svc = LocalContainerService(
+                cluster="test", max_cpus=2, log_dir=log_dir, schedule_interval=0.01
+            )
+
+            # Act
+            with patch(
+                "fbpcp.service.container_local.subprocess.Popen", wraps=subprocess.Popen
+            ) as popen:
+                instance = container_svc.create_instance(
+                    "task_def",
+                    "sh -c 'ulimit -v' & wait",
+                    container_type=ContainerType.SMALL,
+                )
+            container_svc.wait(TEST_TIMEOUT)
+
+            # Assert: processes forked by the command inherit the limits too
+            self.assertNotIn("preexec_fn", popen.call_args.kwargs)
+            with open(os.path.join(log_dir, f"{instance.instance_id}.log")) as f:
+                self.assertEqual(f.read().split(), [str(8 * 1024 * 1024)])
+
+    def test_cancel_instances(self):
+        # Arrange
+        instances = self.container_svc.create_instances("task_def", ["sleep 30"] * 3)
+
+        # Act
+        errors = self.container_svc.cancel_instances(
+            [instance.instance_id for instance in instances] + ["test/unknown"]
+        )
+        self.assertTrue(self.container_svc.wait(TEST_TIMEOUT))
+        cancelled = self.container_svc.get_instances(
+            [instance.instance_id for instance in instances]
+        )
+
+        # Assert
+        self.assertEqual(errors[:3], [None] * 3)
+        self.assertIsNotNone(errors[3])
+        self.assertEqual(
+            [(c.status, c.exit_code) for c in cancelled],
+            [(ContainerInstanceStatus.FAILED, 143)] * 2
+            + [(ContainerInstanceStatus.FAILED, None)],
+        )
+        self.assertEqual(self.container_svc.get_current_instances_count(), 0)
+
+    def test_onedocker_service(self):
+        # Arrange
+        onedocker_svc = OneDockerService(
+            self.container_svc,
+            "task_def",
+            container_cmd_prefix="echo {package_name} {runner_args}",
+        )
+
+        # Act
+        containers = onedocker_svc.start_containers(
+            package_name="project/exe", cmd_args_list=["--k=v"]
+        )
+        ready = asyncio.run(
+            onedocker_svc.wait_for_pending_containers(
+                [container.instance_id for container in containers]
+            )
+        )
+        self.container_svc.wait(TEST_TIMEOUT)
+
+        # Assert
+        self.assertEqual(ready[0].ip_address, LOCAL_IP_ADDRESS)
+        self.assertEqual(
+            onedocker_svc.get_container(containers[0].instance_id).status,
+            ContainerInstanceStatus.COMPLETED,
+        )
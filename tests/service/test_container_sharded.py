@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import unittest
+from unittest.mock import MagicMock
+
+from fbpcp.entity.cluster_instance import Cluster, ClusterStatus
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.error.pcp import PcpError
+from fbpcp.service.container_sharded import ShardedContainerService, ShardPlacement
+
+TEST_CONTAINER_DEFINITION = "test-task-definition:1#test-container"
+TEST_REGIONS = ["us-west-2", "us-east-1"]
+TEST_CLUSTERS = ["cluster-a", "cluster-b"]
+
+
+def _arn(shard: int, cmd: str) -> str:
+    return f"arn:aws:ecs:{TEST_REGIONS[shard]}:123456789012:task/{TEST_CLUSTERS[shard]}/{cmd}"
+
+
+def _build_shard(shard: int, load: int) -> MagicMock:
+    svc = MagicMock()
+    svc.get_region.return_value = TEST_REGIONS[shard]
+    svc.get_cluster.return_value = TEST_CLUSTERS[shard]
+    svc.get_current_instances_count.return_value = load
+    svc.create_instances.side_effect = lambda **kwargs: [
+        ContainerInstance(_arn(shard, cmd)) for cmd in kwargs["cmds"]
+    ]
+    svc.get_instances.side_effect = lambda ids: [
+        ContainerInstance(instance_id) for instance_id in ids
+    ]
+    svc.cancel_instances.side_effect = lambda ids: [None for _ in ids]
+    return svc
+
+
+class TestShardedContainerService(unittest.TestCase):
+    def setUp(self):
+        self.shards = [_build_shard(0, load=4), _build_shard(1, load=0)]
+        self.container_svc = ShardedContainerService(self.shards)
+
+    def test_create_instances_least_loaded(self):
+        # Act
+        cmds = [f"cmd{i}" for i in range(6)]
+        instances = self.container_svc.create_instances(
+            TEST_CONTAINER_DEFINITION, cmds, env_vars=[{"i": str(i)} for i in range(6)]
+        )
+
+        # Assert
+        self.assertEqual([i.instance_id.split("/")[-1] for i in instances], cmds)
+        shard_0_cmds = self.shards[0].create_instances.call_args.kwargs["cmds"]
+        shard_1_kwargs = self.shards[1].create_instances.call_args.kwargs
+        # shard 1 starts empty, so it takes 5 instances before shard 0 gets one
+        self.assertEqual(len(shard_0_cmds), 1)
+        self.assertEqual(len(shard_1_kwargs["cmds"]), 5)
+        self.assertEqual(
+            [env["i"] for env in shard_1_kwargs["env_vars"]],
+            [cmd[-1] for cmd in shard_1_kwargs["cmds"]],
+        )
+
+    def test_create_instances_weighted(self):
+        container_svc = ShardedContainerService(
+            self.shards, weights=[3, 1], placement=ShardPlacement.WEIGHTED
+        )
+
+        container_svc.create_instances(
+            TEST_CONTAINER_DEFINITION, [f"cmd{i}" for i in range(8)]
+        )
+
+        self.assertEqual(
+            len(self.shards[0].create_instances.call_args.kwargs["cmds"]), 6
+        )
+        self.assertEqual(
+            len(self.shards[1].create_instances.call_args.kwargs["cmds"]), 2
+        )
+
+    def test_get_and_cancel_instances_are_routed_to_owner(self):
+        # Arrange
+        instances = self.container_svc.create_instances(
+            TEST_CONTAINER_DEFINITION, [f"cmd{i}" for i in range(6)]
+        )
+        instance_ids = [instance.instance_id for instance in reversed(instances)]
+        instance_ids.insert(1, "unknown-instance-id")
+
+        # Act
+        found = self.container_svc.get_instances(instance_ids)
+        errors = self.container_svc.cancel_instances(instance_ids)
+
+        # Assert
+        self.assertEqual(
+            [i.instance_id if i else None for i in found],
+            [instance_ids[0], None, *instance_ids[2:]],
+        )
+        self.assertIsInstance(errors[1], PcpError)
+        self.assertEqual(errors[:1] + errors[2:], [None] * 6)
+        self.assertEqual(len(self.shards[0].get_instances.call_args.args[0]), 1)
+        self.assertEqual(len(self.shards[1].get_instances.call_args.args[0]), 5)
+
+    def test_create_instances_cancels_other_shards_on_failure(self):
+        # Arrange
+        self.shards[1].create_instances.side_effect = PcpError("RunTask failed")
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            self.container_svc.create_instances(
+                TEST_CONTAINER_DEFINITION, [f"cmd{i}" for i in range(6)]
+            )
+        shard_0_cmds = self.shards[0].create_instances.call_args.kwargs["cmds"]
+        self.shards[0].cancel_instances.assert_called_once_with(
+            [_arn(0, cmd) for cmd in shard_0_cmds]
+        )
+        self.assertEqual(self.container_svc._owners, {})
+
+    def test_owners_are_kept_after_terminal_status_or_cancel(self):
+        # Arrange: ids that do not embed their region and cluster, like local or k8s ids
+        for shard in self.shards:
+            shard.create_instances.side_effect = lambda **kwargs: [
+                ContainerInstance(cmd) for cmd in kwargs["cmds"]
+            ]
+        instances = self.container_svc.create_instances(
+            TEST_CONTAINER_DEFINITION, ["cmd0", "cmd1"]
+        )
+        self.shards[1].get_instances.side_effect = lambda ids: [
+            ContainerInstance(i, status=ContainerInstanceStatus.COMPLETED) for i in ids
+        ]
+
+        # Act
+        self.container_svc.get_instances([i.instance_id for i in instances])
+        self.container_svc.cancel_instances([instances[1].instance_id])
+        found = self.container_svc.get_instances([i.instance_id for i in instances])
+
+        # Assert
+        self.assertEqual(
+            [i.status for i in found], [ContainerInstanceStatus.COMPLETED] * 2
+        )
+
+    def test_owners_are_bounded(self):
+        # Arrange
+        container_svc = ShardedContainerService(self.shards, max_owners=2)
+        self.shards[1].create_instance.return_value = ContainerInstance("cmd2")
+        instances = container_svc.create_instances(
+            TEST_CONTAINER_DEFINITION, ["cmd0", "cmd1"]
+        )
+
+        # Act
+        container_svc.get_instance(instances[0].instance_id)
+        container_svc.create_instance(TEST_CONTAINER_DEFINITION, "cmd2", None)
+
+        # Assert: the least recently used instance was dropped
+        self.assertEqual(
+            list(container_svc._owners),
+            [instances[0].instance_id, "cmd2"],
+        )
+
+    def test_find_owner_from_arn(self):
+        instance_id = _arn(0, "created-elsewhere")
+
+        self.container_svc.get_instance(instance_id)
+
+        self.shards[0].get_instance.assert_called_once_with(instance_id)
+        self.shards[1].get_instance.assert_not_called()
+
+    def test_get_current_instances_count_and_cluster(self):
+        for shard, svc in enumerate(self.shards):
+            svc.get_cluster_instance.return_value = Cluster(
+                cluster_arn=f"arn-{shard}",
+                cluster_name=TEST_CLUSTERS[shard],
+                pending_tasks=1,
+                running_tasks=2,
+                status=ClusterStatus.ACTIVE,
+            )
+
+        cluster = self.container_svc.get_cluster_instance()
+
+        self.assertEqual(self.container_svc.get_current_instances_count(), 4)
+        self.assertEqual(cluster.pending_tasks, 2)
+        self.assertEqual(cluster.running_tasks, 4)
+        self.assertEqual(cluster.status, ClusterStatus.ACTIVE)
+        self.assertEqual(self.container_svc.get_cluster(), "cluster-a,cluster-b")
+
+    def test_invalid_weights(self):
+        with self.assertRaises(ValueError):
+            ShardedContainerService(self.shards, weights=[1])
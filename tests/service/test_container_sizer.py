@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import tempfile
+import unittest
+
+from fbpcp.entity.container_type import ContainerType, ContainerTypeConfig
+from fbpcp.entity.resource_usage import get_run_fingerprint, ResourceUsage
+from fbpcp.service.container_sizer import ContainerSizer, GB_TO_BYTES
+
+TEST_PACKAGE = "private_lift/lift"
+TEST_VERSION = "latest"
+
+
+class TestContainerSizer(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.usage_store_config = {
+            "class": "fbpcp.service.resource_usage_store_local.LocalResourceUsageStore",
+            "constructor": {"root_dir": self.tmpdir.name},
+        }
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _record(
+        self, sizer, exe_args, peak_gb, cpu_time, wall_time, exit_code=0, version=None
+    ):
+        version = version or TEST_VERSION
+        sizer.usage_store.record(
+            ResourceUsage(
+                package_name=TEST_PACKAGE,
+                version=version,
+                fingerprint=get_run_fingerprint(TEST_PACKAGE, version, exe_args),
+                peak_memory=int(peak_gb * GB_TO_BYTES),
+                cpu_time=cpu_time,
+                wall_time=wall_time,
+                cpu=16,
+                exit_code=exit_code,
+            )
+        )
+
+    def test_recommend_memory(self):
+        # Arrange
+        sizer = ContainerSizer(self.usage_store_config)
+        self._record(sizer, "--small", peak_gb=2, cpu_time=10, wall_time=10)
+        self._record(sizer, "--big", peak_gb=20, cpu_time=10, wall_time=10)
+        # an OOM killed run is not used
+        self._record(
+            sizer, "--small", peak_gb=7.9, cpu_time=1, wall_time=1, exit_code=137
+        )
+
+        # Act & Assert
+        self.assertEqual(
+            sizer.recommend(TEST_PACKAGE, TEST_VERSION, ["--small"]),
+            ContainerType.SMALL,
+        )
+        self.assertEqual(
+            sizer.recommend(TEST_PACKAGE, TEST_VERSION, ["--small", "--big"]),
+            ContainerType.MEDIUM,
+        )
+        self.assertIsNone(sizer.recommend("unknown", TEST_VERSION))
+
+    def test_recommend_target_runtime(self):
+        # Arrange
+        sizer = ContainerSizer(self.usage_store_config, target_runtime=100)
+        # 8 busy cores for 50 seconds: 400s on 1 vCPU, 100s on 4 vCPU
+        self._record(sizer, "--parallel", peak_gb=1, cpu_time=400, wall_time=50)
+
+        # Act & Assert
+        self.assertEqual(
+            sizer.recommend(TEST_PACKAGE, TEST_VERSION, ["--parallel"]),
+            ContainerType.MEDIUM,
+        )
+        # runs with other args of the same version are used as a fallback
+        self.assertEqual(
+            sizer.recommend(TEST_PACKAGE, TEST_VERSION, ["--other"]),
+            ContainerType.MEDIUM,
+        )
+        sizer.target_runtime = 10
+        self.assertEqual(
+            sizer.recommend(TEST_PACKAGE, TEST_VERSION, ["--parallel"]),
+            ContainerType.LARGE,
+        )
+
+    def test_recommend_custom_candidates(self):
+        # Arrange
+        custom = ContainerTypeConfig(cpu=2, memory=4)
+        sizer = ContainerSizer(
+            self.usage_store_config,
+            target_runtime=100,
+            candidates=[ContainerType.MEDIUM, custom, ContainerType.SMALL],
+        )
+        self._record(sizer, None, peak_gb=3, cpu_time=150, wall_time=75)
+
+        # Act & Assert
+        self.assertEqual(sizer.recommend(TEST_PACKAGE, TEST_VERSION), custom)
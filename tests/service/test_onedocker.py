@@ -6,6 +6,7 @@
 
 # pyre-unsafe
 
+import asyncio
 import json
 import unittest
 from shlex import quote
@@ -16,10 +17,13 @@ from unittest.mock import ANY, AsyncMock, call, MagicMock, patch
 from fbpcp.entity.certificate_request import CertificateRequest, KeyAlgorithm
 from fbpcp.entity.cloud_provider import CloudProvider
 from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.entity.container_metadata import ContainerTimeline
 from fbpcp.entity.container_permission import ContainerPermissionConfig
 from fbpcp.entity.container_type import ContainerType, ContainerTypeConfig
 from fbpcp.error.pcp import PcpError
 from fbpcp.service.onedocker import (
+    AUTO_CONTAINER_TYPE,
+    METRICS_CONTAINER_PHASE_DURATION,
     METRICS_START_CONTAINERS_COUNT,
     METRICS_START_CONTAINERS_DURATION,
     ONEDOCKER_CMD_PREFIX,
@@ -217,6 +221,44 @@ class TestOneDockerServiceSync(unittest.TestCase):
                 permission=None,
             )
 
+    def test_start_containers_auto_container_type(self):
+        # Arrange
+        self.container_svc.create_instances = MagicMock(
+            return_value=_get_pending_container_instances()
+        )
+        container_sizer = MagicMock()
+        container_sizer.usage_store_config = {"class": "test.Store"}
+        container_sizer.recommend.return_value = ContainerType.MEDIUM
+        self.onedocker_svc.container_sizer = container_sizer
+
+        # Act
+        self.onedocker_svc.start_containers(
+            package_name=TEST_PACKAGE_NAME,
+            cmd_args_list=TEST_CMD_ARGS_LIST,
+            version=TEST_VERSION,
+            container_type=AUTO_CONTAINER_TYPE,
+        )
+
+        # Assert
+        container_sizer.recommend.assert_called_once_with(
+            TEST_PACKAGE_NAME, TEST_VERSION, TEST_CMD_ARGS_LIST
+        )
+        kwargs = self.container_svc.create_instances.call_args.kwargs
+        self.assertEqual(kwargs["container_type"], ContainerType.MEDIUM)
+        self.assertIn(
+            f"--usage_store={quote(json.dumps(container_sizer.usage_store_config))}",
+            kwargs["cmds"][0],
+        )
+
+    def test_start_containers_auto_container_type_without_sizer(self):
+        # Act & Assert
+        with self.assertRaises(ValueError):
+            self.onedocker_svc.start_containers(
+                package_name=TEST_PACKAGE_NAME,
+                cmd_args_list=TEST_CMD_ARGS_LIST,
+                container_type=AUTO_CONTAINER_TYPE,
+            )
+
     def test_get_cmd(self):
         expected_cmd_without_arguments = (
             f"python3.8 -m onedocker.script.runner {TEST_PACKAGE_NAME} --version=latest"
@@ -290,6 +332,124 @@ class TestOneDockerServiceSync(unittest.TestCase):
         # Assert
         self.assertEqual(result, expected_cmd)
 
+    def test_record_container_timelines(self):
+        # Arrange
+        self.container_svc.get_cluster = MagicMock(return_value="cluster")
+        containers = [
+            ContainerInstance(
+                TEST_INSTANCE_ID_1,
+                timeline=ContainerTimeline(
+                    created_at=100.0,
+                    pull_started_at=101.0,
+                    pull_stopped_at=103.5,
+                    started_at=104.0,
+                    stopping_at=110.0,
+                    stopped_at=111.0,
+                ),
+            ),
+            ContainerInstance(TEST_INSTANCE_ID_2),
+        ]
+
+        # Act
+        self.onedocker_svc.record_container_timelines(containers, "task-def:3#c")
+
+        # Assert
+        self.metrics.gauge.assert_has_calls(
+            [
+                call(
+                    f"{METRICS_CONTAINER_PHASE_DURATION}.{phase}.cluster.task-def_3_c",
+                    ms,
+                )
+                for phase, ms in [
+                    ("provisioning", 1000),
+                    ("image_pull", 2500),
+                    ("container_start", 500),
+                    ("launch", 4000),
+                    ("run", 6000),
+                    ("stopping", 1000),
+                ]
+            ]
+        )
+        self.assertEqual(self.metrics.gauge.call_count, 6)
+
+    def test_get_containers_records_stopped_timelines_once(self):
+        # Arrange
+        self.container_svc.get_cluster = MagicMock(return_value="cluster")
+        timeline = ContainerTimeline(
+            created_at=100.0,
+            pull_started_at=101.0,
+            pull_stopped_at=103.5,
+            started_at=104.0,
+        )
+        self.onedocker_svc.record_container_timelines(
+            [ContainerInstance(TEST_INSTANCE_ID_1, timeline=timeline)], "task-def"
+        )
+        self.metrics.gauge.reset_mock()
+        stopped_timeline = ContainerTimeline(
+            **{**timeline.to_dict(), "stopping_at": 110.0, "stopped_at": 111.0}
+        )
+        self.container_svc.get_instances = MagicMock(
+            return_value=[
+                ContainerInstance(
+                    TEST_INSTANCE_ID_1,
+                    status=ContainerInstanceStatus.COMPLETED,
+                    timeline=stopped_timeline,
+                ),
+                ContainerInstance(
+                    TEST_INSTANCE_ID_2,
+                    status=ContainerInstanceStatus.STARTED,
+                    timeline=timeline,
+                ),
+            ]
+        )
+
+        # Act
+        self.onedocker_svc.get_containers([TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2])
+        self.onedocker_svc.get_containers([TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2])
+
+        # Assert: only the phases of the stopped container not emitted yet
+        self.assertEqual(
+            self.metrics.gauge.call_args_list,
+            [
+                call(
+                    f"{METRICS_CONTAINER_PHASE_DURATION}.{phase}.cluster.{TEST_TASK_DEF}",
+                    ms,
+                )
+                for phase, ms in [("run", 6000), ("stopping", 1000)]
+            ],
+        )
+
+    def test_start_serving_containers(self):
+        # Arrange
+        work_queue_config = {
+            "class": "fbpcp.service.work_queue_local.LocalWorkQueueService",
+            "constructor": {"root_dir": "/mnt/queues"},
+        }
+        self.container_svc.create_instances = MagicMock(
+            return_value=_get_pending_container_instances()
+        )
+        expected_cmd = ONEDOCKER_CMD_PREFIX.format(
+            package_name="serve",
+            runner_args=f"--work_queue={quote(json.dumps(work_queue_config))} --queue_name=test_queue --idle_timeout=600",
+        )
+
+        # Act
+        containers = self.onedocker_svc.start_serving_containers(
+            count=2,
+            work_queue_config=work_queue_config,
+            queue_name="test_queue",
+            idle_timeout=600,
+        )
+
+        # Assert
+        self.assertEqual(containers, _get_pending_container_instances())
+        self.container_svc.create_instances.assert_called_once_with(
+            container_definition=TEST_TASK_DEF,
+            cmds=[expected_cmd, expected_cmd],
+            container_type=None,
+            permission=None,
+        )
+
     def test_stop_containers(self):
         containers = [
             TEST_INSTANCE_ID_1,
@@ -471,7 +631,9 @@ class TestOneDockerServiceAsync(IsolatedAsyncioTestCase):
     async def test_waiting_for_pending_container(self):
         pending_containers = _get_pending_container_instances()
         running_containers = _get_running_container_instances()
-        self.onedocker_svc.get_containers = MagicMock(return_value=running_containers)
+        self.onedocker_svc.get_containers_async = AsyncMock(
+            return_value=running_containers
+        )
         expected_container = await self.onedocker_svc.wait_for_pending_container(
             pending_containers[0].instance_id
         )
@@ -480,7 +642,7 @@ class TestOneDockerServiceAsync(IsolatedAsyncioTestCase):
     async def test_waiting_for_pending_containers(self):
         pending_containers = _get_pending_container_instances()
         running_containers = _get_running_container_instances()
-        self.onedocker_svc.get_containers = MagicMock(
+        self.onedocker_svc.get_containers_async = AsyncMock(
             side_effect=([running_containers[0]], [running_containers[1]])
         )
         expected_containers = await self.onedocker_svc.wait_for_pending_containers(
@@ -488,13 +650,254 @@ class TestOneDockerServiceAsync(IsolatedAsyncioTestCase):
         )
         self.assertEqual(expected_containers, running_containers)
 
+    async def test_start_containers_async(self):
+        # Arrange
+        mocked_container_info = _get_pending_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            return_value=mocked_container_info
+        )
+
+        # Act
+        containers = await self.onedocker_svc.start_containers_async(
+            package_name=TEST_PACKAGE_NAME,
+            cmd_args_list=TEST_CMD_ARGS_LIST,
+            version=TEST_VERSION,
+            env_vars=TEST_ENV_VARS_LIST,
+            container_type=TEST_CONTAINER_TYPE,
+        )
+
+        # Assert
+        self.assertEqual(containers, mocked_container_info)
+        self.container_svc.create_instances_async.assert_awaited_once_with(
+            container_definition=TEST_TASK_DEF,
+            cmds=ANY,
+            env_vars=TEST_ENV_VARS_LIST,
+            container_type=TEST_CONTAINER_TYPE,
+            permission=None,
+        )
+        self.assertEqual(self.insights.emit_async.await_count, 2)
+
+    async def test_start_containers_async_throw_with_empty_cmd_args(self):
+        with self.assertRaises(ValueError):
+            await self.onedocker_svc.start_containers_async(
+                package_name=TEST_PACKAGE_NAME, cmd_args_list=[]
+            )
+
+    async def test_get_and_stop_containers_async(self):
+        # Arrange
+        instance_ids = [TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2]
+        running_containers = _get_running_container_instances()
+        errors = [None, PcpError("instance id not found")]
+        self.container_svc.get_instances_async = AsyncMock(
+            return_value=running_containers
+        )
+        self.container_svc.cancel_instances_async = AsyncMock(return_value=errors)
+
+        # Act & Assert
+        self.assertEqual(
+            await self.onedocker_svc.get_containers_async(instance_ids),
+            running_containers,
+        )
+        self.assertEqual(
+            await self.onedocker_svc.stop_containers_async(instance_ids), errors
+        )
+        self.container_svc.get_instances_async.assert_awaited_once_with(instance_ids)
+        self.container_svc.cancel_instances_async.assert_awaited_once_with(instance_ids)
+
+    async def test_start_containers_as_ready(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        running_containers = _get_running_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            side_effect=[[pending_containers[0]], [pending_containers[1]]]
+        )
+        # the second container becomes ready one poll after the first one
+        self.container_svc.get_instances_async = AsyncMock(
+            side_effect=lambda ids: [
+                (
+                    running_containers[0]
+                    if instance_id == TEST_INSTANCE_ID_1
+                    else pending_containers[1]
+                )
+                for instance_id in ids
+            ]
+        )
+
+        # Act
+        ready = []
+        async for index, container in self.onedocker_svc.start_containers_as_ready(
+            package_name=TEST_PACKAGE_NAME,
+            cmd_args_list=TEST_CMD_ARGS_LIST,
+            poll_interval=0.01,
+        ):
+            ready.append((index, container))
+            self.container_svc.get_instances_async.side_effect = lambda ids: [
+                running_containers[1] for _ in ids
+            ]
+
+        # Assert
+        self.assertEqual(
+            sorted(ready, key=lambda pair: pair[0]),
+            [(0, running_containers[0]), (1, running_containers[1])],
+        )
+        self.assertEqual(self.container_svc.create_instances_async.await_count, 2)
+        self.assertEqual(self.insights.emit_async.await_count, 2)
+
+    @patch("fbpcp.service.onedocker.MISSING_CONTAINER_GRACE_PERIOD", 0.05)
+    async def test_start_containers_as_ready_missing_container(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            return_value=[pending_containers[0]]
+        )
+        self.container_svc.get_instances_async = AsyncMock(return_value=[None])
+
+        self.container_svc.cancel_instances_async = AsyncMock(return_value=[None])
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            async for _ in self.onedocker_svc.start_containers_as_ready(
+                package_name=TEST_PACKAGE_NAME,
+                cmd_args_list=TEST_CMD_ARGS_LIST[:1],
+                poll_interval=0.01,
+            ):
+                pass
+        self.assertGreater(self.container_svc.get_instances_async.await_count, 1)
+        self.container_svc.cancel_instances_async.assert_awaited_once_with(
+            [TEST_INSTANCE_ID_1]
+        )
+
+    async def test_start_containers_as_ready_briefly_missing_container(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        running_containers = _get_running_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            return_value=[pending_containers[0]]
+        )
+        # the task is reported missing right after it was run
+        self.container_svc.get_instances_async = AsyncMock(
+            side_effect=[[None], [running_containers[0]]]
+        )
+
+        # Act
+        ready = [
+            pair
+            async for pair in self.onedocker_svc.start_containers_as_ready(
+                package_name=TEST_PACKAGE_NAME,
+                cmd_args_list=TEST_CMD_ARGS_LIST[:1],
+                poll_interval=0.01,
+            )
+        ]
+
+        # Assert
+        self.assertEqual(ready, [(0, running_containers[0])])
+
+    async def test_start_containers_as_ready_stops_unyielded_on_break(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        running_containers = _get_running_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            side_effect=[[pending_containers[0]], [pending_containers[1]]]
+        )
+        self.container_svc.get_instances_async = AsyncMock(
+            side_effect=lambda ids: [
+                (
+                    running_containers[0]
+                    if instance_id == TEST_INSTANCE_ID_1
+                    else pending_containers[1]
+                )
+                for instance_id in ids
+            ]
+        )
+        self.container_svc.cancel_instances_async = AsyncMock(return_value=[None])
+
+        # Act
+        ready = self.onedocker_svc.start_containers_as_ready(
+            package_name=TEST_PACKAGE_NAME,
+            cmd_args_list=TEST_CMD_ARGS_LIST,
+            poll_interval=0.01,
+        )
+        async for index, _ in ready:
+            break
+        await ready.aclose()
+
+        # Assert
+        self.assertEqual(index, 0)
+        self.container_svc.cancel_instances_async.assert_awaited_once_with(
+            [TEST_INSTANCE_ID_2]
+        )
+
+    async def test_start_containers_as_ready_stops_in_flight_launch_on_break(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        running_containers = _get_running_container_instances()
+        second_launch = asyncio.Event()
+        launches = []
+
+        async def create_instances_async(**kwargs):
+            launches.append(kwargs)
+            if len(launches) == 1:
+                return [pending_containers[0]]
+            # still running when the consumer breaks out
+            await second_launch.wait()
+            return [pending_containers[1]]
+
+        self.container_svc.create_instances_async = AsyncMock(
+            side_effect=create_instances_async
+        )
+        self.container_svc.get_instances_async = AsyncMock(
+            side_effect=lambda ids: [running_containers[0] for _ in ids]
+        )
+        self.container_svc.cancel_instances_async = AsyncMock(return_value=[None])
+
+        # Act
+        ready = self.onedocker_svc.start_containers_as_ready(
+            package_name=TEST_PACKAGE_NAME,
+            cmd_args_list=TEST_CMD_ARGS_LIST,
+            poll_interval=0.01,
+        )
+        async for index, _ in ready:
+            break
+        asyncio.get_running_loop().call_later(0.05, second_launch.set)
+        await ready.aclose()
+
+        # Assert
+        self.assertEqual(index, 0)
+        self.container_svc.cancel_instances_async.assert_awaited_once_with(
+            [TEST_INSTANCE_ID_2]
+        )
+
+    async def test_start_containers_as_ready_stops_launched_on_launch_error(self):
+        # Arrange
+        pending_containers = _get_pending_container_instances()
+        self.container_svc.create_instances_async = AsyncMock(
+            side_effect=[[pending_containers[0]], PcpError("RunTask failed")]
+        )
+        self.container_svc.get_instances_async = AsyncMock(
+            side_effect=lambda ids: [pending_containers[0] for _ in ids]
+        )
+        self.container_svc.cancel_instances_async = AsyncMock(return_value=[None])
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            async for _ in self.onedocker_svc.start_containers_as_ready(
+                package_name=TEST_PACKAGE_NAME,
+                cmd_args_list=TEST_CMD_ARGS_LIST,
+                max_concurrent_launches=1,
+                poll_interval=0.01,
+            ):
+                pass
+        self.container_svc.cancel_instances_async.assert_awaited_once_with(
+            [TEST_INSTANCE_ID_1]
+        )
+
     @patch("time.time", MagicMock(return_value=TEST_TIME))
     async def test_insights_emit_async(self):
         # Arrange
         running_containers = _get_running_container_instances()
         pending_containers = _get_pending_container_instances()
 
-        self.onedocker_svc.get_containers = MagicMock(
+        self.onedocker_svc.get_containers_async = AsyncMock(
             side_effect=([running_containers[0]], [running_containers[1]])
         )
 
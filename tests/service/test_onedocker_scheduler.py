@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import asyncio
+import itertools
+import threading
+import unittest
+from unittest import IsolatedAsyncioTestCase
+from unittest.mock import ANY, AsyncMock, call, MagicMock, patch
+
+from fbpcp.entity.container_instance import ContainerInstance
+from fbpcp.error.pcp import LimitExceededError, PcpError
+from fbpcp.service.onedocker_scheduler import (
+    METRICS_SCHEDULER_QUEUE_DELAY,
+    OneDockerWaveScheduler,
+)
+
+TEST_PACKAGE_NAME = "project/exe_name"
+TEST_CMD_ARGS_LIST = [f"--shard={i}" for i in range(5)]
+TEST_ENV_VARS_LIST = [{"SHARD": str(i)} for i in range(5)]
+
+
+def _start_containers(package_name, cmd_args_list, env_vars, **kwargs):
+    return [ContainerInstance(cmd_args) for cmd_args in cmd_args_list]
+
+
+class TestOneDockerWaveScheduler(unittest.TestCase):
+    def setUp(self):
+        self.onedocker_svc = MagicMock()
+        self.onedocker_svc.start_containers = MagicMock(side_effect=_start_containers)
+        self.metrics = MagicMock()
+        self.scheduler = OneDockerWaveScheduler(
+            self.onedocker_svc,
+            max_instances=4,
+            max_wave_size=2,
+            poll_interval=0,
+            metrics=self.metrics,
+        )
+
+    def test_start_containers_in_waves(self):
+        # Arrange
+        self.onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            side_effect=[1, 3, 4, 2, 2]
+        )
+
+        # Act
+        containers = self.scheduler.start_containers(
+            TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST, TEST_ENV_VARS_LIST, version="rc"
+        )
+
+        # Assert
+        self.assertEqual(
+            [container.instance_id for container in containers], TEST_CMD_ARGS_LIST
+        )
+        self.onedocker_svc.start_containers.assert_has_calls(
+            [
+                call(
+                    package_name=TEST_PACKAGE_NAME,
+                    cmd_args_list=TEST_CMD_ARGS_LIST[0:2],
+                    env_vars=TEST_ENV_VARS_LIST[0:2],
+                    version="rc",
+                ),
+                call(
+                    package_name=TEST_PACKAGE_NAME,
+                    cmd_args_list=TEST_CMD_ARGS_LIST[2:3],
+                    env_vars=TEST_ENV_VARS_LIST[2:3],
+                    version="rc",
+                ),
+                call(
+                    package_name=TEST_PACKAGE_NAME,
+                    cmd_args_list=TEST_CMD_ARGS_LIST[3:5],
+                    env_vars=TEST_ENV_VARS_LIST[3:5],
+                    version="rc",
+                ),
+            ]
+        )
+        self.assertEqual(self.onedocker_svc.start_containers.call_count, 3)
+        self.metrics.gauge.assert_called_with(METRICS_SCHEDULER_QUEUE_DELAY, ANY)
+        self.assertEqual(self.metrics.gauge.call_count, 3)
+
+    def test_start_containers_counts_unobserved_launches(self):
+        # Arrange: the instances count lags behind the first two waves
+        self.onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            side_effect=[0, 0, 0, 4, 2]
+        )
+
+        # Act
+        containers = self.scheduler.start_containers(
+            TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST
+        )
+
+        # Assert
+        self.assertEqual(len(containers), len(TEST_CMD_ARGS_LIST))
+        self.assertEqual(
+            [
+                len(c.kwargs["cmd_args_list"])
+                for c in self.onedocker_svc.start_containers.call_args_list
+            ],
+            [2, 2, 1],
+        )
+        self.assertEqual(
+            self.onedocker_svc.container_svc.get_current_instances_count.call_count, 5
+        )
+
+    def test_start_containers_stops_started_waves_on_failure(self):
+        # Arrange
+        self.onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            return_value=0
+        )
+        self.onedocker_svc.start_containers.side_effect = [
+            _start_containers(TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST[0:2], None),
+            PcpError("RunTask failed"),
+        ]
+        self.onedocker_svc.stop_containers.return_value = [None, None]
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            self.scheduler.start_containers(TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST)
+        self.onedocker_svc.stop_containers.assert_called_once_with(
+            TEST_CMD_ARGS_LIST[0:2]
+        )
+
+    @patch("fbpcp.service.onedocker_scheduler.time")
+    def test_start_containers_max_wait(self, mock_time):
+        mock_time.monotonic.side_effect = [0.0, 5.0, 11.0]
+        self.onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            return_value=4
+        )
+
+        with self.assertRaises(LimitExceededError):
+            self.scheduler.start_containers(
+                TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST, max_wait=10
+            )
+        self.onedocker_svc.start_containers.assert_not_called()
+
+    def test_invalid_env_vars(self):
+        with self.assertRaises(ValueError):
+            self.scheduler.start_containers(
+                TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST, TEST_ENV_VARS_LIST[:1]
+            )
+
+
+class TestOneDockerWaveSchedulerAsync(IsolatedAsyncioTestCase):
+    async def test_start_containers_async(self):
+        # Arrange
+        onedocker_svc = MagicMock()
+        onedocker_svc.start_containers_async = AsyncMock(side_effect=_start_containers)
+        onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            side_effect=[0, 4, 0]
+        )
+        scheduler = OneDockerWaveScheduler(
+            onedocker_svc, max_instances=4, max_wave_size=3, poll_interval=0
+        )
+
+        # Act
+        containers = await scheduler.start_containers_async(
+            TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST
+        )
+
+        # Assert
+        self.assertEqual(
+            [container.instance_id for container in containers], TEST_CMD_ARGS_LIST
+        )
+        self.assertEqual(onedocker_svc.start_containers_async.await_count, 2)
+
+    async def test_start_containers_async_stops_started_waves_on_failure(self):
+        # Arrange
+        onedocker_svc = MagicMock()
+        onedocker_svc.start_containers_async = AsyncMock(
+            side_effect=[
+                _start_containers(TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST[0:3], None),
+                PcpError("RunTask failed"),
+            ]
+        )
+        onedocker_svc.stop_containers_async = AsyncMock(return_value=[None] * 3)
+        onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            return_value=0
+        )
+        scheduler = OneDockerWaveScheduler(
+            onedocker_svc, max_instances=10, max_wave_size=3, poll_interval=0
+        )
+
+        # Act & Assert
+        with self.assertRaises(PcpError):
+            await scheduler.start_containers_async(
+                TEST_PACKAGE_NAME, TEST_CMD_ARGS_LIST
+            )
+        onedocker_svc.stop_containers_async.assert_awaited_once_with(
+            TEST_CMD_ARGS_LIST[0:3]
+        )
+
+    async def test_sync_and_async_callers_share_one_queue(self):
+        # Arrange: instances run for a moment, and the count sees them right away
+        lock = threading.Lock()
+        running = [0]
+        peak = [0]
+        started_by = []
+
+        def finish(count):
+            with lock:
+                running[0] -= count
+
+        def start(package_name, cmd_args_list, env_vars, **kwargs):
+            with lock:
+                running[0] += len(cmd_args_list)
+                peak[0] = max(peak[0], running[0])
+                started_by.append(cmd_args_list[0].split("-")[0])
+            threading.Timer(0.02, finish, [len(cmd_args_list)]).start()
+            return _start_containers(package_name, cmd_args_list, env_vars)
+
+        onedocker_svc = MagicMock()
+        onedocker_svc.start_containers = MagicMock(side_effect=start)
+        onedocker_svc.start_containers_async = AsyncMock(side_effect=start)
+        onedocker_svc.container_svc.get_current_instances_count = MagicMock(
+            side_effect=lambda: running[0]
+        )
+        scheduler = OneDockerWaveScheduler(
+            onedocker_svc,
+            max_instances=4,
+            max_wave_size=2,
+            poll_interval=0.005,
+            launch_settle_time=0.05,
+        )
+
+        # Act
+        results = await asyncio.gather(
+            asyncio.get_running_loop().run_in_executor(
+                None,
+                scheduler.start_containers,
+                TEST_PACKAGE_NAME,
+                [f"sync-{i}" for i in range(6)],
+            ),
+            *(
+                scheduler.start_containers_async(
+                    TEST_PACKAGE_NAME, [f"async{caller}-{i}" for i in range(6)]
+                )
+                for caller in range(2)
+            ),
+        )
+
+        # Assert: each caller starts all its waves before the next caller's first one
+        self.assertEqual([len(containers) for containers in results], [6, 6, 6])
+        self.assertLessEqual(peak[0], 4)
+        callers = [caller for caller, _ in itertools.groupby(started_by)]
+        self.assertEqual(sorted(callers), ["async0", "async1", "sync"])
@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.service.onedocker_warm_pool import OneDockerWarmPool
+from fbpcp.service.work_queue import RESULTS_QUEUE_SUFFIX
+
+TEST_TASK_DEF = "task_def"
+
+
+class TestOneDockerWarmPool(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work_queue_config = {
+            "class": "fbpcp.service.work_queue_local.LocalWorkQueueService",
+            "constructor": {"root_dir": self.tmpdir.name},
+        }
+        self.onedocker_svc = MagicMock()
+        self.onedocker_svc.task_definition = TEST_TASK_DEF
+        self.started = 0
+
+        def start_serving_containers(count, **kwargs):
+            containers = [
+                ContainerInstance(f"runner-{self.started + i}") for i in range(count)
+            ]
+            self.started += count
+            return containers
+
+        self.onedocker_svc.start_serving_containers = MagicMock(
+            side_effect=start_serving_containers
+        )
+        self.onedocker_svc.get_containers = MagicMock(
+            side_effect=lambda ids: [
+                ContainerInstance(i, status=ContainerInstanceStatus.STARTED)
+                for i in ids
+            ]
+        )
+        self.pool = OneDockerWarmPool(
+            self.onedocker_svc,
+            self.work_queue_config,
+            pool_size=2,
+            max_runners=2,
+            idle_timeout=600,
+        )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_replenish(self):
+        # Act
+        first = self.pool.replenish()
+        second = self.pool.replenish()
+
+        # Assert
+        self.assertEqual(len(first), 2)
+        self.assertEqual(second, [])
+        self.assertEqual(self.pool.runner_ids, ["runner-0", "runner-1"])
+        self.onedocker_svc.start_serving_containers.assert_called_once_with(
+            count=2,
+            work_queue_config=self.work_queue_config,
+            queue_name="onedocker-pool-task_def",
+            task_definition=TEST_TASK_DEF,
+            idle_timeout=600,
+            container_type=None,
+            permission=None,
+        )
+
+    def test_replenish_busy_and_dead_runners(self):
+        # Arrange
+        self.pool.replenish()
+        self.pool.submit("pkg", "1.0")
+        self.onedocker_svc.get_containers = MagicMock(
+            return_value=[
+                ContainerInstance("runner-0", status=ContainerInstanceStatus.STARTED),
+                ContainerInstance("runner-1", status=ContainerInstanceStatus.FAILED),
+            ]
+        )
+
+        # Act
+        started = self.pool.replenish()
+
+        # Assert
+        # one runner is busy and one died: two are needed, but max_runners caps it to one more
+        self.assertEqual([c.instance_id for c in started], ["runner-2"])
+        self.assertEqual(self.pool.runner_ids, ["runner-0", "runner-2"])
+
+    def test_submit_and_get_result(self):
+        # Arrange
+        item_id = self.pool.submit("pkg", "1.0", cmd_args="--k=v", timeout=60)
+        item = self.pool.work_queue.get(self.pool.queue_name)
+        item.exit_code = 0
+        self.pool.work_queue.put(self.pool.queue_name + RESULTS_QUEUE_SUFFIX, item)
+
+        # Act
+        result = self.pool.get_result()
+
+        # Assert
+        self.assertEqual(item.item_id, item_id)
+        self.assertEqual(item.exe_args, "--k=v")
+        self.assertEqual(result.exit_code, 0)
+        self.assertIsNone(self.pool.get_result())
+
+    def test_start_and_stop(self):
+        # Act
+        self.pool.start(interval=3600)
+        self.pool.stop()
+
+        # Assert
+        self.onedocker_svc.stop_containers.assert_called_once_with(
+            ["runner-0", "runner-1"]
+        )
+        self.assertEqual(self.pool.runner_ids, [])
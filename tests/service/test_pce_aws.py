@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import unittest
+from unittest.mock import patch
+
+from fbpcp.entity.container_definition import ContainerDefinition
+from fbpcp.service.pce_aws import (
+    AWSPCEService,
+    PCE_ID_KEY,
+    SHARED_TASK_DEFINITION_PREFIX,
+)
+
+TEST_REGION = "us-west-2"
+TEST_PCE_ID = "pce-1"
+TEST_ARN = "arn:aws:ecs:us-west-2:123456789012:task-definition/onedocker:1"
+
+
+def _definition(tags):
+    return ContainerDefinition(
+        f"{TEST_ARN}#container",
+        "image",
+        4096,
+        30720,
+        ["sh", "-c"],
+        {"USER": "ubuntu"},
+        "role",
+        tags,
+    )
+
+
+class TestAWSPCEService(unittest.TestCase):
+    @patch("fbpcp.service.pce_aws.ECSGateway")
+    @patch("fbpcp.service.pce_aws.EC2Gateway")
+    def setUp(self, MockEC2Gateway, MockECSGateway):
+        self.pce_svc = AWSPCEService(TEST_REGION)
+        self.ecs_gateway = self.pce_svc.ecs_gateway
+        self.ecs_gateway.describe_clusters.return_value = []
+        self.ecs_gateway.list_task_definitions.return_value = [TEST_ARN]
+        self.shared_definition = _definition({})
+        self.ecs_gateway.describe_task_definition.return_value = self.shared_definition
+
+    def _describe_with_tags(self, *tags):
+        self.ecs_gateway.describe_task_definitions_in_parallel.side_effect = [
+            [_definition(t)] for t in tags
+        ]
+
+    def test_get_compute_finds_tagged_definition(self):
+        # Arrange
+        self._describe_with_tags({PCE_ID_KEY: TEST_PCE_ID})
+
+        # Act
+        compute = self.pce_svc._get_compute(TEST_PCE_ID)
+
+        # Assert
+        self.assertEqual(
+            compute.container_definition, _definition({PCE_ID_KEY: TEST_PCE_ID})
+        )
+        self.assertEqual(
+            self.ecs_gateway.describe_task_definitions_in_parallel.call_count, 1
+        )
+        self.ecs_gateway.describe_task_definition.assert_not_called()
+
+    def test_get_compute_full_refresh_picks_up_new_tags(self):
+        # Arrange: the PCE tag is added to the revision after it was first described
+        self._describe_with_tags({}, {PCE_ID_KEY: TEST_PCE_ID})
+
+        # Act
+        compute = self.pce_svc._get_compute(TEST_PCE_ID)
+
+        # Assert
+        self.assertEqual(
+            compute.container_definition, _definition({PCE_ID_KEY: TEST_PCE_ID})
+        )
+        self.assertEqual(
+            self.ecs_gateway.describe_task_definitions_in_parallel.call_count, 2
+        )
+        self.ecs_gateway.describe_task_definition.assert_not_called()
+
+    def test_get_compute_full_refresh_is_rate_limited(self):
+        # Arrange
+        self._describe_with_tags({}, {})
+
+        # Act
+        first = self.pce_svc._get_compute(TEST_PCE_ID)
+        second = self.pce_svc._get_compute(TEST_PCE_ID)
+
+        # Assert: the second miss falls back to the shared definition right away
+        self.assertEqual(first.container_definition, self.shared_definition)
+        self.assertEqual(second.container_definition, self.shared_definition)
+        self.assertEqual(
+            self.ecs_gateway.describe_task_definitions_in_parallel.call_count, 2
+        )
+        self.ecs_gateway.describe_task_definition.assert_called_with(
+            SHARED_TASK_DEFINITION_PREFIX + TEST_REGION
+        )
+
+    def test_get_compute_full_refresh_after_interval(self):
+        # Arrange
+        self.pce_svc.full_refresh_interval = 0
+        self._describe_with_tags({}, {}, {PCE_ID_KEY: TEST_PCE_ID})
+
+        # Act
+        self.pce_svc._get_compute(TEST_PCE_ID)
+        compute = self.pce_svc._get_compute(TEST_PCE_ID)
+
+        # Assert
+        self.assertEqual(
+            compute.container_definition, _definition({PCE_ID_KEY: TEST_PCE_ID})
+        )
+        self.assertEqual(
+            self.ecs_gateway.describe_task_definitions_in_parallel.call_count, 3
+        )
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import tempfile
+import unittest
+
+from fbpcp.entity.resource_usage import get_run_fingerprint, ResourceUsage
+from fbpcp.service.resource_usage_store_local import LocalResourceUsageStore
+
+
+class TestLocalResourceUsageStore(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.store = LocalResourceUsageStore(self.tmpdir.name)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def _usage(self, version, exe_args, wall_time):
+        return ResourceUsage(
+            package_name="private_lift/lift",
+            version=version,
+            fingerprint=get_run_fingerprint("private_lift/lift", version, exe_args),
+            peak_memory=1024,
+            cpu_time=1.0,
+            wall_time=wall_time,
+            cpu=1,
+            exit_code=0,
+        )
+
+    def test_get_usages(self):
+        # Arrange
+        for wall_time, (version, exe_args) in enumerate(
+            [("v1", "a"), ("v1", "b"), ("v2", "a"), ("v1", "a")]
+        ):
+            self.store.record(self._usage(version, exe_args, wall_time))
+
+        # Act & Assert
+        self.assertEqual(
+            [u.wall_time for u in self.store.get_usages("private_lift/lift")],
+            [3, 2, 1, 0],
+        )
+        self.assertEqual(
+            [u.wall_time for u in self.store.get_usages("private_lift/lift", "v1")],
+            [3, 1, 0],
+        )
+        self.assertEqual(
+            [
+                u.wall_time
+                for u in self.store.get_usages(
+                    "private_lift/lift",
+                    "v1",
+                    get_run_fingerprint("private_lift/lift", "v1", "a"),
+                    limit=1,
+                )
+            ],
+            [3],
+        )
+        self.assertEqual(self.store.get_usages("other"), [])
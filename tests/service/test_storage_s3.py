@@ -6,10 +6,16 @@
 
 # pyre-unsafe
 
+import hashlib
 import os
+import tempfile
+import threading
+import time
 import unittest
+from datetime import datetime
 from unittest.mock import call, MagicMock, patch
 
+from fbpcp.entity.file_information import FileInfo
 from fbpcp.service.storage_s3 import S3StorageService
 
 
@@ -93,6 +99,80 @@ class TestS3StorageService(unittest.TestCase):
             "bucket", "test_file", str(self.LOCAL_FILE)
         )
 
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_download_file_parallel(self, MockS3Gateway):
+        content = os.urandom(1000)
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.s3_gateway.get_object_size = MagicMock(return_value=len(content))
+        service.s3_gateway.get_object_range = MagicMock(
+            side_effect=lambda bucket, key, start, end: content[start : end + 1]
+        )
+        with tempfile.TemporaryDirectory() as tmpdir:
+            destination = os.path.join(tmpdir, "test_file")
+
+            sha256 = service.download_file_parallel(
+                self.S3_FILE, destination, max_workers=3, part_size=64
+            )
+
+            with open(destination, "rb") as f:
+                self.assertEqual(f.read(), content)
+        self.assertEqual(sha256, hashlib.sha256(content).hexdigest())
+        self.assertEqual(service.s3_gateway.get_object_range.call_count, 16)
+        service.s3_gateway.get_object_range.assert_any_call(
+            "bucket", "test_file", 960, 999
+        )
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_download_file_parallel_caps_in_flight_bytes(self, MockS3Gateway):
+        content = os.urandom(1000)
+        lock = threading.Lock()
+        in_flight = [0, 0]
+
+        def get_object_range(bucket, key, start, end):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.001)
+            with lock:
+                in_flight[0] -= 1
+            return content[start : end + 1]
+
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.s3_gateway.get_object_size = MagicMock(return_value=len(content))
+        service.s3_gateway.get_object_range = MagicMock(side_effect=get_object_range)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            sha256 = service.download_file_parallel(
+                self.S3_FILE,
+                os.path.join(tmpdir, "test_file"),
+                max_workers=8,
+                part_size=64,
+                max_in_flight_bytes=128,
+            )
+
+        self.assertEqual(sha256, hashlib.sha256(content).hexdigest())
+        self.assertLessEqual(in_flight[1], 2)
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_read_stream(self, MockS3Gateway):
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.read_stream(self.S3_FILE)
+        service.s3_gateway.get_object_stream.assert_called_with("bucket", "test_file")
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_download_file_parallel_short_read(self, MockS3Gateway):
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.s3_gateway.get_object_size = MagicMock(return_value=100)
+        service.s3_gateway.get_object_range = MagicMock(return_value=b"short")
+        with tempfile.TemporaryDirectory() as tmpdir:
+            with self.assertRaises(ValueError):
+                service.download_file_parallel(
+                    self.S3_FILE, os.path.join(tmpdir, "test_file"), max_workers=2
+                )
+
     def test_copy_s3_dir_to_local_recursive_false(self):
         service = S3StorageService("us-west-1")
         self.assertRaises(
@@ -220,3 +300,53 @@ class TestS3StorageService(unittest.TestCase):
         service.s3_gateway = MockS3Gateway()
         service.list_files(self.S3_FOLDER)
         service.s3_gateway.list_object2.assert_called_with("bucket", "test_folder")
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_read_versioned(self, MockS3Gateway):
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.s3_gateway.get_object_with_etag.return_value = ("data", '"etag1"')
+        self.assertEqual(service.read_versioned(self.S3_FILE), ("data", '"etag1"'))
+        service.s3_gateway.get_object_with_etag.assert_called_with(
+            "bucket", "test_file"
+        )
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_write_conditional(self, MockS3Gateway):
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        service.s3_gateway.put_object_conditional.return_value = '"etag2"'
+        self.assertEqual(
+            service.write_conditional(self.S3_FILE, "data", '"etag1"'), '"etag2"'
+        )
+        service.s3_gateway.put_object_conditional.assert_called_with(
+            "bucket", "test_file", "data", '"etag1"'
+        )
+
+    @patch("fbpcp.gateway.s3.S3Gateway")
+    def test_list_files_info(self, MockS3Gateway):
+        service = S3StorageService("us-west-1")
+        service.s3_gateway = MockS3Gateway()
+        last_modified = datetime(2022, 1, 1, 1, 1, 5)
+        service.s3_gateway.list_objects_info.return_value = [
+            {
+                "Key": "test_folder/test_file",
+                "Size": 10,
+                "LastModified": last_modified,
+                "ETag": '"abc"',
+            }
+        ]
+        self.assertEqual(
+            service.list_files_info(self.S3_FOLDER),
+            [
+                FileInfo(
+                    file_name=f"{self.S3_FOLDER}test_file",
+                    last_modified=last_modified.ctime(),
+                    file_size=10,
+                    etag="abc",
+                )
+            ],
+        )
+        service.s3_gateway.list_objects_info.assert_called_with(
+            "bucket", "test_folder/"
+        )
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import os
+import tempfile
+import unittest
+
+from fbpcp.entity.work_item import WorkItem
+from fbpcp.service.work_queue_local import LocalWorkQueueService
+
+
+class TestLocalWorkQueueService(unittest.TestCase):
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.work_queue = LocalWorkQueueService(self.tmpdir.name, poll_interval=0.01)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_put_and_get_in_order(self):
+        # Arrange
+        items = [
+            WorkItem(package_name="pkg", version="1.0", exe_args=f"--shard={i}")
+            for i in range(3)
+        ]
+
+        # Act
+        for item in items:
+            self.work_queue.put("queue", item)
+        results = [self.work_queue.get("queue") for _ in items]
+
+        # Assert
+        self.assertEqual(results, items)
+        self.assertEqual(os.listdir(os.path.join(self.tmpdir.name, "queue")), [])
+
+    def test_get_empty_queue(self):
+        # Act & Assert
+        self.assertIsNone(self.work_queue.get("queue"))
+        self.assertIsNone(self.work_queue.get("queue", wait_time=0.05))
+
+    def test_consumers_share_queue(self):
+        # Arrange
+        other_consumer = LocalWorkQueueService(self.tmpdir.name)
+        items = [WorkItem(package_name="pkg", version="1.0") for _ in range(2)]
+        for item in items:
+            self.work_queue.put("queue", item)
+
+        # Act
+        first = other_consumer.get("queue")
+        second = self.work_queue.get("queue")
+
+        # Assert
+        self.assertEqual([first, second], items)
+        self.assertIsNone(other_consumer.get("queue"))
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import MagicMock, patch
+
+from fbpcp.entity.container_instance import ContainerInstance, ContainerInstanceStatus
+from fbpcp.util.container_instance_cache import ContainerInstanceCache
+
+TEST_INSTANCE_ID_1 = "test-instance-id-1"
+TEST_INSTANCE_ID_2 = "test-instance-id-2"
+
+
+class TestContainerInstanceCache(unittest.TestCase):
+    def setUp(self):
+        self.cache = ContainerInstanceCache(
+            status_ttls={ContainerInstanceStatus.STARTED: 5.0}
+        )
+
+    @patch("fbpcp.util.container_instance_cache.time")
+    def test_running_instance_expires(self, mock_time):
+        # Arrange
+        mock_time.monotonic.return_value = 0.0
+        instance = ContainerInstance(
+            TEST_INSTANCE_ID_1, status=ContainerInstanceStatus.STARTED
+        )
+        loader = MagicMock(return_value=[instance])
+
+        # Act & Assert
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [instance])
+        mock_time.monotonic.return_value = 4.0
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [instance])
+        self.assertEqual(loader.call_count, 1)
+        mock_time.monotonic.return_value = 6.0
+        self.cache.get_many([TEST_INSTANCE_ID_1], loader)
+        self.assertEqual(loader.call_count, 2)
+
+    @patch("fbpcp.util.container_instance_cache.time")
+    def test_terminal_instance_never_expires(self, mock_time):
+        mock_time.monotonic.return_value = 0.0
+        instance = ContainerInstance(
+            TEST_INSTANCE_ID_1, status=ContainerInstanceStatus.COMPLETED
+        )
+        loader = MagicMock(return_value=[instance])
+
+        self.cache.get_many([TEST_INSTANCE_ID_1], loader)
+        mock_time.monotonic.return_value = 1e9
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [instance])
+        loader.assert_called_once_with([TEST_INSTANCE_ID_1])
+
+    def test_missing_instances_are_not_cached(self):
+        loader = MagicMock(return_value=[None])
+
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [None])
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [None])
+        self.assertEqual(loader.call_count, 2)
+
+    def test_only_missing_ids_are_loaded_in_order(self):
+        instance_1 = ContainerInstance(
+            TEST_INSTANCE_ID_1, status=ContainerInstanceStatus.FAILED
+        )
+        instance_2 = ContainerInstance(
+            TEST_INSTANCE_ID_2, status=ContainerInstanceStatus.STARTED
+        )
+        self.cache.get_many([TEST_INSTANCE_ID_1], MagicMock(return_value=[instance_1]))
+        loader = MagicMock(return_value=[instance_2])
+
+        res = self.cache.get_many([TEST_INSTANCE_ID_2, TEST_INSTANCE_ID_1], loader)
+
+        self.assertEqual(res, [instance_2, instance_1])
+        loader.assert_called_once_with([TEST_INSTANCE_ID_2])
+
+    def test_invalidate(self):
+        instance = ContainerInstance(
+            TEST_INSTANCE_ID_1, status=ContainerInstanceStatus.STARTED
+        )
+        loader = MagicMock(return_value=[instance])
+
+        self.cache.get_many([TEST_INSTANCE_ID_1], loader)
+        self.cache.invalidate(TEST_INSTANCE_ID_1)
+        self.cache.get_many([TEST_INSTANCE_ID_1], loader)
+
+        self.assertEqual(loader.call_count, 2)
+
+    def test_single_flight(self):
+        # Arrange
+        instance = ContainerInstance(
+            TEST_INSTANCE_ID_1, status=ContainerInstanceStatus.STARTED
+        )
+        loading = threading.Event()
+        release = threading.Event()
+
+        def slow_loader(ids):
+            loading.set()
+            release.wait(5)
+            return [instance]
+
+        loader = MagicMock(side_effect=slow_loader)
+
+        # Act
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            first = executor.submit(self.cache.get_many, [TEST_INSTANCE_ID_1], loader)
+            loading.wait(5)
+            second = executor.submit(self.cache.get_many, [TEST_INSTANCE_ID_1], loader)
+            release.set()
+
+            # Assert
+            self.assertEqual(first.result(), [instance])
+            self.assertEqual(second.result(), [instance])
+        loader.assert_called_once()
+
+    def test_loader_error_is_propagated(self):
+        loader = MagicMock(side_effect=RuntimeError("boom"))
+
+        with self.assertRaises(RuntimeError):
+            self.cache.get_many([TEST_INSTANCE_ID_1], loader)
+        # a failed load must not leave the id marked as in flight
+        loader.side_effect = None
+        loader.return_value = [None]
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_1], loader), [None])
+
+    def test_short_loader_result(self):
+        instance = ContainerInstance(TEST_INSTANCE_ID_1)
+        loader = MagicMock(return_value=[instance])
+
+        self.assertEqual(
+            self.cache.get_many([TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2], loader),
+            [instance, None],
+        )
+        # the id missing from the result must not be left in flight
+        loader.return_value = [None]
+        self.assertEqual(self.cache.get_many([TEST_INSTANCE_ID_2], loader), [None])
+        self.assertEqual(loader.call_count, 2)
+
+    def test_max_entries(self):
+        cache = ContainerInstanceCache(max_entries=1)
+        instances = [
+            ContainerInstance(instance_id, status=ContainerInstanceStatus.COMPLETED)
+            for instance_id in (TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2)
+        ]
+        cache.get_many(
+            [TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2], MagicMock(return_value=instances)
+        )
+        loader = MagicMock(return_value=[instances[0]])
+
+        cache.get_many([TEST_INSTANCE_ID_1, TEST_INSTANCE_ID_2], loader)
+
+        loader.assert_called_once_with([TEST_INSTANCE_ID_1])
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import unittest
+from unittest.mock import patch
+
+from fbpcp.util.rate_limiter import RateLimiter
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_invalid_rate(self):
+        with self.assertRaises(ValueError):
+            RateLimiter(0)
+
+    @patch("fbpcp.util.rate_limiter.time")
+    def test_acquire_within_burst(self, mock_time):
+        mock_time.monotonic.return_value = 0.0
+        limiter = RateLimiter(rate=10, burst=3)
+        for _ in range(3):
+            limiter.acquire()
+        mock_time.sleep.assert_not_called()
+
+    @patch("fbpcp.util.rate_limiter.time")
+    def test_acquire_waits_for_refill(self, mock_time):
+        now = [0.0]
+        mock_time.monotonic.side_effect = lambda: now[0]
+
+        def sleep(seconds):
+            now[0] += seconds
+
+        mock_time.sleep.side_effect = sleep
+        limiter = RateLimiter(rate=2, burst=1)
+
+        limiter.acquire()
+        limiter.acquire()
+
+        mock_time.sleep.assert_called_once_with(0.5)
+        self.assertEqual(now[0], 0.5)
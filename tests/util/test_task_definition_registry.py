@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# Copyright (c) Meta Platforms, Inc. and affiliates.
+#
+# This source code is licensed under the MIT license found in the
+# LICENSE file in the root directory of this source tree.
+
+# pyre-unsafe
+
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock
+
+from fbpcp.entity.container_definition import ContainerDefinition
+from fbpcp.util.task_definition_registry import TaskDefinitionRegistry
+
+TEST_ARN_1 = "arn:aws:ecs:us-west-2:123456789012:task-definition/onedocker:1"
+TEST_ARN_2 = "arn:aws:ecs:us-west-2:123456789012:task-definition/onedocker:2"
+TEST_ARN_3 = "arn:aws:ecs:us-west-2:123456789012:task-definition/other:1"
+TEST_TAGS = {
+    TEST_ARN_1: {"pce:pce-id": "pce-1"},
+    TEST_ARN_2: {"pce:pce-id": "pce-2", "env": "prod"},
+    TEST_ARN_3: {"pce:pce-id": "pce-2", "env": "test"},
+}
+
+
+def _definition(arn):
+    return ContainerDefinition(
+        f"{arn}#container",
+        "image",
+        4096,
+        30720,
+        ["sh", "-c"],
+        {"USER": "ubuntu"},
+        "role",
+        TEST_TAGS[arn],
+    )
+
+
+class TestTaskDefinitionRegistry(unittest.TestCase):
+    def setUp(self):
+        self.ecs_gateway = MagicMock()
+        self.ecs_gateway.list_task_definitions = MagicMock(
+            return_value=[TEST_ARN_1, TEST_ARN_2]
+        )
+        self.ecs_gateway.describe_task_definitions_in_parallel = MagicMock(
+            side_effect=lambda task_definitions, max_workers: [
+                _definition(arn) for arn in task_definitions
+            ]
+        )
+
+    def test_find_by_tags(self):
+        # Arrange
+        registry = TaskDefinitionRegistry(self.ecs_gateway)
+
+        # Act & Assert
+        self.assertEqual(
+            registry.find({"pce:pce-id": "pce-2"}), [_definition(TEST_ARN_2)]
+        )
+        self.assertEqual(registry.find({"pce:pce-id": "pce-2", "env": "test"}), [])
+        self.assertEqual(registry.find({"unknown": "tag"}), [])
+        self.assertEqual(
+            registry.find(), [_definition(TEST_ARN_1), _definition(TEST_ARN_2)]
+        )
+        self.ecs_gateway.describe_task_definitions_in_parallel.assert_called_once()
+
+    def test_incremental_refresh(self):
+        # Arrange
+        registry = TaskDefinitionRegistry(self.ecs_gateway)
+        registry.refresh()
+        # revision 1 is deregistered and a new task definition is registered
+        self.ecs_gateway.list_task_definitions.return_value = [TEST_ARN_2, TEST_ARN_3]
+
+        # Act
+        described = registry.refresh()
+
+        # Assert
+        self.assertEqual(described, 1)
+        self.ecs_gateway.describe_task_definitions_in_parallel.assert_called_with(
+            task_definitions=[TEST_ARN_3], max_workers=8
+        )
+        self.assertEqual(
+            registry.find({"pce:pce-id": "pce-2"}),
+            [_definition(TEST_ARN_2), _definition(TEST_ARN_3)],
+        )
+        self.assertIsNone(registry.get(TEST_ARN_1))
+
+    def test_full_refresh(self):
+        # Arrange
+        registry = TaskDefinitionRegistry(self.ecs_gateway)
+        registry.refresh()
+
+        # Act
+        described = registry.refresh(full=True)
+
+        # Assert
+        self.assertEqual(described, 2)
+
+    def test_persistent_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Arrange
+            cache_path = os.path.join(tmpdir, "task_definitions.json")
+            TaskDefinitionRegistry(self.ecs_gateway, cache_path=cache_path).refresh()
+            self.ecs_gateway.describe_task_definitions_in_parallel.reset_mock()
+
+            # Act
+            registry = TaskDefinitionRegistry(self.ecs_gateway, cache_path=cache_path)
+            described = registry.refresh()
+
+            # Assert
+            self.assertEqual(described, 0)
+            self.ecs_gateway.describe_task_definitions_in_parallel.assert_not_called()
+            self.assertEqual(
+                registry.find({"pce:pce-id": "pce-1"}), [_definition(TEST_ARN_1)]
+            )
+
+    def test_unreadable_cache(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            # Arrange
+            cache_path = os.path.join(tmpdir, "task_definitions.json")
+            with open(cache_path, "w") as f:
+                f.write("{not json")
+
+            # Act
+            registry = TaskDefinitionRegistry(self.ecs_gateway, cache_path=cache_path)
+
+            # Assert
+            self.assertEqual(registry.refresh(), 2)